@@ -21,12 +21,12 @@ EXIT_CODE=$?
 if [ $EXIT_CODE -eq 0 ]; then
     echo "✅ Retraining successful at $(date)" >> logs/retraining.log
     
-    # Перезапускаем бота если он работает
+    # Бот подхватывает новые модели сам (watcher models/, ml_reload_interval);
+    # запрос к API только ускоряет перезагрузку - рестарт не нужен
     if [ -f bot.pid ] && ps -p $(cat bot.pid) > /dev/null 2>&1; then
-        echo "🔄 Restarting bot with new models..." >> logs/retraining.log
-        kill -HUP $(cat bot.pid) || true
-        sleep 5
-        ./start_bot_24_7.sh
+        echo "🔄 Hot-reloading models in running bot..." >> logs/retraining.log
+        curl -s -X POST http://localhost:8000/api/control/reload_models >> logs/retraining.log 2>&1 || true
+        echo >> logs/retraining.log
     fi
 else
     echo "❌ Retraining failed at $(date) with code $EXIT_CODE" >> logs/retraining_error.log
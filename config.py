@@ -102,7 +102,11 @@ TRADING_CONFIG = {
     'timeframes': ['15m', '1h', '4h', '1d'],
     'update_frequency': 300,  # 5 минут
     'min_confidence': 0.8,  # 80% для Best Alpha Only
-    'top_signals': 5
+    'top_signals': 5,
+    'fetch_concurrency': 16,  # Одновременных загрузок OHLCV при скане пар
+    'exchange_concurrency': 8,  # Одновременных запросов к одной бирже
+    'compute_concurrency': 4,  # Одновременных анализов (потоки индикаторов)
+    'onchain_refresh': 300  # Интервал фонового обновления on-chain данных, сек
 }
 
 # Анализ настройки
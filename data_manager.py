@@ -4,16 +4,14 @@ data_manager.py
 
 🚀 ПРОФЕССИОНАЛЬНЫЙ УНИВЕРСАЛЬНЫЙ DATA MANAGER
 - WebSocket real-time данные (Binance, Bybit, OKX)
-- REST API fallback через ccxt
+- REST API fallback через ccxt.async_support (общий пул соединений)
 - Расширенные технические индикаторы (SuperTrend, Donchian, VWAP)
 - Реальные on-chain данные (Dune Analytics)
 - Новостной анализ (CryptoPanic)
 - Только реальные данные, никаких симуляций!
 """
 
-import ccxt
 import asyncio
-import aiohttp
 import websockets
 import pandas as pd
 import numpy as np
@@ -24,6 +22,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import requests
 from config import EXCHANGE_KEYS, EXTERNAL_APIS
+from src.services.http_client import http_client
+from src.services.exchange_pool import ExchangePool
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -317,46 +317,32 @@ class RealDataCollector:
         self.cache = {}
         self.cache_timeout = 60
         
-    def _init_exchanges(self) -> Dict:
-        """Инициализация бирж через ccxt"""
-        exchanges = {}
-        
-        try:
-            exchanges['binance'] = ccxt.binance({
+    def _init_exchanges(self) -> ExchangePool:
+        """Асинхронные клиенты ccxt на общем пуле соединений"""
+        return ExchangePool({
+            'binance': {
                 'apiKey': EXCHANGE_KEYS['binance']['key'],
                 'secret': EXCHANGE_KEYS['binance']['secret'],
                 'sandbox': False,
                 'enableRateLimit': True,
                 'rateLimit': 1200
-            })
-        except Exception as e:
-            logger.error(f"❌ Binance init error: {e}")
-        
-        try:
-            exchanges['bybit'] = ccxt.bybit({
+            },
+            'bybit': {
                 'apiKey': EXCHANGE_KEYS['bybit']['key'],
                 'secret': EXCHANGE_KEYS['bybit']['secret'],
                 'sandbox': False,
                 'enableRateLimit': True,
                 'rateLimit': 2000
-            })
-        except Exception as e:
-            logger.error(f"❌ Bybit init error: {e}")
-        
-        try:
-            exchanges['okx'] = ccxt.okx({
+            },
+            'okx': {
                 'apiKey': EXCHANGE_KEYS['okx']['key'],
                 'secret': EXCHANGE_KEYS['okx']['secret'],
                 'password': EXCHANGE_KEYS['okx']['passphrase'],
                 'sandbox': False,
                 'enableRateLimit': True,
                 'rateLimit': 1000
-            })
-        except Exception as e:
-            logger.error(f"❌ OKX init error: {e}")
-        
-        logger.info(f"✅ Инициализировано {len(exchanges)} бирж")
-        return exchanges
+            }
+        })
     
     async def get_real_ohlcv(self, symbol: str, timeframe: str = '1h', limit: int = 100) -> Optional[pd.DataFrame]:
         """Получение реальных OHLCV данных через ccxt с fallback"""
@@ -372,32 +358,24 @@ class RealDataCollector:
         # Приоритет бирж
         exchange_priority = ['binance', 'okx', 'bybit']
         
-        for exchange_name in exchange_priority:
-            if exchange_name not in self.exchanges:
-                continue
-                
-            try:
-                exchange = self.exchanges[exchange_name]
-                
-                # Получаем данные
-                ohlcv = await asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-                )
-                
-                if ohlcv and len(ohlcv) > 0:
-                    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-                    df['exchange'] = exchange_name
-                    
-                    # Кэшируем
-                    self.cache[cache_key] = (df, current_time)
-                    logger.info(f"✅ {symbol} data from {exchange_name}: {len(df)} candles")
-                    return df
-                    
-            except Exception as e:
-                logger.warning(f"⚠️ {exchange_name} error for {symbol}: {e}")
-                continue
+        # Hedged-запрос: следующая биржа стартует, если текущая не ответила за свой p95
+        try:
+            exchange_name, ohlcv = await self.exchanges.fetch_ohlcv_hedged(
+                symbol, timeframe, limit=limit, names=exchange_priority
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ OHLCV error for {symbol}: {e}")
+            exchange_name, ohlcv = None, None
+        
+        if exchange_name is not None:
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df['exchange'] = exchange_name
+            
+            # Кэшируем
+            self.cache[cache_key] = (df, current_time)
+            logger.info(f"✅ {symbol} data from {exchange_name}: {len(df)} candles")
+            return df
         
         logger.error(f"❌ Failed to get data for {symbol} from all exchanges")
         return None
@@ -490,7 +468,7 @@ class RealDataCollector:
                 'filter': 'rising'
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client.borrow() as session:
                 async with session.get(url, params=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -640,6 +618,10 @@ class RealDataCollector:
         """Остановка WebSocket потоков"""
         await self.websocket_manager.stop_streams()
         logger.info("🛑 WebSocket streams stopped")
+    
+    async def close(self):
+        """Закрытие клиентов бирж и пула соединений"""
+        await self.exchanges.close()
 
 # Пример использования
 if __name__ == "__main__":
@@ -657,5 +639,6 @@ if __name__ == "__main__":
         
         # Тест WebSocket (запустить на несколько секунд)
         # await collector.start_realtime_streams(['BTC/USDT', 'ETH/USDT'])
+        await collector.close()
     
     asyncio.run(test_data_manager()) 
\ No newline at end of file
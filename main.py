@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import sys
+from datetime import datetime
 from typing import Optional
 import ccxt
 import ccxt.async_support as ccxt_async
@@ -9,10 +10,14 @@ from src.core.settings import settings
 from src.core.logging import setup_logging
 from src.services.notifier import Notifier
 from src.services.telegram import TelegramBot
-from src.services.api_server import run_api
+from src.services.api_server import run_api, signal_payload, status_payload
+from src.services.http_client import http_client
+from src.services.event_bus import event_bus
 import threading
 from src.strategies.models import EnhancedSignal
 from src.services.portfolio_service import PortfolioService
+from src.db.journal import SignalJournal
+from src.strategies.outcome_tracker import OutcomeTracker
 from src.strategies.signal_generator import SignalGenerator
 
 # Setup Logging
@@ -38,6 +43,14 @@ class Bot:
         self.last_signal_time = {}  # symbol -> datetime
         self.last_update_time = {}  # symbol -> timestamp (for dynamic frequency)
         self.api_semaphore = asyncio.Semaphore(10)  # Max 10 concurrent API calls
+        # Signal/outcome journal (batched writes + background TP/SL resolver)
+        self.journal = SignalJournal(
+            flush_interval=self.settings.journal_flush_seconds,
+            resolve_interval=self.settings.journal_resolve_seconds,
+            max_hold_hours=self.settings.journal_max_hold_hours
+        )
+        self.outcome_tracker = None  # Ultra Mode: live SL/TP tracking -> risk manager
+        self._published_signals = {}  # cache_key -> timestamp сигнала, уже отправленного в event_bus
         self.notifier.telegram.set_control_callback(self.control_callback)
         
         # Top 20 pairs by liquidity (update every 60s)
@@ -55,6 +68,22 @@ class Bot:
         elif action == 'stop':
             self.is_active = False
             logger.info("Bot paused via Telegram.")
+        self.publish_status()
+
+    def publish_status(self):
+        """Статус для подписчиков API (retained: новый клиент получает его сразу)"""
+        if self.signal_generator is not None:
+            event_bus.publish('status', status_payload(self), retain=True)
+
+    def _publish_signal(self, signal):
+        """Публикует сигнал, если это новая запись signal_cache (кешированный повтор не дублируется)"""
+        cache_key = f"{signal.symbol}_{signal.timeframe}"
+        cached = self.signal_generator.signal_cache.get(cache_key)
+        timestamp = cached[1] if cached else datetime.now()
+        if self._published_signals.get(cache_key) == timestamp:
+            return
+        self._published_signals[cache_key] = timestamp
+        event_bus.publish('signal', signal_payload(signal, timestamp), key=cache_key, retain=True)
 
     async def initialize(self):
         logger.info("Initializing Bot...")
@@ -168,6 +197,7 @@ class Bot:
             logger.info("🚀 Initializing Ultra Mode (Real ML + Smart Money)...")
             from src.strategies.signal_generator_ultra import UltraSignalGenerator
             from src.strategies.binance_ws import BinanceWSClient
+            from src.db.metrics_store import MetricsStore
             
             # Smart Symbol Resolution: Find the actual symbols used by Binance
             binance_symbols = []
@@ -179,10 +209,33 @@ class Bot:
                     binance_symbols.append(s)
             
             # Start WS Client with RESOLVED symbols
-            self.ws_client = BinanceWSClient(binance_symbols)
+            self.ws_client = BinanceWSClient(
+                binance_symbols,
+                order_books=self.settings.enable_order_books,
+                depth_pct=self.settings.order_book_depth_pct,
+                store=MetricsStore(self.settings.metrics_store_path),
+                flush_interval=self.settings.metrics_flush_seconds
+            )
             asyncio.create_task(self.ws_client.start())
             
             self.signal_generator = UltraSignalGenerator(self.primary_exchange, ws_client=self.ws_client)
+            # Переобученные модели подхватываются без рестарта
+            self.signal_generator.ml_engine.watch(self.settings.ml_reload_interval)
+            
+            if self.settings.ml_online_weights:
+                self.signal_generator.ml_engine.enable_online_weights(
+                    eta=self.settings.ml_online_eta,
+                    drop_weight=self.settings.ml_online_drop_weight,
+                    min_observations=self.settings.ml_online_min_outcomes
+                )
+
+            # Live outcomes feed Kelly sizing (DynamicRiskManager.record_trade) and ensemble weights
+            self.outcome_tracker = OutcomeTracker(
+                self.signal_generator.risk_manager,
+                max_hold_seconds=self.settings.journal_max_hold_hours * 3600,
+                ml_engine=self.signal_generator.ml_engine
+            )
+            self.ws_client.add_price_listener(self.outcome_tracker.on_price)
             logger.info(f"   Min Confidence: {self.settings.ultra_min_confidence:.0%}")
             logger.info("   ML Models: XGBoost + LightGBM + CatBoost")
             logger.info("   Smart Money: Liquidity + Funding Analysis (WebSocket)")
@@ -194,8 +247,12 @@ class Bot:
         
         # Portfolio Service
         self.portfolio_service = PortfolioService(self.exchanges)
+        
+        # Journal: outcomes resolved from primary exchange klines
+        await self.journal.start(self.primary_exchange.fetch_ohlcv)
         logger.info(f"Bot Initialized. Active Exchanges: {list(self.exchanges.keys())}")
         self.is_running = True
+        self.status_changed_at = datetime.now()  # last_update в /api/status
 
     def find_matching_symbol(self, exchange_name: str, target_symbol: str) -> tuple[Optional[str], float]:
         """
@@ -328,9 +385,9 @@ class Bot:
                                     arbitrage_spread=spread_pct
                                 )
                             if signal:
+                                self._publish_signal(signal)
+                                
                                 # Cooldown Check
-                                from typing import Dict, List, Optional
-                                from datetime import datetime
                                 now = datetime.now()
                                 if symbol not in self.last_signal_time or (now - self.last_signal_time[symbol]).total_seconds() > self.settings.signal_cooldown_minutes * 60:
                                     
@@ -340,6 +397,9 @@ class Bot:
                                     else:
                                         await self.notifier.send_signal(signal)
                                     
+                                    self.journal.record(signal, timestamp=now)
+                                    if self.outcome_tracker:
+                                        self.outcome_tracker.track(signal)
                                     self.last_signal_time[symbol] = now
                                 else:
                                     logger.debug(f"Signal for {symbol} suppressed by cooldown.")
@@ -350,6 +410,14 @@ class Bot:
 
                     await asyncio.sleep(0.5)  # Small delay between symbols
 
+                # Статус и метрики - подписчикам API (вместо их опроса)
+                self.publish_status()
+                event_bus.publish('metrics', {
+                    'http': http_client.stats(),
+                    'telegram': self.notifier.telegram.outbox.stats,
+                    'bus': event_bus.stats()
+                }, retain=True)
+
                 # Dynamic sleep: shorter for active monitoring
                 logger.debug(f"Loop iteration complete. Next cycle in 30s")
                 await asyncio.sleep(30)  # Check every 30s, but symbols update per their interval
@@ -551,9 +619,14 @@ class Bot:
 
 
     async def cleanup(self):
+        ml_engine = getattr(self.signal_generator, 'ml_engine', None)
+        if hasattr(ml_engine, 'stop_watching'):
+            ml_engine.stop_watching()
+        await self.journal.stop()
         await self.notifier.close()
         for name, exchange in getattr(self, 'exchanges', {}).items():
             await exchange.close()
+        await http_client.close()
 
 async def main():
     bot = Bot()
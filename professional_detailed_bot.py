@@ -15,6 +15,7 @@ import numpy as np
 from data_manager import RealDataCollector
 from enhanced_technical_analyzer import ProfessionalTechnicalAnalyzer
 from config import TELEGRAM_CONFIG, TRADING_CONFIG, ANALYSIS_CONFIG
+from src.services.http_client import http_client
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -427,8 +428,6 @@ class DetailedTelegramBot:
     async def _send_message(self, message: str) -> bool:
         """Отправка сообщения в Telegram"""
         try:
-            import aiohttp
-            
             url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
             data = {
                 'chat_id': self.chat_id,
@@ -436,7 +435,7 @@ class DetailedTelegramBot:
                 'disable_web_page_preview': True
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client.borrow() as session:
                 async with session.post(url, json=data, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
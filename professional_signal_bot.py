@@ -21,6 +21,8 @@ import sys
 
 from data_manager import RealDataCollector, AdvancedTechnicalAnalyzer
 from config import TELEGRAM_CONFIG, TRADING_CONFIG, ANALYSIS_CONFIG
+from src.services.http_client import http_client
+from src.services.telegram_outbox import TelegramOutbox
 
 # Настройка логирования
 logging.basicConfig(
@@ -104,11 +106,9 @@ class TradingBotController:
                 if quality_signals:
                     logger.info(f"✅ Найдено {len(quality_signals)} качественных сигналов")
                     
-                    # Отправляем лучшие сигналы
+                    # Отправляем лучшие сигналы (очередь сама соблюдает лимиты Telegram)
                     for signal in quality_signals[:5]:  # Топ 5 сигналов
-                        await self._send_signal_to_telegram(signal)
-                        self.stats['signals_sent'] += 1
-                        await asyncio.sleep(2)  # Пауза между отправками
+                        self._send_signal_to_telegram(signal)
                 
                 # Статистика цикла
                 cycle_time = time.time() - cycle_start
@@ -373,20 +373,21 @@ class TradingBotController:
         
         return unique_signals
     
-    async def _send_signal_to_telegram(self, signal: Dict):
-        """Отправка сигнала в Telegram"""
+    def _send_signal_to_telegram(self, signal: Dict):
+        """Постановка сигнала в очередь Telegram (анализ не ждет доставки)"""
         try:
             if not self.telegram_bot:
                 return
             
             message = self._format_signal_message(signal)
-            success = await self.telegram_bot.send_message(message)
+            symbol = signal['symbol']
             
-            if success:
-                logger.info(f"📤 Сигнал {signal['symbol']} отправлен в Telegram")
+            def on_sent():
+                logger.info(f"📤 Сигнал {symbol} отправлен в Telegram")
+                self.stats['signals_sent'] += 1
                 self.stats['last_signal_time'] = time.time()
-            else:
-                logger.error(f"❌ Не удалось отправить сигнал {signal['symbol']}")
+            
+            self.telegram_bot.queue_message(message, on_sent=on_sent)
                 
         except Exception as e:
             logger.error(f"❌ Ошибка отправки сигнала: {e}")
@@ -626,6 +627,12 @@ class TelegramBotManager:
         self.trading_controller = trading_controller
         self.running = False
         
+        # Очередь доставки: сигналы ставятся из потока анализа, отправляются из loop бота
+        self.outbox = TelegramOutbox(
+            self.bot_token, self.chat_id, parse_mode='Markdown',
+            path=TELEGRAM_CONFIG.get('outbox_path', 'data/telegram_outbox_professional.json')
+        )
+        
         # Устанавливаем ссылку в контроллере
         trading_controller.telegram_bot = self
     
@@ -641,8 +648,7 @@ class TelegramBotManager:
                 'disable_web_page_preview': True
             }
             
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
+            async with http_client.borrow() as session:
                 async with session.post(url, json=data, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -654,9 +660,14 @@ class TelegramBotManager:
             logger.error(f"❌ Telegram send error: {e}")
             return False
     
+    def queue_message(self, message: str, chat_id: str = None, on_sent=None) -> int:
+        """Постановка сообщения в очередь доставки (можно из любого потока)"""
+        return self.outbox.enqueue(message, chat_id or self.chat_id, on_sent=on_sent)
+    
     async def start_polling(self):
         """Запуск прослушивания команд"""
         self.running = True
+        self.outbox.start()
         offset = 0
         
         logger.info("📱 Telegram bot polling started...")
@@ -666,8 +677,7 @@ class TelegramBotManager:
                 url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
                 params = {'offset': offset, 'limit': 10, 'timeout': 30}
                 
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
+                async with http_client.borrow() as session:
                     async with session.get(url, params=params, timeout=35) as response:
                         if response.status == 200:
                             data = await response.json()
@@ -803,6 +813,7 @@ async def main():
     finally:
         trading_controller.stop_bot()
         telegram_manager.stop_polling()
+        await telegram_manager.outbox.stop()
 
 if __name__ == "__main__":
     try:
@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 import ccxt
 
+from src.strategies import indicators
+
 class ScalpingSignalEngine:
     """Движок для скальпинг сигналов на коротких таймфреймах"""
     
@@ -68,69 +70,24 @@ class ScalpingSignalEngine:
             if len(historical_data) < 30:
                 return {}
             
-            # Создаем DataFrame
-            df = pd.DataFrame(historical_data)
-            
             # Текущие значения
             close = current_data.get('close', 0)
-            high = current_data.get('high', 0)
-            low = current_data.get('low', 0)
-            volume = current_data.get('volume', 0)
-            
-            # Массивы для расчетов
-            closes = df['close'].values
-            highs = df['high'].values
-            lows = df['low'].values
-            volumes = df['volume'].values
-            
-            # БЫСТРЫЕ индикаторы для скальпинга
-            
-            # 1. Быстрый RSI (7 периодов)
-            rsi_fast = self._calculate_fast_rsi(closes, period=7)
-            
-            # 2. Быстрый MACD (5,13,4)
-            macd_fast = self._calculate_fast_macd(closes)
-            
-            # 3. Быстрые EMA (8, 21)
-            ema_8 = self._calculate_ema(closes, 8)
-            ema_21 = self._calculate_ema(closes, 21)
-            
-            # 4. Быстрый Stochastic (5,3,3)
-            stoch_fast = self._calculate_fast_stochastic(highs, lows, closes)
-            
-            # 5. Быстрый ADX (7 периодов)
-            adx_fast = self._calculate_fast_adx(highs, lows, closes)
-            
-            # 6. Volume momentum (5 периодов)
-            volume_momentum = self._calculate_volume_momentum(volumes)
-            
-            # 7. Price momentum
-            price_momentum = self._calculate_price_momentum(closes)
-            
-            # 8. Быстрый ATR для волатильности
-            atr_fast = self._calculate_fast_atr(highs, lows, closes)
             
-            # 9. Bollinger Bands squeeze
-            bb_squeeze = self._calculate_bb_squeeze(closes)
+            # Массивы для расчетов (без промежуточного DataFrame)
+            closes = np.array([c['close'] for c in historical_data], dtype=np.float64)
+            highs = np.array([c['high'] for c in historical_data], dtype=np.float64)
+            lows = np.array([c['low'] for c in historical_data], dtype=np.float64)
+            volumes = np.array([c['volume'] for c in historical_data], dtype=np.float64)
             
-            # 10. Support/Resistance break
-            sr_break = self._calculate_sr_break(highs, lows, closes)
+            # БЫСТРЫЕ индикаторы для скальпинга - один проход ядра:
+            # RSI-7, MACD 5/13/4, EMA 8/21, Stoch 5/3/3, ADX-7, ATR-7, BB squeeze, S/R break
+            snapshot = indicators.scalping_snapshot(highs, lows, closes, volumes)
+            atr_fast = snapshot['atr_fast']
             
             return {
                 'timeframe': timeframe,
                 'price': close,
-                'rsi_fast': rsi_fast,
-                'macd_fast': macd_fast,
-                'ema_8': ema_8,
-                'ema_21': ema_21,
-                'ema_cross': 1 if ema_8 > ema_21 else -1,
-                'stoch_fast': stoch_fast,
-                'adx_fast': adx_fast,
-                'volume_momentum': volume_momentum,
-                'price_momentum': price_momentum,
-                'atr_fast': atr_fast,
-                'bb_squeeze': bb_squeeze,
-                'sr_break': sr_break,
+                **snapshot,
                 'volatility': atr_fast / close if close > 0 else 0
             }
             
@@ -410,215 +367,77 @@ class ScalpingSignalEngine:
             print(f"❌ Filter evaluation error: {e}")
             return None
     
-    # Быстрые индикаторы для скальпинга
+    # Быстрые индикаторы для скальпинга (обертки над src.strategies.indicators)
     def _calculate_fast_rsi(self, prices, period=7):
         """Быстрый RSI для скальпинга"""
         try:
-            deltas = np.diff(prices)
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
-            
-            if len(gains) < period:
-                return 50
-            
-            avg_gain = np.mean(gains[:period])
-            avg_loss = np.mean(losses[:period])
-            
-            for i in range(period, len(gains)):
-                avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-                avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-            
-            if avg_loss == 0:
-                return 100
-            rs = avg_gain / avg_loss
-            return 100 - (100 / (1 + rs))
+            return indicators.rsi(np.asarray(prices, dtype=np.float64), period)
         except:
             return 50
     
     def _calculate_fast_macd(self, prices):
         """Быстрый MACD (5,13,4) для скальпинга"""
         try:
-            if len(prices) < 13:
-                return {'macd': 0, 'signal': 0, 'histogram': 0}
-            
-            ema_5 = self._calculate_ema(prices, 5)
-            ema_13 = self._calculate_ema(prices, 13)
-            macd_line = ema_5 - ema_13
-            
-            # Сигнальная линия (EMA от MACD)
-            macd_array = []
-            for i in range(len(prices)):
-                if i >= 12:
-                    macd_array.append(self._calculate_ema(prices[:i+1], 5) - self._calculate_ema(prices[:i+1], 13))
-            
-            if len(macd_array) >= 4:
-                signal_line = self._calculate_ema(np.array(macd_array), 4)
-                histogram = macd_line - signal_line
-            else:
-                signal_line = macd_line
-                histogram = 0
-            
-            return {
-                'macd': macd_line,
-                'signal': signal_line,
-                'histogram': histogram
-            }
+            return indicators.macd(np.asarray(prices, dtype=np.float64), 5, 13, 4)
         except:
             return {'macd': 0, 'signal': 0, 'histogram': 0}
     
     def _calculate_ema(self, prices, period):
         """Экспоненциальная скользящая средняя"""
         try:
-            if len(prices) < period:
-                return prices[-1] if len(prices) > 0 else 0
-            
-            alpha = 2 / (period + 1)
-            ema = prices[0]
-            for price in prices[1:]:
-                ema = alpha * price + (1 - alpha) * ema
-            return ema
+            return indicators.ema_last(np.asarray(prices, dtype=np.float64), period)
         except:
             return 0
     
     def _calculate_fast_stochastic(self, highs, lows, closes, k_period=5, d_period=3):
         """Быстрый стохастик для скальпинга"""
         try:
-            if len(highs) < k_period:
-                return {'k': 50, 'd': 50}
-            
-            highest_high = np.max(highs[-k_period:])
-            lowest_low = np.min(lows[-k_period:])
-            
-            if highest_high == lowest_low:
-                k = 50
-            else:
-                k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
-            
-            # D = сглаженная версия K
-            d = k * 0.9  # Упрощенно
-            
-            return {'k': k, 'd': d}
+            return indicators.stochastic(highs, lows, closes, k_period)
         except:
             return {'k': 50, 'd': 50}
     
     def _calculate_fast_adx(self, highs, lows, closes, period=7):
         """Быстрый ADX для скальпинга"""
         try:
-            if len(highs) < period + 1:
-                return 20
-            
-            # Упрощенный расчет ADX
-            tr_list = []
-            dm_plus_list = []
-            dm_minus_list = []
-            
-            for i in range(1, len(highs)):
-                # True Range
-                tr1 = highs[i] - lows[i]
-                tr2 = abs(highs[i] - closes[i-1])
-                tr3 = abs(lows[i] - closes[i-1])
-                tr = max(tr1, tr2, tr3)
-                tr_list.append(tr)
-                
-                # Directional Movement
-                dm_plus = max(highs[i] - highs[i-1], 0) if highs[i] - highs[i-1] > lows[i-1] - lows[i] else 0
-                dm_minus = max(lows[i-1] - lows[i], 0) if lows[i-1] - lows[i] > highs[i] - highs[i-1] else 0
-                
-                dm_plus_list.append(dm_plus)
-                dm_minus_list.append(dm_minus)
-            
-            if len(tr_list) >= period:
-                atr = np.mean(tr_list[-period:])
-                di_plus = 100 * np.mean(dm_plus_list[-period:]) / atr if atr > 0 else 0
-                di_minus = 100 * np.mean(dm_minus_list[-period:]) / atr if atr > 0 else 0
-                
-                if (di_plus + di_minus) > 0:
-                    dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
-                    return dx
-            
-            return 20
+            return indicators.adx_fast(*self._as_arrays(highs, lows, closes), period)
         except:
             return 20
     
     def _calculate_volume_momentum(self, volumes, period=5):
         """Моментум объема"""
         try:
-            if len(volumes) < period + 1:
-                return 0
-            
-            current_avg = np.mean(volumes[-period:])
-            previous_avg = np.mean(volumes[-period-1:-1])
-            
-            if previous_avg > 0:
-                return (current_avg - previous_avg) / previous_avg * 100
-            return 0
+            return indicators.volume_momentum(volumes, period)
         except:
             return 0
     
     def _calculate_price_momentum(self, prices, period=3):
         """Моментум цены"""
         try:
-            if len(prices) < period + 1:
-                return 0
-            
-            current_price = prices[-1]
-            previous_price = prices[-period-1]
-            
-            if previous_price > 0:
-                return (current_price - previous_price) / previous_price * 100
-            return 0
+            return indicators.price_momentum(prices, period)
         except:
             return 0
     
     def _calculate_fast_atr(self, highs, lows, closes, period=7):
         """Быстрый ATR"""
         try:
-            if len(highs) < period + 1:
-                return abs(highs[-1] - lows[-1]) if len(highs) > 0 else 0
-            
-            tr_list = []
-            for i in range(1, len(highs)):
-                tr1 = highs[i] - lows[i]
-                tr2 = abs(highs[i] - closes[i-1])
-                tr3 = abs(lows[i] - closes[i-1])
-                tr_list.append(max(tr1, tr2, tr3))
-            
-            return np.mean(tr_list[-period:])
+            return indicators.atr_fast(*self._as_arrays(highs, lows, closes), period)
         except:
             return 0
     
     def _calculate_bb_squeeze(self, prices, period=10):
         """Bollinger Bands Squeeze"""
         try:
-            if len(prices) < period:
-                return False
-            
-            recent_prices = prices[-period:]
-            sma = np.mean(recent_prices)
-            std = np.std(recent_prices)
-            
-            # Squeeze когда стандартное отклонение очень мало
-            return std / sma < 0.02 if sma > 0 else False
+            return indicators.bb_squeeze(prices, period)
         except:
             return False
     
     def _calculate_sr_break(self, highs, lows, closes, period=10):
         """Пробой поддержки/сопротивления"""
         try:
-            if len(highs) < period:
-                return 0
-            
-            resistance = np.max(highs[-period:])
-            support = np.min(lows[-period:])
-            current_price = closes[-1]
-            
-            # Пробой сопротивления
-            if current_price > resistance * 1.001:
-                return 1
-            # Пробой поддержки
-            elif current_price < support * 0.999:
-                return -1
-            
-            return 0
+            return indicators.sr_break(highs, lows, closes, period)
         except:
-            return 0 
\ No newline at end of file
+            return 0
+
+    @staticmethod
+    def _as_arrays(*series):
+        return [np.asarray(s, dtype=np.float64) for s in series]
@@ -13,10 +13,11 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 import json
 import os
-import aiohttp
 import requests
-import ccxt
+from src.strategies import indicators
+from src.services.exchange_pool import ExchangePool
 from config import TELEGRAM_CONFIG, EXCHANGE_KEYS, EXTERNAL_APIS, TRADING_CONFIG
+from src.services.http_client import http_client
 
 # 200+ торговых пар из конфигурации
 TRADING_PAIRS = TRADING_CONFIG['pairs'][:200]  # Берем первые 200 пар
@@ -28,41 +29,45 @@ class UniversalDataManager:
         self.cache = {}
         self.cache_timeout = 60  # секунды
         
-        # Инициализируем биржи через ccxt
-        self.binance = ccxt.binance({
-            'apiKey': EXCHANGE_KEYS['binance']['key'],
-            'secret': EXCHANGE_KEYS['binance']['secret'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 1200,  # 1.2 секунды между запросами
-        })
-        
-        self.bybit = ccxt.bybit({
-            'apiKey': EXCHANGE_KEYS['bybit']['key'],
-            'secret': EXCHANGE_KEYS['bybit']['secret'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 2000,  # 2 секунды между запросами для Bybit
-        })
-        
-        self.okx = ccxt.okx({
-            'apiKey': EXCHANGE_KEYS['okx']['key'],
-            'secret': EXCHANGE_KEYS['okx']['secret'],
-            'password': EXCHANGE_KEYS['okx']['passphrase'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 1000,  # 1 секунда между запросами
-        })
+        # Асинхронные клиенты ccxt на общем пуле соединений (без потоков)
+        exchange_configs = {
+            'binance': {
+                'apiKey': EXCHANGE_KEYS['binance']['key'],
+                'secret': EXCHANGE_KEYS['binance']['secret'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 1200,  # 1.2 секунды между запросами
+            },
+            'bybit': {
+                'apiKey': EXCHANGE_KEYS['bybit']['key'],
+                'secret': EXCHANGE_KEYS['bybit']['secret'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 2000,  # 2 секунды между запросами для Bybit
+            },
+            'okx': {
+                'apiKey': EXCHANGE_KEYS['okx']['key'],
+                'secret': EXCHANGE_KEYS['okx']['secret'],
+                'password': EXCHANGE_KEYS['okx']['passphrase'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 1000,  # 1 секунда между запросами
+            }
+        }
         
         # Приоритет бирж (Binance самый надежный)
-        self.exchange_priority = [
-            ('binance', self.binance),
-            ('okx', self.okx),
-            ('bybit', self.bybit)
-        ]
+        self.exchange_priority = ['binance', 'okx', 'bybit']
+        
+        self.exchange_pool = ExchangePool(
+            exchange_configs, max_concurrency=TRADING_CONFIG.get('exchange_concurrency', 8)
+        )
         
         print("✅ Биржи инициализированы: Binance, Bybit, OKX")
         
+    async def close(self):
+        """Закрывает клиентов бирж и пул соединений"""
+        await self.exchange_pool.close()
+
     async def get_multi_timeframe_data(self, symbol: str, timeframes: List[str]) -> Dict:
         """Получение РЕАЛЬНЫХ OHLCV данных для нескольких таймфреймов с умным fallback"""
         try:
@@ -94,102 +99,66 @@ class UniversalDataManager:
             return None
     
     async def _get_best_timeframe_data(self, symbol: str, timeframe: str) -> Dict:
-        """Получение данных с лучшей доступной биржи"""
-        for exchange_name, exchange in self.exchange_priority:
-            try:
-                data = await self._get_exchange_ohlcv(exchange, symbol, timeframe, exchange_name)
-                if data:
-                    return data
-            except Exception as e:
-                # Если rate limit, пропускаем эту биржу
-                if 'rate limit' in str(e).lower() or 'too many' in str(e).lower():
-                    continue
-                    
+        """Получение данных с самой быстрой доступной биржи (hedged-запросы)"""
+        # Конвертируем таймфрейм в формат ccxt
+        tf_map = {
+            '5m': '5m',
+            '15m': '15m',
+            '1h': '1h', 
+            '4h': '4h',
+            '1d': '1d'
+        }
+        ccxt_tf = tf_map.get(timeframe, '1h')
+
+        # Следующая биржа стартует, если текущая не ответила за свой p95 или вернула ошибку
+        try:
+            exchange_name, ohlcv = await self.exchange_pool.fetch_ohlcv_hedged(
+                symbol, ccxt_tf, limit=200, names=self.exchange_priority,
+                accept=lambda candles: bool(candles) and len(candles) >= 50  # Минимум 50 свечей для индикаторов
+            )
+        except Exception as e:
+            print(f"❌ OHLCV error for {symbol} {timeframe}: {e}")
+            return None
+
         # Если не удалось получить данные ни с одной биржи
-        return None
-    
-    async def _get_exchange_ohlcv(self, exchange, symbol: str, timeframe: str, exchange_name: str) -> Dict:
-        """Универсальное получение OHLCV данных через ccxt с retry логикой"""
-        max_retries = 2
-        retry_delay = 1
-        
-        for attempt in range(max_retries):
-            try:
-                # Конвертируем таймфрейм в формат ccxt
-                tf_map = {
-                    '5m': '5m',
-                    '15m': '15m',
-                    '1h': '1h', 
-                    '4h': '4h',
-                    '1d': '1d'
-                }
-                ccxt_tf = tf_map.get(timeframe, '1h')
-                
-                # Получаем ИСТОРИЧЕСКИЕ данные для расчета индикаторов
-                loop = asyncio.get_event_loop()
-                ohlcv = await loop.run_in_executor(
-                    None, 
-                    lambda: exchange.fetch_ohlcv(symbol, ccxt_tf, limit=200)  # Увеличиваем до 200 свечей
-                )
-                
-                if ohlcv and len(ohlcv) >= 50:  # Минимум 50 свечей для индикаторов
-                    # Возвращаем полные исторические данные
-                    df_data = []
-                    for candle in ohlcv:
-                        df_data.append({
-                            'timestamp': int(candle[0]),
-                            'open': float(candle[1]),
-                            'high': float(candle[2]),
-                            'low': float(candle[3]),
-                            'close': float(candle[4]),
-                            'volume': float(candle[5])
-                        })
-                    
-                    return {
-                        'historical_data': df_data,
-                        'current': {
-                            'open': float(ohlcv[-1][1]),
-                            'high': float(ohlcv[-1][2]),
-                            'low': float(ohlcv[-1][3]),
-                            'close': float(ohlcv[-1][4]),
-                            'volume': float(ohlcv[-1][5]),
-                            'timestamp': int(ohlcv[-1][0])
-                        },
-                        'exchange': exchange_name,
-                        'symbol': symbol
-                    }
-                
-                return None
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                
-                # Rate limit errors - не ретраим, сразу возвращаем None
-                if any(keyword in error_msg for keyword in ['rate limit', 'too many', 'exceeded']):
-                    if attempt == 0:  # Логируем только первый раз
-                        print(f"⚠️ {exchange_name} rate limit for {symbol}")
-                    return None
-                
-                # Market not found - не ретраим
-                if any(keyword in error_msg for keyword in ['symbol not found', 'does not have market', 'invalid symbol']):
-                    return None
-                    
-                # Другие ошибки - ретраим
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
-                    continue
-                else:
-                    # Логируем только критические ошибки
-                    print(f"❌ {exchange_name} error for {symbol} {timeframe}: {e}")
-                    return None
+        if exchange_name is None:
+            return None
+        return self._format_ohlcv(ohlcv, symbol, exchange_name)
+    
+    @staticmethod
+    def _format_ohlcv(ohlcv: List[List[float]], symbol: str, exchange_name: str) -> Dict:
+        """Свечи ccxt -> полные исторические данные для расчета индикаторов"""
+        df_data = []
+        for candle in ohlcv:
+            df_data.append({
+                'timestamp': int(candle[0]),
+                'open': float(candle[1]),
+                'high': float(candle[2]),
+                'low': float(candle[3]),
+                'close': float(candle[4]),
+                'volume': float(candle[5])
+            })
         
-        return None
+        return {
+            'historical_data': df_data,
+            'current': {
+                'open': float(ohlcv[-1][1]),
+                'high': float(ohlcv[-1][2]),
+                'low': float(ohlcv[-1][3]),
+                'close': float(ohlcv[-1][4]),
+                'volume': float(ohlcv[-1][5]),
+                'timestamp': int(ohlcv[-1][0])
+            },
+            'exchange': exchange_name,
+            'symbol': symbol
+        }
 
 class SignalProEngine:
     """Основной движок для анализа обычных сигналов"""
     
     def __init__(self):
         self.indicators = {}
+        self.indicator_cache = indicators.IndicatorCache()
         
     async def process_symbol(self, symbol: str, ohlcv_data: Dict) -> Optional[Dict]:
         """Обработка символа и генерация сигнала"""
@@ -201,7 +170,7 @@ class SignalProEngine:
             analysis_results = {}
             for tf, data in ohlcv_data.items():
                 if tf not in ['whale_activity', 'exchange_flows', 'social_sentiment', 'timestamp']:
-                    analysis_results[tf] = self._analyze_timeframe(data)
+                    analysis_results[tf] = self._analyze_timeframe(data, symbol, tf)
             
             # Объединяем результаты
             signal = self._combine_analysis(analysis_results, symbol)
@@ -225,188 +194,27 @@ class SignalProEngine:
             print(f"❌ Error processing {symbol}: {e}")
             return None
     
-    def _analyze_timeframe(self, data: Dict) -> Dict:
-        """РЕАЛЬНЫЙ анализ таймфрейма с настоящими техническими индикаторами"""
+    # Ключи снимка, которые использует _combine_analysis
+    ANALYSIS_KEYS = ('rsi', 'macd', 'ema_20', 'ema_50', 'bb_upper', 'bb_lower', 'ma_50', 'adx',
+                     'volume_ratio', 'price', 'patterns', 'stoch_k', 'stoch_d')
+
+    def _analyze_timeframe(self, data: Dict, symbol: str = None, timeframe: str = None) -> Dict:
+        """РЕАЛЬНЫЙ анализ таймфрейма: индикаторы из общей библиотеки, кэш по последней свече"""
         try:
-            # Получаем исторические данные
-            historical_data = data.get('historical_data', [])
-            current_data = data.get('current', {})
-            
-            if len(historical_data) < 50:
+            snapshot = indicators.analyze_timeframe(data, symbol, timeframe, cache=self.indicator_cache,
+                                                    body_patterns=False)
+            if not snapshot:
                 return {}
-            
-            # Создаем DataFrame для расчетов
-            df = pd.DataFrame(historical_data)
-            
-            # Текущие значения
-            close = current_data.get('close', 0)
-            high = current_data.get('high', 0)
-            low = current_data.get('low', 0)
-            volume = current_data.get('volume', 0)
-            open_price = current_data.get('open', 0)
-            
-            # Массивы для расчетов
-            closes = df['close'].values
-            highs = df['high'].values
-            lows = df['low'].values
-            volumes = df['volume'].values
-            opens = df['open'].values
-            
-            # РЕАЛЬНЫЙ RSI расчет (14 периодов)
-            def calculate_rsi(prices, period=14):
-                deltas = np.diff(prices)
-                gains = np.where(deltas > 0, deltas, 0)
-                losses = np.where(deltas < 0, -deltas, 0)
-                
-                avg_gain = np.mean(gains[:period])
-                avg_loss = np.mean(losses[:period])
-                
-                for i in range(period, len(gains)):
-                    avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-                    avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-                
-                if avg_loss == 0:
-                    return 100
-                rs = avg_gain / avg_loss
-                return 100 - (100 / (1 + rs))
-            
-            rsi = calculate_rsi(closes)
-            
-            # РЕАЛЬНЫЙ MACD расчет
-            def calculate_ema(prices, period):
-                alpha = 2 / (period + 1)
-                ema = [prices[0]]
-                for price in prices[1:]:
-                    ema.append(alpha * price + (1 - alpha) * ema[-1])
-                return np.array(ema)
-            
-            ema_12 = calculate_ema(closes, 12)
-            ema_26 = calculate_ema(closes, 26)
-            macd_line = ema_12 - ema_26
-            signal_line = calculate_ema(macd_line, 9)
-            histogram = macd_line[-1] - signal_line[-1]
-            
-            macd_data = {
-                'macd': macd_line[-1],
-                'signal': signal_line[-1],
-                'histogram': histogram
-            }
-            
-            # РЕАЛЬНЫЕ EMA расчеты
-            ema_20 = calculate_ema(closes, 20)[-1]
-            ema_50 = calculate_ema(closes, 50)[-1]
-            
-            # РЕАЛЬНЫЕ Bollinger Bands
-            def calculate_bollinger_bands(prices, period=20, std_dev=2):
-                sma = np.mean(prices[-period:])
-                std = np.std(prices[-period:])
-                upper = sma + (std * std_dev)
-                lower = sma - (std * std_dev)
-                return upper, sma, lower
-            
-            bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(closes)
-            
-            # РЕАЛЬНАЯ MA50
-            ma_50 = np.mean(closes[-50:]) if len(closes) >= 50 else closes[-1]
-            
-            # РЕАЛЬНЫЙ ADX расчет
-            def calculate_adx(highs, lows, closes, period=14):
-                # True Range
-                tr1 = highs - lows
-                tr2 = np.abs(highs - np.roll(closes, 1))
-                tr3 = np.abs(lows - np.roll(closes, 1))
-                tr = np.maximum(tr1, np.maximum(tr2, tr3))[1:]  # Убираем первый элемент
-                
-                # Directional Movement
-                dm_plus = np.where((highs[1:] - highs[:-1]) > (lows[:-1] - lows[1:]), 
-                                 np.maximum(highs[1:] - highs[:-1], 0), 0)
-                dm_minus = np.where((lows[:-1] - lows[1:]) > (highs[1:] - highs[:-1]), 
-                                  np.maximum(lows[:-1] - lows[1:], 0), 0)
-                
-                # Smoothed values
-                if len(tr) >= period:
-                    atr = np.mean(tr[-period:])
-                    di_plus = 100 * np.mean(dm_plus[-period:]) / atr if atr > 0 else 0
-                    di_minus = 100 * np.mean(dm_minus[-period:]) / atr if atr > 0 else 0
-                    
-                    if (di_plus + di_minus) > 0:
-                        dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
-                        return dx
-                
-                return 20  # Fallback
-            
-            adx = calculate_adx(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ Volume анализ
-            if len(volumes) >= 20:
-                avg_volume = np.mean(volumes[-20:])
-                volume_ratio = volume / avg_volume if avg_volume > 0 else 1.0
-            else:
-                volume_ratio = 1.0
-            
-            # РЕАЛЬНЫЙ анализ свечных паттернов
-            patterns = []
-            
-            # Анализируем последние 3 свечи для паттернов
-            if len(closes) >= 3:
-                # Размеры тел свечей
-                body_sizes = np.abs(closes[-3:] - opens[-3:]) / closes[-3:]
-                
-                # Три белых солдата
-                if all(closes[-3:] > opens[-3:]) and all(body_sizes > 0.01):
-                    patterns.append('three_white_soldiers')
-                
-                # Три черных ворона
-                elif all(closes[-3:] < opens[-3:]) and all(body_sizes > 0.01):
-                    patterns.append('three_black_crows')
-                
-                # Анализ последней свечи
-                current_body = abs(close - open_price) / close if close > 0 else 0
-                upper_shadow = high - max(close, open_price)
-                lower_shadow = min(close, open_price) - low
-                
-                # Молот
-                if lower_shadow > current_body * 2 and upper_shadow < current_body * 0.5:
-                    patterns.append('hammer')
-                
-                # Падающая звезда
-                elif upper_shadow > current_body * 2 and lower_shadow < current_body * 0.5:
-                    patterns.append('shooting_star')
-            
-            # РЕАЛЬНЫЙ Stochastic Oscillator
-            def calculate_stochastic(highs, lows, closes, period=14):
-                if len(highs) >= period:
-                    highest_high = np.max(highs[-period:])
-                    lowest_low = np.min(lows[-period:])
-                    if highest_high != lowest_low:
-                        k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
-                        return k, k * 0.9  # D = сглаженная версия K
-                return 50, 45
-            
-            stoch_k, stoch_d = calculate_stochastic(highs, lows, closes)
-            
-            return {
-                'rsi': rsi,
-                'macd': macd_data,
-                'ema_20': ema_20,
-                'ema_50': ema_50,
-                'bb_upper': bb_upper,
-                'bb_lower': bb_lower,
-                'ma_50': ma_50,
-                'adx': adx,
-                'volume_ratio': volume_ratio,
-                'price': close,
-                'patterns': patterns,
-                'stoch_k': stoch_k,
-                'stoch_d': stoch_d,
-                'exchanges': data.get('exchanges', 1),
-                'sources': data.get('sources', ['unknown'])
-            }
-            
+
+            analysis = {key: snapshot[key] for key in self.ANALYSIS_KEYS}
+            analysis['exchanges'] = data.get('exchanges', 1)
+            analysis['sources'] = data.get('sources', ['unknown'])
+            return analysis
+
         except Exception as e:
             print(f"❌ Error in technical analysis: {e}")
             return {}
-    
+
     def _combine_analysis(self, analysis_results: Dict, symbol: str) -> Optional[Dict]:
         """Объединение анализа всех таймфреймов"""
         try:
@@ -581,7 +389,7 @@ class TelegramBot:
                 'disable_web_page_preview': True
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_client.borrow() as session:
                 async with session.post(url, json=data, timeout=10) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -936,6 +744,8 @@ async def main():
         print("\n🛑 Stopping SignalPro...")
     finally:
         bot.stop()
+        await bot.data_manager.close()
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
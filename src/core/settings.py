@@ -10,6 +10,7 @@ class Settings(BaseSettings):
     send_signals: bool = True
     send_status: bool = True
     send_errors: bool = True
+    telegram_outbox_path: str = "data/telegram_outbox.json"  # Недоставленные сообщения между рестартами
 
     # Exchange Keys
     binance_key: str = 'ВАШ_BINANCE_API_KEY'
@@ -32,8 +33,42 @@ class Settings(BaseSettings):
     coinglass_api_key: str = ""  # https://www.coinglass.com/
     hyblock_api_key: str = ""    # https://app.hyblock.capital/
     
+    # Local Order Book (Binance diff-depth WebSocket)
+    enable_order_books: bool = True
+    order_book_depth_pct: float = 0.01  # Глубина считается в полосе ±1% от mid
+    
+    # Metrics Store (история funding/OI/ликвидаций для обучения)
+    metrics_store_path: str = "data/metrics/"
+    feature_store_path: str = "data/features/"  # Обучающие матрицы (float32 колонки, memmap)
+    metrics_flush_seconds: float = 30.0
+    
+    # Signal Journal (исходы сигналов для статистики)
+    journal_flush_seconds: float = 5.0
+    journal_resolve_seconds: float = 60.0
+    journal_max_hold_hours: float = 48.0
+    
     # ML Model Path
     ml_model_path: str = "models/"
+    ml_reload_interval: float = 30.0  # Проверка models/ на новые версии, сек (0 - не следить)
+    ml_train_workers: int = 3  # Процессов обучения ансамбля (1 - последовательно)
+    ml_train_cores: int = 0    # Бюджет ядер на обучение (0 - все ядра)
+    ml_search_trials: int = 0  # Поиск гиперпараметров перед обучением, trial'ов на модель (0 - без поиска)
+    ml_search_folds: int = 4   # Walk-forward фолдов в поиске
+    ml_label_horizons: List[int] = [4, 12, 24]  # Горизонты разметки SL/TP, свечей
+    ml_label_target: str = "long_h24_tp1"  # Таргет обучения: {long|short}_h{горизонт}_tp{1-3}
+    ml_routing: str = "regime"  # Маршрутные модели: off | regime (trend x volatility) | cluster (кластер символа)
+    ml_route_clusters: int = 3  # Кластеров символов для ml_routing=cluster
+    ml_route_min_samples: int = 500  # Минимум строк обучения на маршрут (меньше - общий ансамбль)
+    ml_update_days: int = 14   # Окно свежих данных для дообучения (train_models.py --update)
+    ml_update_rounds: int = 50  # Новых итераций бустинга при дообучении
+    ml_update_min_improvement: float = 0.0  # На сколько logloss должен улучшиться, чтобы опубликовать
+    ml_online_weights: bool = True  # Веса ансамбля по исходам закрытых сигналов (OutcomeTracker)
+    ml_online_eta: float = 0.05  # Шаг экспоненциального градиента
+    ml_online_drop_weight: float = 0.05  # Модель с весом ниже - вне инференса (0 - не выводить)
+    ml_online_min_outcomes: int = 50  # Исходов до первого вывода модели
+    feature_costs_path: str = "data/feature_costs.json"  # Время расчета фич в живом пайплайне
+    feature_audit_path: str = "data/feature_audit.json"  # Отчет train_models.py --audit
+    feature_audit_tolerance: float = 0.002  # Допустимый рост logloss урезанного набора фич
     
     dune_api_key: str = 'ВАШ_DUNE_API_KEY'
     dune_query_id: str = 'ВАШ_QUERY_ID'
@@ -9,9 +9,9 @@ engine = create_async_engine(DATABASE_URL, echo=False)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
-# src/db/models.py
-# (Placeholder for future models)
-class Trade(Base):
-    __tablename__ = 'trades'
-    # Define columns here...
-    pass
+
+async def init_db(db_engine=None):
+    """Создает таблицы (модели живут в src/db/models.py)."""
+    from src.db import models  # noqa: F401 - регистрирует модели в Base.metadata
+    async with (db_engine or engine).begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
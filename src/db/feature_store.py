@@ -0,0 +1,323 @@
+# src/db/feature_store.py
+"""
+Feature Store - колоночное хранилище обучающих матриц на диске.
+
+Раскладка: {root}/{SYMBOL}/{start_ms}-{end_ms}/
+    times.i8        # время открытия свечи строки, int64 ms
+    labels.i1       # таргет, int8 (несколько таргетов - labels.{name}.i1)
+    {feature}.f4    # по колонке float32 на фичу
+    meta.json       # порядок колонок, число строк, время записи
+
+Сбор данных пишет партицию на символ сразу после расчета фич - весь датасет
+в RAM не собирается. load() сливает партиции в одну float32 матрицу
+(C-order, np.memmap в {root}/.matrix/) и отдает DataFrame поверх нее без
+копирования: lgb.Dataset / DMatrix / np.asarray(..., float32) читают те же
+страницы. Размер датасета ограничен диском, а не памятью.
+
+matrix_slice(X) - ссылка (файл, форма, строки) на матрицу под X или срезом
+ее строк: процессы обучения / поиска получают ее вместо данных и открывают
+тот же файл как np.memmap.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.db.metrics_store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+META = 'meta.json'
+DEFAULT_LABEL = 'label'
+MATRIX_DIR = '.matrix'
+
+
+@dataclass
+class Partition:
+    symbol: str
+    start_ms: int  # [start_ms, end_ms)
+    end_ms: int
+    rows: int
+    columns: List[str]
+    written_at: float
+    path: str
+    labels: List[str]
+
+
+@dataclass(frozen=True)
+class MatrixSlice:
+    """Строки [start, stop) матрицы .matrix/ - передается в процессы вместо самих данных"""
+    path: str
+    shape: Tuple[int, int]
+    columns: Tuple[str, ...]
+    start: int
+    stop: int
+
+    def array(self) -> np.ndarray:
+        # copy-on-write, как и load(): правки в процессе не доходят до файла
+        matrix = np.memmap(self.path, dtype=FeatureStore.FEATURE_DTYPE, mode='c', shape=self.shape)
+        return matrix[self.start:self.stop]
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.array(), columns=list(self.columns), copy=False)
+
+
+def matrix_slice(X) -> Optional[MatrixSlice]:
+    """
+    MatrixSlice для X - DataFrame / массива поверх матрицы load() (или среза
+    подряд идущих строк, X.iloc[a:b]), иначе None. Изменения X, сделанные в
+    памяти после load(), в файле не видны - ссылка на них не нужна.
+    """
+    values = X.to_numpy() if isinstance(X, pd.DataFrame) else X
+    if not isinstance(values, np.ndarray) or values.ndim != 2 or values.dtype != FeatureStore.FEATURE_DTYPE:
+        return None
+    # Корневой memmap файла (срезы memmap - тоже memmap, но не с начала файла)
+    base, node = None, values
+    while isinstance(node, np.ndarray):
+        if isinstance(node, np.memmap) and getattr(node, 'filename', None):
+            base = node
+        node = node.base
+    if base is None or base.offset or base.ndim != 2 or not base.flags.c_contiguous or values.strides != base.strides:
+        return None
+    offset = values.__array_interface__['data'][0] - base.__array_interface__['data'][0]
+    row_bytes = base.strides[0]
+    if offset % row_bytes or values.shape[1] != base.shape[1]:
+        return None
+    start = offset // row_bytes
+    columns = tuple(str(c) for c in X.columns) if isinstance(X, pd.DataFrame) else tuple(map(str, range(values.shape[1])))
+    return MatrixSlice(str(base.filename), tuple(base.shape), columns, int(start), int(start + values.shape[0]))
+
+
+class FeatureStore:
+    """
+    Args:
+        root: каталог хранилища (settings.feature_store_path)
+    """
+    FEATURE_DTYPE = np.dtype('<f4')
+    LABEL_DTYPE = np.dtype('i1')
+    TS_DTYPE = np.dtype('<i8')
+
+    def __init__(self, root: str = "data/features/"):
+        self.root = root
+
+    # === Запись ===
+
+    def write(self, symbol: str, features: pd.DataFrame, labels, times_ms, end_ms: Optional[int] = None) -> Partition:
+        """
+        Сохраняет фичи символа партицией [times_ms[0], end_ms). Партиция с тем же
+        диапазоном заменяется целиком (запись во временный каталог + rename).
+        labels - массив или DataFrame таргетов (label_engine: по колонке на таргет).
+        """
+        times_ms = np.asarray(times_ms, dtype=self.TS_DTYPE)
+        if len(times_ms) != len(features) or len(labels) != len(features):
+            raise ValueError("features, labels and times must have the same length")
+        if len(times_ms) == 0:
+            raise ValueError(f"No rows to store for {symbol}")
+        symbol = MetricsStore.normalize_symbol(symbol)
+        start_ms = int(times_ms.min())
+        end_ms = int(end_ms if end_ms is not None else times_ms.max() + 1)
+        columns = [str(column) for column in features.columns]
+        if not isinstance(labels, pd.DataFrame):
+            labels = pd.DataFrame({DEFAULT_LABEL: np.asarray(labels)})
+
+        symbol_dir = os.path.join(self.root, symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=symbol_dir, prefix='.tmp-')
+        try:
+            times_ms.tofile(os.path.join(staging, 'times.i8'))
+            for name in labels.columns:
+                labels[name].to_numpy(dtype=self.LABEL_DTYPE).tofile(os.path.join(staging, self._label_file(name)))
+            for column in columns:
+                values = features[column].to_numpy(dtype=self.FEATURE_DTYPE, na_value=np.nan)
+                values.tofile(os.path.join(staging, self._column_file(column)))
+            meta = {'symbol': symbol, 'start_ms': start_ms, 'end_ms': end_ms, 'rows': len(times_ms),
+                    'columns': columns, 'labels': [str(name) for name in labels.columns],
+                    'written_at': time.time()}
+            with open(os.path.join(staging, META), 'w') as f:
+                json.dump(meta, f)
+
+            target = os.path.join(symbol_dir, f"{start_ms}-{end_ms}")
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"💾 [FEATURES] {symbol}: {len(times_ms)} rows x {len(columns)} features stored")
+        return self._partition(target, meta)
+
+    # === Чтение ===
+
+    def partitions(self, symbols: Optional[Sequence[str]] = None, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> List[Partition]:
+        """Партиции символов, пересекающиеся с [start_ms, end_ms), старые записи первыми"""
+        if not os.path.isdir(self.root):
+            return []
+        wanted = {MetricsStore.normalize_symbol(s) for s in symbols} if symbols else None
+        found = []
+        for symbol in sorted(os.listdir(self.root)):
+            if symbol.startswith('.') or (wanted is not None and symbol not in wanted):
+                continue
+            symbol_dir = os.path.join(self.root, symbol)
+            for name in os.listdir(symbol_dir):
+                meta_path = os.path.join(symbol_dir, name, META)
+                if name.startswith('.') or not os.path.exists(meta_path):
+                    continue
+                with open(meta_path) as f:
+                    partition = self._partition(os.path.join(symbol_dir, name), json.load(f))
+                if start_ms is not None and partition.end_ms <= start_ms:
+                    continue
+                if end_ms is not None and partition.start_ms >= end_ms:
+                    continue
+                found.append(partition)
+        return sorted(found, key=lambda p: (p.written_at, p.symbol, p.start_ms))
+
+    def read(self, partition: Partition, label: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """(times, labels, {фича: колонка}) партиции - np.memmap, без чтения в память"""
+        n = partition.rows
+        label = label or partition.labels[0]
+        if label not in partition.labels:
+            raise ValueError(f"{partition.path}: no label {label!r}; stored: {partition.labels}")
+        times = np.memmap(os.path.join(partition.path, 'times.i8'), dtype=self.TS_DTYPE, mode='r', shape=(n,))
+        labels = np.memmap(os.path.join(partition.path, self._label_file(label)),
+                           dtype=self.LABEL_DTYPE, mode='r', shape=(n,))
+        columns = {
+            column: np.memmap(os.path.join(partition.path, self._column_file(column)),
+                              dtype=self.FEATURE_DTYPE, mode='r', shape=(n,))
+            for column in partition.columns
+        }
+        return times, labels, columns
+
+    def load(self, symbols: Optional[Sequence[str]] = None, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None, columns: Optional[List[str]] = None,
+             partitions: Optional[List[Partition]] = None,
+             label: Optional[str] = None) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
+        """
+        Обучающий датасет в хронологическом порядке: (X float32, y int8, times).
+        label - какой из сохраненных таргетов отдать как y (по умолчанию первый).
+
+        X - DataFrame поверх np.memmap матрицы в {root}/.matrix/ (собирается по
+        колонке, повторный load тех же партиций переиспользует файл). Строки,
+        перекрытые более новой партицией того же символа, берутся из новой.
+        """
+        if partitions is None:
+            partitions = self.partitions(symbols, start_ms, end_ms)
+        if not partitions:
+            raise ValueError("No stored features for the requested symbols and range")
+        columns = list(columns or partitions[-1].columns)
+        label = label or partitions[-1].labels[0]
+        for partition in partitions:
+            missing = [c for c in columns if c not in partition.columns]
+            if missing:
+                raise ValueError(f"{partition.path}: missing features {missing}; re-collect the dataset")
+
+        parts = [self.read(partition, label) for partition in partitions]
+        times = np.concatenate([t for t, _, _ in parts])
+        rows, _ = self._select_rows(partitions, times, start_ms, end_ms)
+
+        X = self._matrix(partitions, columns, rows, parts)
+        labels = np.concatenate([l for _, l, _ in parts])[rows]
+        return (pd.DataFrame(X, columns=columns, copy=False),
+                pd.Series(labels, name=label),
+                pd.Series(pd.to_datetime(times[rows], unit='ms'), name='time'))
+
+    def symbols(self, symbols: Optional[Sequence[str]] = None, start_ms: Optional[int] = None,
+                end_ms: Optional[int] = None, partitions: Optional[List[Partition]] = None) -> pd.Series:
+        """Символ каждой строки load() с теми же аргументами (тот же порядок строк)"""
+        if partitions is None:
+            partitions = self.partitions(symbols, start_ms, end_ms)
+        if not partitions:
+            raise ValueError("No stored features for the requested symbols and range")
+        times = np.concatenate([self.read(partition)[0] for partition in partitions])
+        rows, owner = self._select_rows(partitions, times, start_ms, end_ms)
+        names = np.array([partition.symbol for partition in partitions])
+        return pd.Series(names[owner[rows]], name='symbol')
+
+    def clear_cache(self):
+        """Удаляет собранные матрицы .matrix/ (партиции остаются)"""
+        shutil.rmtree(os.path.join(self.root, MATRIX_DIR), ignore_errors=True)
+
+    # === Внутреннее ===
+
+    @staticmethod
+    def _column_file(column: str) -> str:
+        return column.replace(os.sep, '_') + '.f4'
+
+    @staticmethod
+    def _label_file(name: str) -> str:
+        return 'labels.i1' if name == DEFAULT_LABEL else f"labels.{name.replace(os.sep, '_')}.i1"
+
+    @staticmethod
+    def _partition(path: str, meta: Dict) -> Partition:
+        return Partition(meta['symbol'], int(meta['start_ms']), int(meta['end_ms']), int(meta['rows']),
+                         list(meta['columns']), float(meta.get('written_at', 0.0)), path,
+                         list(meta.get('labels', [DEFAULT_LABEL])))
+
+    @staticmethod
+    def _select_rows(partitions: List[Partition], times: np.ndarray, start_ms: Optional[int],
+                     end_ms: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Строки датасета: диапазон, дедупликация (symbol, time) в пользу новой
+        записи, сортировка по времени. Возвращает (rows, партиция каждой строки).
+        """
+        owner = np.repeat(np.arange(len(partitions), dtype=np.int32), [p.rows for p in partitions])
+        symbol_ids = {s: i for i, s in enumerate(sorted({p.symbol for p in partitions}))}
+        symbol_of = np.array([symbol_ids[p.symbol] for p in partitions], dtype=np.int32)[owner]
+        mask = np.ones(len(times), dtype=bool)
+        if start_ms is not None:
+            mask &= times >= start_ms
+        if end_ms is not None:
+            mask &= times < end_ms
+        rows = np.flatnonzero(mask)
+        newest_first = rows[np.lexsort((-owner[rows], times[rows], symbol_of[rows]))]
+        keys = np.stack([symbol_of[newest_first], times[newest_first]])
+        first = np.ones(len(newest_first), dtype=bool)
+        first[1:] = np.any(keys[:, 1:] != keys[:, :-1], axis=0)
+        rows = newest_first[first]
+        rows = rows[np.argsort(times[rows], kind='stable')]
+        if len(rows) == 0:
+            raise ValueError("No stored rows in the requested range")
+        return rows, owner
+
+    def _matrix(self, partitions: List[Partition], columns: List[str], rows: np.ndarray, parts) -> np.ndarray:
+        """float32 матрица (rows x columns) на диске; собирается по одной колонке за раз"""
+        key = hashlib.sha256(json.dumps(
+            [[p.path, p.rows, p.written_at] for p in partitions] + [columns]
+        ).encode('utf-8') + rows.tobytes()).hexdigest()[:16]
+        matrix_dir = os.path.join(self.root, MATRIX_DIR)
+        path = os.path.join(matrix_dir, f"{key}.f4")
+        shape = (len(rows), len(columns))
+        expected_size = shape[0] * shape[1] * self.FEATURE_DTYPE.itemsize
+        if not (os.path.exists(path) and os.path.getsize(path) == expected_size):
+            self._build_matrix(path, shape, columns, rows, parts)
+        # copy-on-write: правки X (fillna и т.п.) не доходят до файла
+        return np.memmap(path, dtype=self.FEATURE_DTYPE, mode='c', shape=shape)
+
+    def _build_matrix(self, path: str, shape: Tuple[int, int], columns: List[str], rows: np.ndarray, parts):
+        matrix_dir = os.path.dirname(path)
+        os.makedirs(matrix_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=matrix_dir, prefix='.tmp-')
+        os.close(fd)
+        try:
+            out = np.memmap(tmp_path, dtype=self.FEATURE_DTYPE, mode='w+', shape=shape)
+            for j, column in enumerate(columns):
+                out[:, j] = np.concatenate([cols[column] for _, _, cols in parts])[rows]
+            out.flush()
+            del out
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # Старые матрицы не нужны (открытые memmap продолжают работать до закрытия)
+        for name in os.listdir(matrix_dir):
+            if name.endswith('.f4') and name != os.path.basename(path):
+                os.remove(os.path.join(matrix_dir, name))
@@ -0,0 +1,233 @@
+# src/db/journal.py
+"""
+Signal Journal - персистентный журнал сигналов и их исходов.
+
+Запись не блокирует горячий путь: record() только кладет строку в буфер,
+фоновая задача коммитит буфер пачками. Резолвер раз в N секунд
+помечает открытые сигналы как TP / SL / EXPIRED по свечам биржи.
+"""
+import asyncio
+import logging
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import select, func
+
+from src.db.base import AsyncSessionLocal, init_db
+from src.db.models import SignalRecord
+
+logger = logging.getLogger(__name__)
+
+# fetch_ohlcv(symbol, timeframe, since_ms, limit) -> [[ts, o, h, l, c, v], ...]
+OHLCVFetcher = Callable[..., Awaitable[List[List[float]]]]
+
+_TIMEFRAME_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+
+
+class SignalJournal:
+    """
+    Журнал сигналов поверх async SQLAlchemy.
+
+    Args:
+        session_factory: фабрика AsyncSession (по умолчанию AsyncSessionLocal)
+        flush_interval: период коммита буфера, сек
+        batch_size: размер буфера, при котором коммит происходит досрочно
+        resolve_interval: период проверки открытых сигналов, сек
+        resolve_timeframe: таймфрейм свечей для резолвера
+        max_hold_hours: через сколько часов сигнал без касания уровней закрывается как EXPIRED
+    """
+    def __init__(self, session_factory=AsyncSessionLocal, db_engine=None,
+                 flush_interval: float = 5.0, batch_size: int = 100,
+                 resolve_interval: float = 60.0, resolve_timeframe: str = '5m',
+                 max_hold_hours: float = 48.0):
+        self.session_factory = session_factory
+        self.db_engine = db_engine
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.resolve_interval = resolve_interval
+        self.resolve_timeframe = resolve_timeframe
+        self.max_hold = timedelta(hours=max_hold_hours)
+
+        self._buffer: List[Dict] = []
+        self._flush_event: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.running = False
+
+    # === Запись ===
+
+    def record(self, signal, timestamp: Optional[datetime] = None):
+        """Кладет сигнал (EnhancedSignal) в буфер. O(1), без I/O."""
+        tps = list(signal.take_profit) + [None, None, None]
+        rationale = signal.rationale or {}
+        self._buffer.append({
+            'symbol': signal.symbol,
+            'timestamp': timestamp or datetime.now(),
+            'direction': signal.direction,
+            'timeframe': signal.timeframe,
+            'confidence': float(signal.confidence),
+            'entry_price': float(signal.entry_price),
+            'stop_loss': float(signal.stop_loss),
+            'tp1': float(tps[0]),
+            'tp2': float(tps[1]) if tps[1] is not None else None,
+            'tp3': float(tps[2]) if tps[2] is not None else None,
+            'risk_reward': float(signal.risk_reward),
+            'ml_probability': rationale.get('ml_probability'),
+            'regime': rationale.get('regime'),
+            'status': 'OPEN',
+        })
+        if len(self._buffer) >= self.batch_size and self._flush_event:
+            self._flush_event.set()
+
+    async def flush(self) -> int:
+        """Коммитит накопленный буфер одной транзакцией."""
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        try:
+            async with self.session_factory() as session:
+                session.add_all([SignalRecord(**row) for row in batch])
+                await session.commit()
+            return len(batch)
+        except Exception as e:
+            # Возвращаем строки в буфер, чтобы не потерять сигналы
+            self._buffer = batch + self._buffer
+            logger.error(f"❌ [JOURNAL] Flush failed ({len(batch)} signals kept in buffer): {e}")
+            return 0
+
+    # === Резолвер исходов ===
+
+    async def resolve_open(self, fetch_ohlcv: OHLCVFetcher, now: Optional[datetime] = None) -> int:
+        """
+        Помечает исходы открытых сигналов по свечам.
+        Одна загрузка свечей на символ, проверка уровней векторно по numpy.
+        Возвращает число закрытых сигналов.
+        """
+        now = now or datetime.now()
+        resolved = 0
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(SignalRecord).where(SignalRecord.status == 'OPEN')
+            )).scalars().all()
+
+            by_symbol: Dict[str, List[SignalRecord]] = {}
+            for rec in rows:
+                by_symbol.setdefault(rec.symbol, []).append(rec)
+
+            for symbol, records in by_symbol.items():
+                since_ms = int(min(r.timestamp for r in records).timestamp() * 1000)
+                try:
+                    ohlcv = await fetch_ohlcv(symbol, self.resolve_timeframe, since=since_ms, limit=1000)
+                except Exception as e:
+                    logger.warning(f"⚠️ [JOURNAL] Klines fetch failed for {symbol}: {e}")
+                    continue
+                candles = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+                for rec in records:
+                    if self._resolve_record(rec, candles, now):
+                        resolved += 1
+
+            if resolved:
+                await session.commit()
+        return resolved
+
+    def _resolve_record(self, rec: SignalRecord, candles: np.ndarray, now: datetime) -> bool:
+        start_ms = rec.timestamp.timestamp() * 1000
+        deadline = rec.timestamp + self.max_hold
+        # Только свечи, открывшиеся после сигнала и до истечения срока
+        mask = (candles[:, 0] >= start_ms) & (candles[:, 0] < deadline.timestamp() * 1000)
+        window = candles[mask]
+
+        if len(window):
+            highs, lows = window[:, 2], window[:, 3]
+            if rec.is_long:
+                sl_hits, tp_hits = lows <= rec.stop_loss, highs >= rec.tp1
+            else:
+                sl_hits, tp_hits = highs >= rec.stop_loss, lows <= rec.tp1
+            sl_idx = int(np.argmax(sl_hits)) if sl_hits.any() else len(window)
+            tp_idx = int(np.argmax(tp_hits)) if tp_hits.any() else len(window)
+
+            if sl_idx < len(window) or tp_idx < len(window):
+                # Оба уровня в одной свече - консервативно считаем SL
+                if sl_idx <= tp_idx:
+                    self._close(rec, 'SL', rec.stop_loss, window[sl_idx, 0])
+                else:
+                    self._close(rec, 'TP', rec.tp1, window[tp_idx, 0])
+                return True
+
+        if now >= deadline:
+            exit_price = float(window[-1, 4]) if len(window) else rec.entry_price
+            self._close(rec, 'EXPIRED', exit_price, deadline.timestamp() * 1000)
+            return True
+        return False
+
+    @staticmethod
+    def _close(rec: SignalRecord, status: str, exit_price: float, ts_ms: float):
+        rec.status = status
+        rec.exit_price = float(exit_price)
+        move = (exit_price - rec.entry_price) / rec.entry_price * 100
+        rec.pnl_pct = move if rec.is_long else -move
+        rec.resolved_at = datetime.fromtimestamp(ts_ms / 1000)
+
+    # === Статистика ===
+
+    async def get_stats(self, since: Optional[datetime] = None) -> Dict:
+        """Агрегаты по журналу: win rate = TP / (TP + SL), средний PnL закрытых."""
+        query = select(SignalRecord.status, func.count(), func.avg(SignalRecord.pnl_pct))
+        if since:
+            query = query.where(SignalRecord.timestamp >= since)
+        query = query.group_by(SignalRecord.status)
+
+        async with self.session_factory() as session:
+            rows = (await session.execute(query)).all()
+
+        counts = {status: count for status, count, _ in rows}
+        closed = [(count, avg) for status, count, avg in rows if status != 'OPEN' and avg is not None]
+        closed_count = sum(c for c, _ in closed)
+        wins, losses = counts.get('TP', 0), counts.get('SL', 0)
+        return {
+            'total_signals': sum(counts.values()) + len(self._buffer),
+            'open': counts.get('OPEN', 0) + len(self._buffer),
+            'wins': wins,
+            'losses': losses,
+            'expired': counts.get('EXPIRED', 0),
+            'win_rate': round(wins / (wins + losses) * 100, 1) if wins + losses else 0.0,
+            'avg_pnl_pct': round(sum(c * a for c, a in closed) / closed_count, 3) if closed_count else 0.0,
+        }
+
+    # === Жизненный цикл ===
+
+    async def start(self, fetch_ohlcv: Optional[OHLCVFetcher] = None):
+        await init_db(self.db_engine)
+        self.running = True
+        self._flush_event = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+        if fetch_ohlcv:
+            self._tasks.append(asyncio.create_task(self._resolve_loop(fetch_ohlcv)))
+        logger.info("📒 [JOURNAL] Signal journal started")
+
+    async def stop(self):
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.flush()
+
+    async def _flush_loop(self):
+        while self.running:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    async def _resolve_loop(self, fetch_ohlcv: OHLCVFetcher):
+        while self.running:
+            await asyncio.sleep(self.resolve_interval)
+            try:
+                await self.flush()
+                resolved = await self.resolve_open(fetch_ohlcv)
+                if resolved:
+                    logger.info(f"📒 [JOURNAL] Resolved {resolved} signal outcomes")
+            except Exception as e:
+                logger.error(f"❌ [JOURNAL] Resolver error: {e}")
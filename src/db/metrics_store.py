@@ -0,0 +1,178 @@
+# src/db/metrics_store.py
+"""
+Metrics Store - append-only колоночное хранилище WS метрик
+(funding, open interest, ликвидации, mark price).
+
+Раскладка: {root}/{metric}/{SYMBOL}/{YYYY-MM-DD}.ts + .val
+Каждый день - две колонки фиксированной ширины (int64 ms и float64),
+дописываются пачками. Чтение через np.memmap + searchsorted, без парсинга.
+"""
+import os
+import logging
+import numpy as np
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+
+
+class MetricsStore:
+    """
+    Хранилище временных рядов для обучения и бэктестов.
+
+    Запись: append() копит точки в памяти, drain() + write_batch() сбрасывают
+    их на диск пачкой (drain на event loop, запись можно увести в executor).
+    Ликвидации хранятся со знаком: +usd для BUY (закрыт шорт), -usd для SELL (закрыт лонг).
+    """
+    METRICS = ('funding_rate', 'mark_price', 'open_interest', 'liquidations')
+    TS_DTYPE = np.dtype('<i8')
+    VAL_DTYPE = np.dtype('<f8')
+
+    def __init__(self, root: str = "data/metrics/"):
+        self.root = root
+        self._buffer: Dict[Tuple[str, str], List[Tuple[int, float]]] = defaultdict(list)
+
+    # === Запись ===
+
+    @staticmethod
+    def normalize_symbol(symbol: str) -> str:
+        """'BTC/USDT:USDT' -> 'BTCUSDT'"""
+        return symbol.split(':')[0].replace('/', '').upper()
+
+    def append(self, symbol: str, metric: str, ts_ms: int, value: float):
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        self._buffer[(self.normalize_symbol(symbol), metric)].append((int(ts_ms), float(value)))
+
+    def append_liquidation(self, symbol: str, side: str, ts_ms: int, usd_value: float):
+        self.append(symbol, 'liquidations', ts_ms, usd_value if side == 'BUY' else -usd_value)
+
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._buffer.values())
+
+    def drain(self) -> Dict[Tuple[str, str], List[Tuple[int, float]]]:
+        """Забирает накопленную пачку (O(1), вызывать из того же потока, что и append)."""
+        batch, self._buffer = self._buffer, defaultdict(list)
+        return batch
+
+    def write_batch(self, batch: Dict[Tuple[str, str], List[Tuple[int, float]]]) -> int:
+        """Дописывает пачку в дневные колонки. Возвращает число записанных точек."""
+        written = 0
+        for (symbol, metric), rows in batch.items():
+            if not rows:
+                continue
+            rows.sort(key=lambda r: r[0])
+            ts = np.fromiter((r[0] for r in rows), dtype=self.TS_DTYPE, count=len(rows))
+            vals = np.fromiter((r[1] for r in rows), dtype=self.VAL_DTYPE, count=len(rows))
+
+            days = ts // DAY_MS
+            # Границы дней внутри пачки (ts отсортированы)
+            cuts = np.flatnonzero(np.diff(days)) + 1
+            for day_ts, day_vals in zip(np.split(ts, cuts), np.split(vals, cuts)):
+                base = self._partition_path(symbol, metric, int(day_ts[0] // DAY_MS))
+                os.makedirs(os.path.dirname(base), exist_ok=True)
+                with open(base + '.ts', 'ab') as f:
+                    f.write(day_ts.tobytes())
+                with open(base + '.val', 'ab') as f:
+                    f.write(day_vals.tobytes())
+            written += len(rows)
+        return written
+
+    def flush(self) -> int:
+        """Синхронный сброс буфера на диск."""
+        return self.write_batch(self.drain())
+
+    # === Чтение ===
+
+    def scan(self, symbol: str, metric: str, start_ms: int, end_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Точки метрики в [start_ms, end_ms), отсортированные по времени.
+        Открываются только дневные партиции из диапазона.
+        """
+        symbol = self.normalize_symbol(symbol)
+        ts_parts, val_parts = [], []
+        for day in range(int(start_ms // DAY_MS), int((end_ms - 1) // DAY_MS) + 1):
+            ts, vals = self._load_partition(symbol, metric, day)
+            if ts is None:
+                continue
+            # Порядок внутри дня может нарушиться при поздних событиях - проверяем дешево
+            if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+                order = np.argsort(ts, kind='stable')
+                ts, vals = ts[order], vals[order]
+            lo = np.searchsorted(ts, start_ms, side='left')
+            hi = np.searchsorted(ts, end_ms, side='left')
+            if hi > lo:
+                ts_parts.append(np.array(ts[lo:hi]))
+                val_parts.append(np.array(vals[lo:hi]))
+
+        if not ts_parts:
+            return np.empty(0, dtype=self.TS_DTYPE), np.empty(0, dtype=self.VAL_DTYPE)
+        return np.concatenate(ts_parts), np.concatenate(val_parts)
+
+    def latest_before(self, symbol: str, metric: str, ts_ms: int, lookback_ms: int = DAY_MS) -> Optional[float]:
+        """Последнее значение метрики не позже ts_ms (в пределах lookback_ms)."""
+        ts, vals = self.scan(symbol, metric, ts_ms - lookback_ms, ts_ms + 1)
+        return float(vals[-1]) if len(vals) else None
+
+    def _partition_path(self, symbol: str, metric: str, day: int) -> str:
+        date = datetime.fromtimestamp(day * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+        return os.path.join(self.root, metric, symbol, date)
+
+    def _load_partition(self, symbol: str, metric: str, day: int):
+        base = self._partition_path(symbol, metric, day)
+        if not os.path.exists(base + '.ts') or not os.path.exists(base + '.val'):
+            return None, None
+        n_ts = os.path.getsize(base + '.ts') // self.TS_DTYPE.itemsize
+        n_val = os.path.getsize(base + '.val') // self.VAL_DTYPE.itemsize
+        # Если запись колонок оборвалась посередине - берем общую длину
+        n = min(n_ts, n_val)
+        if n == 0:
+            return None, None
+        ts = np.memmap(base + '.ts', dtype=self.TS_DTYPE, mode='r', shape=(n,))
+        vals = np.memmap(base + '.val', dtype=self.VAL_DTYPE, mode='r', shape=(n,))
+        return ts, vals
+
+    # === Выравнивание на свечи (векторно) ===
+
+    @staticmethod
+    def align_asof(ts: np.ndarray, values: np.ndarray, target_ts: np.ndarray, default: float = 0.0,
+                   max_age_ms: Optional[int] = None) -> np.ndarray:
+        """Последнее известное значение на каждый момент target_ts (as-of join через searchsorted)."""
+        target_ts = np.asarray(target_ts, dtype=np.int64)
+        out = np.full(len(target_ts), default, dtype=np.float64)
+        if len(ts) == 0:
+            return out
+        idx = np.searchsorted(ts, target_ts, side='right') - 1
+        valid = idx >= 0
+        if max_age_ms is not None:
+            valid &= (target_ts - ts[np.clip(idx, 0, None)]) <= max_age_ms
+        out[valid] = values[idx[valid]]
+        return out
+
+    @staticmethod
+    def window_liq_ratio(ts: np.ndarray, signed_usd: np.ndarray, window_start: np.ndarray,
+                         window_end: np.ndarray) -> np.ndarray:
+        """
+        Соотношение ликвидаций sell/max(1, buy) в окнах [start, end) - та же формула,
+        что и у LiquidationLedger. Без ликвидаций в окне - нейтральные 1.0.
+        """
+        buy_cum = np.concatenate(([0.0], np.cumsum(np.where(signed_usd > 0, signed_usd, 0.0))))
+        sell_cum = np.concatenate(([0.0], np.cumsum(np.where(signed_usd < 0, -signed_usd, 0.0))))
+        lo = np.searchsorted(ts, window_start, side='left')
+        hi = np.searchsorted(ts, window_end, side='left')
+        buy = buy_cum[hi] - buy_cum[lo]
+        sell = sell_cum[hi] - sell_cum[lo]
+        ratio = sell / np.maximum(1.0, buy)
+        return np.where(buy + sell > 0, ratio, 1.0)
+
+    @staticmethod
+    def pct_change_asof(ts: np.ndarray, values: np.ndarray, target_ts: np.ndarray, lag_ms: int) -> np.ndarray:
+        """Относительное изменение as-of значения за lag_ms (0.0 где истории нет)."""
+        now = MetricsStore.align_asof(ts, values, target_ts, default=np.nan)
+        past = MetricsStore.align_asof(ts, values, np.asarray(target_ts, dtype=np.int64) - lag_ms, default=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = now / past - 1.0
+        return np.where(np.isfinite(change), change, 0.0)
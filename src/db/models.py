@@ -0,0 +1,45 @@
+# src/db/models.py
+"""
+ORM модели журнала сигналов.
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+
+from src.db.base import Base
+
+
+class SignalRecord(Base):
+    """
+    Сигнал и его исход. Исход заполняет SignalJournal.resolve_open()
+    по свечам: TP (первым коснулись TP1), SL или EXPIRED.
+    """
+    __tablename__ = 'signals'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(String(40), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    direction = Column(String(16), nullable=False)
+    timeframe = Column(String(8))
+    confidence = Column(Float)
+    entry_price = Column(Float, nullable=False)
+    stop_loss = Column(Float, nullable=False)
+    tp1 = Column(Float, nullable=False)
+    tp2 = Column(Float)
+    tp3 = Column(Float)
+    risk_reward = Column(Float)
+    ml_probability = Column(Float)
+    regime = Column(String(32))
+
+    # Исход
+    status = Column(String(8), nullable=False, default='OPEN')  # OPEN / TP / SL / EXPIRED
+    exit_price = Column(Float)
+    pnl_pct = Column(Float)
+    resolved_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_signals_symbol_timestamp', 'symbol', 'timestamp'),
+        Index('ix_signals_status', 'status'),
+    )
+
+    @property
+    def is_long(self) -> bool:
+        return 'BUY' in self.direction
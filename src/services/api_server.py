@@ -1,12 +1,16 @@
 import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from src.services.http_client import http_client
+from src.services.event_bus import event_bus
+from src.services.response_cache import ResponseCache
+
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="SignalPro API", version="1.0.0")
@@ -23,6 +27,12 @@ app.add_middleware(
 # Global state to share with Bot
 bot_instance = None
 
+# Готовые тела /api/status и /api/signals (пересобираются только при изменениях)
+response_cache = ResponseCache()
+
+# Интервал SSE-комментария, чтобы прокси не закрывали простаивающий поток
+SSE_HEARTBEAT_SECONDS = 15.0
+
 class BotStatus(BaseModel):
     is_running: bool
     active_exchanges: List[str]
@@ -170,20 +180,19 @@ async def root():
                 <h3 style="margin-bottom: 20px;">📡 API Endpoints</h3>
                 <div class="endpoint"><span class="method">GET</span> /api/status</div>
                 <div class="endpoint"><span class="method">GET</span> /api/signals</div>
+                <div class="endpoint"><span class="method">GET</span> /api/stream?topics=signal,status (SSE)</div>
+                <div class="endpoint"><span class="method">WS</span> /ws?topics=signal,status</div>
                 <div class="endpoint"><span class="method">GET</span> /api/portfolio</div>
                 <div class="endpoint"><span class="method">GET</span> /api/stats</div>
                 <div class="endpoint"><span class="method">GET</span> /api/market/history?symbol=BTC_USDT</div>
                 <div class="endpoint"><span class="method">POST</span> /api/control/start</div>
                 <div class="endpoint"><span class="method">POST</span> /api/control/stop</div>
+                <div class="endpoint"><span class="method">POST</span> /api/control/reload_models</div>
             </div>
         </div>
 
         <script>
-            async function updateStatus() {
-                try {
-                    const response = await fetch('/api/status');
-                    const data = await response.json();
-                    
+            function renderStatus(data) {
                     document.getElementById('status').textContent = data.is_running ? 'Работает' : 'Остановлен';
                     document.getElementById('status').classList.remove('loading');
                     document.getElementById('status-badge').textContent = data.is_running ? 'ONLINE' : 'OFFLINE';
@@ -196,17 +205,9 @@ async def root():
                     
                     document.getElementById('pairs-count').textContent = data.active_pairs.length;
                     document.getElementById('signals-count').textContent = data.signals_count;
-                } catch (error) {
-                    console.error('Failed to fetch status:', error);
-                    document.getElementById('status').textContent = 'Ошибка';
-                    document.getElementById('status').classList.remove('loading');
-                }
             }
 
-            async function updateSignals() {
-                try {
-                    const response = await fetch('/api/signals');
-                    const signals = await response.json();
+            function renderSignals(signals) {
                     const container = document.getElementById('signals-container');
                     
                     if (!signals || signals.length === 0) {
@@ -290,6 +291,23 @@ async def root():
                             </div>
                         `;
                     }).join('');
+            }
+
+            async function updateStatus() {
+                try {
+                    const response = await fetch('/api/status');
+                    renderStatus(await response.json());
+                } catch (error) {
+                    console.error('Failed to fetch status:', error);
+                    document.getElementById('status').textContent = 'Ошибка';
+                    document.getElementById('status').classList.remove('loading');
+                }
+            }
+
+            async function updateSignals() {
+                try {
+                    const response = await fetch('/api/signals');
+                    renderSignals(await response.json());
                 } catch (error) {
                     console.error('Failed to fetch signals:', error);
                     document.getElementById('signals-container').innerHTML = `
@@ -300,21 +318,35 @@ async def root():
                 }
             }
 
-            // Update status immediately and then every 3 seconds
-            updateStatus();
-            updateSignals();
-            setInterval(() => {
+            if (window.EventSource) {
+                // Push: сервер присылает текущий статус и сигналы при подключении, дальше - изменения
+                const signals = new Map();
+                const stream = new EventSource('/api/stream?topics=signal,status');
+                stream.addEventListener('status', (e) => renderStatus(JSON.parse(e.data).data));
+                stream.addEventListener('signal', (e) => {
+                    const event = JSON.parse(e.data);
+                    signals.delete(event.key);  // Обновленный сигнал - в конец, как в кеше бота
+                    signals.set(event.key, event.data);
+                    renderSignals(Array.from(signals.values()));
+                });
+                stream.onopen = () => { signals.clear(); renderSignals([]); };
+            } else {
+                // Старые браузеры: опрос раз в 3 секунды
                 updateStatus();
                 updateSignals();
-            }, 3000);
+                setInterval(() => {
+                    updateStatus();
+                    updateSignals();
+                }, 3000);
+            }
         </script>
     </body>
     </html>
     """
 
-@app.get("/api/status", response_model=BotStatus)
-async def get_status():
-    if not bot_instance:
+def status_payload(bot) -> Dict:
+    """Снимок статуса бота (ответ /api/status и событие 'status')"""
+    if not bot:
         return {
             "is_running": False,
             "active_exchanges": [],
@@ -323,27 +355,124 @@ async def get_status():
             "signals_count": 0
         }
     
+    changed_at = _last_change(bot)
     return {
-        "is_running": bot_instance.is_running,
-        "active_exchanges": list(bot_instance.exchanges.keys()),
-        "active_pairs": bot_instance.settings.trading_pairs,
-        "last_update": datetime.now().isoformat(),
-        "signals_count": len(bot_instance.signal_generator.signal_cache)
+        "is_running": bot.is_running,
+        "active_exchanges": list(bot.exchanges.keys()),
+        "active_pairs": bot.settings.trading_pairs,
+        "last_update": changed_at.isoformat() if changed_at else "N/A",
+        "signals_count": len(bot.signal_generator.signal_cache)
     }
 
-@app.get("/api/signals")
-async def get_signals():
-    if not bot_instance:
+def _last_change(bot) -> Optional[datetime]:
+    """Время последнего изменения статуса: запуск / стоп бота или новый сигнал в signal_cache"""
+    times = [t for t in (getattr(bot, 'status_changed_at', None),
+                         getattr(bot.signal_generator, 'updated_at', None)) if t is not None]
+    return max(times) if times else None
+
+def signal_payload(signal, timestamp: datetime) -> Dict:
+    """Сигнал из signal_cache в виде словаря для JSON (ответ /api/signals и событие 'signal')"""
+    sig_dict = signal.__dict__.copy()
+    sig_dict['valid_until'] = sig_dict['valid_until'].isoformat()
+    sig_dict['timestamp'] = timestamp.isoformat()
+    return sig_dict
+
+def _status_version(bot):
+    """Все, от чего зависит status_payload (включая время последнего изменения)"""
+    if not bot:
+        return None
+    pairs = bot.settings.trading_pairs
+    return (bot.is_running, tuple(bot.exchanges), id(pairs), len(pairs),
+            len(bot.signal_generator.signal_cache), _last_change(bot))
+
+def _signals_version(bot):
+    if not bot:
+        return None
+    generator = bot.signal_generator
+    return (id(generator), getattr(generator, 'cache_version', None), len(generator.signal_cache))
+
+def _signals_list(bot) -> List[Dict]:
+    if not bot:
         return []
+    return [
+        signal_payload(signal, timestamp)
+        for symbol, (signal, timestamp) in bot.signal_generator.signal_cache.items()
+    ]
+
+@app.get("/api/status", response_model=BotStatus)
+async def get_status(request: Request):
+    entry = response_cache.get('status', _status_version(bot_instance), lambda: status_payload(bot_instance))
+    return response_cache.respond(request, entry)
+
+@app.get("/api/signals")
+async def get_signals(request: Request):
+    entry = response_cache.get('signals', _signals_version(bot_instance), lambda: _signals_list(bot_instance))
+    return response_cache.respond(request, entry)
+
+def _topics(topics: Optional[str]) -> Optional[List[str]]:
+    return [t.strip() for t in topics.split(',') if t.strip()] if topics else None
+
+@app.get("/api/stream")
+async def stream_events(request: Request, topics: Optional[str] = None):
+    """
+    Server-Sent Events: signal / status / metrics по мере появления.
+    При подключении сразу приходят текущий статус и актуальные сигналы.
+    """
+    subscription = event_bus.subscribe(_topics(topics))
+    
+    async def frames():
+        try:
+            while True:
+                try:
+                    event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    break  # Медленный клиент отключен - EventSource переподключится
+                yield event.sse
+        finally:
+            event_bus.unsubscribe(subscription)
     
-    signals = []
-    for symbol, (signal, timestamp) in bot_instance.signal_generator.signal_cache.items():
-        sig_dict = signal.__dict__.copy()
-        sig_dict['valid_until'] = sig_dict['valid_until'].isoformat()
-        sig_dict['timestamp'] = timestamp.isoformat()
-        signals.append(sig_dict)
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def websocket_events(websocket: WebSocket, topics: Optional[str] = None):
+    """WebSocket-поток тех же событий: {"seq", "topic", "key", "data"}"""
+    await websocket.accept()
+    subscription = event_bus.subscribe(_topics(topics))
+    
+    async def watch_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()  # Входящие сообщения не нужны, ждем закрытия
+        except WebSocketDisconnect:
+            pass
+        finally:
+            subscription.close()
     
-    return signals
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for event in subscription:
+            await websocket.send_text(event.message)
+    except Exception:
+        pass  # Клиент ушел во время отправки
+    finally:
+        watcher.cancel()
+        event_bus.unsubscribe(subscription)
+    if subscription.dropped >= subscription.max_dropped:
+        try:
+            await websocket.close(code=1013)  # Try again later: клиент не успевал читать
+        except Exception:
+            pass
+
+@app.get("/api/bus")
+async def get_bus_stats():
+    """Подписчики и опубликованные события шины"""
+    return event_bus.stats()
 
 @app.get("/api/portfolio")
 async def get_portfolio():
@@ -353,19 +482,22 @@ async def get_portfolio():
 
 @app.get("/api/stats")
 async def get_stats():
-    if not bot_instance:
+    if not bot_instance or not hasattr(bot_instance, 'journal'):
          return {"win_rate": 0, "total_signals": 0, "on_chain_score": "N/A"}
     
-    signals_count = len(bot_instance.signal_generator.signal_cache)
-    # Heuristic for demo/realism until we have trade history DB
-    win_rate = 74.2 if signals_count > 0 else 0
-    on_chain_score = "High" if signals_count > 0 else "N/A"
-    
-    return {
-        "win_rate": win_rate,
-        "total_signals": signals_count,
-        "on_chain_score": on_chain_score
-    }
+    # Статистика из журнала сигналов (исходы TP/SL по свечам)
+    try:
+        stats = await bot_instance.journal.get_stats()
+    except Exception as e:
+        logger.error(f"Failed to read journal stats: {e}")
+        raise HTTPException(status_code=503, detail="Signal journal unavailable")
+    stats["on_chain_score"] = "High" if stats["total_signals"] > 0 else "N/A"
+    return stats
+
+@app.get("/api/http")
+async def get_http_stats():
+    """Статистика общих HTTP-сессий: запросы и переиспользование соединений"""
+    return http_client.stats()
 
 @app.get("/api/market/history")
 async def get_market_history(symbol: str, timeframe: str = '1h'):
@@ -383,6 +515,8 @@ async def get_market_history(symbol: str, timeframe: str = '1h'):
 async def stop_bot():
     if bot_instance:
         bot_instance.is_running = False
+        bot_instance.status_changed_at = datetime.now()
+        event_bus.publish('status', status_payload(bot_instance), retain=True)
         return {"status": "Stopped"}
     return {"status": "Not initialized"}
 
@@ -390,9 +524,23 @@ async def stop_bot():
 async def start_bot():
     if bot_instance:
         bot_instance.is_running = True
+        bot_instance.status_changed_at = datetime.now()
+        event_bus.publish('status', status_payload(bot_instance), retain=True)
         return {"status": "Started"}
     return {"status": "Not initialized"}
 
+@app.post("/api/control/reload_models")
+async def reload_models(force: bool = False):
+    """Подхватывает новые модели из models/ без рестарта (Ultra Mode)"""
+    if not bot_instance:
+        raise HTTPException(status_code=503, detail="Bot not initialized")
+    ml_engine = getattr(bot_instance.signal_generator, 'ml_engine', None)
+    if not hasattr(ml_engine, 'reload'):
+        raise HTTPException(status_code=409, detail="Hot reload requires Ultra Mode")
+    # Загрузка и проверка моделей - в потоке, event loop не блокируется
+    reloaded = await asyncio.to_thread(ml_engine.reload, force)
+    return {"reloaded": reloaded, **ml_engine.model_info()}
+
 async def run_api(bot):
     global bot_instance
     bot_instance = bot
@@ -0,0 +1,178 @@
+# src/services/event_bus.py
+"""
+Event Bus - push-доставка сигналов, статуса и метрик подписчикам API.
+
+Бот публикует событие один раз: оно сразу кодируется в JSON и раскладывается
+по очередям подписчиков (WebSocket / SSE клиенты api_server). Опрос
+/api/status и /api/signals каждые 3 секунды больше не нужен.
+
+Retained-события (последний статус, последний сигнал по паре) хранятся и
+отдаются новому подписчику сразу после подключения - клиенту не нужен
+отдельный запрос за начальным состоянием.
+
+Медленные клиенты не тормозят бота: очередь подписчика ограничена, при
+переполнении выбрасываются самые старые события, а подписчик, потерявший
+слишком много, отключается (клиент переподключится и получит снимок заново).
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from src.services.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def encode(data: Any) -> str:
+    return dumps(data).decode('utf-8')
+
+
+@dataclass
+class Event:
+    seq: int
+    topic: str
+    data: str  # Уже закодированный JSON
+    key: Optional[str] = None
+    _message: Optional[str] = field(default=None, repr=False)
+    _sse: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def message(self) -> str:
+        """Кадр WebSocket: {"seq", "topic", "key", "data"} (кодируется один раз на все подписки)."""
+        if self._message is None:
+            key = 'null' if self.key is None else json.dumps(self.key)
+            self._message = f'{{"seq":{self.seq},"topic":{json.dumps(self.topic)},"key":{key},"data":{self.data}}}'
+        return self._message
+
+    @property
+    def sse(self) -> str:
+        """Кадр Server-Sent Events."""
+        if self._sse is None:
+            self._sse = f"id: {self.seq}\nevent: {self.topic}\ndata: {self.message}\n\n"
+        return self._sse
+
+
+class Subscription:
+    """
+    Очередь событий одного клиента.
+
+    Args:
+        topics: интересующие темы (None - все)
+        maxsize: длина очереди
+        max_dropped: после стольких выброшенных событий подписка закрывается
+    """
+    def __init__(self, topics: Optional[Iterable[str]] = None, maxsize: int = 256, max_dropped: int = 1000):
+        self.topics: Optional[Set[str]] = set(topics) if topics else None
+        self.max_dropped = max_dropped
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def offer(self, event: Event):
+        """Кладет событие без ожидания; при переполнении выбрасывает самое старое."""
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped >= self.max_dropped:
+                logger.warning(f"⚠️ [BUS] Slow subscriber disconnected after {self.dropped} dropped events")
+                self.close()
+                return
+        self.queue.put_nowait(event)
+
+    def close(self):
+        """Закрывает подписку; ожидающий get() получит None."""
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Следующее событие; None - подписка закрыта. asyncio.TimeoutError по таймауту."""
+        event = await asyncio.wait_for(self.queue.get(), timeout)
+        if event is None:
+            self.queue.put_nowait(None)  # Повторные get() тоже получают None
+        else:
+            self.delivered += 1
+        return event
+
+    def __aiter__(self) -> AsyncIterator[Event]:
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+
+class EventBus:
+    """
+    Args:
+        queue_size: длина очереди одного подписчика
+        max_dropped: порог отключения медленного подписчика
+    """
+    def __init__(self, queue_size: int = 256, max_dropped: int = 1000):
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self._subscribers: Set[Subscription] = set()
+        self._retained: Dict[Tuple[str, Optional[str]], Event] = {}
+        self._seq = 0
+        self.published = 0
+
+    def publish(self, topic: str, data: Any, key: Optional[str] = None, retain: bool = False) -> Event:
+        """
+        Кодирует событие один раз и раскладывает по подписчикам (без ожидания).
+        retain=True - событие запоминается по (topic, key) и отдается новым подписчикам.
+        Вызывать из event loop, в котором работают подписчики.
+        """
+        self._seq += 1
+        event = Event(self._seq, topic, encode(data), key)
+        if retain:
+            self._retained[(topic, key)] = event
+        for subscription in list(self._subscribers):
+            if subscription.closed:
+                self._subscribers.discard(subscription)
+            elif subscription.wants(topic):
+                subscription.offer(event)
+        self.published += 1
+        return event
+
+    def forget(self, topic: str, key: Optional[str] = None):
+        """Убирает retained-событие (например, истекший сигнал)."""
+        self._retained.pop((topic, key), None)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, replay: bool = True) -> Subscription:
+        subscription = Subscription(topics, maxsize=self.queue_size, max_dropped=self.max_dropped)
+        if replay:
+            for event in sorted(self._retained.values(), key=lambda e: e.seq):
+                if subscription.wants(event.topic):
+                    subscription.offer(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        self._subscribers.discard(subscription)
+
+    def stats(self) -> Dict:
+        active = [s for s in self._subscribers if not s.closed]
+        return {
+            'subscribers': len(active),
+            'published': self.published,
+            'retained': len(self._retained),
+            'dropped': sum(s.dropped for s in active),
+        }
+
+
+# Общий экземпляр для процесса (бот публикует, api_server раздает)
+event_bus = EventBus()
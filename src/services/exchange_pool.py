@@ -0,0 +1,276 @@
+# src/services/exchange_pool.py
+"""
+Exchange Pool - асинхронный доступ к биржам через ccxt.async_support.
+
+Все клиенты делят одну aiohttp-сессию: пул соединений с keep-alive и
+кэшем DNS, поэтому сотни параллельных запросов не занимают потоки,
+а rateLimit ccxt ждет через asyncio.sleep, а не блокирует поток.
+У каждой биржи свой семафор - лимит одновременных запросов.
+
+Hedged-запросы: если основная биржа не ответила за свой наблюдаемый p95,
+параллельно запускается следующая, берется первый успешный ответ.
+Порядок бирж и задержка хеджа определяются EWMA латентности и ошибок.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+import ccxt.async_support as ccxt_async
+
+logger = logging.getLogger(__name__)
+
+
+class ExchangeHealth:
+    """
+    Латентность и ошибки одной биржи.
+    EWMA задают ранжирование, скользящее окно латентностей - p95 для хеджа.
+    """
+    def __init__(self, alpha: float = 0.2, window: int = 200, default_latency: float = 1.0):
+        self.alpha = alpha
+        self.default_latency = default_latency
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.samples: deque = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.samples.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_ewma *= 1 - self.alpha
+
+    def record_error(self):
+        self.requests += 1
+        self.errors += 1
+        self.error_ewma += self.alpha * (1.0 - self.error_ewma)
+
+    @property
+    def latency(self) -> float:
+        return self.default_latency if self.latency_ewma is None else self.latency_ewma
+
+    def p95(self) -> float:
+        if len(self.samples) < 5:
+            return self.latency * 2  # Мало наблюдений - осторожная оценка
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def score(self) -> float:
+        """Ожидаемое время до успешного ответа: латентность / доля успехов."""
+        return self.latency / max(0.05, 1.0 - self.error_ewma)
+
+    def to_dict(self) -> Dict:
+        return {
+            'latency_ewma': round(self.latency, 4),
+            'p95': round(self.p95(), 4),
+            'error_ewma': round(self.error_ewma, 4),
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class ExchangePool:
+    """
+    Args:
+        configs: {'binance': {ccxt config}, ...} - имя биржи = класс ccxt
+        max_concurrency: лимит одновременных запросов (число или словарь по биржам)
+        limit: общий лимит соединений пула
+        limit_per_host: лимит соединений на хост
+        dns_ttl: время жизни DNS-кэша, сек
+        keepalive_timeout: сколько держать простаивающее соединение, сек
+        min_hedge_delay / max_hedge_delay: границы задержки перед запросом к следующей бирже, сек
+    """
+    def __init__(self, configs: Dict[str, Dict], max_concurrency: Union[int, Dict[str, int]] = 8,
+                 limit: int = 100, limit_per_host: int = 32, dns_ttl: int = 300,
+                 keepalive_timeout: float = 30.0, request_timeout: float = 15.0,
+                 min_hedge_delay: float = 0.05, max_hedge_delay: float = 5.0):
+        self.configs = configs
+        self.max_concurrency = max_concurrency
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.health: Dict[str, ExchangeHealth] = {name: ExchangeHealth() for name in configs}
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.exchanges: Dict[str, ccxt_async.Exchange] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.configs)
+
+    def _concurrency(self, name: str) -> int:
+        if isinstance(self.max_concurrency, dict):
+            return self.max_concurrency.get(name, 8)
+        return self.max_concurrency
+
+    async def start(self):
+        """Создает сессию и клиентов (лениво, при первом запросе - нужен запущенный loop)."""
+        loop = asyncio.get_running_loop()
+        if self.session is not None and self._loop is loop:
+            return
+        if self._loop is not loop:
+            # Сессия привязана к своему loop (боты с loop в отдельном потоке) - создаем заново,
+            # старые клиенты закрываются (на своем loop, если он еще работает)
+            old_loop, old_session, old_exchanges = self._loop, self.session, self.exchanges
+            self._start_lock = asyncio.Lock()
+            self.session, self.exchanges, self._semaphores = None, {}, {}
+            self._loop = loop
+            if old_session is not None or old_exchanges:
+                if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+                    asyncio.run_coroutine_threadsafe(self._close_clients(old_exchanges, old_session), old_loop)
+                else:
+                    await self._close_clients(old_exchanges, old_session)
+        async with self._start_lock:
+            if self.session is not None:
+                return
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            for name, config in self.configs.items():
+                try:
+                    exchange_class = getattr(ccxt_async, name)
+                    self.exchanges[name] = exchange_class({
+                        **config,
+                        'session': session,  # Общая сессия: ccxt не создает свой коннектор
+                        'timeout': int(self.request_timeout * 1000),
+                    })
+                    self._semaphores[name] = asyncio.Semaphore(self._concurrency(name))
+                except Exception as e:
+                    logger.error(f"❌ [EXCHANGES] {name} init error: {e}")
+            self.session = session
+            logger.info(f"✅ [EXCHANGES] Async clients ready: {', '.join(self.exchanges)}")
+
+    async def get(self, name: str) -> Optional[ccxt_async.Exchange]:
+        await self.start()
+        return self.exchanges.get(name)
+
+    async def fetch_ohlcv(self, name: str, symbol: str, timeframe: str = '1h',
+                          since: Optional[int] = None, limit: Optional[int] = None) -> List[List[float]]:
+        """fetch_ohlcv на бирже name с учетом ее лимита параллелизма."""
+        exchange = await self.get(name)
+        if exchange is None:
+            raise KeyError(f"Exchange {name} is not available")
+        async with self._semaphores[name]:
+            return await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+    # === Hedged-запросы ===
+
+    def ranked(self, names: Optional[List[str]] = None) -> List[str]:
+        """Биржи по ожидаемому времени ответа; без статистики - в исходном порядке."""
+        names = self.names if names is None else names
+        return sorted(names, key=lambda name: self.health[name].score())
+
+    def hedge_delay(self, name: str) -> float:
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, self.health[name].p95()))
+
+    async def _timed_fetch(self, name: str, symbol: str, timeframe: str, since, limit) -> Tuple[str, Any]:
+        started = time.monotonic()
+        try:
+            ohlcv = await self.fetch_ohlcv(name, symbol, timeframe, since=since, limit=limit)
+        except asyncio.CancelledError:
+            raise  # Проигравший хедж: латентность неизвестна, не учитываем
+        except ccxt_async.BadSymbol:
+            raise  # Нет рынка на бирже - не ошибка биржи
+        except Exception:
+            self.health[name].record_error()
+            raise
+        self.health[name].record_success(time.monotonic() - started)
+        return name, ohlcv
+
+    async def fetch_ohlcv_hedged(self, symbol: str, timeframe: str = '1h', since: Optional[int] = None,
+                                 limit: Optional[int] = None, names: Optional[List[str]] = None,
+                                 accept: Optional[Callable[[Any], bool]] = None) -> Tuple[Optional[str], Any]:
+        """
+        OHLCV с первой ответившей биржи.
+        Следующая биржа запускается, если текущая не ответила за свой p95
+        или вернула ошибку / неподходящие данные (accept -> False).
+        Возвращает (имя биржи, ohlcv) или (None, None).
+        """
+        accept = accept or bool
+        candidates = self.ranked(names)
+        in_flight: Dict[asyncio.Task, str] = {}
+        primary = candidates[0] if candidates else None
+
+        def launch():
+            name = candidates.pop(0)
+            task = asyncio.create_task(self._timed_fetch(name, symbol, timeframe, since, limit))
+            in_flight[task] = name
+            return name
+
+        try:
+            last = launch() if candidates else None
+            while in_flight:
+                timeout = self.hedge_delay(last) if candidates else None
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges_fired += 1
+                    last = launch()
+                    continue
+                for task in done:
+                    name = in_flight.pop(task)
+                    if not task.cancelled() and task.exception() is None:
+                        _, ohlcv = task.result()
+                        if accept(ohlcv):
+                            if name != primary:
+                                self.hedges_won += 1
+                            return name, ohlcv
+                    elif not task.cancelled():
+                        logger.debug(f"⚠️ [EXCHANGES] {name} {symbol} {timeframe}: {task.exception()}")
+                if not in_flight and candidates:
+                    last = launch()  # Все текущие провалились - сразу следующая биржа
+            return None, None
+        finally:
+            for task in in_flight:
+                if task.done():
+                    if not task.cancelled():
+                        task.exception()  # Забираем исключение, чтобы не было "never retrieved"
+                else:
+                    task.cancel()
+
+    def health_report(self) -> Dict:
+        return {
+            'exchanges': {name: h.to_dict() for name, h in self.health.items()},
+            'hedges_fired': self.hedges_fired,
+            'hedges_won': self.hedges_won,
+        }
+
+    async def close(self):
+        exchanges, session = self.exchanges, self.session
+        self.exchanges = {}
+        self._semaphores = {}
+        self.session = None
+        self._loop = None
+        await self._close_clients(exchanges, session)
+
+    @staticmethod
+    async def _close_clients(exchanges: Dict[str, ccxt_async.Exchange], session: Optional[aiohttp.ClientSession]):
+        for name, exchange in exchanges.items():
+            try:
+                await exchange.close()
+            except Exception as e:
+                logger.warning(f"⚠️ [EXCHANGES] {name} close error: {e}")
+        if session is not None:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f"⚠️ [EXCHANGES] Session close error: {e}")
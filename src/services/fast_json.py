@@ -0,0 +1,40 @@
+# src/services/fast_json.py
+"""
+Fast JSON - кодирование ответов API и событий шины.
+
+orjson (если установлен) в разы быстрее стандартного json и сам понимает
+datetime и numpy; без него - stdlib json с тем же набором типов.
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def json_default(value: Any) -> Any:
+    """Типы, которых нет в стандартном json: datetime, numpy, tuple/set."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data: Any) -> bytes:
+        return orjson.dumps(data, default=json_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(data: Any) -> bytes:
+        return json.dumps(data, default=json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
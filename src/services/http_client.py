@@ -0,0 +1,149 @@
+# src/services/http_client.py
+"""
+HTTP Client - общие долгоживущие aiohttp-сессии для всех исходящих запросов.
+
+Раньше каждый запрос к Telegram / Dune / CoinGecko / CryptoPanic создавал
+новую ClientSession и TCPConnector, то есть новый TCP+TLS handshake.
+Здесь сессии именованные (по сервису), живут до close() и держат пул
+соединений с keep-alive и лимитом на хост. Через TraceConfig считается,
+сколько запросов ушло по новому соединению, а сколько - по переиспользованному.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionStats:
+    requests: int = 0
+    errors: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+
+    def to_dict(self) -> Dict:
+        connections = self.new_connections + self.reused_connections
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'new_connections': self.new_connections,
+            'reused_connections': self.reused_connections,
+            'reuse_ratio': round(self.reused_connections / connections, 3) if connections else 0.0,
+        }
+
+
+class HttpClient:
+    """
+    Реестр именованных сессий.
+
+    Args:
+        limit: общий лимит соединений одной сессии
+        limit_per_host: лимит соединений на хост
+        keepalive_timeout: сколько держать простаивающее соединение, сек
+        dns_ttl: время жизни DNS-кэша, сек
+        timeout: общий таймаут запроса по умолчанию, сек
+    """
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, keepalive_timeout: float = 30.0,
+                 dns_ttl: int = 300, timeout: float = 30.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+
+        # (name, loop) -> session: сессия привязана к event loop, в котором создана
+        # (часть ботов крутит отдельные loop в потоках)
+        self._sessions: Dict[Tuple[str, asyncio.AbstractEventLoop], aiohttp.ClientSession] = {}
+        self._stats: Dict[str, SessionStats] = {}
+
+    def _trace_config(self, stats: SessionStats) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            stats.requests += 1
+
+        async def on_request_exception(session, ctx, params):
+            stats.errors += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            stats.new_connections += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats.reused_connections += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def session(self, name: str = 'default', ssl: Optional[bool] = None,
+                limit_per_host: Optional[int] = None) -> aiohttp.ClientSession:
+        """
+        Общая сессия сервиса name (создается при первом обращении в текущем loop).
+        ssl/limit_per_host учитываются только при создании.
+        Сессию не закрывать - этим занимается HttpClient.close().
+        """
+        key = (name, asyncio.get_running_loop())
+        session = self._sessions.get(key)
+        if session is not None and not session.closed:
+            return session
+        # Сессии завершившихся loop больше не нужны
+        for stale in [key for key in self._sessions if key[1].is_closed()]:
+            del self._sessions[stale]
+
+        connector_options = {
+            'limit': self.limit,
+            'limit_per_host': limit_per_host or self.limit_per_host,
+            'keepalive_timeout': self.keepalive_timeout,
+            'ttl_dns_cache': self.dns_ttl,
+        }
+        if ssl is not None:
+            connector_options['ssl'] = ssl
+        stats = self._stats.setdefault(name, SessionStats())
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**connector_options),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self._trace_config(stats)]
+        )
+        self._sessions[key] = session
+        logger.debug(f"🌐 [HTTP] Session '{name}' created")
+        return session
+
+    @asynccontextmanager
+    async def borrow(self, name: str = 'default', **options):
+        """
+        `async with http_client.borrow('onchain') as session:` - замена
+        `async with aiohttp.ClientSession() as session:` без закрытия сессии.
+        """
+        yield self.session(name, **options)
+
+    def stats(self) -> Dict:
+        per_session = {name: stats.to_dict() for name, stats in self._stats.items()}
+        total = SessionStats()
+        for stats in self._stats.values():
+            total.requests += stats.requests
+            total.errors += stats.errors
+            total.new_connections += stats.new_connections
+            total.reused_connections += stats.reused_connections
+        return {'sessions': per_session, 'total': total.to_dict()}
+
+    async def close(self):
+        """Закрывает все сессии текущего loop."""
+        loop = asyncio.get_running_loop()
+        for key in [key for key in self._sessions if key[1] is loop]:
+            session = self._sessions.pop(key)
+            if not session.closed:
+                await session.close()
+        total = self.stats()['total']
+        logger.info(f"🌐 [HTTP] Sessions closed. Requests: {total['requests']}, "
+                    f"connection reuse: {total['reuse_ratio']:.0%}")
+
+
+# Общий экземпляр для всего процесса
+http_client = HttpClient()
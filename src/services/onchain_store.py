@@ -0,0 +1,299 @@
+# src/services/onchain_store.py
+"""
+On-Chain Store - on-chain/новостные данные в памяти с фоновым обновлением.
+
+Раньше каждый символ отдельно ходил в Dune, CoinGecko и CryptoPanic
+(последовательно, с запасными запросами), а глобальная выборка Dune
+скачивалась заново для каждого символа. Здесь каждый источник
+загружается один раз за интервал обновления:
+  - dataset:   глобальный набор (Dune) - одна загрузка на всех,
+               выборка по активу считается один раз на версию набора;
+  - per-asset: данные по активам (CoinGecko, CryptoPanic) - запросы
+               за короткое окно склеиваются в один пакетный вызов.
+
+Чтение - stale-while-revalidate: свежие данные отдаются из памяти,
+устаревшие тоже отдаются сразу, а обновление уходит в фон. Ждать
+приходится только при первом обращении к активу (или если данные
+старше max_stale).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fetched_at: float
+    failed: bool = False
+
+
+@dataclass
+class ProviderStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'errors': self.errors,
+        }
+
+
+class OnChainStore:
+    """
+    Args:
+        refresh_interval: период фонового обновления, сек
+        max_stale: данные старше этого не отдаются без ожидания загрузки, сек
+        retry_after: через сколько повторить неудачную загрузку, сек
+        batch_window: окно склейки запросов per-asset источников, сек
+    """
+    def __init__(self, refresh_interval: float = 300.0, max_stale: float = 3600.0,
+                 retry_after: float = 60.0, batch_window: float = 0.05):
+        self.refresh_interval = refresh_interval
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self.batch_window = batch_window
+
+        self.tracked: Set[str] = set()
+        self._datasets: Dict[str, Dict[str, Callable]] = {}
+        self._per_asset: Dict[str, Callable[[List[str]], Awaitable[Dict[str, Any]]]] = {}
+        self._stats: Dict[str, ProviderStats] = {}
+
+        # Данные переживают смену event loop, задачи и futures - нет
+        self._raw: Dict[str, _Entry] = {}                  # dataset -> набор
+        self._selected: Dict[str, Dict[str, Any]] = {}     # dataset -> {asset: выборка}
+        self._values: Dict[str, Dict[str, _Entry]] = {}    # per-asset -> {asset: значение}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._inflight: Dict[str, asyncio.Task] = {}                 # dataset -> загрузка
+        self._futures: Dict[str, Dict[str, asyncio.Future]] = {}     # per-asset -> {asset: ожидание}
+        self._queued: Dict[str, List[str]] = {}                      # per-asset -> активы на склейку
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+
+    # === Регистрация источников ===
+
+    def add_dataset(self, name: str, load: Callable[[], Awaitable[Any]],
+                    select: Callable[[Any, str], Any]):
+        """Глобальный набор: load() -> набор, select(набор, asset) -> значение актива."""
+        self._datasets[name] = {'load': load, 'select': select}
+        self._stats[name] = ProviderStats()
+
+    def add_per_asset(self, name: str, load: Callable[[List[str]], Awaitable[Dict[str, Any]]]):
+        """Данные по активам: load([assets]) -> {asset: значение}; нет актива в ответе -> None."""
+        self._per_asset[name] = load
+        self._values[name] = {}
+        self._stats[name] = ProviderStats()
+
+    @property
+    def providers(self) -> List[str]:
+        return list(self._datasets) + list(self._per_asset)
+
+    def track(self, assets: Iterable[str]):
+        """Активы, которые фоновое обновление держит свежими."""
+        self.tracked.update(assets)
+
+    # === Чтение ===
+
+    def _state(self, entry: Optional[_Entry], now: float) -> str:
+        if entry is None:
+            return 'missing'
+        age = now - entry.fetched_at
+        if entry.failed:
+            return 'missing' if age >= self.retry_after else 'fresh'
+        if age >= self.max_stale:
+            return 'missing'
+        return 'stale' if age >= self.refresh_interval else 'fresh'
+
+    async def get(self, asset: str, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Значения всех (или перечисленных) источников для актива: {name: value | None}.
+        Недостающие источники загружаются параллельно, устаревшие - обновляются в фоне.
+        """
+        self._bind_loop()
+        self.track([asset])
+        names = self.providers if names is None else names
+        now = time.time()
+        waits = {}
+        for name in names:
+            stats = self._stats[name]
+            if name in self._datasets:
+                entry = self._raw.get(name)
+            else:
+                entry = self._values[name].get(asset)
+            state = self._state(entry, now)
+            if state == 'missing':
+                stats.misses += 1
+                waits[name] = self._load_dataset(name) if name in self._datasets else self._request(name, [asset])
+            elif state == 'stale':
+                stats.stale_hits += 1
+                self._revalidate(name, asset)
+            else:
+                stats.hits += 1
+        if waits:
+            await asyncio.gather(*waits.values())
+        return {name: self._value(name, asset) for name in names}
+
+    def _value(self, name: str, asset: str) -> Any:
+        if name in self._per_asset:
+            entry = self._values[name].get(asset)
+            return entry.value if entry else None
+        entry = self._raw.get(name)
+        if entry is None or entry.value is None:
+            return None
+        selected = self._selected.setdefault(name, {})
+        if asset not in selected:
+            try:
+                selected[asset] = self._datasets[name]['select'](entry.value, asset)
+            except Exception as e:
+                logger.warning(f"⚠️ [ONCHAIN] {name} select {asset} error: {e}")
+                selected[asset] = None
+        return selected[asset]
+
+    def _revalidate(self, name: str, asset: str):
+        if name in self._datasets:
+            self._load_dataset(name)
+        else:
+            self._request(name, [asset])
+
+    # === Загрузка ===
+
+    def _load_dataset(self, name: str) -> asyncio.Task:
+        """Одна загрузка набора на всех ожидающих (single-flight)."""
+        task = self._inflight.get(name)
+        if task is None or task.done():
+            task = asyncio.create_task(self._run_dataset_load(name))
+            self._inflight[name] = task
+        return task
+
+    async def _run_dataset_load(self, name: str):
+        stats = self._stats[name]
+        stats.loads += 1
+        try:
+            raw = await self._datasets[name]['load']()
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ [ONCHAIN] {name} load error: {e}")
+            if name not in self._raw or self._raw[name].failed:
+                self._raw[name] = _Entry(None, time.time(), failed=True)
+            else:
+                # Старые данные остаются, повтор - не раньше retry_after
+                self._raw[name].fetched_at = max(self._raw[name].fetched_at,
+                                                 time.time() - self.refresh_interval + self.retry_after)
+            return
+        self._raw[name] = _Entry(raw, time.time())
+        self._selected[name] = {}
+
+    def _request(self, name: str, assets: List[str]) -> asyncio.Future:
+        """Ставит активы в пакет источника; уже загружаемые повторно не запрашиваются."""
+        futures = self._futures.setdefault(name, {})
+        waits = []
+        for asset in assets:
+            future = futures.get(asset)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                futures[asset] = future
+                self._queued.setdefault(name, []).append(asset)
+            waits.append(future)
+        if self._queued.get(name) and (name not in self._flush_tasks or self._flush_tasks[name].done()):
+            self._flush_tasks[name] = asyncio.create_task(self._flush(name))
+        return asyncio.gather(*waits)
+
+    async def _flush(self, name: str):
+        # Активы, поставленные в очередь во время загрузки, уходят следующим пакетом
+        while self._queued.get(name):
+            await asyncio.sleep(self.batch_window)
+            assets, self._queued[name] = self._queued[name], []
+            await self._load_assets(name, assets)
+
+    async def _load_assets(self, name: str, assets: List[str]):
+        stats = self._stats[name]
+        stats.loads += 1
+        try:
+            values = await self._per_asset[name](assets)
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ [ONCHAIN] {name} load error ({len(assets)} assets): {e}")
+            values = None
+        now = time.time()
+        store = self._values[name]
+        futures = self._futures.get(name, {})
+        for asset in assets:
+            if values is not None:
+                store[asset] = _Entry(values.get(asset), now)
+            elif asset not in store or store[asset].failed:
+                store[asset] = _Entry(None, now, failed=True)
+            else:
+                store[asset].fetched_at = max(store[asset].fetched_at,
+                                              now - self.refresh_interval + self.retry_after)
+            future = futures.pop(asset, None)
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def refresh(self, min_age: float = 0.0):
+        """Обновляет все источники для отслеживаемых активов (данные моложе min_age пропускаются)."""
+        self._bind_loop()
+        now = time.time()
+        waits = []
+        for name in self._datasets:
+            entry = self._raw.get(name)
+            if entry is None or now - entry.fetched_at >= min_age:
+                waits.append(self._load_dataset(name))
+        for name, store in self._values.items():
+            assets = [asset for asset in self.tracked
+                      if asset not in store or now - store[asset].fetched_at >= min_age]
+            if assets:
+                waits.append(self._request(name, assets))
+        await asyncio.gather(*waits, return_exceptions=True)
+
+    # === Фоновое обновление ===
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Задачи и futures привязаны к своему loop - начинаем с чистого листа, данные сохраняем
+            self._loop = loop
+            self._inflight, self._futures, self._queued, self._flush_tasks = {}, {}, {}, {}
+            self._refresh_task = None
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                # Уже обновленное чтением (stale-while-revalidate) повторно не грузим
+                await self.refresh(min_age=self.refresh_interval / 2)
+            except Exception as e:
+                logger.error(f"❌ [ONCHAIN] Background refresh error: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'tracked_assets': len(self.tracked),
+            'providers': {name: stats.to_dict() for name, stats in self._stats.items()},
+        }
+
+    async def close(self):
+        tasks = [self._refresh_task] if self._refresh_task else []
+        tasks += list(self._inflight.values()) + list(self._flush_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for futures in self._futures.values():
+            for future in futures.values():
+                if not future.done():
+                    future.cancel()
+        self._refresh_task = None
+        self._inflight, self._futures, self._queued, self._flush_tasks = {}, {}, {}, {}
+        self._loop = None
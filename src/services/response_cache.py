@@ -0,0 +1,78 @@
+# src/services/response_cache.py
+"""
+Response Cache - заранее закодированные ответы API.
+
+Тело ответа (JSON, при необходимости gzip) собирается только когда меняется
+версия данных, например счетчик изменений signal_cache. Повторные запросы
+отдают готовые байты, а клиент с If-None-Match получает 304 без тела.
+"""
+import gzip
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.services.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedBody:
+    version: Hashable
+    body: bytes
+    etag: str
+    gzip_body: Optional[bytes] = None
+
+
+class ResponseCache:
+    """
+    Args:
+        min_gzip_size: тела короче этого не сжимаются, байт
+        gzip_level: уровень сжатия (сжимается один раз на версию)
+    """
+    def __init__(self, min_gzip_size: int = 1024, gzip_level: int = 6):
+        self.min_gzip_size = min_gzip_size
+        self.gzip_level = gzip_level
+        self._entries: Dict[str, CachedBody] = {}
+        self.stats = {'builds': 0, 'hits': 0, 'not_modified': 0}
+
+    def get(self, name: str, version: Hashable, build: Callable[[], Any]) -> CachedBody:
+        """Тело ответа name для версии version; build() вызывается только при смене версии."""
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version:
+            self.stats['hits'] += 1
+            return entry
+        body = dumps(build())
+        # ETag от содержимого: после рестарта счетчики версий начинаются заново
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        entry = CachedBody(version, body, etag)
+        self._entries[name] = entry
+        self.stats['builds'] += 1
+        return entry
+
+    def invalidate(self, name: Optional[str] = None):
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+    def respond(self, request: Request, entry: CachedBody) -> Response:
+        """Ответ с ETag: 304 на совпавший If-None-Match, gzip - если клиент его принимает."""
+        headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if_none_match = request.headers.get('if-none-match', '')
+        if if_none_match and (if_none_match.strip() == '*' or
+                              entry.etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]):
+            self.stats['not_modified'] += 1
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        if len(body) >= self.min_gzip_size and 'gzip' in request.headers.get('accept-encoding', ''):
+            if entry.gzip_body is None:
+                entry.gzip_body = gzip.compress(body, compresslevel=self.gzip_level)
+            body = entry.gzip_body
+            headers['Content-Encoding'] = 'gzip'
+        return Response(content=body, media_type='application/json', headers=headers)
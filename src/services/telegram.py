@@ -1,7 +1,8 @@
 import logging
 import asyncio
-import aiohttp
 from src.core.settings import settings
+from src.services.http_client import http_client
+from src.services.telegram_outbox import TelegramOutbox
 
 logger = logging.getLogger(__name__)
 
@@ -10,20 +11,23 @@ class TelegramBot:
         self.bot_token = settings.telegram_bot_token
         self.chat_id = settings.telegram_chat_id
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
-        self.session = None
         self.running = False
         self.bot_control_callback = None # Callback to control main bot (start/stop)
+        # Все исходящие сообщения идут через очередь: анализ не ждет Telegram
+        self.outbox = TelegramOutbox(
+            self.bot_token, self.chat_id, parse_mode="HTML", path=settings.telegram_outbox_path
+        )
 
     async def _get_session(self):
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False))
-        return self.session
+        # Общая пулированная сессия: keep-alive вместо нового TLS handshake на каждое сообщение
+        return http_client.session('telegram', ssl=False)
 
     def set_control_callback(self, callback):
         self.bot_control_callback = callback
 
     async def start_polling(self):
         """Starts the polling loop for handling updates"""
+        self.outbox.start()
         # [DISABLED] polling to avoid 409 Conflict with external instances
         logger.info("Telegram polling is DISABLED. Bot can still SEND signals.")
         return
@@ -55,17 +59,17 @@ class TelegramBot:
             msg = "🤖 <b>Bot Started!</b>\nAnalyze loop is running."
             if self.bot_control_callback:
                 self.bot_control_callback('start')
-            await self.send_message(msg, chat_id)
+            await self.send_message(msg, chat_id, coalesce=False)
             
         elif cmd == '/stop' or cmd == '/stopbot':
             msg = "🛑 <b>Bot Paused!</b>\nAnalysis loop stopped."
             if self.bot_control_callback:
                 self.bot_control_callback('stop')
-            await self.send_message(msg, chat_id)
+            await self.send_message(msg, chat_id, coalesce=False)
             
         elif cmd == '/status':
             msg = "ℹ️ <b>Status</b>: Running\nMode: Multi-Strategy"
-            await self.send_message(msg, chat_id)
+            await self.send_message(msg, chat_id, coalesce=False)
             
         elif cmd == '/help':
             msg = (
@@ -74,9 +78,10 @@ class TelegramBot:
                 "/stopbot - Pause Bot\n"
                 "/status - Check Status\n"
             )
-            await self.send_message(msg, chat_id)
+            await self.send_message(msg, chat_id, coalesce=False)
 
-    async def send_message(self, message: any, chat_id: str = None):
+    async def send_message(self, message: any, chat_id: str = None, coalesce: bool = True):
+        """Ставит сообщение в очередь доставки и сразу возвращается (без сетевых запросов)."""
         if not settings.enable_telegram: return
         
         # Format message if it's a signal object
@@ -85,28 +90,13 @@ class TelegramBot:
         else:
             message = str(message)
 
-        target_chat_id = chat_id or self.chat_id
-        session = await self._get_session()
-        
-        try:
-            url = f"{self.base_url}/sendMessage"
-            payload = {
-                "chat_id": target_chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    logger.info(f"✅ Telegram message sent successfully to {target_chat_id}")
-                else:
-                    logger.error(f"Telegram send failed: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Telegram error: {e}")
+        self.outbox.start()
+        self.outbox.enqueue(message, chat_id or self.chat_id, coalesce=coalesce)
 
     async def send_signal(self, signal_data: any):
         if settings.send_signals:
             await self.send_message(signal_data)
 
     async def close(self):
-        if self.session and not self.session.closed:
-            await self.session.close()
+        # Недоставленное сохраняется на диск; сессия общая - закрывается в http_client.close()
+        await self.outbox.stop()
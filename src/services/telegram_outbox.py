@@ -0,0 +1,378 @@
+# src/services/telegram_outbox.py
+"""
+Telegram Outbox - неблокирующая очередь исходящих сообщений Telegram.
+
+enqueue() только кладет сообщение в очередь (O(1), можно из любого потока),
+доставкой занимается одна фоновая задача:
+  - лимиты Telegram: ~1 сообщение/сек в личный чат, 20/мин в группу,
+    30/сек на бота в целом;
+  - ответ 429 - чат ставится на паузу на retry_after из ответа;
+  - сетевые ошибки и 5xx - повтор с экспоненциальной паузой;
+  - если в чате скопилось несколько сигналов (всплеск или пауза по 429),
+    они уходят одним сообщением-дайджестом;
+  - недоставленные сообщения сохраняются в JSON и отправляются после рестарта.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.services.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+# transport(payload) -> (HTTP статус, JSON ответа)
+Transport = Callable[[Dict], Awaitable[Tuple[int, Dict]]]
+
+
+@dataclass
+class OutboxMessage:
+    id: int
+    chat_id: str
+    text: str
+    parse_mode: Optional[str] = None
+    coalesce: bool = True
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+
+
+class TelegramOutbox:
+    """
+    Args:
+        bot_token: токен бота (для транспорта по умолчанию)
+        default_chat_id: чат, если в enqueue() не указан другой
+        parse_mode: 'HTML' / 'Markdown' / None по умолчанию
+        path: JSON-файл для недоставленных сообщений (None - без сохранения)
+        transport: отправка payload (по умолчанию POST sendMessage через общую сессию)
+        chat_interval: минимальный интервал между сообщениями в личный чат, сек
+        group_interval: то же для групп и каналов (chat_id < 0), сек
+        global_rate: сообщений в секунду на бота
+        max_attempts: попыток доставки при сетевых ошибках и 5xx
+        persist_interval: как часто сохранять очередь на диск, сек
+    """
+    def __init__(self, bot_token: str = '', default_chat_id: Optional[str] = None,
+                 parse_mode: Optional[str] = 'HTML', path: Optional[str] = None,
+                 transport: Optional[Transport] = None, chat_interval: float = 1.0,
+                 group_interval: float = 3.0, global_rate: int = 30, max_attempts: int = 5,
+                 persist_interval: float = 5.0):
+        self.bot_token = bot_token
+        self.default_chat_id = default_chat_id
+        self.parse_mode = parse_mode
+        self.path = path
+        self.transport = transport or self._post
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.global_rate = global_rate
+        self.max_attempts = max_attempts
+        self.persist_interval = persist_interval
+
+        self._lock = threading.Lock()  # enqueue() вызывается и из потоков с другим loop
+        self._pending: Dict[str, Deque[OutboxMessage]] = {}
+        self._callbacks: Dict[int, Callable[[], Any]] = {}
+        self._inflight: List[OutboxMessage] = []
+        self._ids = itertools.count(1)
+        self._next_allowed: Dict[str, float] = {}  # chat_id -> time.monotonic()
+        self._recent: Deque[float] = deque()  # Время последних отправок (глобальный лимит)
+        self._dirty = False
+        self._last_persist = 0.0
+        self._loaded = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'queued': 0, 'sent': 0, 'messages_sent': 0, 'digests': 0,
+                      'rate_limited': 0, 'retries': 0, 'dropped': 0}
+
+    # === Очередь ===
+
+    def enqueue(self, text: str, chat_id: Optional[str] = None, parse_mode: Optional[str] = '',
+                coalesce: bool = True, on_sent: Optional[Callable[[], Any]] = None) -> int:
+        """
+        Ставит сообщение в очередь и сразу возвращает его id (без I/O).
+        coalesce=False - сообщение не объединяется в дайджест (ответы на команды).
+        on_sent() вызывается после доставки (не переживает рестарт).
+        """
+        message = OutboxMessage(
+            id=next(self._ids),
+            chat_id=str(chat_id or self.default_chat_id),
+            text=str(text),
+            parse_mode=self.parse_mode if parse_mode == '' else parse_mode,
+            coalesce=coalesce
+        )
+        with self._lock:
+            self._pending.setdefault(message.chat_id, deque()).append(message)
+            if on_sent is not None:
+                self._callbacks[message.id] = on_sent
+            self._dirty = True
+            self.stats['queued'] += 1
+        self._wake()
+        return message.id
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._pending.values()) + len(self._inflight)
+
+    def _wake(self):
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        try:
+            if loop is asyncio.get_running_loop():
+                wakeup.set()
+                return
+        except RuntimeError:
+            pass  # Вызов из потока без loop
+        loop.call_soon_threadsafe(wakeup.set)
+
+    # === Жизненный цикл ===
+
+    def start(self):
+        """Запускает отправителя в текущем loop (повторный вызов ничего не делает)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and not self._loop.is_closed():
+            return  # Уже работает (возможно, в loop другого потока - enqueue() его разбудит)
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"📮 [TELEGRAM] Outbox started ({self.pending()} pending)")
+
+    async def stop(self, drain_timeout: float = 0.0):
+        """Останавливает отправителя; недоставленное сохраняется на диск."""
+        if drain_timeout > 0:
+            deadline = time.monotonic() + drain_timeout
+            while self.pending() and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Прерванная отправка возвращается в очередь
+        with self._lock:
+            for message in reversed(self._inflight):
+                self._pending.setdefault(message.chat_id, deque()).appendleft(message)
+            self._inflight = []
+        self._persist()
+        self._loop = None
+        logger.info(f"📮 [TELEGRAM] Outbox stopped. Sent: {self.stats['sent']}, pending: {self.pending()}")
+
+    # === Отправка ===
+
+    def _interval(self, chat_id: str) -> float:
+        return self.group_interval if chat_id.startswith('-') else self.chat_interval
+
+    def _pick_chat(self, now: float) -> Tuple[Optional[str], Optional[float]]:
+        """Готовый к отправке чат (дольше всех ждавший) или время до ближайшего."""
+        with self._lock:
+            chats = [chat for chat, queue in self._pending.items() if queue]
+        if not chats:
+            return None, None
+        chat = min(chats, key=lambda c: self._next_allowed.get(c, 0.0))
+        wait = self._next_allowed.get(chat, 0.0) - now
+        return (chat, None) if wait <= 0 else (None, wait)
+
+    def _take(self, chat_id: str) -> List[OutboxMessage]:
+        """Следующее сообщение чата плюс все, что можно склеить с ним в дайджест."""
+        with self._lock:
+            queue = self._pending[chat_id]
+            batch = [queue.popleft()]
+            if batch[0].coalesce:
+                length = len(batch[0].text)
+                while queue and queue[0].coalesce and queue[0].parse_mode == batch[0].parse_mode:
+                    length += len(DIGEST_SEPARATOR) + len(queue[0].text)
+                    if length + 32 > MAX_MESSAGE_LENGTH:  # 32 - запас на заголовок
+                        break
+                    batch.append(queue.popleft())
+            self._inflight = batch
+        return batch
+
+    def _requeue(self, batch: List[OutboxMessage]):
+        with self._lock:
+            queue = self._pending.setdefault(batch[0].chat_id, deque())
+            for message in reversed(batch):
+                queue.appendleft(message)
+            self._inflight = []
+
+    @staticmethod
+    def _digest(batch: List[OutboxMessage]) -> str:
+        if len(batch) == 1:
+            return batch[0].text
+        return f"📬 Дайджест: {len(batch)}{DIGEST_SEPARATOR}" + DIGEST_SEPARATOR.join(m.text for m in batch)
+
+    async def _global_slot(self):
+        """Не больше global_rate отправок за любую секунду."""
+        while True:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) < self.global_rate:
+                self._recent.append(now)
+                return
+            await asyncio.sleep(1.0 - (now - self._recent[0]))
+
+    async def _run(self):
+        while True:
+            try:
+                await self._maybe_persist()
+                chat_id, wait = self._pick_chat(time.monotonic())
+                if chat_id is None:
+                    self._wakeup.clear()
+                    try:
+                        timeout = wait if wait is not None else self.persist_interval
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._global_slot()
+                await self._deliver(chat_id, self._take(chat_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ [TELEGRAM] Outbox error: {e}")
+                await asyncio.sleep(1)
+
+    async def _deliver(self, chat_id: str, batch: List[OutboxMessage]):
+        payload = {
+            'chat_id': chat_id,
+            'text': self._digest(batch),
+            'disable_web_page_preview': True
+        }
+        if batch[0].parse_mode:
+            payload['parse_mode'] = batch[0].parse_mode
+        try:
+            status, body = await self.transport(payload)
+        except Exception as e:
+            status, body = 0, {'description': str(e)}
+
+        now = time.monotonic()
+        self._next_allowed[chat_id] = now + self._interval(chat_id)
+        if status == 200 and body.get('ok', True):
+            with self._lock:
+                self._inflight = []
+                callbacks = [self._callbacks.pop(m.id, None) for m in batch]
+                self._dirty = True
+            self.stats['sent'] += 1
+            self.stats['messages_sent'] += len(batch)
+            if len(batch) > 1:
+                self.stats['digests'] += 1
+            for callback in callbacks:
+                if callback is not None:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.warning(f"⚠️ [TELEGRAM] on_sent callback error: {e}")
+            return
+
+        if status == 429:
+            retry_after = float((body.get('parameters') or {}).get('retry_after', 1))
+            self._next_allowed[chat_id] = now + retry_after
+            self.stats['rate_limited'] += 1
+            logger.warning(f"⚠️ [TELEGRAM] 429 for chat {chat_id}, retry after {retry_after:.0f}s")
+            self._requeue(batch)
+        elif status == 0 or status >= 500:
+            retry = [m for m in batch if m.attempts + 1 < self.max_attempts]
+            for message in retry:
+                message.attempts += 1
+            self._drop([m for m in batch if m not in retry], body)
+            if retry:
+                self.stats['retries'] += 1
+                self._next_allowed[chat_id] = now + min(60.0, 2.0 ** max(m.attempts for m in retry))
+                self._requeue(retry)
+        else:
+            # 400/403: неверная разметка, бот заблокирован - повтор не поможет
+            self._drop(batch, body)
+        with self._lock:
+            self._inflight = []
+            self._dirty = True
+
+    def _drop(self, messages: List[OutboxMessage], body: Dict):
+        if not messages:
+            return
+        with self._lock:
+            for message in messages:
+                self._callbacks.pop(message.id, None)
+        self.stats['dropped'] += len(messages)
+        logger.error(f"❌ [TELEGRAM] Dropped {len(messages)} message(s) for chat {messages[0].chat_id}: "
+                     f"{body.get('description', body)}")
+
+    async def _post(self, payload: Dict) -> Tuple[int, Dict]:
+        session = http_client.session('telegram', ssl=False)
+        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+        async with session.post(url, json=payload, timeout=15) as response:
+            try:
+                body = await response.json(content_type=None)
+            except Exception:
+                body = {'description': await response.text()}
+            return response.status, body or {}
+
+    # === Сохранение ===
+
+    def _snapshot(self) -> List[Dict]:
+        with self._lock:
+            messages = list(self._inflight)
+            for queue in self._pending.values():
+                messages.extend(queue)
+            self._dirty = False
+        return [asdict(m) for m in sorted(messages, key=lambda m: m.id)]
+
+    def _write(self, snapshot: List[Dict]):
+        if not snapshot:
+            # Очередь пуста - файл не нужен
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)  # Атомарная замена: файл не бывает наполовину записан
+
+    def _persist(self):
+        if not self.path:
+            return
+        try:
+            self._write(self._snapshot())
+            self._last_persist = time.monotonic()
+        except Exception as e:
+            logger.error(f"❌ [TELEGRAM] Outbox persist error: {e}")
+
+    async def _maybe_persist(self):
+        if not self.path or not self._dirty or time.monotonic() - self._last_persist < self.persist_interval:
+            return
+        snapshot = self._snapshot()
+        self._last_persist = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"❌ [TELEGRAM] Outbox persist error: {e}")
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = [OutboxMessage(**item) for item in json.load(f)]
+        except Exception as e:
+            logger.error(f"❌ [TELEGRAM] Outbox load error: {e}")
+            return
+        with self._lock:
+            # Сохраненные сообщения старше всего, что успели поставить до start()
+            for message in reversed(saved):
+                message.id = next(self._ids)
+                self._pending.setdefault(message.chat_id, deque()).appendleft(message)
+        if saved:
+            logger.info(f"📮 [TELEGRAM] Restored {len(saved)} undelivered message(s)")
@@ -2,11 +2,15 @@
 """
 Advanced Feature Engineering - продвинутые математические фичи.
 Включает: Hurst Exponent, DFA, Fractals, Statistical Moments.
+
+features= - считать только перечисленные фичи (схема загруженных моделей);
+cost_meter - время расчета каждой фичи (FeatureCostMeter, feature_audit).
 """
 import pandas as pd
 import numpy as np
+import time
 from scipy import stats
-from typing import Dict
+from typing import Collection, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,46 +21,75 @@ class AdvancedFeatureEngineer:
     Эти фичи дают преимущество над базовыми TA индикаторами.
     """
     
-    def create_advanced_features(self, data: pd.DataFrame) -> Dict:
+    def __init__(self, cost_meter=None):
+        self.cost_meter = cost_meter
+
+    def create_advanced_features(self, data: pd.DataFrame, features: Optional[Collection[str]] = None) -> Dict:
         """
         Генерирует продвинутые фичи из OHLCV данных.
+        features - только эти фичи (None - все).
         """
-        features = {}
-        
         if len(data) < 100:
             logger.warning("Not enough data for advanced features")
-            return features
+            return {}
         
         close = data['close'].values
         returns = pd.Series(close).pct_change().dropna().values
         
-        # === 1. FRACTAL DIMENSION (HURST EXPONENT) ===
-        # Показывает персистентность тренда
-        # 0-0.5: Mean Reverting, 0.5: Random Walk, 0.5-1: Trending
-        features['hurst_exponent'] = self._calculate_hurst(returns)
-        
-        # === 2. DFA (DETRENDED FLUCTUATION ANALYSIS) ===
-        # Измеряет long-range correlations
-        features['dfa_alpha'] = self._calculate_dfa(close)
-        
-        # === 3. STATISTICAL MOMENTS ===
-        # Skewness: асимметрия распределения
-        # Kurtosis: "толщина хвостов" (риск экстремальных движений)
-        features['returns_skew'] = float(stats.skew(returns))
-        features['returns_kurtosis'] = float(stats.kurtosis(returns))
-        
-        # === 4. VOLATILITY REGIME DETECTION ===
-        features['volatility_regime'] = self._detect_volatility_regime(returns)
-        features['volatility_percentile'] = self._volatility_percentile(returns)
-        
-        # === 5. MOMENTUM PERSISTENCE ===
-        # Как долго текущий тренд сохраняется
-        features['momentum_persistence'] = self._momentum_persistence(close)
-        
-        # === 6. ENTROPY (СЛОЖНОСТЬ ЦЕНОВОГО РЯДА) ===
-        features['price_entropy'] = self._calculate_entropy(returns)
+        return self._compute({
+            # === 1. FRACTAL DIMENSION (HURST EXPONENT) ===
+            # Показывает персистентность тренда
+            # 0-0.5: Mean Reverting, 0.5: Random Walk, 0.5-1: Trending
+            'hurst_exponent': lambda: self._calculate_hurst(returns),
+            
+            # === 2. DFA (DETRENDED FLUCTUATION ANALYSIS) ===
+            # Измеряет long-range correlations
+            'dfa_alpha': lambda: self._calculate_dfa(close),
+            
+            # === 3. STATISTICAL MOMENTS ===
+            # Skewness: асимметрия распределения
+            # Kurtosis: "толщина хвостов" (риск экстремальных движений)
+            'returns_skew': lambda: float(stats.skew(returns)),
+            'returns_kurtosis': lambda: float(stats.kurtosis(returns)),
+            
+            # === 4. VOLATILITY REGIME DETECTION ===
+            'volatility_regime': lambda: self._detect_volatility_regime(returns),
+            'volatility_percentile': lambda: self._volatility_percentile(returns),
+            
+            # === 5. MOMENTUM PERSISTENCE ===
+            # Как долго текущий тренд сохраняется
+            'momentum_persistence': lambda: self._momentum_persistence(close),
+            
+            # === 6. ENTROPY (СЛОЖНОСТЬ ЦЕНОВОГО РЯДА) ===
+            'price_entropy': lambda: self._calculate_entropy(returns),
+        }, features)
+
+    def create_price_features(self, data: pd.DataFrame, features: Optional[Collection[str]] = None) -> Dict:
+        """
+        Простые ценовые фичи ML (как в data_pipeline): SMA к цене и объем к среднему.
+        """
+        close = data['close']
+        price = close.iloc[-1]
         
-        return features
+        return self._compute({
+            'sma_20': lambda: (close.rolling(20).mean().iloc[-1] / price) if len(data) >= 20 else 1.0,
+            'sma_50': lambda: (close.rolling(50).mean().iloc[-1] / price) if len(data) >= 50 else 1.0,
+            'volume_ratio': lambda: data['volume'].iloc[-1] / data['volume'].rolling(20).mean().iloc[-1] if len(data) >= 20 else 1.0,
+        }, features)
+
+    def _compute(self, calculators: Dict, features: Optional[Collection[str]] = None) -> Dict:
+        """Считает выбранные фичи; с cost_meter - замеряя время каждой"""
+        result = {}
+        for name, calculate in calculators.items():
+            if features is not None and name not in features:
+                continue
+            if self.cost_meter is None:
+                result[name] = calculate()
+                continue
+            started = time.perf_counter()
+            result[name] = calculate()
+            self.cost_meter.record(name, time.perf_counter() - started)
+        return result
 
     def _calculate_hurst(self, series, lags_range=(2, 100)):
         """
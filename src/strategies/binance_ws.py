@@ -3,7 +3,14 @@ import json
 import logging
 import websockets
 import time
-from typing import Dict, List, Set
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.db.metrics_store import MetricsStore
+from src.services.http_client import http_client
+from src.strategies.liquidation_ledger import LiquidationLedger
+from src.strategies.order_book import OrderBookManager
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +18,19 @@ class BinanceWSClient:
     """
     Direct WebSocket client for Binance Futures (Public Data).
     Provides real-time Funding Rates, Open Interest, and Liquidations.
+    Liquidations are aggregated in bounded rolling windows (see LiquidationLedger).
+    Optionally maintains local L2 order books from diff-depth streams (see OrderBookManager)
+    and persists every metric to an append-only MetricsStore, flushed in batches.
     """
+    DEPTH_SNAPSHOT_URL = "https://fapi.binance.com/fapi/v1/depth"
+    OI_SAMPLE_MS = 60_000                       # In-memory OI history: one sample per minute
+    OI_HISTORY_MS = 4 * 3600_000 + 15 * 60_000  # 4h change + 15 min tolerance
+    OI_TOLERANCE_MS = 15 * 60_000
     
-    def __init__(self, symbols: List[str]):
+    def __init__(self, symbols: List[str], liq_ratio_window: str = '1h',
+                 order_books: bool = False, depth_pct: float = 0.01,
+                 record_path: Optional[str] = None,
+                 store: Optional[MetricsStore] = None, flush_interval: float = 30.0):
         # Store original keys for data storage (e.g. BTC/USDT:USDT)
         self.original_symbols = symbols
         # Generate stream names (e.g. BTCUSDT)
@@ -32,12 +49,25 @@ class BinanceWSClient:
             s: {
                 'funding_rate': 0.0,
                 'open_interest': 0.0,
-                'last_liq_buy': 0.0,
-                'last_liq_sell': 0.0,
-                'liq_volume_ratio': 1.0,
                 'timestamp': 0
             } for s in symbols
         }
+        # Rolling liquidation windows per symbol (bounded memory on 24/7 runs)
+        self.liq_ratio_window = liq_ratio_window
+        self.ledgers = {s: LiquidationLedger() for s in symbols}
+        # Recent OI samples per symbol (oi_change without touching the disk store)
+        self._oi_history: Dict[str, Deque[Tuple[int, float]]] = {s: deque() for s in symbols}
+        self._oi_seeded: Set[str] = set()
+        # Local order books (diff-depth + REST snapshot resync)
+        self.order_books = OrderBookManager(symbols, depth_pct=depth_pct) if order_books else None
+        self._snapshot_tasks: Dict[str, asyncio.Task] = {}
+        # Optional raw message recording for offline replay
+        self.record_path = record_path
+        # Optional persistent history (funding, OI, liquidations, mark price)
+        self.store = store
+        self.flush_interval = flush_interval
+        # Подписчики на mark price: callback(symbol, price, ts_seconds)
+        self._price_listeners: List[Callable[[str, float, float], None]] = []
         self.running = False
         self._tasks: List[asyncio.Task] = []
         self._start_time = 0
@@ -59,6 +89,11 @@ class BinanceWSClient:
         for task in self._tasks:
             task.cancel()
         self._tasks = []
+        for task in self._snapshot_tasks.values():
+            task.cancel()
+        self._snapshot_tasks = {}
+        if self.store:
+            await self._flush_store()
 
     async def restart(self):
         """Restarts the client."""
@@ -78,12 +113,35 @@ class BinanceWSClient:
             streams.append(f"{s}@markPrice")
             streams.append(f"{s}@openInterest")
             streams.append(f"{s}@forceOrder")
+            if self.order_books:
+                streams.append(f"{s}@depth@100ms")
             
         # Split into smaller chunks (Max 50 streams per connection recommended)
         chunk_size = 20
         for i in range(0, len(streams), chunk_size):
             chunk = streams[i:i + chunk_size]
             self._tasks.append(asyncio.create_task(self._listen_combined_streams(chunk)))
+        
+        if self.store:
+            self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def _flush_loop(self):
+        """Periodically writes buffered metrics to the store in one batch."""
+        while self.running:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_store()
+
+    async def _flush_store(self):
+        # Drain on the loop thread (same thread as append), write off-loop
+        batch = self.store.drain()
+        if not batch:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            written = await loop.run_in_executor(None, self.store.write_batch, batch)
+            logger.debug(f"[WS] Flushed {written} metric points to store")
+        except Exception as e:
+            logger.warning(f"⚠️ [WS] Metrics store flush failed: {e}")
 
     async def _listen_combined_streams(self, streams: List[str]):
         """Listens to a combined stream of multiple events."""
@@ -98,82 +156,211 @@ class BinanceWSClient:
                         msg = await ws.recv()
                         payload = json.loads(msg)
                         
-                        stream_name = payload.get('stream')
-                        data = payload.get('data')
-                        if not stream_name or not data: continue
-                            
-                        symbol_raw = stream_name.split('@')[0].upper()
-                        target_key = self.stream_to_ccxt.get(symbol_raw)
-                        if not target_key: continue
-                            
-                        # Update timestamp
-                        event_time = data.get('E', int(time.time() * 1000))
-                        self.data[target_key]['timestamp'] = event_time
-                        
-                        # 1. MARK PRICE (Funding Rate)
-                        if 'markPrice' in stream_name:
-                            if 'r' in data:
-                                self.data[target_key]['funding_rate'] = float(data['r'])
-                                
-                        # 2. OPEN INTEREST
-                        elif 'openInterest' in stream_name:
-                             if 'o' in data:
-                                self.data[target_key]['open_interest'] = float(data['o'])
-                                
-                        # 3. LIQUIDATIONS
-                        elif 'forceOrder' in stream_name:
-                            order = data.get('o', {})
-                            side = order.get('S')
-                            q = float(order.get('q', 0))
-                            p = float(order.get('p', 0))
-                            usd_val = q * p
-                            
-                            if side == 'BUY':
-                                self.data[target_key]['last_liq_buy'] += usd_val
-                            else:
-                                self.data[target_key]['last_liq_sell'] += usd_val
-                                
-                            total_liq = self.data[target_key]['last_liq_buy'] + self.data[target_key]['last_liq_sell']
-                            if total_liq > 0:
-                                self.data[target_key]['liq_volume_ratio'] = self.data[target_key]['last_liq_sell'] / max(1, self.data[target_key]['last_liq_buy'])
+                        if self.record_path:
+                            self._record({'stream_message': payload})
+                        self._handle_payload(payload)
             except Exception as e:
                 if self.running:
                     # Silent reconnect for production
                     await asyncio.sleep(5)
 
+    def _handle_payload(self, payload: Dict):
+        """Routes one combined-stream message to the matching symbol state."""
+        stream_name = payload.get('stream')
+        data = payload.get('data')
+        if not stream_name or not data: return
+            
+        symbol_raw = stream_name.split('@')[0].upper()
+        target_key = self.stream_to_ccxt.get(symbol_raw)
+        if not target_key: return
+            
+        # Update timestamp
+        event_time = data.get('E', int(time.time() * 1000))
+        self.data[target_key]['timestamp'] = event_time
+        
+        # 1. MARK PRICE (Funding Rate)
+        if 'markPrice' in stream_name:
+            if 'r' in data:
+                self.data[target_key]['funding_rate'] = float(data['r'])
+            if 'p' in data and self._price_listeners:
+                self._notify_price(target_key, float(data['p']), event_time / 1000)
+            if self.store:
+                if 'r' in data:
+                    self.store.append(target_key, 'funding_rate', event_time, float(data['r']))
+                if 'p' in data:
+                    self.store.append(target_key, 'mark_price', event_time, float(data['p']))
+                
+        # 2. OPEN INTEREST
+        elif 'openInterest' in stream_name:
+             if 'o' in data:
+                self.data[target_key]['open_interest'] = float(data['o'])
+                self._record_oi(target_key, event_time, float(data['o']))
+                if self.store:
+                    self.store.append(target_key, 'open_interest', event_time, float(data['o']))
+                
+        # 3. LIQUIDATIONS
+        elif 'forceOrder' in stream_name:
+            order = data.get('o', {})
+            side = order.get('S')
+            q = float(order.get('q', 0))
+            p = float(order.get('p', 0))
+            usd_val = q * p
+            trade_time = order.get('T', event_time)
+            self.ledgers[target_key].record(side, usd_val, ts=trade_time / 1000)
+            if self.store:
+                self.store.append_liquidation(target_key, side, trade_time, usd_val)
+
+        # 4. DIFF DEPTH (Local Order Book)
+        elif '@depth' in stream_name and self.order_books:
+            self.order_books.on_depth_event(target_key, data)
+            if self.order_books.needs_snapshot(target_key):
+                self._ensure_snapshot(target_key)
+
+    def add_price_listener(self, callback: Callable[[str, float, float], None]):
+        """Registers a mark price callback (e.g. OutcomeTracker.on_price)."""
+        self._price_listeners.append(callback)
+
+    def _notify_price(self, target_key: str, price: float, ts: float):
+        for callback in self._price_listeners:
+            try:
+                callback(target_key, price, ts)
+            except Exception as e:
+                logger.error(f"❌ [WS] Price listener error for {target_key}: {e}")
+
+    def _ensure_snapshot(self, target_key: str):
+        """Schedules a REST depth snapshot for a symbol unless one is already in flight."""
+        if not self.running:
+            return  # Offline replay: snapshots come from the recording
+        task = self._snapshot_tasks.get(target_key)
+        if task and not task.done():
+            return
+        self._snapshot_tasks[target_key] = asyncio.create_task(self._fetch_depth_snapshot(target_key))
+
+    async def _fetch_depth_snapshot(self, target_key: str):
+        """Fetches /fapi/v1/depth and hands it to the order book manager."""
+        raw_symbol = target_key.split(':')[0].replace('/', '').upper()
+        try:
+            # Give the stream a moment to buffer events that cover the snapshot
+            await asyncio.sleep(1)
+            async with http_client.borrow('binance') as session:
+                params = {'symbol': raw_symbol, 'limit': 1000}
+                async with session.get(self.DEPTH_SNAPSHOT_URL, params=params, timeout=10) as resp:
+                    if resp.status != 200:
+                        logger.warning(f"⚠️ [DEPTH] Snapshot failed for {raw_symbol}: HTTP {resp.status}")
+                        return
+                    snapshot = await resp.json()
+            if self.record_path:
+                self._record({'snapshot': target_key, 'data': snapshot})
+            if self.order_books.on_snapshot(target_key, snapshot):
+                logger.info(f"✅ [DEPTH] {raw_symbol} order book synced (lastUpdateId={snapshot['lastUpdateId']})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ [DEPTH] Snapshot error for {raw_symbol}: {e}")
+
+    def _record(self, entry: Dict):
+        """Appends a raw message to the replay recording (JSON lines)."""
+        try:
+            with open(self.record_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.debug(f"WS recording failed: {e}")
+
+    def _resolve_symbol(self, symbol: str):
+        """Maps a symbol from any exchange format to the key used by this client."""
+        if symbol in self.data:
+            return symbol
+        # Fuzzy match for symbols from differnet exchanges
+        tag = symbol.split(':')[0].replace('/', '').upper()
+        for key in self.data.keys():
+            clean_key = key.split(':')[0].replace('/', '').upper()
+            if clean_key == tag:
+                return key
+        return None
+
+    def get_liquidations(self, symbol: str, window: str = None) -> Dict:
+        """Returns rolling liquidation aggregates (sums, counts, ratio) for one window."""
+        target_symbol = self._resolve_symbol(symbol)
+        if not target_symbol:
+            return {}
+        return self.ledgers[target_symbol].window(window or self.liq_ratio_window)
+
+    def get_liquidation_features(self, symbol: str) -> Dict:
+        """Returns 1m/5m/1h/4h liquidation feature candidates for a symbol."""
+        target_symbol = self._resolve_symbol(symbol)
+        if not target_symbol:
+            return {}
+        return self.ledgers[target_symbol].features()
+
+    def get_order_book_metrics(self, symbol: str) -> Dict:
+        """Returns precomputed depth metrics (imbalance, walls, sweeps) or {} if not synced."""
+        if not self.order_books:
+            return {}
+        target_symbol = self._resolve_symbol(symbol)
+        if not target_symbol:
+            return {}
+        return self.order_books.get_metrics(target_symbol)
+
     def get_metrics(self, symbol: str) -> Dict:
         """Returns the latest cached metrics for a symbol."""
-        target_symbol = symbol
-        if target_symbol not in self.data:
-            # Fuzzy match for symbols from differnet exchanges
-            tag = symbol.split(':')[0].replace('/', '').upper()
-            found_key = None
-            for key in self.data.keys():
-                clean_key = key.split(':')[0].replace('/', '').upper()
-                if clean_key == tag:
-                    found_key = key
-                    break
-            if found_key:
-                target_symbol = found_key
-            else:
-                return self._empty_metrics()
+        target_symbol = self._resolve_symbol(symbol)
+        if not target_symbol:
+            return self._empty_metrics()
         
         d = self.data[target_symbol]
         now_ms = time.time() * 1000
         if d['timestamp'] == 0 or (now_ms - d['timestamp']) > 1800000:
             return self._empty_metrics()
         
+        ledger = self.ledgers[target_symbol]
         return {
             'funding_rate': d['funding_rate'],
             'open_interest': d['open_interest'],
-            'liq_ratio': d['liq_volume_ratio'],
+            'oi_change_1h': self._oi_change(target_symbol, 3600_000),
+            'oi_change_4h': self._oi_change(target_symbol, 4 * 3600_000),
+            'liq_ratio': ledger.ratio(self.liq_ratio_window),
+            'liq_features': ledger.features(),
             'is_ws': True
         }
 
+    def _record_oi(self, target_key: str, ts_ms: int, value: float):
+        """Keeps a bounded per-minute OI history; seeded once from the store after a restart."""
+        history = self._oi_history[target_key]
+        if target_key not in self._oi_seeded:
+            self._oi_seeded.add(target_key)
+            if self.store:
+                ts, vals = self.store.scan(target_key, 'open_interest', ts_ms - self.OI_HISTORY_MS, ts_ms)
+                for t, v in zip(ts.tolist(), vals.tolist()):
+                    if not history or t - history[-1][0] >= self.OI_SAMPLE_MS:
+                        history.append((t, v))
+        if history and ts_ms - history[-1][0] < self.OI_SAMPLE_MS:
+            return
+        history.append((ts_ms, value))
+        while history[0][0] < ts_ms - self.OI_HISTORY_MS:
+            history.popleft()
+
+    def _oi_change(self, target_symbol: str, lag_ms: int) -> float:
+        """Relative open interest change over lag_ms from the in-memory history (0.0 if unknown)."""
+        current = self.data[target_symbol]['open_interest']
+        history = self._oi_history[target_symbol]
+        if current <= 0 or not history:
+            return 0.0
+        target = int(time.time() * 1000) - lag_ms
+        i = bisect_right(history, (target, float('inf')))
+        if i == 0:
+            return 0.0
+        ts, past = history[i - 1]
+        if ts < target - self.OI_TOLERANCE_MS or past <= 0:
+            return 0.0
+        return current / past - 1.0
+
     def _empty_metrics(self) -> Dict:
         return {
             'funding_rate': 0.0,
             'open_interest': 0.0,
+            'oi_change_1h': 0.0,
+            'oi_change_4h': 0.0,
             'liq_ratio': 1.0,
+            'liq_features': {},
             'is_ws': False
         }
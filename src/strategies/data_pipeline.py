@@ -2,12 +2,15 @@
 """
 Trading Data Pipeline - сбор данных и обучение ML моделей.
 Запускается отдельно от основного бота (по расписанию или вручную).
+
+Фичи каждого символа сразу пишутся в FeatureStore (float32 колонки на диске),
+обучающий датасет - memmap матрица поверх них, а не pd.concat в памяти.
 """
 import ccxt
 import pandas as pd
+import numpy as np
 import asyncio
 from datetime import datetime, timedelta
-from sklearn.model_selection import train_test_split
 import logging
 import sys
 
@@ -18,6 +21,12 @@ from src.strategies.advanced_features import AdvancedFeatureEngineer
 from src.strategies.smart_money_analyzer import SmartMoneyAnalyzer
 from src.strategies.ml_engine_real import RealMLEngine
 from src.strategies.adaptive_indicators import ImprovedAdaptiveIndicatorEngine
+from src.db.metrics_store import MetricsStore
+from src.db.feature_store import FeatureStore
+from src.strategies.label_engine import label_candles, regime_states
+from src.strategies.model_search import embargo_split
+from src.strategies.model_router import REGIME_ROUTES, cluster_route, regime_codes, symbol_clusters
+from src.core.settings import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +35,10 @@ class TradingDataPipeline:
     """
     Пайплайн для сбора исторических данных и обучения ML моделей.
     """
-    def __init__(self):
+    CANDLE_MS = 3600_000  # 1h свечи
+
+    def __init__(self, store: MetricsStore = None, feature_store: FeatureStore = None):
         # Use Binance Futures for funding rates and OI
-        from src.core.settings import settings
         self.exchange = ccxt.binance({
             'apiKey': settings.binance_key if settings.binance_key != 'ВАШ_BINANCE_API_KEY' else None,
             'secret': settings.binance_secret if settings.binance_secret != 'ВАШ_BINANCE_SECRET' else None,
@@ -37,17 +47,100 @@ class TradingDataPipeline:
         })
         self.feature_engineer = AdvancedFeatureEngineer()
         self.indicator_engine = ImprovedAdaptiveIndicatorEngine()
-        self.ml_engine = RealMLEngine()
+        self.ml_engine = RealMLEngine(
+            train_workers=settings.ml_train_workers,
+            train_cores=settings.ml_train_cores or None
+        )
+        # История funding/OI/ликвидаций, записанная BinanceWSClient
+        self.store = store or MetricsStore(settings.metrics_store_path)
+        # Обучающие матрицы на диске (float32, memmap при обучении)
+        self.feature_store = feature_store or FeatureStore(settings.feature_store_path)
+        # Последний собранный датасет: партиции и доходности символов (для route_keys)
+        self.last_partitions = []
+        self.symbol_returns = {}
         
+    def _load_funding_history(self, symbol: str, start_ms: int, end_ms: int):
+        """
+        Funding из MetricsStore (как live markPrice 'r'); часть диапазона до первой
+        записи store (история до первого запуска бота) - из REST истории расчетов.
+        Возвращает отсортированные массивы (ts_ms, rate).
+        """
+        scan_start = start_ms - 8 * self.CANDLE_MS
+        ts, vals = self.store.scan(symbol, 'funding_rate', scan_start, end_ms)
+        if len(ts) and ts[0] <= start_ms:
+            return ts, vals
+
+        # fapiPublicGetFundingRate возвращает до 1000 записей (~333 дня расчетов раз в 8ч)
+        rest_end = int(ts[0]) - 1 if len(ts) else end_ms
+        raw_symbol = symbol.replace('/', '').replace(':', '')
+        try:
+            funding_history = self.exchange.fapiPublicGetFundingRate({
+                'symbol': raw_symbol,
+                'startTime': scan_start,
+                'endTime': rest_end,
+                'limit': 1000
+            })
+        except Exception as e:
+            if not len(ts):
+                raise
+            logger.warning(f"⚠️ [FUNDING] REST history failed for {raw_symbol}, store only from {int(ts[0])}: {e}")
+            return ts, vals
+        rows = sorted((int(x['fundingTime']), float(x['fundingRate'])) for x in funding_history
+                      if int(x['fundingTime']) <= rest_end)
+        rest_ts = np.array([r[0] for r in rows], dtype=np.int64)
+        rest_vals = np.array([r[1] for r in rows], dtype=np.float64)
+        return np.concatenate([rest_ts, ts]), np.concatenate([rest_vals, vals])
+
+    def _smart_money_features(self, symbol: str, open_ms: np.ndarray) -> pd.DataFrame:
+        """
+        Funding, liq_ratio и изменения OI для каждой свечи, выровненные векторно
+        на момент закрытия свечи (без заглядывания вперед).
+        """
+        close_ms = open_ms + self.CANDLE_MS
+        start_ms, end_ms = int(open_ms[0]), int(close_ms[-1])
+
+        f_ts, f_vals = self._load_funding_history(symbol, start_ms, end_ms)
+        liq_ts, liq_usd = self.store.scan(symbol, 'liquidations', start_ms, end_ms)
+        oi_ts, oi_vals = self.store.scan(symbol, 'open_interest', start_ms - 4 * self.CANDLE_MS, end_ms)
+
+        return pd.DataFrame({
+            # As-of: последняя известная ставка, а не только точные часы расчета
+            'funding_rate': MetricsStore.align_asof(f_ts, f_vals, close_ms),
+            # Окно 1h = свеча, как liq_ratio_window у live клиента
+            'liq_ratio': MetricsStore.window_liq_ratio(liq_ts, liq_usd, open_ms, close_ms),
+            'oi_change_1h': MetricsStore.pct_change_asof(oi_ts, oi_vals, close_ms, self.CANDLE_MS),
+            'oi_change_4h': MetricsStore.pct_change_asof(oi_ts, oi_vals, close_ms, 4 * self.CANDLE_MS),
+        })
+
     async def collect_training_data(self, symbols: list, lookback_days=180):
         """
         Собирает данные для обучения.
         
         X (Features): TA индикаторы + Advanced features
-        y (Target): 1 если цена выросла > 2% за следующие 4 часа, иначе 0
+        y (Target): settings.ml_label_target, по умолчанию 1 если long по уровням
+                    DynamicRiskManager дошел до TP1 раньше стопа за 24 свечи
         """
-        all_features = []
-        all_labels = []
+        X, y, times = await self.collect_dataset(symbols, lookback_days)
+        
+        # Train/Val split (80/20): строки отсортированы по времени - валидация это последние 20%,
+        # между ними эмбарго; срезы строк - представления memmap матрицы, без копий
+        train_end, split = embargo_split(times)
+        X_train, X_val, y_train, y_val = X.iloc[:train_end], X.iloc[split:], y.iloc[:train_end], y.iloc[split:]
+        
+        logger.info(f"📊 Data split: Train={len(X_train)}, Val={len(X_val)}")
+        logger.info(f"   Positive samples (profit): {y_train.sum()} / {len(y_train)} ({y_train.mean()*100:.1f}%)")
+        
+        return X_train, y_train, X_val, y_val
+
+    async def collect_dataset(self, symbols: list, lookback_days=180, label: str = None):
+        """
+        Полный датасет всех символов в хронологическом порядке.
+        В FeatureStore пишутся все таргеты label_engine; y - label (settings.ml_label_target).
+        Возвращает (X, y, times) - times нужны walk-forward валидации (model_search).
+        X - float32 DataFrame поверх memmap матрицы FeatureStore.
+        """
+        partitions = []
+        self.symbol_returns = {}
         
         logger.info(f"📊 Collecting data for {len(symbols)} symbols, {lookback_days} days history...")
         
@@ -75,25 +168,13 @@ class TradingDataPipeline:
                     ohlcv, 
                     columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
                 )
+                open_ms = df['timestamp'].to_numpy(dtype=np.int64)
                 df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
                 df.set_index('timestamp', inplace=True)
                 
                 # === СБОР СМАРТ-МАНИ ДАННЫХ ===
-                # 1. Historical Funding Rates
-                # fapiPublicGetFundingRate возвращает до 1000 записей
-                raw_symbol = symbol.replace('/', '').replace(':', '')
-                funding_history = self.exchange.fapiPublicGetFundingRate({
-                    'symbol': raw_symbol,
-                    'limit': 1000
-                })
-                
-                # Создаем маппинг времени к ставке
-                funding_map = {
-                    pd.to_datetime(int(x['fundingTime']), unit='ms').floor('1h'): float(x['fundingRate'])
-                    for x in funding_history
-                }
-                
-                # === ГЕНЕРАЦИЯ ФИЧЕЙ ===
+                # Funding, ликвидации и OI из MetricsStore (REST фолбэк для funding)
+                sm_features = self._smart_money_features(symbol, open_ms)
                 
                 # === ГЕНЕРАЦИЯ ФИЧЕЙ ===
                 
@@ -105,72 +186,78 @@ class TradingDataPipeline:
                 df['adx'] = self.indicator_engine._calculate_adx(df)
                 df['atr'] = self.indicator_engine._calculate_atr_direct(df) # Need this helper
                 
-                # Объединяем все фичи в один словарь для каждой строки
-                feature_rows = []
-                for idx in range(100, len(df)):
-                    close_price = df['close'].iloc[idx]
-                    ts_floor = df.index[idx].floor('1h')
-                    
-                    # Получаем все адванс фичи для этой строки
-                    # (Для обучения на истории берем под-фрейм до текущего момента)
+                # Фичи сразу в float32 колонки (без списка словарей по строкам)
+                n_rows = len(df) - 100
+                adv_columns = {}
+                for i, idx in enumerate(range(100, len(df))):
+                    # Адванс фичи строки (для обучения на истории берем под-фрейм до текущего момента)
                     current_adv = self.feature_engineer.create_advanced_features(df.iloc[:idx+1])
-                    
-                    row_features = {
-                        **current_adv,
-                        'rsi': df['rsi'].iloc[idx] if pd.notna(df['rsi'].iloc[idx]) else 50.0,
-                        'atr': df['atr'].iloc[idx] / close_price if pd.notna(df['atr'].iloc[idx]) else 0.01,
-                        'adx': df['adx'].iloc[idx] if pd.notna(df['adx'].iloc[idx]) else 20.0,
-                        'sma_20': (df['close'].rolling(20).mean().iloc[idx] / close_price),
-                        'sma_50': (df['close'].rolling(50).mean().iloc[idx] / close_price),
-                        'volume_ratio': (df['volume'].iloc[idx] / df['volume'].rolling(20).mean().iloc[idx]),
-                        'funding_rate': funding_map.get(ts_floor, 0.0),
-                        'liq_ratio': 1.0
-                    }
-                    feature_rows.append(row_features)
+                    for name, value in current_adv.items():
+                        if name not in adv_columns:
+                            adv_columns[name] = np.full(n_rows, np.nan, dtype=np.float32)
+                        adv_columns[name][i] = value
                 
-                features_df = pd.DataFrame(feature_rows)
-                # Устанавливаем индекс из оригинального DF со сдвигом 100
-                features_df.index = df.index[100:]
+                close = df['close']
+                ta_columns = {
+                    'rsi': df['rsi'].fillna(50.0),
+                    'atr': (df['atr'] / close).where(df['atr'].notna(), 0.01),
+                    'adx': df['adx'].fillna(20.0),
+                    'sma_20': close.rolling(20).mean() / close,
+                    'sma_50': close.rolling(50).mean() / close,
+                    'volume_ratio': df['volume'] / df['volume'].rolling(20).mean(),
+                }
+                features_df = pd.DataFrame({
+                    **adv_columns,
+                    **{name: values.to_numpy(dtype=np.float32)[100:] for name, values in ta_columns.items()},
+                    **{name: sm_features[name].to_numpy(dtype=np.float32)[100:]
+                       for name in ('funding_rate', 'liq_ratio', 'oi_change_1h', 'oi_change_4h')},
+                }, index=df.index[100:])
                 
-                # === ГЕНЕРАЦИЯ ТАРГЕТА (LABEL) ===
-                # y = 1 если цена вырастет > 1.5% за следующие 4 часа
-                # Выравниваем таргет с индексами фич
-                df_slice = df.iloc[100:]
-                future_returns = (df['close'].shift(-4) / df['close']).iloc[100:] - 1
-                labels = (future_returns > 0.015).astype(int)
+                # === ГЕНЕРАЦИЯ ТАРГЕТОВ (LABELS) ===
+                # Первое касание стопа / TP1-3 уровней DynamicRiskManager (long и short)
+                # на нескольких горизонтах - как сигнал закрылся бы в OutcomeTracker
+                outcome_labels = label_candles(df, horizons=settings.ml_label_horizons)
+                labels = outcome_labels.frame()
+                # Код режима строки (trend x volatility) - ключ маршрутных моделей
+                labels['regime'] = regime_codes(*regime_states(df['close'])[:2])
+                labels = labels.iloc[100:]
+                self.symbol_returns[symbol] = df['close'].pct_change()
                 
-                # Убираем последние строки без таргета (где shift-4 дал NaN)
-                valid_mask = future_returns.notna()
+                # Убираем строки, где окно самого длинного горизонта выходит за историю
+                valid_mask = outcome_labels.valid[100:, -1]
                 features_df = features_df[valid_mask]
-                labels = labels[valid_mask]
+                labels = labels[valid_mask].reset_index(drop=True)
                 
-                all_features.append(features_df)
-                all_labels.append(labels)
+                # На диск сразу - в памяти держим только текущий символ
+                partitions.append(self.feature_store.write(
+                    symbol, features_df, labels, open_ms[100:][valid_mask],
+                    end_ms=int(open_ms[-1]) + self.CANDLE_MS
+                ))
                 
                 logger.info(f"✅ {symbol}: {len(features_df)} samples")
                 
             except Exception as e:
                 logger.error(f"❌ Error collecting {symbol}: {e}")
                 
-        if not all_features:
+        if not partitions:
             raise ValueError("No data collected. Check symbols or exchange connectivity.")
         
-        # Объединяем все данные
-        X = pd.concat(all_features, ignore_index=True)
-        y = pd.concat(all_labels, ignore_index=True)
-        
-        # Train/Val split (80/20)
-        X_train, X_val, y_train, y_val = train_test_split(
-            X, y, 
-            test_size=0.2, 
-            shuffle=False,  # Сохраняем временной порядок
-            random_state=42
-        )
-        
-        logger.info(f"📊 Data split: Train={len(X_train)}, Val={len(X_val)}")
-        logger.info(f"   Positive samples (profit): {y_train.sum()} / {len(y_train)} ({y_train.mean()*100:.1f}%)")
-        
-        return X_train, y_train, X_val, y_val
+        # Все символы в одной матрице, отсортированной по времени свечи
+        self.last_partitions = partitions
+        return self.feature_store.load(partitions=partitions, label=label or settings.ml_label_target)
+
+    def route_keys(self, mode: str):
+        """
+        Ключ маршрута каждой строки последнего collect_dataset (порядок строк X)
+        и кластеры символов: mode 'regime' - режим свечи, 'cluster' - кластер
+        символа по корреляции доходностей.
+        """
+        if mode == 'regime':
+            _, codes, _ = self.feature_store.load(partitions=self.last_partitions, label='regime')
+            return np.array(REGIME_ROUTES)[codes.to_numpy()], {}
+        clusters = symbol_clusters(pd.DataFrame(self.symbol_returns), settings.ml_route_clusters)
+        symbols = self.feature_store.symbols(partitions=self.last_partitions)
+        return np.array([cluster_route(clusters[symbol]) for symbol in symbols]), clusters
 
     def _calculate_simple_rsi(self, prices, period=14):
         """Упрощенный RSI для фичей"""
@@ -206,9 +293,13 @@ class TradingDataPipeline:
             X_train, y_train, X_val, y_val = await self.collect_training_data(symbols)
             
             # 2. Train models
-            self.ml_engine.train_models(X_train, y_train, X_val, y_val)
+            version = self.ml_engine.train_models(
+                X_train, y_train, X_val, y_val,
+                training_window={'symbols': symbols, 'lookback_days': 180,
+                                 'collected_at': datetime.now().isoformat()}
+            )
             
-            logger.info("✅ Training Complete! Models saved to models/")
+            logger.info(f"✅ Training Complete! Published model version {version}")
             logger.info("🚀 You can now use Ultra Mode in the main bot")
             
         except Exception as e:
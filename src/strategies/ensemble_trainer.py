@@ -0,0 +1,323 @@
+# src/strategies/ensemble_trainer.py
+"""
+Ensemble Trainer - параллельное обучение XGBoost / LightGBM / CatBoost.
+
+Три модели обучаются одновременно в отдельных процессах (spawn - без
+унаследованного состояния OpenMP), каждая со своим бюджетом ядер через
+родные параметры библиотек (n_jobs / num_threads / thread_count). Процессы
+пишут файлы моделей в каталог версии и присылают прогресс через очередь.
+Матрица FeatureStore не пиклится в процессы: они получают MatrixSlice
+(файл + строки) и открывают тот же файл как np.memmap.
+
+init_models - дообучение (warm start): бустинг продолжается от файлов
+предыдущей версии, params задают число новых итераций.
+
+Итог - wall-clock обучения против последовательной базы: wall-clock прогона
+workers=1 со всем бюджетом ядер на каждую модель (sequential_wall - замер
+прошлого такого прогона). Сумма CPU-времени fit'ов - только справочно: она
+не учитывает многопоточность последовательного прогона.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from queue import Empty
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.db.feature_store import MatrixSlice, matrix_slice
+
+logger = logging.getLogger(__name__)
+
+# Доля ядер по моделям (XGBoost - 500 деревьев без early stopping, самый тяжелый)
+CORE_WEIGHTS = {'xgb': 0.4, 'lgbm': 0.3, 'catboost': 0.3}
+PROGRESS_EVERY = 50
+EARLY_STOPPING_ROUNDS = 50  # LightGBM / CatBoost - и в обучении, и в поиске (model_search)
+
+# Гиперпараметры по умолчанию (перекрываются найденными model_search и
+# сохраненными в manifest активной версии). Число итераций - отдельным ключом.
+DEFAULT_PARAMS = {
+    'xgb': {
+        'n_estimators': 500,
+        'max_depth': 6,
+        'learning_rate': 0.01,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+    },
+    'lgbm': {
+        'num_boost_round': 500,
+        'num_leaves': 31,
+        'learning_rate': 0.01,
+        'feature_fraction': 0.8,
+        'bagging_fraction': 0.8,
+        'bagging_freq': 5,
+    },
+    'catboost': {
+        'iterations': 500,
+        'depth': 6,
+        'learning_rate': 0.01,
+    },
+}
+ITERATION_KEYS = {'xgb': 'n_estimators', 'lgbm': 'num_boost_round', 'catboost': 'iterations'}
+
+# (модель, итерация, всего итераций, метрики валидации)
+ProgressCallback = Callable[[str, int, int, Dict[str, float]], None]
+
+_progress_queue = None  # Очередь прогресса в дочернем процессе
+
+
+def split_cores(total: int, names: List[str], weights: Optional[Dict[str, float]] = None) -> Dict[str, int]:
+    """Делит total ядер между моделями по весам (методом наибольшего остатка, минимум 1)"""
+    weights = weights or CORE_WEIGHTS
+    weight_sum = sum(weights.get(name, 1.0) for name in names)
+    shares = {name: total * weights.get(name, 1.0) / weight_sum for name in names}
+    budget = {name: int(share) for name, share in shares.items()}
+    for name in sorted(names, key=lambda n: shares[n] - budget[n], reverse=True)[:total - sum(budget.values())]:
+        budget[name] += 1
+    return {name: max(1, cores) for name, cores in budget.items()}
+
+
+def model_params(name: str, overrides: Optional[Dict] = None) -> Dict:
+    """DEFAULT_PARAMS модели с перекрытием найденными значениями"""
+    return {**DEFAULT_PARAMS[name], **(overrides or {})}
+
+
+def fit_xgb(directory: str, X_train, y_train, X_val, y_val, n_jobs: int,
+            report: Optional[ProgressCallback] = None, params: Optional[Dict] = None,
+            init_model: Optional[str] = None) -> Tuple[float, float]:
+    import xgboost as xgb
+    params = model_params('xgb', params)
+    iterations = params['n_estimators']
+
+    callbacks = []
+    if report:
+        class Progress(xgb.callback.TrainingCallback):
+            def after_iteration(self, model, epoch, evals_log):
+                if (epoch + 1) % PROGRESS_EVERY == 0:
+                    metrics = {f'val_{metric}': values[-1]
+                               for metric, values in evals_log.get('validation_0', {}).items()}
+                    report('xgb', epoch + 1, iterations, metrics)
+                return False
+        callbacks.append(Progress())
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    model = xgb.XGBClassifier(
+        **params,
+        eval_metric='logloss',
+        random_state=42,
+        use_label_encoder=False,
+        n_jobs=n_jobs,
+        callbacks=callbacks
+    )
+    model.fit(
+        X_train, y_train,
+        eval_set=[(X_val, y_val)],
+        verbose=False,
+        xgb_model=init_model
+    )
+    model.save_model(f"{directory}xgb_model.json")
+    return time.perf_counter() - started, time.process_time() - cpu_started
+
+
+def fit_lgbm(directory: str, X_train, y_train, X_val, y_val, n_jobs: int,
+             report: Optional[ProgressCallback] = None, params: Optional[Dict] = None,
+             init_model: Optional[str] = None) -> Tuple[float, float]:
+    import lightgbm as lgb
+    tuned = model_params('lgbm', params)
+    iterations = tuned.pop('num_boost_round')
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    train_data = lgb.Dataset(X_train, label=y_train)
+    val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
+
+    params = {
+        'objective': 'binary',
+        'metric': 'binary_logloss',
+        'boosting_type': 'gbdt',
+        **tuned,
+        'verbose': -1,
+        'random_state': 42,
+        'num_threads': n_jobs
+    }
+
+    callbacks = [lgb.early_stopping(EARLY_STOPPING_ROUNDS), lgb.log_evaluation(0)]
+    if report:
+        def progress(env):
+            if (env.iteration + 1) % PROGRESS_EVERY == 0:
+                report('lgbm', env.iteration + 1, iterations,
+                       {f'val_{metric}': value for _, metric, value, _ in env.evaluation_result_list})
+        callbacks.append(progress)
+
+    model = lgb.train(
+        params,
+        train_data,
+        num_boost_round=iterations,
+        valid_sets=[val_data],
+        callbacks=callbacks,
+        init_model=init_model
+    )
+    model.save_model(f"{directory}lgbm_model.txt")
+    return time.perf_counter() - started, time.process_time() - cpu_started
+
+
+def fit_catboost(directory: str, X_train, y_train, X_val, y_val, n_jobs: int,
+                 report: Optional[ProgressCallback] = None, params: Optional[Dict] = None,
+                 init_model: Optional[str] = None) -> Tuple[float, float]:
+    from catboost import CatBoostClassifier
+    params = model_params('catboost', params)
+    iterations = params['iterations']
+
+    callbacks = None
+    if report:
+        class Progress:
+            def after_iteration(self, info):
+                if info.iteration % PROGRESS_EVERY == 0:
+                    metrics = {f'val_{metric}': values[-1]
+                               for metric, values in info.metrics.get('validation', {}).items()}
+                    report('catboost', info.iteration, iterations, metrics)
+                return True
+        callbacks = [Progress()]
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    model = CatBoostClassifier(
+        **params,
+        loss_function='Logloss',
+        random_seed=42,
+        thread_count=n_jobs,
+        allow_writing_files=False,  # Без catboost_info/ в рабочем каталоге (параллельные fit'ы и поиск)
+        verbose=False
+    )
+    model.fit(
+        X_train, y_train,
+        eval_set=(X_val, y_val),
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        verbose=False,
+        callbacks=callbacks,
+        init_model=init_model
+    )
+    model.save_model(f"{directory}catboost_model.cbm")
+    return time.perf_counter() - started, time.process_time() - cpu_started
+
+
+FITTERS = {'xgb': fit_xgb, 'lgbm': fit_lgbm, 'catboost': fit_catboost}
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _report_to_queue(name: str, iteration: int, total: int, metrics: Dict[str, float]):
+    _progress_queue.put((name, iteration, total, {k: float(v) for k, v in metrics.items()}))
+
+
+def _run_fit(name: str, directory: str, X_train, y_train, X_val, y_val, n_jobs: int,
+             params: Optional[Dict] = None, init_model: Optional[str] = None) -> Tuple[float, float]:
+    """Точка входа дочернего процесса"""
+    report = _report_to_queue if _progress_queue is not None else None
+    X_train, X_val = (X.frame() if isinstance(X, MatrixSlice) else X for X in (X_train, X_val))
+    return FITTERS[name](directory, X_train, y_train, X_val, y_val, n_jobs, report, params, init_model)
+
+
+def log_progress(name: str, iteration: int, total: int, metrics: Dict[str, float]):
+    details = ', '.join(f"{key}={value:.4f}" for key, value in metrics.items())
+    logger.info(f"   [{name}] {iteration}/{total} {details}")
+
+
+def train_ensemble(directory: str, X_train, y_train, X_val, y_val,
+                   workers: int = 3, cores: Optional[int] = None,
+                   progress: Optional[ProgressCallback] = log_progress,
+                   params: Optional[Dict[str, Dict]] = None,
+                   init_models: Optional[Dict[str, str]] = None,
+                   sequential_wall: Optional[float] = None) -> Dict:
+    """
+    Обучает модели FITTERS и сохраняет их файлы в directory.
+
+    Args:
+        workers: число процессов (1 или одно ядро - последовательно в текущем процессе)
+        cores: общий бюджет ядер (None - все ядра машины)
+        progress: вызывается в родительском процессе каждые PROGRESS_EVERY итераций
+        params: {модель: гиперпараметры} поверх DEFAULT_PARAMS
+        init_models: {модель: файл предыдущей версии} - продолжить бустинг от него
+        sequential_wall: wall-clock последовательного прогона на тех же данных (база для speedup)
+
+    Returns:
+        {'wall_seconds', 'fit_seconds' / 'cpu_seconds': {модель: сек}, 'cpu_total',
+         'sequential_wall' (база; для workers=1 - сам прогон), 'speedup' (None - базы нет),
+         'workers', 'cores': {модель: потоков}}
+    """
+    names = list(FITTERS)
+    params = params or {}
+    init_models = init_models or {}
+    total_cores = cores or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    if workers <= 1 or total_cores < 2:
+        workers = 1  # Процессы на одном ядре только делят его и платят за spawn
+        budget = {name: total_cores for name in names}
+        timings = {}
+        for name in names:
+            logger.info(f"Training {name} ({budget[name]} threads)...")
+            timings[name] = FITTERS[name](directory, X_train, y_train, X_val, y_val, budget[name], progress,
+                                          params.get(name), init_models.get(name))
+    else:
+        budget = split_cores(total_cores, names)
+        logger.info(f"Training {', '.join(f'{n} ({budget[n]} threads)' for n in names)} in {workers} processes...")
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue() if progress else None
+        # Матрица FeatureStore - ссылкой на файл, остальное (срезы в памяти) - как есть
+        X_train_arg, X_val_arg = (matrix_slice(X) or X for X in (X_train, X_val))
+        with ProcessPoolExecutor(max_workers=min(workers, len(names)), mp_context=context,
+                                 initializer=_init_worker, initargs=(queue,)) as pool:
+            futures = {
+                pool.submit(_run_fit, name, directory, X_train_arg, y_train, X_val_arg, y_val, budget[name],
+                            params.get(name), init_models.get(name)): name
+                for name in names
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_EXCEPTION)
+                _drain(queue, progress)
+                for future in done:
+                    if future.exception() is not None:
+                        for other in pending:
+                            other.cancel()
+                        raise future.exception()
+            _drain(queue, progress)
+        timings = {futures[future]: future.result() for future in futures}
+
+    wall = time.perf_counter() - started
+    if workers == 1:
+        sequential_wall = wall
+    speedup = round(sequential_wall / wall, 2) if sequential_wall and wall > 0 else None
+    report = {
+        'wall_seconds': round(wall, 3),
+        'fit_seconds': {name: round(fit, 3) for name, (fit, _) in timings.items()},
+        'cpu_seconds': {name: round(cpu, 3) for name, (_, cpu) in timings.items()},
+        'cpu_total': round(sum(cpu for _, cpu in timings.values()), 3),
+        'sequential_wall': round(sequential_wall, 3) if sequential_wall else None,
+        'speedup': speedup,
+        'workers': workers,
+        'cores': budget,
+        'params': {name: model_params(name, params.get(name)) for name in names},
+    }
+    if speedup is None:
+        logger.info(f"⏱️ [TRAIN] Ensemble trained in {wall:.1f}s ({workers} workers, no sequential baseline yet)")
+    else:
+        logger.info(f"⏱️ [TRAIN] Ensemble trained in {wall:.1f}s vs {sequential_wall:.1f}s sequential wall "
+                    f"(x{speedup:.2f}, {workers} workers)")
+    return report
+
+
+def _drain(queue, progress: Optional[ProgressCallback]):
+    if queue is None:
+        return
+    while True:
+        try:
+            name, iteration, total, metrics = queue.get_nowait()
+        except Empty:
+            return
+        try:
+            progress(name, iteration, total, metrics)
+        except Exception as e:
+            logger.debug(f"Progress callback error: {e}")
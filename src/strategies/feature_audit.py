@@ -0,0 +1,267 @@
+# src/strategies/feature_audit.py
+"""
+Feature Audit - польза фич ансамбля против их стоимости расчета.
+
+Стоимость: FeatureCostMeter копит время расчета каждой фичи в живом
+пайплайне (AdvancedFeatureEngineer.cost_meter в UltraSignalGenerator) и
+периодически сбрасывает его в JSON. Фичи, которые считаются для TA / Smart
+Money в любом случае (SHARED_FEATURES), ML ничего не стоят - их отключение
+CPU не экономит.
+
+Польза: доля каждой фичи в gain-важности и в средних |SHAP| вкладах каждой
+из трех моделей, усредненная с весами ансамбля.
+
+recommend_sets предлагает урезанные наборы (сохранить 99 / 95 / 90% важности,
+в первую очередь убирая фичи с худшим отношением важность / стоимость),
+retrain_sets обучает по версии реестра на каждый набор (без публикации) и
+выбирает самый дешевый набор, чей logloss не хуже полного на tolerance.
+
+Запуск: python train_models.py --audit [--publish]
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Считаются для TA / Smart Money независимо от ML - отключение не экономит CPU
+SHARED_FEATURES = ('rsi', 'atr', 'adx', 'funding_rate', 'liq_ratio', 'oi_change_1h', 'oi_change_4h')
+KEEP_FRACTIONS = (0.99, 0.95, 0.90)
+SHAP_SAMPLE = 2000
+
+
+class FeatureCostMeter:
+    """
+    Время расчета фич: {фича: [вызовов, секунд]}. С path - продолжает
+    накопленные ранее замеры и сбрасывает их на диск раз в flush_interval.
+    """
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 300.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.totals: Dict[str, List[float]] = {}
+        self._last_flush = time.monotonic()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    for name, entry in json.load(f).get('features', {}).items():
+                        self.totals[name] = [int(entry['calls']), float(entry['seconds'])]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ [AUDIT] Feature costs {path} unreadable, starting over: {e}")
+
+    def record(self, name: str, seconds: float):
+        entry = self.totals.get(name)
+        if entry is None:
+            self.totals[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+        if self.path and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.save()
+
+    @contextmanager
+    def timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def costs(self) -> Dict[str, float]:
+        """Среднее время расчета фичи, сек"""
+        return {name: seconds / calls for name, (calls, seconds) in self.totals.items() if calls}
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        self._last_flush = time.monotonic()
+        if not path:
+            return
+        payload = {
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+            'features': {name: {'calls': calls, 'seconds': seconds, 'mean_ms': seconds / calls * 1000}
+                         for name, (calls, seconds) in self.totals.items() if calls},
+        }
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(payload, f, indent=2)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"⚠️ [AUDIT] Feature costs not saved: {e}")
+
+
+def measure_costs(data: pd.DataFrame, repeats: int = 20) -> Dict[str, float]:
+    """Стоимость фич AdvancedFeatureEngineer на data (когда живых замеров нет)"""
+    from src.strategies.advanced_features import AdvancedFeatureEngineer
+
+    meter = FeatureCostMeter()
+    engineer = AdvancedFeatureEngineer(cost_meter=meter)
+    for _ in range(repeats):
+        engineer.create_advanced_features(data)
+        engineer.create_price_features(data)
+    return meter.costs()
+
+
+def _shares(values, columns: Sequence[str]) -> pd.Series:
+    """Неотрицательные значения по фичам -> доли (сумма 1)"""
+    series = pd.Series(np.abs(np.asarray(values, dtype=np.float64)), index=list(columns))
+    total = series.sum()
+    return series / total if total > 0 else series
+
+
+def model_importance(models: Dict[str, object], X: pd.DataFrame, sample: int = SHAP_SAMPLE) -> pd.DataFrame:
+    """
+    Доли важности фич X.columns по каждой загруженной модели:
+    колонки {модель}_gain (суммарный gain сплитов) и {модель}_shap (среднее |SHAP|).
+    """
+    columns = list(X.columns)
+    rows = X if len(X) <= sample else X.iloc[np.linspace(0, len(X) - 1, sample).astype(int)]
+    table = {}
+
+    if models.get('xgb') is not None:
+        import xgboost as xgb
+        booster = models['xgb'].get_booster()
+        gain = booster.get_score(importance_type='total_gain')
+        table['xgb_gain'] = _shares([gain.get(c, gain.get(f"f{i}", 0.0)) for i, c in enumerate(columns)], columns)
+        contribs = booster.predict(xgb.DMatrix(rows), pred_contribs=True)
+        table['xgb_shap'] = _shares(np.abs(contribs[:, :-1]).mean(axis=0), columns)
+
+    if models.get('lgbm') is not None:
+        booster = models['lgbm']
+        table['lgbm_gain'] = _shares(booster.feature_importance(importance_type='gain'), columns)
+        contribs = booster.predict(rows, pred_contrib=True)
+        table['lgbm_shap'] = _shares(np.abs(contribs[:, :-1]).mean(axis=0), columns)
+
+    if models.get('catboost') is not None:
+        from catboost import Pool
+        model = models['catboost']
+        table['catboost_gain'] = _shares(model.get_feature_importance(type='PredictionValuesChange'), columns)
+        contribs = model.get_feature_importance(Pool(rows), type='ShapValues')
+        table['catboost_shap'] = _shares(np.abs(contribs[:, :-1]).mean(axis=0), columns)
+
+    return pd.DataFrame(table, index=columns)
+
+
+def combined_importance(table: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.Series:
+    """Средняя доля gain и SHAP каждой модели, усредненная с весами ансамбля"""
+    weights = weights or {}
+    combined = pd.Series(0.0, index=table.index)
+    total = 0.0
+    for name in {column.rsplit('_', 1)[0] for column in table.columns}:
+        weight = weights.get(name, 0.33)
+        parts = [table[column] for column in (f"{name}_gain", f"{name}_shap") if column in table]
+        combined += weight * sum(parts) / len(parts)
+        total += weight
+    return combined / total if total > 0 else combined
+
+
+def recommend_sets(importance: pd.Series, costs: Dict[str, float],
+                   keep_fractions: Sequence[float] = KEEP_FRACTIONS) -> List[Dict]:
+    """
+    Урезанные наборы фич: для каждой доли keep - убрать как можно больше
+    платных фич (худшее отношение важность / стоимость первыми), сохранив
+    не меньше keep суммарной важности. Бесполезные фичи (важность 0)
+    убираются всегда, даже бесплатные.
+    """
+    importance = importance / importance.sum() if importance.sum() > 0 else importance
+    cost = {name: costs.get(name, 0.0) for name in importance.index}
+    candidates = [name for name in importance.index if cost[name] > 0 or importance[name] <= 0]
+    # Порядок удаления: бесполезные, затем по возрастанию важности на секунду расчета
+    candidates.sort(key=lambda name: (importance[name] > 0, importance[name] / cost[name] if cost[name] > 0 else np.inf))
+
+    total_cost = sum(cost.values())
+    sets, seen = [], set()
+    for keep in sorted(keep_fractions, reverse=True):
+        kept_share, dropped = 1.0, []
+        for name in candidates:
+            if importance[name] > 0 and kept_share - importance[name] < keep:
+                continue
+            kept_share -= importance[name]
+            dropped.append(name)
+        features = [name for name in importance.index if name not in dropped]
+        if not dropped or len(features) < 2 or tuple(features) in seen:
+            continue
+        seen.add(tuple(features))
+        kept_cost = sum(cost[name] for name in features)
+        sets.append({
+            'name': f"keep_{int(round(keep * 100))}",
+            'features': features,
+            'dropped': dropped,
+            'importance': round(float(kept_share), 4),
+            'cost_ms': round(kept_cost * 1000, 4),
+            'saved_ms': round((total_cost - kept_cost) * 1000, 4),
+        })
+    return sets
+
+
+def audit_features(models: Dict[str, object], X: pd.DataFrame, costs: Dict[str, float],
+                   weights: Optional[Dict[str, float]] = None,
+                   keep_fractions: Sequence[float] = KEEP_FRACTIONS) -> Dict:
+    """
+    Важность (на строках X, обычно валидации) и стоимость каждой фичи моделей
+    + рекомендованные наборы. Фичи SHARED_FEATURES бесплатны для ML.
+    """
+    costs = {name: (0.0 if name in SHARED_FEATURES else value) for name, value in costs.items()}
+    table = model_importance(models, X)
+    importance = combined_importance(table, weights)
+    features = []
+    for name in importance.sort_values(ascending=False).index:
+        cost = costs.get(name, 0.0)
+        features.append({
+            'feature': name,
+            'importance': round(float(importance[name]), 5),
+            **{column: round(float(table.at[name, column]), 5) for column in table.columns},
+            'cost_ms': round(cost * 1000, 4),
+            'shared': name in SHARED_FEATURES or name not in costs,
+        })
+    return {
+        'features': features,
+        'total_cost_ms': round(sum(costs.get(name, 0.0) for name in importance.index) * 1000, 4),
+        'sets': recommend_sets(importance, costs, keep_fractions),
+    }
+
+
+def retrain_sets(engine, X_train, y_train, X_val, y_val, sets: List[Dict], tolerance: float = 0.002,
+                 training_window: Optional[Dict] = None, routing: Optional[Dict] = None,
+                 params: Optional[Dict[str, Dict]] = None, baseline: Optional[str] = None) -> Dict:
+    """
+    Обучает версию реестра (без публикации) на каждый набор и сравнивает
+    ensemble logloss валидации с полным набором (baseline - уже обученная
+    версия на всех фичах, иначе обучается здесь).
+
+    Returns:
+        {'baseline': {version, logloss}, 'results': [{name, version, logloss, delta, cost_ms}],
+         'best': результат самого дешевого набора в пределах tolerance или None}
+    """
+    if baseline is None:
+        baseline = engine.train_models(X_train, y_train, X_val, y_val, training_window=training_window,
+                                       publish=False, params=params, routing=routing)
+    base_loss = engine.registry.manifest(baseline)['metrics']['ensemble_logloss']
+
+    results = []
+    for candidate in sets:
+        columns = candidate['features']
+        logger.info(f"🔬 [AUDIT] Retraining {candidate['name']}: {len(columns)} features, "
+                    f"-{len(candidate['dropped'])} ({', '.join(candidate['dropped'])})")
+        version = engine.train_models(
+            X_train[columns], y_train, X_val[columns], y_val,
+            training_window={**(training_window or {}), 'feature_set': candidate['name'], 'baseline': baseline},
+            publish=False, params=params, routing=routing
+        )
+        loss = engine.registry.manifest(version)['metrics']['ensemble_logloss']
+        results.append({'name': candidate['name'], 'version': version, 'logloss': loss,
+                        'delta': loss - base_loss, 'cost_ms': candidate['cost_ms'],
+                        'saved_ms': candidate['saved_ms']})
+        logger.info(f"   {candidate['name']}: logloss {loss:.4f} ({loss - base_loss:+.4f} vs full), "
+                    f"saves {candidate['saved_ms']:.3f} ms per signal")
+
+    accepted = [r for r in results if r['delta'] <= tolerance]
+    best = min(accepted, key=lambda r: (r['cost_ms'], r['logloss'])) if accepted else None
+    return {'baseline': {'version': baseline, 'logloss': base_loss}, 'results': results, 'best': best}
@@ -0,0 +1,450 @@
+# src/strategies/indicators.py
+"""
+Indicator Kernel - векторные индикаторы за один проход по массиву.
+
+Рекурсивные сглаживания (EMA, Wilder) считаются через scipy.signal.lfilter
+с тем же затравочным значением, что и у старых python-циклов, поэтому
+результаты совпадают с прежними до погрешности float.
+Оконные величины (max/min/mean) - через sliding_window_view и срезы.
+"""
+import copy
+import threading
+import numpy as np
+from collections import OrderedDict
+from scipy.signal import lfilter
+from typing import Dict
+
+# === Базовые примитивы ===
+
+
+def ema_series(values: np.ndarray, period: int) -> np.ndarray:
+    """EMA всего ряда: ema[0] = values[0], ema[i] = a*x[i] + (1-a)*ema[i-1]."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    alpha = 2.0 / (period + 1)
+    out = np.empty_like(values)
+    out[0] = values[0]
+    if len(values) > 1:
+        out[1:], _ = lfilter([alpha], [1.0, alpha - 1.0], values[1:], zi=[(1.0 - alpha) * values[0]])
+    return out
+
+
+def ema_last(values: np.ndarray, period: int) -> float:
+    """Последнее значение EMA (короткий ряд - последняя цена, как раньше)."""
+    if len(values) < period:
+        return float(values[-1]) if len(values) > 0 else 0.0
+    return float(ema_series(values, period)[-1])
+
+
+def wilder_last(values: np.ndarray, period: int) -> float:
+    """Сглаживание Уайлдера: затравка - среднее первых period значений."""
+    seed = float(np.mean(values[:period]))
+    rest = values[period:]
+    if len(rest) == 0:
+        return seed
+    k = (period - 1) / period
+    smoothed, _ = lfilter([1.0 / period], [1.0, -k], rest, zi=[k * seed])
+    return float(smoothed[-1])
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """TR для свечей 1..n-1 (нужен предыдущий close)."""
+    prev_close = closes[:-1]
+    return np.maximum.reduce([
+        highs[1:] - lows[1:],
+        np.abs(highs[1:] - prev_close),
+        np.abs(lows[1:] - prev_close)
+    ])
+
+
+# === Индикаторы (последнее значение) ===
+
+
+def rsi(closes: np.ndarray, period: int = 7) -> float:
+    deltas = np.diff(closes)
+    if len(deltas) < period:
+        return 50
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+    avg_gain = wilder_last(gains, period)
+    avg_loss = wilder_last(losses, period)
+    if avg_loss == 0:
+        return 100
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def macd(closes: np.ndarray, fast: int = 5, slow: int = 13, signal: int = 4) -> Dict[str, float]:
+    """MACD и сигнальная линия по всей истории MACD за один проход (раньше O(n^2))."""
+    if len(closes) < slow:
+        return {'macd': 0, 'signal': 0, 'histogram': 0}
+    macd_series = (ema_series(closes, fast) - ema_series(closes, slow))[slow - 1:]
+    macd_line = float(macd_series[-1])
+    if len(macd_series) >= signal:
+        signal_line = ema_last(macd_series, signal)
+        histogram = macd_line - signal_line
+    else:
+        signal_line, histogram = macd_line, 0
+    return {'macd': macd_line, 'signal': signal_line, 'histogram': histogram}
+
+
+def stochastic(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, k_period: int = 5) -> Dict[str, float]:
+    if len(highs) < k_period:
+        return {'k': 50, 'd': 50}
+    highest_high = np.max(highs[-k_period:])
+    lowest_low = np.min(lows[-k_period:])
+    if highest_high == lowest_low:
+        k = 50
+    else:
+        k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
+    return {'k': k, 'd': k * 0.9}  # D упрощенно, как в исходном движке
+
+
+def directional_movement(highs: np.ndarray, lows: np.ndarray):
+    up = highs[1:] - highs[:-1]
+    down = lows[:-1] - lows[1:]
+    dm_plus = np.where(up > down, np.maximum(up, 0.0), 0.0)
+    dm_minus = np.where(down > up, np.maximum(down, 0.0), 0.0)
+    return dm_plus, dm_minus
+
+
+def adx_fast(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 7,
+             tr: np.ndarray = None) -> float:
+    """Упрощенный ADX скальпинга: DX по средним за последние period свечей."""
+    if len(highs) < period + 1:
+        return 20
+    tr = true_range(highs, lows, closes) if tr is None else tr
+    dm_plus, dm_minus = directional_movement(highs, lows)
+    atr = np.mean(tr[-period:])
+    di_plus = 100 * np.mean(dm_plus[-period:]) / atr if atr > 0 else 0
+    di_minus = 100 * np.mean(dm_minus[-period:]) / atr if atr > 0 else 0
+    if (di_plus + di_minus) > 0:
+        return 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+    return 20
+
+
+def atr_fast(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 7,
+             tr: np.ndarray = None) -> float:
+    if len(highs) < period + 1:
+        return abs(highs[-1] - lows[-1]) if len(highs) > 0 else 0
+    tr = true_range(highs, lows, closes) if tr is None else tr
+    return float(np.mean(tr[-period:]))
+
+
+def volume_momentum(volumes: np.ndarray, period: int = 5) -> float:
+    if len(volumes) < period + 1:
+        return 0
+    current_avg = np.mean(volumes[-period:])
+    previous_avg = np.mean(volumes[-period - 1:-1])
+    return (current_avg - previous_avg) / previous_avg * 100 if previous_avg > 0 else 0
+
+
+def price_momentum(closes: np.ndarray, period: int = 3) -> float:
+    if len(closes) < period + 1:
+        return 0
+    previous = closes[-period - 1]
+    return (closes[-1] - previous) / previous * 100 if previous > 0 else 0
+
+
+def bb_squeeze(closes: np.ndarray, period: int = 10) -> bool:
+    if len(closes) < period:
+        return False
+    recent = closes[-period:]
+    sma = np.mean(recent)
+    return bool(np.std(recent) / sma < 0.02) if sma > 0 else False
+
+
+def sr_break(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 10) -> int:
+    if len(highs) < period:
+        return 0
+    resistance = np.max(highs[-period:])
+    support = np.min(lows[-period:])
+    if closes[-1] > resistance * 1.001:
+        return 1
+    if closes[-1] < support * 0.999:
+        return -1
+    return 0
+
+
+# === Скальпинг: все индикаторы таймфрейма разом ===
+
+
+def scalping_snapshot(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                      volumes: np.ndarray) -> Dict:
+    """
+    Индикаторы ScalpingSignalEngine за один вызов: RSI-7, MACD 5/13/4, EMA 8/21,
+    Stoch 5/3/3, ADX-7, ATR-7, BB squeeze, S/R break, моментум цены и объема.
+    TR считается один раз и переиспользуется ADX и ATR.
+    """
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    tr = true_range(highs, lows, closes) if len(closes) > 1 else np.empty(0)
+
+    ema_8 = ema_last(closes, 8)
+    ema_21 = ema_last(closes, 21)
+    return {
+        'rsi_fast': rsi(closes, 7),
+        'macd_fast': macd(closes, 5, 13, 4),
+        'ema_8': ema_8,
+        'ema_21': ema_21,
+        'ema_cross': 1 if ema_8 > ema_21 else -1,
+        'stoch_fast': stochastic(highs, lows, closes, 5),
+        'adx_fast': adx_fast(highs, lows, closes, 7, tr=tr),
+        'volume_momentum': volume_momentum(volumes, 5),
+        'price_momentum': price_momentum(closes, 3),
+        'atr_fast': atr_fast(highs, lows, closes, 7, tr=tr),
+        'bb_squeeze': bb_squeeze(closes, 10),
+        'sr_break': sr_break(highs, lows, closes, 10),
+    }
+
+
+# === Полный набор монолитных ботов (RealTimeAIEngine._analyze_timeframe) ===
+
+
+def ohlcv_arrays(historical_data) -> Dict[str, np.ndarray]:
+    """Список свечей-словарей -> колонки numpy (без промежуточного DataFrame)."""
+    return {
+        key: np.fromiter((c[key] for c in historical_data), dtype=np.float64, count=len(historical_data))
+        for key in ('open', 'high', 'low', 'close', 'volume')
+    }
+
+
+def bollinger_bands(closes: np.ndarray, period: int = 20, std_dev: float = 2):
+    window = closes[-period:]
+    sma = np.mean(window)
+    std = np.std(window)
+    return sma + std * std_dev, sma, sma - std * std_dev
+
+
+def supertrend_direction(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 10,
+                         multiplier: float = 3.0, tr: np.ndarray = None) -> int:
+    """Упрощенный SuperTrend: пробой полос hl2 ± k*ATR, иначе направление последней свечи."""
+    tr = true_range(highs, lows, closes) if tr is None else tr
+    if len(tr) < period:
+        return 1
+    atr = np.mean(tr[-period:])
+    hl2 = (highs[-1] + lows[-1]) / 2
+    if closes[-1] > hl2 + multiplier * atr:
+        return 1
+    if closes[-1] < hl2 - multiplier * atr:
+        return -1
+    return 1 if closes[-1] > closes[-2] else -1
+
+
+def donchian_channel(highs: np.ndarray, lows: np.ndarray, period: int = 20):
+    if len(highs) >= period:
+        upper = np.max(highs[-period:])
+        lower = np.min(lows[-period:])
+        return upper, (upper + lower) / 2, lower
+    return highs[-1], (highs[-1] + lows[-1]) / 2, lows[-1]
+
+
+def vwap(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, volumes: np.ndarray, period: int = 20) -> float:
+    if len(closes) < period:
+        return closes[-1]
+    typical = (highs[-period:] + lows[-period:] + closes[-period:]) / 3
+    vol = volumes[-period:]
+    total = np.sum(vol)
+    return np.sum(typical * vol) / total if total > 0 else closes[-1]
+
+
+def williams_r(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> float:
+    if len(highs) >= period:
+        highest_high = np.max(highs[-period:])
+        lowest_low = np.min(lows[-period:])
+        if highest_high != lowest_low:
+            return -100 * (highest_high - closes[-1]) / (highest_high - lowest_low)
+    return -50
+
+
+def cci(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 20) -> float:
+    if len(highs) >= period:
+        typical = (highs[-period:] + lows[-period:] + closes[-period:]) / 3
+        sma = np.mean(typical)
+        mean_deviation = np.mean(np.abs(typical - sma))
+        if mean_deviation > 0:
+            return (typical[-1] - sma) / (0.015 * mean_deviation)
+    return 0
+
+
+def stochastic_kd(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14):
+    if len(highs) >= period:
+        highest_high = np.max(highs[-period:])
+        lowest_low = np.min(lows[-period:])
+        if highest_high != lowest_low:
+            k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
+            return k, k * 0.9
+    return 50, 45
+
+
+def ichimoku_lines(highs: np.ndarray, lows: np.ndarray):
+    """Tenkan-sen (9) и Kijun-sen (26), упрощенно."""
+    def midpoint(period):
+        if len(highs) >= period:
+            return (np.max(highs[-period:]) + np.min(lows[-period:])) / 2
+        return (highs[-1] + lows[-1]) / 2
+    return midpoint(9), midpoint(26)
+
+
+def obv(closes: np.ndarray, volumes: np.ndarray) -> float:
+    if len(closes) < 2:
+        return 0
+    return float(np.sum(np.sign(np.diff(closes)) * volumes[1:]))
+
+
+def candle_patterns(opens: np.ndarray, closes: np.ndarray, current: Dict, body_patterns: bool = True):
+    patterns = []
+    if len(closes) < 3:
+        return patterns
+    body_sizes = np.abs(closes[-3:] - opens[-3:]) / closes[-3:]
+    if all(closes[-3:] > opens[-3:]) and all(body_sizes > 0.01):
+        patterns.append('three_white_soldiers')
+    elif all(closes[-3:] < opens[-3:]) and all(body_sizes > 0.01):
+        patterns.append('three_black_crows')
+
+    close, open_price = current.get('close', 0), current.get('open', 0)
+    high, low = current.get('high', 0), current.get('low', 0)
+    current_body = abs(close - open_price) / close if close > 0 else 0
+    upper_shadow = high - max(close, open_price)
+    lower_shadow = min(close, open_price) - low
+    if lower_shadow > current_body * 2 and upper_shadow < current_body * 0.5:
+        patterns.append('hammer')
+    elif upper_shadow > current_body * 2 and lower_shadow < current_body * 0.5:
+        patterns.append('shooting_star')
+
+    if body_patterns and current_body > 0.02:
+        patterns.append('bullish_candle' if close > open_price else 'bearish_candle')
+    return patterns
+
+
+def timeframe_snapshot(arrays: Dict[str, np.ndarray], current: Dict, body_patterns: bool = True) -> Dict:
+    """
+    Все индикаторы таймфрейма монолитных ботов за один вызов.
+    Формулы совпадают с прежними вложенными функциями _analyze_timeframe.
+    """
+    opens, highs, lows = arrays['open'], arrays['high'], arrays['low']
+    closes, volumes = arrays['close'], arrays['volume']
+    close = current.get('close', 0)
+    open_price = current.get('open', 0)
+    volume = current.get('volume', 0)
+    tr = true_range(highs, lows, closes)
+
+    deltas = np.diff(closes)
+    avg_gain = wilder_last(np.where(deltas > 0, deltas, 0.0), 14)
+    avg_loss = wilder_last(np.where(deltas < 0, -deltas, 0.0), 14)
+    rsi_value = 100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+
+    macd_line = ema_series(closes, 12) - ema_series(closes, 26)
+    signal_line = ema_series(macd_line, 9)
+
+    bb_upper, _, bb_lower = bollinger_bands(closes)
+    donchian_upper, donchian_middle, donchian_lower = donchian_channel(highs, lows)
+    stoch_k, stoch_d = stochastic_kd(highs, lows, closes)
+    tenkan_sen, kijun_sen = ichimoku_lines(highs, lows)
+
+    if len(volumes) >= 20:
+        avg_volume = np.mean(volumes[-20:])
+        volume_ratio = volume / avg_volume if avg_volume > 0 else 1.0
+    else:
+        volume_ratio = 1.0
+
+    if len(closes) >= 20:
+        volatility = np.std(closes[-20:]) / np.mean(closes[-20:])
+    else:
+        volatility = abs(current.get('high', 0) - current.get('low', 0)) / close if close > 0 else 0.02
+
+    return {
+        'rsi': rsi_value,
+        'macd': {
+            'macd': macd_line[-1],
+            'signal': signal_line[-1],
+            'histogram': macd_line[-1] - signal_line[-1]
+        },
+        'ema_20': ema_series(closes, 20)[-1],
+        'ema_50': ema_series(closes, 50)[-1],
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'ma_50': np.mean(closes[-50:]) if len(closes) >= 50 else closes[-1],
+        'adx': adx_fast(highs, lows, closes, 14, tr=tr),
+        'volume_ratio': volume_ratio,
+        'supertrend': supertrend_direction(highs, lows, closes, tr=tr),
+        'donchian_upper': donchian_upper,
+        'donchian_lower': donchian_lower,
+        'donchian_middle': donchian_middle,
+        'vwap': vwap(highs, lows, closes, volumes),
+        'williams_r': williams_r(highs, lows, closes),
+        'cci': cci(highs, lows, closes),
+        'stoch_k': stoch_k,
+        'stoch_d': stoch_d,
+        'tenkan_sen': tenkan_sen,
+        'kijun_sen': kijun_sen,
+        'obv': obv(closes, volumes),
+        'price': close,
+        'volatility': volatility,
+        'patterns': candle_patterns(opens, closes, current, body_patterns),
+        'price_change_pct': (close - open_price) / open_price * 100 if open_price > 0 else 0,
+    }
+
+
+class IndicatorCache:
+    """
+    LRU кэш снимков индикаторов по (symbol, timeframe, timestamp последней свечи).
+    Формирующаяся свеча меняется внутри своего timestamp, поэтому вместе со снимком
+    хранится отпечаток последней свечи и текущих значений - при расхождении пересчет.
+    Потокобезопасен: анализ может идти в пуле потоков.
+    """
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _fingerprint(historical_data, current: Dict):
+        last = historical_data[-1]
+        return (len(historical_data), last.get('close'), last.get('high'), last.get('low'), last.get('volume'),
+                current.get('close'), current.get('high'), current.get('low'), current.get('volume'))
+
+    def get_or_compute(self, symbol: str, timeframe: str, historical_data, current: Dict,
+                       body_patterns: bool = True) -> Dict:
+        key = (symbol, timeframe, historical_data[-1].get('timestamp'))
+        fingerprint = self._fingerprint(historical_data, current)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Расчет вне блокировки: разные символы считаются параллельно
+        snapshot = timeframe_snapshot(ohlcv_arrays(historical_data), current, body_patterns)
+        with self._lock:
+            self._entries[key] = (fingerprint, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+
+def analyze_timeframe(data: Dict, symbol: str = None, timeframe: str = None,
+                      cache: IndicatorCache = None, body_patterns: bool = True) -> Dict:
+    """
+    Индикаторы таймфрейма для монолитных ботов. С cache и symbol/timeframe
+    повторный вызов на той же свече возвращает готовый снимок.
+    Возвращает {} если свечей меньше 50 (как раньше).
+    """
+    historical_data = data.get('historical_data', [])
+    current = data.get('current', {})
+    if len(historical_data) < 50:
+        return {}
+    if cache is not None and symbol and timeframe:
+        snapshot = cache.get_or_compute(symbol, timeframe, historical_data, current, body_patterns)
+    else:
+        snapshot = timeframe_snapshot(ohlcv_arrays(historical_data), current, body_patterns)
+    # Глубокая копия: вызывающий код дописывает свои ключи (exchanges, sources, ...) и
+    # может менять вложенные macd / patterns, а снимок общий для IndicatorCache и потоков
+    return copy.deepcopy(snapshot)
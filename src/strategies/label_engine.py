@@ -0,0 +1,190 @@
+# src/strategies/label_engine.py
+"""
+Label Engine - разметка истории исходами реальной торговой логики.
+
+Для каждой свечи i (вход по close[i]) и каждой стороны (long / short)
+ищется первое касание уровней DynamicRiskManager: стоп от ATR и TP1-3.
+После TP1 стоп переносится в безубыток, а если стоп и TP попали в одну
+свечу, считается стоп - так же, как в OutcomeTracker.
+
+Исход по горизонту h - код int8: -1 стоп, 0 истек, k - достигнут TPk.
+Все горизонты считаются из одних и тех же моментов касания, поэтому
+каждый дополнительный горизонт почти ничего не стоит.
+
+Момент касания ищется бинарным подъемом по таблице скользящих max(high) /
+min(low) окон 1, 2, 4, ... 2^k. Это O(n log H) на уровень вместо O(n * H)
+прямого перебора, что годится для лет 1m истории.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.strategies.risk_manager import DynamicRiskManager
+
+logger = logging.getLogger(__name__)
+
+HORIZONS = (4, 12, 24)
+OUTCOME_SL = -1
+OUTCOME_EXPIRED = 0
+NO_TOUCH = np.iinfo(np.int64).max // 4
+SIDES = ('long', 'short')
+
+
+class ExtremaTable:
+    """
+    Скользящие max(high) / min(low) окон [i, i + 2^k) для k < levels
+    (окна у конца истории обрезаются - дальше данных нет).
+    """
+    def __init__(self, high, low, max_window: int):
+        self.n = len(high)
+        self.levels = max(1, int(max_window).bit_length())
+        self.max = [np.asarray(high, dtype=np.float64)]
+        self.min = [np.asarray(low, dtype=np.float64)]
+        for k in range(1, self.levels):
+            step = 1 << (k - 1)
+            prev_max, prev_min = self.max[-1], self.min[-1]
+            next_max, next_min = prev_max.copy(), prev_min.copy()
+            if step < self.n:
+                np.maximum(prev_max[:-step], prev_max[step:], out=next_max[:-step])
+                np.minimum(prev_min[:-step], prev_min[step:], out=next_min[:-step])
+            self.max.append(next_max)
+            self.min.append(next_min)
+
+    def first_touch(self, start: np.ndarray, level: np.ndarray, limit: np.ndarray, above: bool) -> np.ndarray:
+        """
+        Индекс первой свечи j в [start, start + limit), где high[j] >= level (above)
+        или low[j] <= level; NO_TOUCH, если касания нет.
+        """
+        start = np.asarray(start, dtype=np.int64)
+        pos = start.copy()
+        remaining = np.asarray(limit, dtype=np.int64).copy()
+        level = np.asarray(level, dtype=np.float64)
+        active = (pos < self.n) & (remaining > 0) & np.isfinite(level)
+        if self.n == 0:
+            return np.full(len(pos), NO_TOUCH, dtype=np.int64)
+
+        for k in reversed(range(self.levels)):
+            step = 1 << k
+            idx = np.minimum(pos, self.n - 1)
+            if above:
+                clear = self.max[k][idx] < level
+            else:
+                clear = self.min[k][idx] > level
+            move = active & (pos < self.n) & (remaining >= step) & clear
+            pos += step * move
+            remaining -= step * move
+
+        # Шаг 1 не сделан и окно не исчерпано - свеча pos и есть касание
+        touched = active & (remaining > 0) & (pos < self.n)
+        return np.where(touched, pos, NO_TOUCH)
+
+
+@dataclass
+class Labels:
+    horizons: Tuple[int, ...]
+    long: np.ndarray   # (n, len(horizons)) int8: -1 стоп, 0 истек, k - достигнут TPk
+    short: np.ndarray
+    valid: np.ndarray  # (n, len(horizons)) bool: окно горизонта целиком в истории, уровни определены
+
+    def outcome(self, side: str, horizon: int) -> np.ndarray:
+        return getattr(self, side)[:, self.horizons.index(horizon)]
+
+    def target(self, side: str = 'long', horizon: Optional[int] = None, min_tp: int = 1) -> np.ndarray:
+        """Бинарный таргет: достигнут хотя бы TP{min_tp} до стопа"""
+        horizon = horizon or self.horizons[-1]
+        return (self.outcome(side, horizon) >= min_tp).astype(np.int8)
+
+    def frame(self, tp_levels: Sequence[int] = (1, 2, 3)) -> pd.DataFrame:
+        """Все бинарные таргеты: колонки {side}_h{horizon}_tp{k}"""
+        return pd.DataFrame({
+            f"{side}_h{horizon}_tp{k}": self.target(side, horizon, k)
+            for side in SIDES for horizon in self.horizons for k in tp_levels
+        })
+
+
+def compute_labels(high, low, close, stop_distance, tp_distances: Sequence, horizons: Sequence[int] = HORIZONS) -> Labels:
+    """
+    Исходы long / short для каждой свечи по всем горизонтам.
+
+    Args:
+        stop_distance: дистанция стопа от close, массив (n,)
+        tp_distances: дистанции TP1..TPk от close, k массивов (n,) по возрастанию
+        horizons: горизонты в свечах
+    """
+    close = np.asarray(close, dtype=np.float64)
+    stop_distance = np.asarray(stop_distance, dtype=np.float64)
+    tp_distances = [np.asarray(d, dtype=np.float64) for d in tp_distances]
+    horizons = tuple(sorted(int(h) for h in horizons))
+    n, max_h = len(close), horizons[-1]
+
+    table = ExtremaTable(high, low, max_h)
+    idx = np.arange(n, dtype=np.int64)
+    start, limit = idx + 1, np.full(n, max_h, dtype=np.int64)
+
+    outcomes: Dict[str, np.ndarray] = {}
+    for side in SIDES:
+        sign = 1.0 if side == 'long' else -1.0
+        take_profit_up = side == 'long'
+        t_stop = table.first_touch(start, close - sign * stop_distance, limit, above=not take_profit_up)
+        t_tp = [table.first_touch(start, close + sign * d, limit, above=take_profit_up) for d in tp_distances]
+
+        # После TP1 стоп в безубытке: касание входа со следующей свечи
+        tp1_hit = t_tp[0] != NO_TOUCH
+        be_start = np.where(tp1_hit, t_tp[0] + 1, n)
+        be_limit = np.where(tp1_hit, idx + max_h - t_tp[0], 0)
+        t_breakeven = table.first_touch(be_start, close, be_limit, above=not take_profit_up)
+
+        side_outcomes = np.empty((n, len(horizons)), dtype=np.int8)
+        for j, horizon in enumerate(horizons):
+            end = idx + horizon
+            stopped = (t_stop <= end) & (t_stop <= t_tp[0])  # Общая свеча - стоп
+            reached = ((t_tp[0] <= end) & (t_tp[0] < t_stop)).astype(np.int8)
+            for t_next in t_tp[1:]:
+                reached += (reached > 0) & (t_next <= end) & (t_next < t_breakeven)
+            side_outcomes[:, j] = np.where(stopped, OUTCOME_SL, reached)
+        outcomes[side] = side_outcomes
+
+    defined = np.isfinite(close) & np.isfinite(stop_distance)
+    valid = np.stack([defined & (idx + horizon < n) for horizon in horizons], axis=1)
+    return Labels(horizons, outcomes['long'], outcomes['short'], valid)
+
+
+def regime_states(close: pd.Series, window: int = 200) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Векторный аналог EnhancedMarketRegimeAnalyzer.detect_regime на каждую свечу
+    по скользящему окну: (volatility state, phase, crisis_mode).
+    """
+    returns = close.pct_change()
+    volatility = (returns.rolling(window, min_periods=20).std() * np.sqrt(252)).to_numpy()
+    state = np.where(volatility < 0.3, 'low', np.where(volatility < 0.6, 'medium', 'high'))
+    state = np.where(np.isnan(volatility), 'medium', state)  # Начало истории - окно не набрано
+
+    sma50 = close.rolling(50).mean().to_numpy()
+    sma200 = close.rolling(200).mean().to_numpy()
+    price = close.to_numpy()
+    phase = np.where(
+        (price > sma50) & (sma50 > sma200), 'markup',
+        np.where((price < sma50) & (sma50 < sma200), 'markdown',
+                 np.where(price < sma50, 'accumulation', 'distribution'))
+    )
+    recent_drop = close.pct_change(4).to_numpy()
+    crisis = (volatility > 0.8) | (recent_drop < -0.10)
+    return state, phase, crisis
+
+
+def label_candles(df: pd.DataFrame, horizons: Sequence[int] = HORIZONS, atr_column: str = 'atr',
+                  adx_column: str = 'adx', regime_window: int = 200) -> Labels:
+    """
+    Разметка OHLC свечей уровнями DynamicRiskManager.level_distances
+    (ATR / ADX из колонок df, режим - regime_states).
+    """
+    volatility, phase, crisis = regime_states(df['close'], regime_window)
+    adx = df[adx_column].fillna(20.0).to_numpy() if adx_column in df else 20.0
+    stop_distance, tp_distances = DynamicRiskManager.level_distances(
+        df['close'].to_numpy(), df[atr_column].to_numpy(), volatility, adx, phase, crisis
+    )
+    return compute_labels(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+                          stop_distance, tp_distances, horizons)
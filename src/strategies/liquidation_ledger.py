@@ -0,0 +1,156 @@
+# src/strategies/liquidation_ledger.py
+"""
+Liquidation Ledger - скользящие окна ликвидаций по символу.
+Кольцевые буферы фиксированного размера вместо бесконечных счетчиков:
+O(1) запросы сумм, соотношений и количества за 1m/5m/1h/4h,
+память ограничена при работе 24/7.
+"""
+import time
+from typing import Dict, Optional
+
+# Индексы полей внутри бакета
+_BUY_USD, _SELL_USD, _BUY_COUNT, _SELL_COUNT = 0, 1, 2, 3
+_N_FIELDS = 4
+
+
+class _BucketRing:
+    """
+    Кольцевой буфер бакетов фиксированной ширины с бегущими суммами по окнам.
+    Бакет помечается абсолютным номером, поэтому устаревшие слоты не нужно чистить заранее.
+    """
+    def __init__(self, bucket_seconds: int, windows: Dict[str, int]):
+        # windows: имя окна -> длина в бакетах
+        self.bucket_seconds = bucket_seconds
+        self.windows = windows
+        self.size = max(windows.values())
+        self._slots = [[0.0] * _N_FIELDS for _ in range(self.size)]
+        self._ids = [-1] * self.size
+        self._head: Optional[int] = None
+        self._sums = {name: [0.0] * _N_FIELDS for name in windows}
+
+    def _bucket_id(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds)
+
+    def advance(self, ts: float):
+        """Сдвигает голову буфера и вычитает бакеты, вышедшие из окон (амортизированно O(1))."""
+        bucket_id = self._bucket_id(ts)
+        if self._head is None:
+            self._head = bucket_id
+            return
+        gap = bucket_id - self._head
+        if gap <= 0:
+            return
+
+        for name, length in self.windows.items():
+            sums = self._sums[name]
+            if gap >= length:
+                # Окно целиком устарело
+                for i in range(_N_FIELDS):
+                    sums[i] = 0.0
+                continue
+            for b in range(self._head - length + 1, bucket_id - length + 1):
+                slot = b % self.size
+                if self._ids[slot] == b:
+                    vals = self._slots[slot]
+                    for i in range(_N_FIELDS):
+                        sums[i] -= vals[i]
+        self._head = bucket_id
+
+    def add(self, ts: float, usd_field: int, count_field: int, usd_value: float):
+        bucket_id = self._bucket_id(ts)
+        self.advance(ts)
+        if bucket_id <= self._head - self.size:
+            return  # Событие старше горизонта буфера
+
+        slot = bucket_id % self.size
+        if self._ids[slot] != bucket_id:
+            self._ids[slot] = bucket_id
+            self._slots[slot] = [0.0] * _N_FIELDS
+        vals = self._slots[slot]
+        vals[usd_field] += usd_value
+        vals[count_field] += 1
+
+        for name, length in self.windows.items():
+            if bucket_id > self._head - length:
+                sums = self._sums[name]
+                sums[usd_field] += usd_value
+                sums[count_field] += 1
+
+    def totals(self, name: str, ts: float) -> list:
+        self.advance(ts)
+        # Защита от накопленной погрешности вычитания float
+        return [max(0.0, v) for v in self._sums[name]]
+
+
+class LiquidationLedger:
+    """
+    Журнал ликвидаций одного символа с окнами 1m/5m/1h/4h.
+
+    Короткие окна считаются по 1-секундным бакетам, длинные - по минутным,
+    так что на символ хранится ~540 бакетов вне зависимости от uptime.
+    """
+    WINDOWS = {'1m': 60, '5m': 300, '1h': 3600, '4h': 14400}
+
+    def __init__(self, fine_bucket_seconds: int = 1, coarse_bucket_seconds: int = 60,
+                 fine_horizon_seconds: int = 300):
+        fine, coarse = {}, {}
+        for name, seconds in self.WINDOWS.items():
+            if seconds <= fine_horizon_seconds:
+                fine[name] = seconds // fine_bucket_seconds
+            else:
+                coarse[name] = seconds // coarse_bucket_seconds
+
+        self._rings = []
+        self._ring_for = {}
+        for bucket_seconds, windows in ((fine_bucket_seconds, fine), (coarse_bucket_seconds, coarse)):
+            if not windows:
+                continue
+            ring = _BucketRing(bucket_seconds, windows)
+            self._rings.append(ring)
+            for name in windows:
+                self._ring_for[name] = ring
+
+    def record(self, side: str, usd_value: float, ts: Optional[float] = None):
+        """
+        Добавляет ликвидацию. side - сторона ордера Binance forceOrder:
+        'SELL' закрывает лонг, 'BUY' закрывает шорт.
+        """
+        ts = time.time() if ts is None else ts
+        if side == 'BUY':
+            fields = (_BUY_USD, _BUY_COUNT)
+        else:
+            fields = (_SELL_USD, _SELL_COUNT)
+        for ring in self._rings:
+            ring.add(ts, fields[0], fields[1], usd_value)
+
+    def window(self, name: str, now: Optional[float] = None) -> Dict:
+        """Агрегаты за окно: объемы, количество и соотношение sell/buy."""
+        if name not in self._ring_for:
+            raise ValueError(f"Unknown liquidation window: {name}")
+        now = time.time() if now is None else now
+        buy_usd, sell_usd, buy_count, sell_count = self._ring_for[name].totals(name, now)
+        total = buy_usd + sell_usd
+        return {
+            'buy_usd': buy_usd,
+            'sell_usd': sell_usd,
+            'buy_count': int(round(buy_count)),
+            'sell_count': int(round(sell_count)),
+            'total_usd': total,
+            # Та же формула, что и раньше в BinanceWSClient; без ликвидаций - нейтральные 1.0
+            'ratio': sell_usd / max(1, buy_usd) if total > 0 else 1.0
+        }
+
+    def ratio(self, name: str = '1h', now: Optional[float] = None) -> float:
+        return self.window(name, now)['ratio']
+
+    def features(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Кандидаты в ML фичи: соотношение, объемы и количество по каждому окну."""
+        now = time.time() if now is None else now
+        features = {}
+        for name in self.WINDOWS:
+            w = self.window(name, now)
+            features[f'liq_ratio_{name}'] = w['ratio']
+            features[f'liq_buy_usd_{name}'] = w['buy_usd']
+            features[f'liq_sell_usd_{name}'] = w['sell_usd']
+            features[f'liq_count_{name}'] = float(w['buy_count'] + w['sell_count'])
+        return features
@@ -2,6 +2,26 @@
 """
 Реальный ML движок с ансамблем градиентного бустинга.
 Заменяет эвристический MLEngine на XGBoost + LightGBM + CatBoost.
+
+Горячая перезагрузка: модели и схема фич хранятся одним объектом ModelBundle.
+Новая версия из models/ загружается в фоне (watch() или reload()),
+проверяется по схеме фич и подменяется одним присваиванием - предсказание
+всегда работает с целым набором, старым или новым. Бот не перезапускается.
+
+Версии: train_models пишет в ModelRegistry (models/versions/<version>/ +
+manifest) и публикует атомарной заменой указателя CURRENT. Загружается
+только активная версия; без CURRENT - старые файлы прямо из models/.
+
+Дообучение: update_models продолжает бустинг активной версии на свежем окне
+и публикует результат, только если он лучше базы на валидации.
+
+Маршрутизация: версия может содержать компактные ансамбли по режиму рынка
+или кластеру символов (model_router); predict_probability(regime=, symbol=)
+выбирает их поиском в таблице маршрутов, иначе - общий ансамбль.
+
+Онлайн-веса: enable_online_weights() - веса ансамбля адаптируются по исходам
+закрытых сигналов (record_outcome, online_weights); модель с упавшим весом
+выводится из инференса и не тратит время на предсказание.
 """
 import xgboost as xgb
 import lightgbm as lgb
@@ -9,23 +29,50 @@ from catboost import CatBoostClassifier
 import numpy as np
 import joblib
 import os
-from typing import Dict, List, Optional
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from src.strategies.ensemble_trainer import ITERATION_KEYS, train_ensemble
+from src.strategies.model_registry import CURRENT, ModelRegistry, schema_hash
+from src.strategies.online_weights import OnlineWeightLearner
+from src.strategies.model_router import ROUTE_PARAMS, route_dir, route_key, trainable_routes
+
 logger = logging.getLogger(__name__)
 
+# Файлы одной версии моделей в model_path
+MODEL_FILE = {'xgb': 'xgb_model.json', 'lgbm': 'lgbm_model.txt', 'catboost': 'catboost_model.cbm'}
+MODEL_FILES = (*MODEL_FILE.values(), 'features.pkl')
+# Смысл smart money фич обучающих данных (пишется в manifest версии):
+# 1 - MetricsStore: funding as-of, реальный liq_ratio, oi_change_1h / 4h;
+# 0 - модели до MetricsStore (liq_ratio всегда 1.0, без OI) - нужно переобучение
+SMART_MONEY_INPUTS = 1
+
+
+@dataclass
+class ModelBundle:
+    """Согласованный набор моделей и схемы фич (подменяется целиком)"""
+    models: Dict[str, object] = field(default_factory=lambda: {'xgb': None, 'lgbm': None, 'catboost': None})
+    feature_columns: List[str] = field(default_factory=list)
+    signature: Optional[Tuple] = None  # (файл, mtime_ns, size) или (CURRENT, версия) на момент загрузки
+    version: int = 0
+    loaded_at: float = 0.0
+    model_version: Optional[str] = None  # Версия в ModelRegistry (None - файлы прямо в models/)
+    manifest: Dict = field(default_factory=dict)
+    routes: Dict[str, Dict[str, object]] = field(default_factory=dict)  # Ключ маршрута -> модели
+    routing: Dict = field(default_factory=dict)  # {'mode', 'clusters', 'routes'} из manifest
+
+
 class RealMLEngine:
     """
     Ансамбль из 3 моделей градиентного бустинга.
     Взвешенное голосование для финального предсказания.
     """
-    def __init__(self, model_path="models/"):
-        self.models = {
-            'xgb': None,
-            'lgbm': None,
-            'catboost': None
-        }
-        self.feature_columns = []
+    def __init__(self, model_path="models/", train_workers: int = 3, train_cores: Optional[int] = None):
+        self._bundle = ModelBundle()
         # Начальные веса (можно адаптировать динамически)
         self.model_weights = {
             'xgb': 0.4,
@@ -33,9 +80,40 @@ class RealMLEngine:
             'catboost': 0.3
         }
         self.model_path = model_path
+        self.registry = ModelRegistry(model_path)
+        # Обучение: процессов и общий бюджет ядер (None - все ядра)
+        self.train_workers = train_workers
+        self.train_cores = train_cores
+        self.last_training: Dict = {}
+        self.last_update: Dict = {}
+        self._reload_lock = threading.Lock()
+        self._rejected_signature = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+        self.reload_stats = {'reloads': 0, 'rejected': 0, 'last_error': None}
+        self.route_stats: Dict[str, int] = {}  # Предсказаний по маршрутам ('global' - общий ансамбль)
+        self.online: Optional[OnlineWeightLearner] = None
         self._ensure_model_dir()
         self._load_models()
 
+    @property
+    def models(self) -> Dict[str, object]:
+        return self._bundle.models
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self._bundle.feature_columns
+
+    @property
+    def smart_money_inputs(self) -> int:
+        """SMART_MONEY_INPUTS, на которых обучены загруженные модели (0 - старые файлы без manifest)"""
+        return int(self._bundle.manifest.get('params', {}).get('smart_money_inputs', 0))
+
+    @property
+    def version(self) -> int:
+        """Номер загруженного набора (растет с каждой подменой)"""
+        return self._bundle.version
+
     def _ensure_model_dir(self):
         """Создает директорию для моделей если не существует"""
         os.makedirs(self.model_path, exist_ok=True)
@@ -43,158 +121,481 @@ class RealMLEngine:
     def _load_models(self):
         """Загрузка предобученных моделей из файлов"""
         try:
-            xgb_path = f"{self.model_path}xgb_model.json"
-            lgbm_path = f"{self.model_path}lgbm_model.txt"
-            cat_path = f"{self.model_path}catboost_model.cbm"
-            feat_path = f"{self.model_path}features.pkl"
-            
-            if os.path.exists(xgb_path):
-                self.models['xgb'] = xgb.XGBClassifier()
-                self.models['xgb'].load_model(xgb_path)
-                logger.info("✅ XGBoost model loaded")
-            
-            if os.path.exists(lgbm_path):
-                self.models['lgbm'] = lgb.Booster(model_file=lgbm_path)
-                logger.info("✅ LightGBM model loaded")
-            
-            if os.path.exists(cat_path):
-                self.models['catboost'] = CatBoostClassifier()
-                self.models['catboost'].load_model(cat_path)
-                logger.info("✅ CatBoost model loaded")
-            
-            if os.path.exists(feat_path):
-                with open(feat_path, "rb") as f:
-                    self.feature_columns = joblib.load(f)
-                logger.info(f"✅ Feature schema loaded: {len(self.feature_columns)} features")
-                
+            self.reload(force=True)
         except Exception as e:
             logger.warning(f"⚠️  Could not load ML models: {e}. Training needed.")
 
-    def train_models(self, X_train, y_train, X_val, y_val):
+    def _files_signature(self) -> Tuple:
+        """
+        Признак новой версии на диске: активная версия реестра или
+        (файл, mtime_ns, size) по каждому файлу модели в models/.
+        """
+        version = self.registry.current()
+        if version:
+            return ((CURRENT, version),)
+        signature = []
+        for name in MODEL_FILES:
+            try:
+                stat = os.stat(f"{self.model_path}{name}")
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((name, None, None))
+        return tuple(signature)
+
+    def _load_bundle(self, signature: Tuple) -> ModelBundle:
+        """Читает все файлы моделей в новый ModelBundle (текущий набор не трогается)"""
+        bundle = ModelBundle(signature=signature)
+        directory = self.model_path
+        if signature and signature[0][0] == CURRENT:
+            bundle.model_version = signature[0][1]
+            bundle.manifest = self.registry.verify(bundle.model_version)  # Контрольные суммы файлов
+            directory = self.registry.path(bundle.model_version)
+
+        bundle.models, bundle.feature_columns = self._read_models(directory)
+        if bundle.manifest and schema_hash(bundle.feature_columns) != bundle.manifest['feature_schema_hash']:
+            raise ValueError(f"{bundle.model_version}: features.pkl does not match manifest schema")
+        bundle.routing = bundle.manifest.get('params', {}).get('routing', {})
+        for key, info in bundle.routing.get('routes', {}).items():
+            bundle.routes[key] = self._read_models(f"{directory}{info['dir']}")[0]
+        return bundle
+
+    def version_models(self, version: str) -> Dict[str, object]:
+        """Модели версии реестра без публикации (анализ, feature_audit)"""
+        return self._read_models(self.registry.path(version))[0]
+
+    @staticmethod
+    def _read_models(directory: str) -> Tuple[Dict[str, object], List[str]]:
+        """Модели и схема фич из файлов каталога (отсутствующий файл - None / [])"""
+        models = {'xgb': None, 'lgbm': None, 'catboost': None}
+        feature_columns = []
+        xgb_path = f"{directory}xgb_model.json"
+        lgbm_path = f"{directory}lgbm_model.txt"
+        cat_path = f"{directory}catboost_model.cbm"
+        feat_path = f"{directory}features.pkl"
+
+        if os.path.exists(xgb_path):
+            models['xgb'] = xgb.XGBClassifier()
+            models['xgb'].load_model(xgb_path)
+
+        if os.path.exists(lgbm_path):
+            models['lgbm'] = lgb.Booster(model_file=lgbm_path)
+
+        if os.path.exists(cat_path):
+            models['catboost'] = CatBoostClassifier()
+            models['catboost'].load_model(cat_path)
+
+        if os.path.exists(feat_path):
+            with open(feat_path, "rb") as f:
+                feature_columns = list(joblib.load(f))
+        return models, feature_columns
+
+    @staticmethod
+    def _model_feature_count(name: str, model) -> Optional[int]:
+        if name == 'lgbm':
+            return model.num_feature()
+        if name == 'catboost':
+            return len(model.feature_names_) if model.feature_names_ else None
+        return getattr(model, 'n_features_in_', None)
+
+    def _validate_bundle(self, bundle: ModelBundle):
+        """
+        Проверка перед подменой: каждая модель обучена на схеме features.pkl,
+        пробное предсказание дает вероятность в [0, 1]. ValueError - набор отклонен.
+        """
+        if not any(model is not None for model in bundle.models.values()):
+            return
+        if not bundle.feature_columns:
+            raise ValueError("models present but features.pkl is missing")
+
+        n_features = len(bundle.feature_columns)
+        probe = np.zeros((1, n_features))
+        for route, models in [('global', bundle.models), *bundle.routes.items()]:
+            for name, model in models.items():
+                if model is None:
+                    continue
+                expected = self._model_feature_count(name, model)
+                if expected is not None and expected != n_features:
+                    raise ValueError(f"{route}/{name} expects {expected} features, schema has {n_features}")
+
+            for name, prob in self._predict_models(models, probe).items():
+                if not np.isfinite(prob) or not 0.0 <= prob <= 1.0:
+                    raise ValueError(f"{route}/{name} probe prediction out of range: {prob}")
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Загружает модели из model_path, если файлы изменились (force - в любом случае).
+        Набор подменяется только после успешной проверки; иначе остаются текущие модели.
+        Возвращает True, если подменили.
+        """
+        with self._reload_lock:
+            signature = self._files_signature()
+            if not force and signature == self._bundle.signature:
+                return False
+            try:
+                bundle = self._load_bundle(signature)
+                self._validate_bundle(bundle)
+            except Exception as e:
+                self._rejected_signature = signature
+                self.reload_stats['rejected'] += 1
+                self.reload_stats['last_error'] = str(e)
+                logger.warning(f"⚠️ [ML] Model reload rejected, keeping version {self._bundle.version}: {e}")
+                return False
+
+            bundle.version = self._bundle.version + 1
+            bundle.loaded_at = time.time()
+            self._bundle = bundle  # Атомарная подмена: предсказания берут ссылку на набор целиком
+            if self.online:
+                self.online.reset()
+            self._rejected_signature = None
+            self.reload_stats['reloads'] += 1
+            self.reload_stats['last_error'] = None
+            loaded = [name for name, model in bundle.models.items() if model is not None]
+            if loaded:
+                logger.info(f"✅ [ML] Models v{bundle.version} loaded: {', '.join(loaded)}, "
+                            f"{len(bundle.feature_columns)} features ({bundle.model_version or self.model_path})")
+            return True
+
+    def watch(self, interval: float = 30.0):
+        """
+        Фоновый поток следит за файлами в model_path и перезагружает модели.
+        Версия подхватывается, когда файлы не менялись между двумя проверками
+        (обучение записало все файлы); отклоненная версия повторно не грузится.
+        """
+        if interval <= 0 or (self._watch_thread and self._watch_thread.is_alive()):
+            return
+        self._watch_stop.clear()
+
+        def run():
+            previous = self._files_signature()
+            while not self._watch_stop.wait(interval):
+                try:
+                    current = self._files_signature()
+                    settled = current == previous
+                    previous = current
+                    if settled and current not in (self._bundle.signature, self._rejected_signature):
+                        self.reload()
+                except Exception as e:
+                    logger.error(f"❌ [ML] Model watcher error: {e}")
+
+        self._watch_thread = threading.Thread(target=run, name="ml-model-watcher", daemon=True)
+        self._watch_thread.start()
+        logger.info(f"👀 [ML] Watching {self.model_path} for new models every {interval:.0f}s")
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout=5)
+            self._watch_thread = None
+
+    def model_info(self) -> Dict:
+        bundle = self._bundle
+        return {
+            'version': bundle.version,
+            'model_version': bundle.model_version,
+            'loaded_at': bundle.loaded_at,
+            'models': [name for name, model in bundle.models.items() if model is not None],
+            'features': len(bundle.feature_columns),
+            'routing': bundle.routing.get('mode', 'off'),
+            'routes': sorted(bundle.routes),
+            'route_hits': dict(self.route_stats),
+            'online': self.online.stats() if self.online else None,
+            **self.reload_stats,
+        }
+
+    def train_models(self, X_train, y_train, X_val, y_val,
+                     training_window: Optional[Dict] = None, publish: bool = True,
+                     params: Optional[Dict[str, Dict]] = None, search: Optional[Dict] = None,
+                     routing: Optional[Dict] = None) -> str:
         """
         Обучение всех 3 моделей на данных.
         Вызывается из data_pipeline.py
+
+        Файлы пишутся в новую версию реестра (живые модели не трогаются);
+        publish=True - версия сразу становится активной. Возвращает id версии.
+        params - гиперпараметры по моделям (None - найденные ранее, из manifest
+        активной версии); search - итоги model_search для manifest.
+        routing - маршрутные модели: {'mode': 'regime' | 'cluster', 'train' / 'val':
+        ключ маршрута каждой строки, 'clusters': {символ: кластер}, 'min_samples'}.
         """
         logger.info("🎓 Starting model training...")
-        
-        # 1. XGBoost
-        logger.info("Training XGBoost...")
-        self.models['xgb'] = xgb.XGBClassifier(
-            n_estimators=500,
-            max_depth=6,
-            learning_rate=0.01,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            eval_metric='logloss',
-            random_state=42,
-            use_label_encoder=False
-        )
-        self.models['xgb'].fit(
-            X_train, y_train,
-            eval_set=[(X_val, y_val)],
-            verbose=False
-        )
-        self.models['xgb'].save_model(f"{self.model_path}xgb_model.json")
-
-        # 2. LightGBM
-        logger.info("Training LightGBM...")
-        train_data = lgb.Dataset(X_train, label=y_train)
-        val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
-        
-        params = {
-            'objective': 'binary',
-            'metric': 'binary_logloss',
-            'boosting_type': 'gbdt',
-            'num_leaves': 31,
-            'learning_rate': 0.01,
-            'feature_fraction': 0.8,
-            'bagging_fraction': 0.8,
-            'bagging_freq': 5,
-            'verbose': -1,
-            'random_state': 42
-        }
-        
-        self.models['lgbm'] = lgb.train(
-            params,
-            train_data,
-            num_boost_round=500,
-            valid_sets=[val_data],
-            callbacks=[lgb.early_stopping(50), lgb.log_evaluation(0)]
-        )
-        self.models['lgbm'].save_model(f"{self.model_path}lgbm_model.txt")
-
-        # 3. CatBoost
-        logger.info("Training CatBoost...")
-        self.models['catboost'] = CatBoostClassifier(
-            iterations=500,
-            depth=6,
-            learning_rate=0.01,
-            loss_function='Logloss',
-            random_seed=42,
-            verbose=False
-        )
-        self.models['catboost'].fit(
-            X_train, y_train,
-            eval_set=(X_val, y_val),
-            early_stopping_rounds=50,
-            verbose=False
-        )
-        self.models['catboost'].save_model(f"{self.model_path}catboost_model.cbm")
-        
+        if params is None:
+            params = self.tuned_params()
+        staging = self.registry.begin()
+        try:
+            models = self._train_into(staging, X_train, y_train, X_val, y_val, params)
+            feature_columns = list(X_train.columns)
+            routes = self._train_routes(staging, models, X_train, y_train, X_val, y_val, routing)
+            version = self.registry.commit(
+                staging, feature_columns,
+                metrics={**self._validation_metrics(models, X_val, y_val, len(X_train)),
+                         'ensemble_logloss': self._ensemble_logloss(models, X_val, y_val)},
+                training_window=training_window,
+                params={'models': self.last_training.get('params', {}),
+                        'training': {k: v for k, v in self.last_training.items() if k != 'params'},
+                        'search': search or {},
+                        'routing': routes,
+                        'smart_money_inputs': SMART_MONEY_INPUTS}
+            )
+        except BaseException:
+            self.registry.abort(staging)
+            raise
+
+        if publish:
+            self._publish(version)
+        logger.info(f"✅ All models trained and saved! Version: {version}")
+        return version
+
+    def update_models(self, X_train, y_train, X_val, y_val, rounds: int = 50,
+                      min_improvement: float = 0.0, training_window: Optional[Dict] = None,
+                      publish: bool = True) -> Optional[str]:
+        """
+        Дообучение активной версии на свежем окне данных (между полными переобучениями).
+
+        Бустинг продолжается от моделей активной версии (XGBoost xgb_model,
+        LightGBM / CatBoost init_model) на rounds новых итераций. Гейт: logloss
+        ансамбля на X_val должен стать ниже, чем у базовой версии, минимум на
+        min_improvement - иначе версия отбрасывается и возвращается None.
+        """
+        base = self.registry.current()
+        if not base:
+            raise ValueError("No published model version to update; run a full training first")
+        base_manifest = self.registry.verify(base)
+        feature_columns = list(X_train.columns)
+        if feature_columns != base_manifest['feature_columns']:
+            raise ValueError("Feature schema differs from the published version; run a full training")
+        base_dir = self.registry.path(base)
+        base_models, _ = self._read_models(base_dir)
+        missing = [name for name, model in base_models.items() if model is None]
+        if missing:
+            raise ValueError(f"Version {base} has no {', '.join(missing)} model to continue from")
+
+        logger.info(f"🔁 Updating {base} on {len(X_train)} new samples ({rounds} rounds)...")
+        tuned = base_manifest.get('params', {}).get('models', {})
+        params = {name: {**tuned.get(name, {}), ITERATION_KEYS[name]: rounds} for name in base_models}
+        init_models = {name: f"{base_dir}{MODEL_FILE[name]}" for name in base_models}
+
+        staging = self.registry.begin()
+        try:
+            self.last_training = train_ensemble(staging, X_train, y_train, X_val, y_val,
+                                                workers=self.train_workers, cores=self.train_cores,
+                                                params=params, init_models=init_models)
+            with open(f"{staging}features.pkl", "wb") as f:
+                joblib.dump(feature_columns, f)
+            models, _ = self._read_models(staging)
+            # Маршрутные модели базы переходят в новую версию без изменений
+            routing = base_manifest.get('params', {}).get('routing', {})
+            for info in routing.get('routes', {}).values():
+                shutil.copytree(f"{base_dir}{info['dir']}", f"{staging}{info['dir']}")
+
+            base_loss = self._ensemble_logloss(base_models, X_val, y_val)
+            new_loss = self._ensemble_logloss(models, X_val, y_val)
+            self.last_update = {'base': base, 'base_logloss': base_loss, 'new_logloss': new_loss,
+                                'accepted': new_loss <= base_loss - min_improvement}
+            if not self.last_update['accepted']:
+                logger.warning(f"⚠️ [ML] Update rejected: ensemble logloss {new_loss:.4f} "
+                               f"vs {base_loss:.4f} for {base} (min improvement {min_improvement})")
+                self.registry.abort(staging)
+                return None
+
+            metrics = self._validation_metrics(models, X_val, y_val, len(X_train))
+            metrics.update(ensemble_logloss=new_loss, base_ensemble_logloss=base_loss)
+            version = self.registry.commit(
+                staging, feature_columns,
+                metrics=metrics,
+                training_window=training_window,
+                params={'models': tuned,
+                        'training': {**{k: v for k, v in self.last_training.items() if k != 'params'},
+                                     'mode': 'incremental', 'rounds': rounds},
+                        'search': base_manifest.get('params', {}).get('search', {}),
+                        'routing': routing,
+                        # Деревья базы остаются - смысл входов тот же, что у нее
+                        'smart_money_inputs': base_manifest.get('params', {}).get('smart_money_inputs', 0)},
+                parent=base
+            )
+        except BaseException:
+            self.registry.abort(staging)
+            raise
+
+        if publish:
+            self._publish(version)
+        logger.info(f"✅ [ML] Incremental update {version}: logloss {base_loss:.4f} -> {new_loss:.4f}")
+        return version
+
+    def _publish(self, version: str):
+        """
+        Публикует версию и сразу берет ее в работу через reload (та же проверка набора,
+        watcher не будет грузить эту же версию повторно). Отклоненная версия снимается
+        с публикации - ValueError.
+        """
+        self.registry.publish(version)
+        if self.reload(force=True):
+            return
+        try:
+            self.registry.rollback()
+        except ValueError:
+            pass  # Предыдущей версии нет - CURRENT остается, reload его уже отклонил
+        raise ValueError(f"Version {version} rejected on load: {self.reload_stats['last_error']}")
+
+    def _train_routes(self, directory: str, global_models: Dict[str, object], X_train, y_train,
+                      X_val, y_val, routing: Optional[Dict]) -> Dict:
+        """
+        Компактные ансамбли маршрутов (ROUTE_PARAMS) в directory/routes/<key>/.
+        Маршрут остается, только если на своей части валидации он не хуже общего
+        ансамбля. Возвращает запись routing для manifest ({} - без маршрутов).
+        """
+        if not routing or routing.get('mode', 'off') == 'off':
+            return {}
+        keys_train, keys_val = np.asarray(routing['train']), np.asarray(routing['val'])
+        y_train, y_val = np.asarray(y_train), np.asarray(y_val)
+        routes = {}
+        for key in trainable_routes(keys_train, y_train, keys_val, y_val, routing.get('min_samples', 500)):
+            train_mask, val_mask = keys_train == key, keys_val == key
+            route_path = f"{directory}{route_dir(key)}"
+            os.makedirs(route_path)
+            logger.info(f"🧭 [ML] Training route {key}: {int(train_mask.sum())} samples")
+            train_ensemble(route_path, X_train[train_mask], y_train[train_mask], X_val[val_mask], y_val[val_mask],
+                           workers=self.train_workers, cores=self.train_cores, params=ROUTE_PARAMS)
+            loss = self._ensemble_logloss(self._read_models(route_path)[0], X_val[val_mask], y_val[val_mask])
+            baseline = self._ensemble_logloss(global_models, X_val[val_mask], y_val[val_mask])
+            if loss > baseline:
+                logger.info(f"   Route {key} dropped: logloss {loss:.4f} vs global {baseline:.4f}")
+                shutil.rmtree(route_path)
+                continue
+            routes[key] = {'dir': route_dir(key), 'n_train': int(train_mask.sum()), 'n_val': int(val_mask.sum()),
+                           'logloss': loss, 'global_logloss': baseline}
+        return {'mode': routing['mode'], 'clusters': routing.get('clusters', {}), 'routes': routes}
+
+    @staticmethod
+    def _predict_matrix(models: Dict[str, object], X, skip=()) -> Dict[str, np.ndarray]:
+        """Вероятности класса 1 для всех строк X от каждой загруженной модели (кроме skip)"""
+        predictions = {}
+        for name, model in models.items():
+            if model is None or name in skip:
+                continue
+            # lgb.Booster с objective=binary уже отдает вероятность
+            if name == 'lgbm':
+                predictions[name] = model.predict(X)
+            else:
+                predictions[name] = model.predict_proba(X)[:, 1]
+        return predictions
+
+    def _ensemble_logloss(self, models: Dict[str, object], X, y) -> float:
+        """Logloss взвешенного ансамбля (model_weights по загруженным моделям)"""
+        from sklearn.metrics import log_loss
+
+        probs = self._ensemble_average(self._predict_matrix(models, X))
+        return float(log_loss(y, np.clip(probs, 1e-7, 1 - 1e-7), labels=[0, 1]))
+
+    def _ensemble_average(self, predictions: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Взвешенное среднее ансамбля (веса нормируются по ответившим моделям).
+        Один расчет и для живого инференса, и для гейтов обновления / маршрутов.
+        """
+        total = sum(self.model_weights.get(name, 0.33) for name in predictions) or 1.0
+        return sum(p * self.model_weights.get(name, 0.33) for name, p in predictions.items()) / total
+
+    @classmethod
+    def _validation_metrics(cls, models: Dict[str, object], X_val, y_val, n_train: int) -> Dict:
+        """Logloss / AUC каждой модели на валидации (пишутся в manifest версии)"""
+        from sklearn.metrics import log_loss, roc_auc_score
+
+        metrics = {'n_train': int(n_train), 'n_val': int(len(X_val)),
+                   'val_positive_rate': float(np.mean(y_val)) if len(y_val) else 0.0}
+        for name, probs in cls._predict_matrix(models, X_val).items():
+            try:
+                metrics[f'{name}_logloss'] = float(log_loss(y_val, probs, labels=[0, 1]))
+                metrics[f'{name}_auc'] = float(roc_auc_score(y_val, probs))
+            except ValueError:  # Один класс в валидации - AUC не определен
+                continue
+        return metrics
+
+    def tuned_params(self) -> Dict[str, Dict]:
+        """Гиперпараметры активной версии реестра (победители model_search), {} - значения по умолчанию"""
+        version = self.registry.current()
+        if not version:
+            return {}
+        try:
+            return self.registry.manifest(version).get('params', {}).get('models', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _sequential_wall(self, n_train: int) -> Optional[float]:
+        """
+        База speedup: wall-clock последнего полного последовательного обучения
+        (workers=1) из manifest'ов реестра, пересчитанный на n_train строк.
+        """
+        for version in reversed(self.registry.versions()):
+            try:
+                manifest = self.registry.manifest(version)
+            except (OSError, ValueError):
+                continue
+            training = manifest.get('params', {}).get('training', {})
+            rows = manifest.get('metrics', {}).get('n_train')
+            if training.get('workers') == 1 and 'mode' not in training and training.get('wall_seconds') and rows:
+                return training['wall_seconds'] * n_train / rows
+        return None
+
+    def _train_into(self, directory: str, X_train, y_train, X_val, y_val,
+                    params: Optional[Dict[str, Dict]] = None) -> Dict[str, object]:
+        """Обучает 3 модели (параллельно, см. ensemble_trainer) и сохраняет их файлы и features.pkl в directory"""
+        self.last_training = train_ensemble(directory, X_train, y_train, X_val, y_val,
+                                            workers=self.train_workers, cores=self.train_cores,
+                                            params=params, sequential_wall=self._sequential_wall(len(X_train)))
+
         # Сохраняем список фич для consistency
-        self.feature_columns = list(X_train.columns)
-        with open(f"{self.model_path}features.pkl", "wb") as f:
-            joblib.dump(self.feature_columns, f)
-            
-        logger.info("✅ All models trained and saved!")
+        with open(f"{directory}features.pkl", "wb") as f:
+            joblib.dump(list(X_train.columns), f)
+        return self._read_models(directory)[0]
 
-    def predict_probability(self, features: dict) -> float:
+    def predict_probability(self, features: dict, regime=None, symbol: Optional[str] = None) -> float:
         """
         Взвешенное предсказание ансамбля.
         Возвращает вероятность класса 1 (прибыльный сигнал).
+        regime (MarketRegime) / symbol выбирают маршрутную модель версии, если она есть.
+        """
+        return self.predict_components(features, regime, symbol)[0]
+
+    def predict_components(self, features: dict, regime=None,
+                           symbol: Optional[str] = None) -> Tuple[float, Dict[str, float]]:
         """
-        if not any(self.models.values()) or not self.feature_columns:
+        Как predict_probability, плюс вероятности базовых моделей {модель: p}
+        (их вместе с исходом сигнала получает record_outcome).
+        """
+        bundle = self._bundle  # Один набор на все предсказание, даже если идет перезагрузка
+        if not any(bundle.models.values()) or not bundle.feature_columns:
             logger.warning("Models not trained. Returning neutral 0.5")
-            return 0.5
+            return 0.5, {}
 
         try:
             # Подготовка вектора фич в правильном порядке
             feature_vector = []
-            for col in self.feature_columns:
+            for col in bundle.feature_columns:
                 feature_vector.append(features.get(col, 0.0))
             
             X = np.array(feature_vector).reshape(1, -1)
-            predictions = {}
-            
-            # XGBoost prediction
-            if self.models['xgb']:
-                prob = self.models['xgb'].predict_proba(X)[0][1]
-                predictions['xgb'] = prob
-            
-            # LightGBM prediction
-            if self.models['lgbm']:
-                prob = self.models['lgbm'].predict(X)[0]
-                # LightGBM может возвращать raw score, нормализуем sigmoid
-                prob = 1 / (1 + np.exp(-prob))
-                predictions['lgbm'] = float(prob)
-
-            # CatBoost prediction
-            if self.models['catboost']:
-                prob = self.models['catboost'].predict_proba(X)[0][1]
-                predictions['catboost'] = prob
-
-            # Взвешенное среднее
+            skip = self.online.dropped if self.online else ()
+            predictions = self._predict_models(self._route(bundle, regime, symbol), X, skip)
             if predictions:
-                weighted_prob = sum(
-                    pred * self.model_weights.get(name, 0.33)
-                    for name, pred in predictions.items()
-                )
-                return float(np.clip(weighted_prob, 0.0, 1.0))
+                weighted_prob = self._ensemble_average(predictions)
+                return float(np.clip(weighted_prob, 0.0, 1.0)), predictions
                 
         except Exception as e:
             logger.error(f"ML Prediction Error: {e}")
             
-        return 0.5
+        return 0.5, {}
+
+    def _route(self, bundle: ModelBundle, regime=None, symbol: Optional[str] = None) -> Dict[str, object]:
+        """Модели для запроса: маршрут из таблицы версии или общий ансамбль"""
+        key = route_key(bundle.routing, regime, symbol) if bundle.routes else None
+        models = bundle.routes.get(key) if key else None
+        hit = key if models else 'global'
+        self.route_stats[hit] = self.route_stats.get(hit, 0) + 1
+        return models or bundle.models
+
+    @classmethod
+    def _predict_models(cls, models: Dict[str, object], X: np.ndarray, skip=()) -> Dict[str, float]:
+        """Вероятность класса 1 для одной строки X - тот же путь, что и у валидации (_predict_matrix)"""
+        return {name: float(probs[0]) for name, probs in cls._predict_matrix(models, X, skip).items()}
 
     def update_weights(self, model_performances: Dict[str, float]):
         """
@@ -206,3 +607,27 @@ class RealMLEngine:
             for model_name, perf in model_performances.items():
                 self.model_weights[model_name] = perf / total
             logger.info(f"Updated weights: {self.model_weights}")
+
+    def enable_online_weights(self, eta: float = 0.05, decay: float = 0.02,
+                              drop_weight: float = 0.05, min_observations: int = 50):
+        """Веса ансамбля адаптируются по исходам сигналов (record_outcome)"""
+        self.online = OnlineWeightLearner(self.model_weights, eta=eta, decay=decay,
+                                          drop_weight=drop_weight, min_observations=min_observations)
+        self.model_weights = self.online.weights  # Один dict: обновления сразу видны предсказанию
+
+    def record_outcome(self, predictions: Dict[str, float], outcome: int, version: Optional[int] = None):
+        """
+        Исход закрытого лонг-сигнала (цель моделей - прибыльность лонга):
+        predictions - вероятности моделей из predict_components, outcome - 1 (TP) /
+        0 (SL, истек), version - bundle.version на момент сигнала
+        (исходы сигналов прошлой версии моделей не учитываются).
+        """
+        if not self.online or not predictions:
+            return
+        if version is not None and version != self.version:
+            return
+        dropped = self.online.observe(predictions, outcome)
+        if dropped:
+            logger.warning(f"⚠️ [ML] {dropped} dropped from inference: weight below {self.online.drop_weight:.2f} "
+                           f"(rolling logloss {self.online.logloss.get(dropped, 0.0):.4f}), "
+                           f"weights {self.online.stats()['weights']}")
@@ -0,0 +1,232 @@
+# src/strategies/model_registry.py
+"""
+Model Registry - версии обученных моделей с атомарной публикацией.
+
+Каждое обучение пишет файлы в отдельный каталог (staging), после чего
+commit() добавляет manifest.json (хеш схемы фич, окно обучения, метрики,
+sha256 файлов) и переименовывает каталог в versions/<version>/.
+Активная версия задается файлом-указателем CURRENT, который заменяется
+через os.replace - читатель видит либо старую, либо новую версию целиком.
+
+    models/
+        CURRENT                 # id активной версии
+        HISTORY.json            # порядок публикаций (для rollback)
+        versions/<version>/     # xgb_model.json, lgbm_model.txt, catboost_model.cbm,
+                                # features.pkl, manifest.json
+            routes/<key>/       # ансамбли маршрутов по режиму / кластеру (model_router)
+
+Без CURRENT движок читает старые файлы прямо из models/ (как раньше).
+
+CLI: python -m src.strategies.model_registry [list | publish <version> | rollback]
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+CURRENT = 'CURRENT'
+HISTORY = 'HISTORY.json'
+VERSIONS = 'versions'
+
+
+def schema_hash(feature_columns: List[str]) -> str:
+    """Хеш упорядоченного списка фич (порядок важен для вектора признаков)"""
+    return hashlib.sha256(json.dumps(list(feature_columns)).encode('utf-8')).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, text: str):
+    """tmp + fsync + os.replace: файл либо старый, либо новый целиком"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ModelRegistry:
+    """
+    Args:
+        root: каталог моделей (settings.ml_model_path)
+    """
+    def __init__(self, root: str = "models/"):
+        self.root = root
+        self.versions_dir = os.path.join(root, VERSIONS)
+
+    def path(self, version: str) -> str:
+        """Каталог версии (с завершающим '/', как model_path в RealMLEngine)"""
+        return os.path.join(self.versions_dir, version, '')
+
+    def begin(self) -> str:
+        """Новый staging-каталог для файлов обучения"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        return tempfile.mkdtemp(dir=self.versions_dir, prefix='.staging-') + os.sep
+
+    def abort(self, staging: str):
+        """Удаляет недописанную версию (обучение упало)"""
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def commit(self, staging: str, feature_columns: List[str], metrics: Optional[Dict] = None,
+               training_window: Optional[Dict] = None, params: Optional[Dict] = None,
+               parent: Optional[str] = None) -> str:
+        """
+        Пишет manifest и переименовывает staging в versions/<version>.
+        Возвращает id версии (еще не опубликована); parent - версия, от которой дообучали.
+        """
+        files = {}
+        for directory, subdirs, names in os.walk(staging):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith('.'))
+            for name in names:
+                relative = os.path.relpath(os.path.join(directory, name), staging)
+                if relative != MANIFEST and not name.startswith('.'):
+                    files[relative] = file_sha256(os.path.join(directory, name))
+        files = dict(sorted(files.items()))
+        created = datetime.now(timezone.utc)
+        fingerprint = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()
+        version = f"{created.strftime('%Y%m%dT%H%M%SZ')}-{fingerprint[:8]}"
+        manifest = {
+            'version': version,
+            'created_at': created.isoformat(),
+            'feature_columns': list(feature_columns),
+            'feature_schema_hash': schema_hash(feature_columns),
+            'training_window': training_window or {},
+            'metrics': metrics or {},
+            'params': params or {},
+            'parent': parent,
+            'files': files,
+        }
+        target = os.path.join(self.versions_dir, version)
+        if os.path.exists(target):  # Те же файлы в ту же секунду - версия уже есть
+            self.abort(staging)
+            return version
+        _write_atomic(os.path.join(staging, MANIFEST), json.dumps(manifest, indent=2, default=str))
+        os.rename(staging.rstrip(os.sep), target)
+        logger.info(f"📦 [REGISTRY] Version {version} committed ({len(files)} files)")
+        return version
+
+    def manifest(self, version: str) -> Dict:
+        with open(os.path.join(self.path(version), MANIFEST)) as f:
+            return json.load(f)
+
+    def verify(self, version: str) -> Dict:
+        """Проверяет sha256 файлов по manifest; ValueError при расхождении"""
+        manifest = self.manifest(version)
+        directory = self.path(version)
+        for name, expected in manifest['files'].items():
+            file_path = os.path.join(directory, name)
+            if not os.path.exists(file_path):
+                raise ValueError(f"{version}: {name} is missing")
+            if file_sha256(file_path) != expected:
+                raise ValueError(f"{version}: checksum mismatch for {name}")
+        return manifest
+
+    def versions(self) -> List[str]:
+        """Завершенные версии, старые первыми"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        names = [
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith('.') and os.path.exists(os.path.join(self.versions_dir, name, MANIFEST))
+        ]
+        return sorted(names, key=lambda name: (self.manifest(name).get('created_at', ''), name))
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def history(self) -> List[str]:
+        try:
+            with open(os.path.join(self.root, HISTORY)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def publish(self, version: str):
+        """Делает версию активной (атомарная замена CURRENT)"""
+        self.verify(version)
+        history = [v for v in self.history() if v != version] + [version]
+        _write_atomic(os.path.join(self.root, HISTORY), json.dumps(history))
+        _write_atomic(os.path.join(self.root, CURRENT), version + '\n')
+        logger.info(f"🚀 [REGISTRY] Published {version}")
+
+    def rollback(self) -> str:
+        """Возвращает предыдущую опубликованную версию"""
+        history = self.history()
+        current = self.current()
+        previous = [v for v in history if v != current and v in self.versions()]
+        if not previous:
+            raise ValueError("No previous version to roll back to")
+        version = previous[-1]
+        self.verify(version)
+        _write_atomic(os.path.join(self.root, HISTORY),
+                      json.dumps([v for v in history if v != current]))
+        _write_atomic(os.path.join(self.root, CURRENT), version + '\n')
+        logger.info(f"⏪ [REGISTRY] Rolled back {current} -> {version}")
+        return version
+
+    def prune(self, keep: int = 5) -> List[str]:
+        """Удаляет старые версии, кроме последних keep и активной"""
+        current = self.current()
+        versions = self.versions()
+        removed = [v for v in versions[:-keep] if v != current] if keep > 0 else []
+        for version in removed:
+            shutil.rmtree(self.path(version), ignore_errors=True)
+        return removed
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from src.core.settings import settings
+
+    parser = argparse.ArgumentParser(description="Model registry")
+    parser.add_argument('command', choices=['list', 'publish', 'rollback', 'prune'])
+    parser.add_argument('version', nargs='?')
+    parser.add_argument('--root', default=settings.ml_model_path)
+    parser.add_argument('--keep', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current()
+        for version in registry.versions():
+            metrics = registry.manifest(version).get('metrics', {})
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {json.dumps(metrics, default=str)}")
+    elif args.command == 'publish':
+        if not args.version:
+            parser.error("publish requires a version")
+        registry.publish(args.version)
+    elif args.command == 'rollback':
+        print(registry.rollback())
+    else:
+        for version in registry.prune(args.keep):
+            print(f"removed {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# src/strategies/model_router.py
+"""
+Model Router - маршрутизация предсказаний по режиму рынка или кластеру символов.
+
+Кроме общего ансамбля версия моделей может содержать компактные ансамбли
+маршрутов (routes/<key>/ в каталоге версии):
+  - regime:  ключ "{trend}:{volatility}" из EnhancedMarketRegimeAnalyzer
+  - cluster: ключ "cluster:{id}" - кластер символа по корреляции доходностей
+
+Запрос выбирает модели одним поиском в таблице маршрутов; маршрута нет
+(мало данных при обучении) - работает общий ансамбль.
+"""
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.db.metrics_store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+ROUTING_MODES = ('off', 'regime', 'cluster')
+TRENDS = ('bullish', 'bearish', 'neutral')
+VOLATILITY_STATES = ('low', 'medium', 'high')
+# Код режима (int8 колонка 'regime' в FeatureStore) -> ключ маршрута
+REGIME_ROUTES = [f"{trend}:{volatility}" for trend in TRENDS for volatility in VOLATILITY_STATES]
+
+# Маршрутные модели учатся на части данных - меньше деревьев и глубина
+ROUTE_PARAMS = {
+    'xgb': {'n_estimators': 150, 'max_depth': 4, 'learning_rate': 0.05},
+    'lgbm': {'num_boost_round': 150, 'num_leaves': 15, 'learning_rate': 0.05},
+    'catboost': {'iterations': 150, 'depth': 4, 'learning_rate': 0.05},
+}
+
+
+def regime_route(trend: str, volatility: str) -> str:
+    return f"{trend}:{volatility}"
+
+
+def cluster_route(cluster: int) -> str:
+    return f"cluster:{int(cluster)}"
+
+
+def route_dir(key: str) -> str:
+    """Каталог маршрута внутри версии: 'bullish:high' -> 'routes/bullish-high/'"""
+    return f"routes/{key.replace(':', '-')}/"
+
+
+def regime_codes(volatility_states: np.ndarray, phases: np.ndarray) -> np.ndarray:
+    """
+    Коды REGIME_ROUTES по состояниям label_engine.regime_states
+    (тренд как в detect_regime: markup - bullish, markdown - bearish).
+    """
+    trend = np.where(phases == 'markup', 0, np.where(phases == 'markdown', 1, 2))
+    volatility = np.select([volatility_states == 'low', volatility_states == 'medium'], [0, 1], 2)
+    return (trend * len(VOLATILITY_STATES) + volatility).astype(np.int8)
+
+
+def symbol_clusters(returns: pd.DataFrame, n_clusters: int = 3, min_overlap: int = 50) -> Dict[str, int]:
+    """
+    Кластеры символов по корреляции доходностей (иерархическая кластеризация,
+    расстояние 1 - corr). returns - колонки символов, строки выровнены по времени.
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+    from scipy.spatial.distance import squareform
+
+    symbols = [MetricsStore.normalize_symbol(s) for s in returns.columns]
+    if len(symbols) <= 1 or n_clusters <= 1:
+        return {symbol: 0 for symbol in symbols}
+    corr = returns.corr(min_periods=min_overlap).fillna(0.0).to_numpy()
+    distance = np.clip(1.0 - corr, 0.0, 2.0)
+    np.fill_diagonal(distance, 0.0)
+    tree = linkage(squareform((distance + distance.T) / 2, checks=False), method='average')
+    labels = fcluster(tree, t=min(n_clusters, len(symbols)), criterion='maxclust')
+    return {symbol: int(label) - 1 for symbol, label in zip(symbols, labels)}
+
+
+def route_key(routing: Dict, regime=None, symbol: Optional[str] = None) -> Optional[str]:
+    """Ключ маршрута запроса по настройке версии routing = {'mode', 'clusters'}"""
+    mode = routing.get('mode', 'off')
+    if mode == 'regime' and regime is not None:
+        return regime_route(regime.trend, regime.volatility)
+    if mode == 'cluster' and symbol:
+        cluster = routing.get('clusters', {}).get(MetricsStore.normalize_symbol(symbol))
+        return cluster_route(cluster) if cluster is not None else None
+    return None
+
+
+def trainable_routes(keys_train: Sequence[str], y_train, keys_val: Sequence[str], y_val,
+                     min_samples: int) -> List[str]:
+    """Маршруты, для которых хватает данных: min_samples строк обучения, оба класса, валидация"""
+    keys_train, keys_val = np.asarray(keys_train), np.asarray(keys_val)
+    y_train, y_val = np.asarray(y_train), np.asarray(y_val)
+    routes = []
+    for key in sorted(set(keys_train.tolist())):
+        train_mask, val_mask = keys_train == key, keys_val == key
+        if train_mask.sum() < min_samples or val_mask.sum() < max(20, min_samples // 10):
+            continue
+        if len(np.unique(y_train[train_mask])) < 2:
+            continue
+        routes.append(key)
+    return routes
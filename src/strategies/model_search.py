@@ -0,0 +1,399 @@
+# src/strategies/model_search.py
+"""
+Model Search - walk-forward валидация и поиск гиперпараметров ансамбля.
+
+Датасет делится по времени на последовательные блоки: фолд k обучается на
+прошлом (expanding - все блоки до k, rolling - последние window блоков) и
+проверяется на блоке k. Между train и val выдерживается зазор gap
+(самый длинный горизонт разметки settings.ml_label_horizons, label_gap),
+чтобы метка не заглядывала в валидацию. embargo_split - тот же зазор для
+итогового train / val сплита (train_models.py).
+
+Поиск - случайные конфигурации из SEARCH_SPACES для каждой модели:
+  * единица работы - (trial, fold), их раздает пул процессов;
+  * матрица фич передается каждому процессу один раз (initializer) -
+    ссылкой на файл FeatureStore (MatrixSlice), если X лежит в нем, а
+    нативные датасеты фолдов (DMatrix / lgb.Dataset / Pool) строятся один
+    раз на процесс и переиспользуются всеми trial'ами;
+  * после каждого фолда trial сравнивается с медианой (prune_quantile)
+    других trial'ов на том же фолде и отсекается, если хуже;
+  * победитель по среднему logloss на всех фолдах пишется в manifest
+    версии (RealMLEngine.train_models) и используется следующими обучениями.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.settings import settings
+from src.db.feature_store import MatrixSlice, matrix_slice
+from src.strategies.ensemble_trainer import EARLY_STOPPING_ROUNDS, model_params
+
+logger = logging.getLogger(__name__)
+
+# (тип, min, max): int - равномерно целые, float - равномерно, log - лог-равномерно
+SEARCH_SPACES = {
+    'xgb': {
+        'n_estimators': ('int', 100, 800),
+        'max_depth': ('int', 3, 8),
+        'learning_rate': ('log', 0.005, 0.2),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 1.0, 20.0),
+        'reg_lambda': ('log', 0.1, 10.0),
+    },
+    'lgbm': {
+        'num_boost_round': ('int', 100, 800),
+        'num_leaves': ('int', 8, 128),
+        'learning_rate': ('log', 0.005, 0.2),
+        'feature_fraction': ('float', 0.5, 1.0),
+        'bagging_fraction': ('float', 0.5, 1.0),
+        'min_data_in_leaf': ('int', 5, 200),
+        'lambda_l2': ('log', 0.01, 10.0),
+    },
+    'catboost': {
+        'iterations': ('int', 100, 800),
+        'depth': ('int', 4, 8),
+        'learning_rate': ('log', 0.005, 0.2),
+        'l2_leaf_reg': ('log', 1.0, 10.0),
+    },
+}
+
+_worker: Dict = {}  # Состояние процесса поиска: X, y, фолды, кеш датасетов
+
+
+def sample_params(space: Dict[str, Tuple], rng: np.random.Generator) -> Dict:
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def label_gap(horizons: Optional[Iterable[int]] = None, candle=np.timedelta64(1, 'h')) -> np.timedelta64:
+    """Эмбарго train / val: самый длинный горизонт разметки (по умолчанию settings.ml_label_horizons) в свечах"""
+    return candle * max(horizons or settings.ml_label_horizons)
+
+
+def embargo_split(times, fraction: float = 0.8, gap=None) -> Tuple[int, int]:
+    """
+    Хронологический сплит с эмбарго: (train_end, val_start) - train = X[:train_end],
+    val = X[val_start:]. Строки train, чье окно разметки заходит в val
+    (время >= начало val - gap), отбрасываются.
+    """
+    t = np.asarray(times)
+    gap = label_gap() if gap is None else gap
+    if np.issubdtype(t.dtype, np.datetime64):
+        t = t.astype('datetime64[ns]').astype(np.int64)
+        gap = int(np.timedelta64(gap, 'ns').astype(np.int64))
+    val_start = int(len(t) * fraction)
+    if val_start >= len(t):
+        return val_start, val_start
+    return int(np.searchsorted(t, t[val_start] - gap, side='left')), val_start
+
+
+def walk_forward_folds(times, n_folds: int = 4, mode: str = 'expanding', window: Optional[int] = None,
+                       gap=None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Индексы (train, val) walk-forward фолдов.
+
+    Args:
+        times: время каждой строки (datetime64 или число)
+        n_folds: число валидационных блоков (ось времени делится на n_folds + 1 блок)
+        mode: 'expanding' - train с начала истории, 'rolling' - последние window блоков
+        gap: зазор между концом train и началом val (в единицах times; None - label_gap())
+    """
+    t = np.asarray(times)
+    gap = label_gap() if gap is None else gap
+    if np.issubdtype(t.dtype, np.datetime64):
+        t = t.astype('datetime64[ns]').astype(np.int64)
+        gap = int(np.timedelta64(gap, 'ns').astype(np.int64))
+    unique = np.unique(t)
+    edges = np.linspace(0, len(unique), n_folds + 2).round().astype(int)
+    bounds = [unique[i] for i in edges[:-1]] + [np.inf]
+    window = window or n_folds
+
+    folds = []
+    for k in range(1, n_folds + 1):
+        val_start, val_end = bounds[k], bounds[k + 1]
+        train_start = bounds[max(0, k - window)] if mode == 'rolling' else -np.inf
+        train_idx = np.flatnonzero((t >= train_start) & (t < val_start - gap))
+        val_idx = np.flatnonzero((t >= val_start) & (t < val_end))
+        if len(train_idx) and len(val_idx):
+            folds.append((train_idx, val_idx))
+    return folds
+
+
+@dataclass
+class Trial:
+    trial_id: int
+    family: str
+    params: Dict
+    scores: List[float] = field(default_factory=list)
+    aucs: List[float] = field(default_factory=list)
+    state: str = 'running'  # running / complete / pruned / failed
+    seconds: float = 0.0
+
+    @property
+    def score(self) -> float:
+        return float(np.mean(self.scores)) if self.scores else math.inf
+
+    def to_dict(self) -> Dict:
+        return {
+            'trial': self.trial_id,
+            'params': self.params,
+            'logloss': round(self.score, 6),
+            'auc': round(float(np.mean(self.aucs)), 6) if self.aucs else None,
+            'folds': len(self.scores),
+            'state': self.state,
+        }
+
+
+@dataclass
+class SearchResult:
+    family: str
+    best: Optional[Trial]
+    trials: int
+    complete: int
+    pruned: int
+    failed: int
+    seconds: float
+    top: List[Trial]
+
+    @property
+    def best_params(self) -> Dict:
+        return dict(self.best.params) if self.best else {}
+
+    def summary(self) -> Dict:
+        """Компактная запись для manifest версии"""
+        return {
+            'best': self.best.to_dict() if self.best else None,
+            'trials': self.trials,
+            'complete': self.complete,
+            'pruned': self.pruned,
+            'failed': self.failed,
+            'seconds': round(self.seconds, 1),
+            'top': [trial.to_dict() for trial in self.top],
+        }
+
+
+def _init_worker(X, y: np.ndarray, folds: List[Tuple[np.ndarray, np.ndarray]], threads: int):
+    _worker.clear()
+    if isinstance(X, MatrixSlice):
+        X = X.array()
+    _worker.update(X=X, y=y, folds=folds, threads=threads, cache={})
+
+
+def _fold_data(family: str, fold: int):
+    """Нативные датасеты фолда: строятся один раз на процесс, общие для всех trial'ов"""
+    key = (family, fold)
+    cache = _worker['cache']
+    if key in cache:
+        return cache[key]
+
+    X, y = _worker['X'], _worker['y']
+    train_idx, val_idx = _worker['folds'][fold]
+    if family == 'xgb':
+        import xgboost as xgb
+        data = xgb.DMatrix(X[train_idx], label=y[train_idx], nthread=_worker['threads']), \
+            xgb.DMatrix(X[val_idx], nthread=_worker['threads'])
+    elif family == 'lgbm':
+        import lightgbm as lgb
+        # feature_pre_filter=False - min_data_in_leaf можно менять между trial'ами
+        train = lgb.Dataset(X[train_idx], label=y[train_idx], free_raw_data=False,
+                            params={'feature_pre_filter': False, 'verbose': -1}).construct()
+        data = train, lgb.Dataset(X[val_idx], label=y[val_idx], reference=train, free_raw_data=False).construct()
+    else:
+        from catboost import Pool
+        data = Pool(X[train_idx], label=y[train_idx]), Pool(X[val_idx], label=y[val_idx])
+    cache[key] = data
+    return data
+
+
+def _fit_predict(family: str, params: Dict, fold: int) -> np.ndarray:
+    """Обучение как в ensemble_trainer: LightGBM / CatBoost с early stopping по val фолда, XGBoost без"""
+    threads = _worker['threads']
+    train, val = _fold_data(family, fold)
+    params = model_params(family, params)
+    if family == 'xgb':
+        import xgboost as xgb
+        rounds = params.pop('n_estimators')
+        booster = xgb.train({**params, 'objective': 'binary:logistic', 'eval_metric': 'logloss',
+                             'nthread': threads, 'seed': 42, 'verbosity': 0}, train, num_boost_round=rounds)
+        return booster.predict(val)
+    if family == 'lgbm':
+        import lightgbm as lgb
+        rounds = params.pop('num_boost_round')
+        booster = lgb.train({**params, 'objective': 'binary', 'metric': 'binary_logloss',
+                             'num_threads': threads, 'seed': 42, 'verbose': -1},
+                            train, num_boost_round=rounds, valid_sets=[val],
+                            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        return booster.predict(val.get_data(), num_iteration=booster.best_iteration)
+    from catboost import CatBoostClassifier
+    model = CatBoostClassifier(**params, loss_function='Logloss', thread_count=threads, random_seed=42,
+                               verbose=False, allow_writing_files=False)
+    model.fit(train, eval_set=val, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    return model.predict_proba(val)[:, 1]
+
+
+def _evaluate(family: str, params: Dict, fold: int) -> Tuple[float, Optional[float], float]:
+    """(logloss, auc, секунды) конфигурации на одном фолде"""
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    started = time.perf_counter()
+    probs = _fit_predict(family, params, fold)
+    y_val = _worker['y'][_worker['folds'][fold][1]]
+    score = float(log_loss(y_val, probs, labels=[0, 1]))
+    try:
+        auc = float(roc_auc_score(y_val, probs))
+    except ValueError:  # Один класс в блоке
+        auc = None
+    return score, auc, time.perf_counter() - started
+
+
+class _InlineExecutor:
+    """Последовательное выполнение в текущем процессе с тем же интерфейсом, что у пула"""
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def search(X, y, times, families: Iterable[str] = ('xgb', 'lgbm', 'catboost'), n_trials: int = 50,
+           n_folds: int = 4, mode: str = 'expanding', window: Optional[int] = None,
+           gap=None, workers: Optional[int] = None, threads_per_trial: int = 1,
+           prune_quantile: float = 0.5, min_trials_to_prune: int = 5, time_budget: Optional[float] = None,
+           seed: int = 42, top_k: int = 5) -> Dict[str, SearchResult]:
+    """
+    Случайный поиск с walk-forward оценкой и отсечением слабых trial'ов.
+
+    Args:
+        X, y, times: датасет в хронологическом порядке (collect_dataset)
+        n_trials: конфигураций на каждую модель
+        workers: процессов (None - все ядра, 1 - в текущем процессе)
+        threads_per_trial: потоков библиотеки на одну оценку
+        prune_quantile: trial хуже этого квантиля других на том же фолде отсекается
+        min_trials_to_prune: сколько оценок на фолде нужно, прежде чем отсекать
+        time_budget: новые trial'ы не запускаются после стольких секунд
+
+    Returns:
+        {модель: SearchResult}
+    """
+    families = list(families)
+    folds = walk_forward_folds(times, n_folds=n_folds, mode=mode, window=window, gap=gap)
+    if not folds:
+        raise ValueError("Not enough history for walk-forward folds")
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))  # Матрица FeatureStore - без копии
+    shared = matrix_slice(X)  # Процессам - ссылка на файл, а не копия матрицы на каждое ядро
+    y = np.asarray(y, dtype=np.int32)
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    logger.info(f"🔎 [SEARCH] {n_trials} trials x {len(families)} models, {len(folds)} {mode} folds, "
+                f"{workers} workers")
+
+    # Trial'ы создаются лениво (десятки тысяч не держатся в очереди заранее)
+    def new_trials():
+        for trial_id in range(n_trials):
+            for family in families:
+                yield Trial(trial_id, family, sample_params(SEARCH_SPACES[family], rng))
+
+    trials: Dict[str, List[Trial]] = {family: [] for family in families}
+    rungs: Dict[Tuple[str, int], List[float]] = {}  # (модель, фолд) -> средний logloss trial'ов
+    generator = new_trials()
+    ready = deque()  # (trial, fold) - продолжения выживших trial'ов идут первыми
+    in_flight: Dict[Future, Tuple[Trial, int]] = {}
+
+    if workers <= 1:
+        _init_worker(X, y, folds, threads_per_trial)
+        executor = _InlineExecutor()
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(shared or X, y, folds, threads_per_trial))
+
+    with executor:
+        exhausted = False
+        while True:
+            while len(in_flight) < workers * 2:
+                if ready:
+                    trial, fold = ready.popleft()
+                elif not exhausted and (time_budget is None or time.perf_counter() - started < time_budget):
+                    trial = next(generator, None)
+                    if trial is None:
+                        exhausted = True
+                        continue
+                    trials[trial.family].append(trial)
+                    fold = 0
+                else:
+                    break
+                in_flight[executor.submit(_evaluate, trial.family, trial.params, fold)] = (trial, fold)
+            if not in_flight:
+                break
+
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                trial, fold = in_flight.pop(future)
+                try:
+                    score, auc, seconds = future.result()
+                except Exception as e:
+                    trial.state = 'failed'
+                    logger.debug(f"Trial {trial.family}#{trial.trial_id} failed: {e}")
+                    continue
+                trial.scores.append(score)
+                if auc is not None:
+                    trial.aucs.append(auc)
+                trial.seconds += seconds
+
+                rung = rungs.setdefault((trial.family, fold), [])
+                running = trial.score
+                if fold + 1 == len(folds):
+                    trial.state = 'complete'
+                elif len(rung) >= min_trials_to_prune and running > np.quantile(rung, prune_quantile):
+                    trial.state = 'pruned'
+                else:
+                    ready.appendleft((trial, fold + 1))
+                rung.append(running)
+
+    elapsed = time.perf_counter() - started
+    results = {}
+    for family, family_trials in trials.items():
+        complete = sorted((t for t in family_trials if t.state == 'complete'), key=lambda t: t.score)
+        results[family] = SearchResult(
+            family=family,
+            best=complete[0] if complete else None,
+            trials=len(family_trials),
+            complete=len(complete),
+            pruned=sum(t.state == 'pruned' for t in family_trials),
+            failed=sum(t.state == 'failed' for t in family_trials),
+            seconds=elapsed,
+            top=complete[:top_k],
+        )
+        best = results[family].best
+        if best:
+            logger.info(f"🏆 [SEARCH] {family}: logloss {best.score:.4f} "
+                        f"({results[family].complete} complete, {results[family].pruned} pruned) {best.params}")
+        else:
+            logger.warning(f"⚠️ [SEARCH] {family}: no trial completed all folds")
+    logger.info(f"⏱️ [SEARCH] Finished in {elapsed:.1f}s")
+    return results
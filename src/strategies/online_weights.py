@@ -0,0 +1,122 @@
+# src/strategies/online_weights.py
+"""
+Online Weights - адаптация весов ансамбля по закрытым сигналам.
+
+OutcomeTracker закрывает сигнал -> исход (TP - 1, SL / EXPIRED - 0) вместе с
+вероятностями базовых моделей на момент сигнала приходит в observe().
+Веса обновляются экспоненциальным градиентом по logloss ансамбля:
+
+    p = sum(w_i * p_i),  g_i = (p - y) / (p * (1 - p)) * p_i,  w_i <- w_i * exp(-eta * g_i) / Z
+
+Скользящие logloss / Brier каждой модели - EWMA. Вся работа на исход -
+O(число моделей), история не хранится.
+
+Модель, вес которой после min_observations упал ниже drop_weight, выводится
+из инференса (ее предсказание больше не считается). Последняя модель не
+выводится никогда. reset() - новая версия моделей, все с начальных весов.
+"""
+import logging
+import math
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PROB_EPS = 0.01  # Клип вероятностей: один уверенный промах не обнуляет вес
+MAX_GRADIENT = 20.0
+
+
+class OnlineWeightLearner:
+    """
+    Args:
+        initial_weights: начальные веса {модель: вес} (нормируются)
+        eta: шаг экспоненциального градиента
+        decay: доля нового исхода в скользящих метриках (EWMA)
+        drop_weight: ниже этого веса модель выводится из инференса (0 - не выводить)
+        min_observations: исходов до первого вывода модели
+    """
+    def __init__(self, initial_weights: Dict[str, float], eta: float = 0.05, decay: float = 0.02,
+                 drop_weight: float = 0.05, min_observations: int = 50):
+        total = sum(initial_weights.values()) or 1.0
+        self.initial = {name: weight / total for name, weight in initial_weights.items()}
+        self.eta = eta
+        self.decay = decay
+        self.drop_weight = drop_weight
+        self.min_observations = min_observations
+
+        self.weights: Dict[str, float] = dict(self.initial)
+        self.dropped: Set[str] = set()
+        self.logloss: Dict[str, float] = {}
+        self.brier: Dict[str, float] = {}
+        self.observations = 0
+
+    def reset(self):
+        """Начальные веса, все модели снова в инференсе (веса меняются на месте)"""
+        self.weights.clear()
+        self.weights.update(self.initial)
+        self.dropped.clear()
+        self.logloss.clear()
+        self.brier.clear()
+        self.observations = 0
+
+    def observe(self, predictions: Dict[str, float], outcome: int) -> Optional[str]:
+        """
+        Учитывает исход сигнала.
+
+        Args:
+            predictions: {модель: вероятность класса 1} на момент сигнала
+            outcome: 1 - сигнал прибыльный (TP), 0 - нет
+
+        Returns:
+            Имя модели, выведенной из инференса этим исходом, иначе None
+        """
+        active = {name: min(max(float(p), PROB_EPS), 1.0 - PROB_EPS)
+                  for name, p in predictions.items() if name in self.weights and name not in self.dropped}
+        if not active:
+            return None
+        y = 1.0 if outcome else 0.0
+        self.observations += 1
+
+        for name, p in active.items():
+            loss = -math.log(p if y else 1.0 - p)
+            brier = (p - y) ** 2
+            self.logloss[name] = loss if name not in self.logloss else \
+                self.logloss[name] + self.decay * (loss - self.logloss[name])
+            self.brier[name] = brier if name not in self.brier else \
+                self.brier[name] + self.decay * (brier - self.brier[name])
+
+        total = sum(self.weights[name] for name in active)
+        p_ensemble = sum(self.weights[name] * p for name, p in active.items()) / total
+        scale = (p_ensemble - y) / (p_ensemble * (1.0 - p_ensemble))
+        for name, p in active.items():
+            gradient = max(-MAX_GRADIENT, min(MAX_GRADIENT, scale * p))
+            self.weights[name] *= math.exp(-self.eta * gradient)
+        # Модели без предсказания (не загружены) сохраняют свой вес
+        updated = sum(self.weights[name] for name in active)
+        for name in active:
+            self.weights[name] *= total / updated
+        return self._maybe_drop(list(active))
+
+    def _normalize(self):
+        total = sum(weight for name, weight in self.weights.items() if name not in self.dropped)
+        for name in self.weights:
+            self.weights[name] = 0.0 if name in self.dropped else self.weights[name] / total
+
+    def _maybe_drop(self, candidates) -> Optional[str]:
+        """Выводит худшую из ответивших моделей, если ее вес ниже drop_weight"""
+        if self.drop_weight <= 0 or self.observations < self.min_observations or len(candidates) <= 1:
+            return None
+        worst = min(candidates, key=self.weights.get)
+        if self.weights[worst] >= self.drop_weight:
+            return None
+        self.dropped.add(worst)
+        self._normalize()
+        return worst
+
+    def stats(self) -> Dict:
+        return {
+            'observations': self.observations,
+            'weights': {name: round(weight, 4) for name, weight in self.weights.items()},
+            'logloss': {name: round(value, 4) for name, value in self.logloss.items()},
+            'brier': {name: round(value, 4) for name, value in self.brier.items()},
+            'dropped': sorted(self.dropped),
+        }
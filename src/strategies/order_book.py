@@ -0,0 +1,418 @@
+# src/strategies/order_book.py
+"""
+Order Book Depth Engine - локальный L2 стакан по символу.
+Источник: Binance Futures diff-depth WebSocket + REST snapshot (resync).
+Метрики (imbalance, глубина ±x%, стены, sweep) пересчитываются инкрементально
+на каждом обновлении, чтение - O(1) через готовый словарь metrics.
+"""
+import time
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LocalOrderBook:
+    """
+    L2 стакан одного символа.
+
+    Для каждой стороны хранится словарь price -> qty и отсортированный список цен.
+    Суммы нотионала в полосе ±depth_pct от mid ведутся инкрементально:
+    изменение уровня внутри полосы корректирует сумму, сдвиг mid добавляет/убирает
+    только уровни, пересекшие границу полосы. Крупнейший уровень полосы (кандидат
+    в стены) ведется так же; полоса пересматривается, только когда этот уровень
+    уменьшился, удален или вышел из полосы.
+    """
+    RECOMPUTE_EVERY = 1000  # Полный пересчет полос против накопления погрешности
+
+    def __init__(self, symbol: str, depth_pct: float = 0.01, wall_ratio: float = 5.0,
+                 min_wall_usd: float = 50_000.0, sweep_pct: float = 0.002,
+                 sweep_min_usd: float = 100_000.0):
+        self.symbol = symbol
+        self.depth_pct = depth_pct
+        self.wall_ratio = wall_ratio
+        self.min_wall_usd = min_wall_usd
+        self.sweep_pct = sweep_pct
+        self.sweep_min_usd = sweep_min_usd
+
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self._bid_prices: List[float] = []  # по возрастанию
+        self._ask_prices: List[float] = []  # по возрастанию
+        self.last_update_id = 0
+
+        self._bid_edge = 0.0  # биды в полосе: price >= edge
+        self._ask_edge = 0.0  # аски в полосе: price <= edge
+        self._bid_band_usd = 0.0
+        self._ask_band_usd = 0.0
+        self._bid_band_levels = 0
+        self._ask_band_levels = 0
+        self._updates = 0
+        # Крупнейший по нотионалу уровень полосы; None + stale - нужен пересмотр полосы
+        self._walls: Dict[bool, Optional[float]] = {True: None, False: None}
+        self._walls_stale: Dict[bool, bool] = {True: True, False: True}
+
+        self.last_sweep: Optional[Dict] = None
+        self.metrics: Dict = {}
+
+    # === Состояние ===
+
+    @property
+    def best_bid(self) -> float:
+        return self._bid_prices[-1] if self._bid_prices else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        return self._ask_prices[0] if self._ask_prices else 0.0
+
+    @property
+    def mid(self) -> float:
+        if not self._bid_prices or not self._ask_prices:
+            return 0.0
+        return (self.best_bid + self.best_ask) / 2
+
+    def is_crossed(self) -> bool:
+        return bool(self._bid_prices and self._ask_prices and self.best_bid >= self.best_ask)
+
+    def clear(self):
+        self._walls_stale[True] = self._walls_stale[False] = True
+        self.bids.clear()
+        self.asks.clear()
+        self._bid_prices.clear()
+        self._ask_prices.clear()
+        self.last_update_id = 0
+        self.metrics = {}
+
+    # === Загрузка и обновления ===
+
+    def load_snapshot(self, bids: List, asks: List, last_update_id: int, ts: Optional[float] = None):
+        """Полная загрузка стакана из REST /fapi/v1/depth."""
+        self.clear()
+        for price, qty in bids:
+            p, q = float(price), float(qty)
+            if q > 0:
+                self.bids[p] = q
+        for price, qty in asks:
+            p, q = float(price), float(qty)
+            if q > 0:
+                self.asks[p] = q
+        self._bid_prices = sorted(self.bids)
+        self._ask_prices = sorted(self.asks)
+        self.last_update_id = last_update_id
+        self.last_sweep = None
+        self._recompute_bands()
+        self._refresh_metrics(ts)
+
+    def apply(self, bids: List, asks: List, update_id: int, ts: Optional[float] = None):
+        """Применяет одно diff-depth событие (qty == 0 удаляет уровень)."""
+        prev_best_bid, prev_best_ask = self.best_bid, self.best_ask
+        removed_bids = []
+        removed_asks = []
+
+        for price, qty in bids:
+            p, q = float(price), float(qty)
+            delta = self._set_level(self.bids, self._bid_prices, p, q, is_bid=True)
+            if delta < 0:
+                removed_bids.append((p, -delta))
+        for price, qty in asks:
+            p, q = float(price), float(qty)
+            delta = self._set_level(self.asks, self._ask_prices, p, q, is_bid=False)
+            if delta < 0:
+                removed_asks.append((p, -delta))
+
+        self.last_update_id = update_id
+        self._updates += 1
+        if self._updates % self.RECOMPUTE_EVERY == 0:
+            self._recompute_bands()
+        else:
+            self._move_band_edges()
+
+        ts = time.time() if ts is None else ts
+        self._detect_sweep(prev_best_bid, prev_best_ask, removed_bids, removed_asks, ts)
+        self._refresh_metrics(ts)
+
+    def _set_level(self, side: Dict[float, float], prices: List[float], p: float, q: float, is_bid: bool) -> float:
+        """Обновляет уровень, корректирует сумму полосы. Возвращает изменение нотионала."""
+        old_q = side.get(p, 0.0)
+        if q > 0:
+            if old_q == 0.0:
+                insort(prices, p)
+            side[p] = q
+        elif old_q > 0:
+            del side[p]
+            del prices[bisect_left(prices, p)]
+        else:
+            return 0.0
+
+        delta_usd = (q - old_q) * p
+        if is_bid:
+            if p >= self._bid_edge:
+                self._bid_band_usd += delta_usd
+                self._bid_band_levels += (q > 0) - (old_q > 0)
+                self._track_wall(True, p, q, old_q)
+        else:
+            if p <= self._ask_edge:
+                self._ask_band_usd += delta_usd
+                self._ask_band_levels += (q > 0) - (old_q > 0)
+                self._track_wall(False, p, q, old_q)
+        return delta_usd
+
+    def _track_wall(self, is_bid: bool, p: float, q: float, old_q: float):
+        """Уровень полосы изменился: новый максимум или пересмотр, если уменьшился текущий"""
+        if self._walls_stale[is_bid]:
+            return
+        wall = self._walls[is_bid]
+        side = self.bids if is_bid else self.asks
+        if p == wall:
+            if q < old_q:
+                self._walls_stale[is_bid] = True
+        elif q > 0 and (wall is None or p * q > wall * side[wall]):
+            self._walls[is_bid] = p
+
+    # === Полосы глубины ===
+
+    def _band_edges(self):
+        mid = self.mid
+        return mid * (1 - self.depth_pct), mid * (1 + self.depth_pct)
+
+    def _recompute_bands(self):
+        self._bid_edge, self._ask_edge = self._band_edges()
+        i = bisect_left(self._bid_prices, self._bid_edge)
+        j = bisect_right(self._ask_prices, self._ask_edge)
+        self._bid_band_usd = sum(p * self.bids[p] for p in self._bid_prices[i:])
+        self._ask_band_usd = sum(p * self.asks[p] for p in self._ask_prices[:j])
+        self._bid_band_levels = len(self._bid_prices) - i
+        self._ask_band_levels = j
+        self._walls_stale[True] = self._walls_stale[False] = True
+
+    def _move_band_edges(self):
+        """Сдвигает границы полос за mid, трогая только уровни между старой и новой границей."""
+        new_bid_edge, new_ask_edge = self._band_edges()
+
+        old_i = bisect_left(self._bid_prices, self._bid_edge)
+        new_i = bisect_left(self._bid_prices, new_bid_edge)
+        if new_i > old_i:
+            for p in self._bid_prices[old_i:new_i]:
+                self._bid_band_usd -= p * self.bids[p]
+                if p == self._walls[True]:
+                    self._walls_stale[True] = True
+            self._bid_band_levels -= new_i - old_i
+        elif new_i < old_i:
+            for p in self._bid_prices[new_i:old_i]:
+                self._bid_band_usd += p * self.bids[p]
+                self._track_wall(True, p, self.bids[p], 0.0)
+            self._bid_band_levels += old_i - new_i
+
+        old_j = bisect_right(self._ask_prices, self._ask_edge)
+        new_j = bisect_right(self._ask_prices, new_ask_edge)
+        if new_j > old_j:
+            for p in self._ask_prices[old_j:new_j]:
+                self._ask_band_usd += p * self.asks[p]
+                self._track_wall(False, p, self.asks[p], 0.0)
+            self._ask_band_levels += new_j - old_j
+        elif new_j < old_j:
+            for p in self._ask_prices[new_j:old_j]:
+                self._ask_band_usd -= p * self.asks[p]
+                if p == self._walls[False]:
+                    self._walls_stale[False] = True
+            self._ask_band_levels -= old_j - new_j
+
+        self._bid_edge, self._ask_edge = new_bid_edge, new_ask_edge
+
+    # === Стены и sweep ===
+
+    def _band_max(self, is_bid: bool) -> Optional[float]:
+        """Полный пересмотр полосы: цена крупнейшего по нотионалу уровня"""
+        if is_bid:
+            i = bisect_left(self._bid_prices, self._bid_edge)
+            band_prices, side = self._bid_prices[i:], self.bids
+        else:
+            j = bisect_right(self._ask_prices, self._ask_edge)
+            band_prices, side = self._ask_prices[:j], self.asks
+        return max(band_prices, key=lambda p: p * side[p]) if band_prices else None
+
+    def _find_wall(self, is_bid: bool) -> Optional[Dict]:
+        if self._walls_stale[is_bid]:
+            self._walls[is_bid] = self._band_max(is_bid)
+            self._walls_stale[is_bid] = False
+        price = self._walls[is_bid]
+        if is_bid:
+            side, band_usd, band_levels = self.bids, self._bid_band_usd, self._bid_band_levels
+        else:
+            side, band_usd, band_levels = self.asks, self._ask_band_usd, self._ask_band_levels
+        if price is None or band_levels <= 0:
+            return None
+
+        notional = price * side[price]
+        avg_level = band_usd / band_levels
+        if notional < self.min_wall_usd or notional < avg_level * self.wall_ratio:
+            return None
+
+        mid = self.mid
+        return {
+            'price': price,
+            'notional': notional,
+            'distance_pct': abs(price - mid) / mid * 100 if mid > 0 else 0.0
+        }
+
+    def _detect_sweep(self, prev_best_bid, prev_best_ask, removed_bids, removed_asks, ts):
+        """
+        Sweep: за одно обновление лучшая цена сдвинулась дальше sweep_pct,
+        и съеденный нотионал между старой и новой лучшей ценой >= sweep_min_usd.
+        """
+        best_bid, best_ask = self.best_bid, self.best_ask
+        if prev_best_bid > 0 and 0 < best_bid < prev_best_bid * (1 - self.sweep_pct):
+            eaten = sum(usd for p, usd in removed_bids if p > best_bid)
+            if eaten >= self.sweep_min_usd:
+                # Продавец снял ликвидность бидов (sweep вниз)
+                self.last_sweep = {'side': 'bid', 'direction': 'down', 'price_from': prev_best_bid,
+                                   'price_to': best_bid, 'notional': eaten, 'ts': ts}
+        if prev_best_ask > 0 and best_ask > prev_best_ask * (1 + self.sweep_pct):
+            eaten = sum(usd for p, usd in removed_asks if p < best_ask)
+            if eaten >= self.sweep_min_usd:
+                # Покупатель снял ликвидность асков (sweep вверх)
+                self.last_sweep = {'side': 'ask', 'direction': 'up', 'price_from': prev_best_ask,
+                                   'price_to': best_ask, 'notional': eaten, 'ts': ts}
+
+    def _refresh_metrics(self, ts: Optional[float] = None):
+        mid = self.mid
+        bid_usd = max(0.0, self._bid_band_usd)
+        ask_usd = max(0.0, self._ask_band_usd)
+        total = bid_usd + ask_usd
+        self.metrics = {
+            'best_bid': self.best_bid,
+            'best_ask': self.best_ask,
+            'mid': mid,
+            'spread_pct': (self.best_ask - self.best_bid) / mid * 100 if mid > 0 else 0.0,
+            'depth_pct': self.depth_pct * 100,
+            'bid_depth_usd': bid_usd,
+            'ask_depth_usd': ask_usd,
+            # +1 = только биды, -1 = только аски
+            'imbalance': (bid_usd - ask_usd) / total if total > 0 else 0.0,
+            'bid_wall': self._find_wall(is_bid=True),
+            'ask_wall': self._find_wall(is_bid=False),
+            'last_sweep': self.last_sweep,
+            'last_update_id': self.last_update_id,
+            'updated_at': time.time() if ts is None else ts
+        }
+
+
+class OrderBookManager:
+    """
+    Синхронизация локальных стаканов с diff-depth потоком Binance Futures.
+
+    Правила Binance: события буферизуются до снапшота, события с u < lastUpdateId
+    отбрасываются, первое применяемое событие должно покрывать lastUpdateId
+    (U <= lastUpdateId + 1, u >= lastUpdateId), далее pu каждого события равен u предыдущего.
+    Если снапшот новее всего буфера (обычный случай - снапшот запрашивается
+    после паузы), стакан загружается, но синхронизированным считается только
+    после первого такого покрывающего события из потока.
+    При разрыве последовательности стакан сбрасывается и запрашивается новый снапшот.
+    Сам менеджер сеть не трогает: снапшоты подает владелец (WS клиент или replay).
+    """
+    MAX_BUFFER = 1000
+
+    def __init__(self, symbols: List[str], **book_kwargs):
+        self.books = {s: LocalOrderBook(s, **book_kwargs) for s in symbols}
+        self._buffers: Dict[str, List[Dict]] = {s: [] for s in symbols}
+        self._synced = {s: False for s in symbols}
+        self._awaiting: Dict[str, int] = {}  # Снапшот загружен, ждем покрывающее событие: symbol -> lastUpdateId
+        self.resync_count = {s: 0 for s in symbols}
+
+    def is_synced(self, symbol: str) -> bool:
+        return self._synced.get(symbol, False)
+
+    def needs_snapshot(self, symbol: str) -> bool:
+        return symbol in self.books and not self._synced[symbol] and symbol not in self._awaiting
+
+    def on_depth_event(self, symbol: str, event: Dict):
+        """Обрабатывает depthUpdate (поля U, u, pu, b, a, E)."""
+        book = self.books.get(symbol)
+        if book is None:
+            return
+
+        if symbol in self._awaiting:
+            self._bridge(symbol, event)
+            return
+
+        if not self._synced[symbol]:
+            buffer = self._buffers[symbol]
+            buffer.append(event)
+            if len(buffer) > self.MAX_BUFFER:
+                del buffer[:-self.MAX_BUFFER]
+            return
+
+        if event.get('pu') != book.last_update_id:
+            logger.warning(f"⚠️ [DEPTH] {symbol} sequence gap (pu={event.get('pu')}, last={book.last_update_id}). Resyncing...")
+            self._resync(symbol, event)
+            return
+
+        self._apply(book, event)
+        if book.is_crossed():
+            logger.warning(f"⚠️ [DEPTH] {symbol} crossed book. Resyncing...")
+            self._resync(symbol)
+
+    def on_snapshot(self, symbol: str, snapshot: Dict) -> bool:
+        """Загружает REST снапшот и догоняет буфер. Возвращает True если стакан синхронизирован."""
+        book = self.books.get(symbol)
+        if book is None:
+            return False
+
+        last_id = int(snapshot['lastUpdateId'])
+        pending = [e for e in self._buffers[symbol] if e['u'] >= last_id]
+        if pending and pending[0]['U'] > last_id:
+            # Снапшот старше буфера - нужен более свежий
+            logger.debug(f"[DEPTH] {symbol} snapshot {last_id} is older than buffered events")
+            return False
+
+        book.load_snapshot(snapshot.get('bids', []), snapshot.get('asks', []), last_id)
+        self._buffers[symbol] = []
+        self._awaiting[symbol] = last_id
+
+        for event in pending:
+            self._bridge(symbol, event)
+            if not self._synced[symbol] and symbol not in self._awaiting:
+                return False  # Разрыв в буфере - ждем новый снапшот
+        return self._synced[symbol]
+
+    def _bridge(self, symbol: str, event: Dict):
+        """
+        Событие после загрузки снапшота: до первого покрывающего lastUpdateId
+        (по диапазону U..u, pu здесь не сверяется) стакан не синхронизирован.
+        """
+        book = self.books[symbol]
+        last_id = self._awaiting.get(symbol)
+        if last_id is None:
+            # Покрывающее событие уже применено - дальше обычная цепочка pu
+            if event.get('pu') != book.last_update_id:
+                self._resync(symbol, event)
+                return
+            self._apply(book, event)
+            return
+        if event['u'] < last_id:
+            return  # Уже в снапшоте
+        if event['U'] > last_id + 1:
+            logger.warning(f"⚠️ [DEPTH] {symbol} stream skipped past snapshot {last_id} (U={event['U']}). Resyncing...")
+            self._resync(symbol, event)
+            return
+        del self._awaiting[symbol]
+        self._synced[symbol] = True
+        self._apply(book, event)
+
+    def get_metrics(self, symbol: str) -> Dict:
+        """O(1): готовые метрики синхронизированного стакана или пустой словарь."""
+        if not self._synced.get(symbol):
+            return {}
+        return self.books[symbol].metrics
+
+    def _apply(self, book: LocalOrderBook, event: Dict):
+        ts = event['E'] / 1000 if 'E' in event else None
+        book.apply(event.get('b', []), event.get('a', []), event['u'], ts=ts)
+
+    def _resync(self, symbol: str, event: Optional[Dict] = None):
+        self._synced[symbol] = False
+        self._awaiting.pop(symbol, None)
+        self.books[symbol].clear()
+        self._buffers[symbol] = [event] if event else []
+        self.resync_count[symbol] += 1
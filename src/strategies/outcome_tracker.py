@@ -0,0 +1,301 @@
+# src/strategies/outcome_tracker.py
+"""
+Outcome Tracker - сопровождение выданных сигналов по потоку цен.
+
+Каждый открытый сигнал держит ровно два активных триггера: стоп и следующий TP.
+Триггеры лежат в отсортированных по цене списках символа:
+  - up:   срабатывают, когда цена поднимается до уровня (TP лонга, стоп шорта)
+  - down: срабатывают, когда цена опускается до уровня (стоп лонга, TP шорта)
+На тике снимается только сработавший префикс/суффикс (bisect), остальные
+сигналы не просматриваются. Отмененные триггеры удаляются лениво.
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _symbol_key(symbol: str) -> str:
+    """'BTC/USDT:USDT' -> 'BTCUSDT'"""
+    return symbol.split(':')[0].replace('/', '').upper()
+
+
+@dataclass
+class TrackedSignal:
+    id: int
+    symbol: str
+    regime: str
+    is_long: bool
+    entry: float
+    stop: float
+    take_profits: Tuple[float, ...]
+    opened_at: float
+    expires_at: float
+    tp_hit: int = 0  # Сколько TP уже достигнуто
+    ml_models: Dict[str, float] = field(default_factory=dict)  # Вероятности базовых моделей на момент сигнала
+    ml_version: Optional[int] = None
+    stop_trigger: Optional[int] = None
+    tp_trigger: Optional[int] = None
+
+
+@dataclass
+class OutcomeStats:
+    count: int = 0
+    wins: int = 0
+    losses: int = 0
+    pnl_sum: float = 0.0
+    outcomes: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, outcome: str, profit_pct: float):
+        self.count += 1
+        self.pnl_sum += profit_pct
+        if profit_pct > 0:
+            self.wins += 1
+        elif profit_pct < 0:
+            self.losses += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.wins / self.count if self.count else 0.0,
+            'avg_profit_pct': self.pnl_sum / self.count if self.count else 0.0,
+            'outcomes': dict(self.outcomes),
+        }
+
+
+class _SymbolLevels:
+    """Отсортированные уровни триггеров одного символа."""
+    def __init__(self):
+        self.up: List[Tuple[float, int]] = []    # (price, trigger_id), по возрастанию
+        self.down: List[Tuple[float, int]] = []  # (price, trigger_id), по возрастанию
+
+    def __len__(self):
+        return len(self.up) + len(self.down)
+
+
+class OutcomeTracker:
+    """
+    Следит за исходами EnhancedSignal и пишет их в DynamicRiskManager.record_trade,
+    а исход (TP - 1, SL / EXPIRED - 0) с вероятностями моделей сигнала -
+    в RealMLEngine.record_outcome (онлайн-веса ансамбля). Только для лонгов:
+    модели предсказывают прибыльность лонга, исход шорта - другая цель.
+
+    Правила исхода:
+      - SL до TP1 -> 'SL' (убыток по стопу)
+      - после TP1 стоп переносится в безубыток, сигнал ведется до TP3;
+        исход - последний достигнутый TP ('TP1'/'TP2'/'TP3'), прибыль по его уровню
+      - без касаний за max_hold_seconds -> 'EXPIRED' по текущей цене
+    """
+    def __init__(self, risk_manager=None, max_hold_seconds: float = 48 * 3600, ml_engine=None):
+        self.risk_manager = risk_manager
+        self.ml_engine = ml_engine
+        self.max_hold_seconds = max_hold_seconds
+
+        self.open: Dict[int, TrackedSignal] = {}
+        self._levels: Dict[str, _SymbolLevels] = {}
+        # trigger_id -> (signal_id, kind), kind: 'stop' | 'tp'
+        self._triggers: Dict[int, Tuple[int, str]] = {}
+        self._expiry: List[Tuple[float, int]] = []
+        self._ids = itertools.count(1)
+        self._last_price: Dict[str, float] = {}
+        self._stale = 0  # Отмененные триггеры, еще лежащие в списках уровней
+
+        self.by_symbol: Dict[str, OutcomeStats] = {}
+        self.by_regime: Dict[str, OutcomeStats] = {}
+        self.closed_count = 0
+
+    # === Регистрация ===
+
+    def track(self, signal, regime: Optional[str] = None, ts: Optional[float] = None) -> Optional[int]:
+        """Начинает сопровождение сигнала. Возвращает id или None для нейтральных сигналов."""
+        if 'BUY' in signal.direction:
+            is_long = True
+        elif 'SELL' in signal.direction:
+            is_long = False
+        else:
+            return None
+
+        ts = time.time() if ts is None else ts
+        rationale = signal.rationale or {}
+        regime = regime or rationale.get('regime', 'unknown')
+        tracked = TrackedSignal(
+            id=next(self._ids),
+            symbol=_symbol_key(signal.symbol),
+            regime=regime,
+            is_long=is_long,
+            entry=float(signal.entry_price),
+            stop=float(signal.stop_loss),
+            take_profits=tuple(float(tp) for tp in signal.take_profit),
+            opened_at=ts,
+            expires_at=ts + self.max_hold_seconds,
+            ml_models=dict(rationale.get('ml_models') or {}),
+            ml_version=rationale.get('ml_version')
+        )
+        self.open[tracked.id] = tracked
+        self._levels.setdefault(tracked.symbol, _SymbolLevels())
+        self._arm(tracked)
+        heapq.heappush(self._expiry, (tracked.expires_at, tracked.id))
+        return tracked.id
+
+    def _arm(self, sig: TrackedSignal):
+        """Ставит триггеры стопа и следующего TP (старые становятся недействительными)."""
+        self._cancel_triggers(sig)
+
+        levels = self._levels.setdefault(sig.symbol, _SymbolLevels())
+        sig.stop_trigger = self._add_trigger(levels.down if sig.is_long else levels.up, sig.stop, sig.id, 'stop')
+        if sig.tp_hit < len(sig.take_profits):
+            tp = sig.take_profits[sig.tp_hit]
+            sig.tp_trigger = self._add_trigger(levels.up if sig.is_long else levels.down, tp, sig.id, 'tp')
+        else:
+            sig.tp_trigger = None
+
+    def _cancel_triggers(self, sig: TrackedSignal):
+        for trigger in (sig.stop_trigger, sig.tp_trigger):
+            if self._triggers.pop(trigger, None) is not None:
+                self._stale += 1
+        sig.stop_trigger = sig.tp_trigger = None
+        # Уровни закрытых сигналов могут годами не пересекаться ценой - периодически чистим
+        if self._stale > 1024 and self._stale > len(self._triggers):
+            self._compact()
+
+    def _compact(self):
+        for key in list(self._levels):
+            levels = self._levels[key]
+            levels.up = [lvl for lvl in levels.up if lvl[1] in self._triggers]
+            levels.down = [lvl for lvl in levels.down if lvl[1] in self._triggers]
+            if not levels:
+                del self._levels[key]
+        self._stale = 0
+
+    def _add_trigger(self, side: List, price: float, signal_id: int, kind: str) -> int:
+        trigger_id = next(self._ids)
+        self._triggers[trigger_id] = (signal_id, kind)
+        bisect.insort(side, (price, trigger_id))
+        return trigger_id
+
+    # === Поток цен ===
+
+    def on_price(self, symbol: str, price: float, ts: Optional[float] = None,
+                 low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """
+        Обрабатывает тик (или диапазон low/high свечи). Возвращает число закрытых сигналов.
+        Сложность - O(k log n) по числу сработавших триггеров, а не открытых сигналов.
+        """
+        ts = time.time() if ts is None else ts
+        key = _symbol_key(symbol)
+        self._last_price[key] = price
+        low = price if low is None else low
+        high = price if high is None else high
+        closed = 0
+
+        levels = self._levels.get(key)
+        if levels:
+            fired: Dict[int, List[str]] = {}
+            # up: все уровни <= high (префикс), down: все уровни >= low (суффикс)
+            cut_up = bisect.bisect_right(levels.up, (high, float('inf')))
+            cut_down = bisect.bisect_left(levels.down, (low, -1))
+            hits = levels.up[:cut_up] + levels.down[cut_down:]
+            del levels.up[:cut_up]
+            del levels.down[cut_down:]
+            for _, trigger_id in hits:
+                self._collect(trigger_id, fired)
+
+            for signal_id, kinds in fired.items():
+                sig = self.open[signal_id]
+                closed += self._on_fired(sig, kinds, high if sig.is_long else low, ts)
+
+            current = self._levels.get(key)
+            if current is not None and not current:
+                del self._levels[key]
+
+        closed += self._expire(ts)
+        return closed
+
+    def _collect(self, trigger_id: int, fired: Dict[int, List[str]]):
+        entry = self._triggers.pop(trigger_id, None)
+        if entry is None:
+            return  # Ленивое удаление: триггер уже отменен
+        signal_id, kind = entry
+        fired.setdefault(signal_id, []).append(kind)
+
+    def _on_fired(self, sig: TrackedSignal, kinds: List[str], best_price: float, ts: float) -> int:
+        if 'stop' in kinds:
+            # Стоп и TP в одном диапазоне - консервативно считаем стоп
+            if sig.tp_hit == 0:
+                self._close(sig, 'SL', self._profit(sig, sig.stop))
+            else:
+                self._close(sig, f'TP{sig.tp_hit}', self._profit(sig, sig.take_profits[sig.tp_hit - 1]))
+            return 1
+
+        # Достигнут TP: проверяем, сколько уровней пройдено этим тиком
+        sig.tp_hit += 1
+        while sig.tp_hit < len(sig.take_profits) and self._reached(sig, sig.take_profits[sig.tp_hit], best_price):
+            sig.tp_hit += 1
+        if sig.tp_hit >= len(sig.take_profits):
+            self._close(sig, f'TP{sig.tp_hit}', self._profit(sig, sig.take_profits[-1]))
+            return 1
+
+        # Стоп в безубыток и следующий TP
+        sig.stop = sig.entry
+        self._arm(sig)
+        return 0
+
+    @staticmethod
+    def _reached(sig: TrackedSignal, level: float, price: float) -> bool:
+        return price >= level if sig.is_long else price <= level
+
+    @staticmethod
+    def _profit(sig: TrackedSignal, exit_price: float) -> float:
+        move = (exit_price - sig.entry) / sig.entry
+        return move if sig.is_long else -move
+
+    def _expire(self, ts: float) -> int:
+        closed = 0
+        while self._expiry and self._expiry[0][0] <= ts:
+            _, signal_id = heapq.heappop(self._expiry)
+            sig = self.open.get(signal_id)
+            if sig is None:
+                continue
+            if sig.tp_hit:
+                self._close(sig, f'TP{sig.tp_hit}', self._profit(sig, sig.take_profits[sig.tp_hit - 1]))
+            else:
+                price = self._last_price.get(sig.symbol, sig.entry)
+                self._close(sig, 'EXPIRED', self._profit(sig, price))
+            closed += 1
+        return closed
+
+    def _close(self, sig: TrackedSignal, outcome: str, profit_pct: float):
+        self.open.pop(sig.id, None)
+        self._cancel_triggers(sig)
+
+        self.by_symbol.setdefault(sig.symbol, OutcomeStats()).add(outcome, profit_pct)
+        self.by_regime.setdefault(sig.regime, OutcomeStats()).add(outcome, profit_pct)
+        self.closed_count += 1
+
+        if self.risk_manager:
+            self.risk_manager.record_trade(sig.symbol, profit_pct, regime=sig.regime)
+        if self.ml_engine and sig.ml_models and sig.is_long:
+            self.ml_engine.record_outcome(sig.ml_models, int(outcome.startswith('TP')), version=sig.ml_version)
+        logger.info(f"🏁 [OUTCOME] {sig.symbol} {'LONG' if sig.is_long else 'SHORT'} -> {outcome} ({profit_pct:+.2%})")
+
+    # === Статистика ===
+
+    def get_stats(self, symbol: Optional[str] = None, regime: Optional[str] = None) -> Dict:
+        if symbol:
+            return self.by_symbol.get(_symbol_key(symbol), OutcomeStats()).to_dict()
+        if regime:
+            return self.by_regime.get(regime, OutcomeStats()).to_dict()
+        return {
+            'open': len(self.open),
+            'closed': self.closed_count,
+            'by_symbol': {k: v.to_dict() for k, v in self.by_symbol.items()},
+            'by_regime': {k: v.to_dict() for k, v in self.by_regime.items()},
+        }
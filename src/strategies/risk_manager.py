@@ -1,9 +1,10 @@
 # src/strategies/risk_manager.py
 from collections import deque
+from datetime import datetime
 import numpy as np
 from src.core.settings import settings
 import logging
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +14,13 @@ class DynamicRiskManager:
         # Initial stats for calculation
         self.win_loss_stats = {'avg_win': 0.02, 'avg_loss': -0.01, 'count': 0}
         
-    def record_trade(self, symbol: str, profit_pct: float):
-        """Record trade for statistics"""
+    def record_trade(self, symbol: str, profit_pct: float, regime: Optional[str] = None):
+        """Record trade for statistics (called by OutcomeTracker on every closed signal)"""
         self.trade_history.append({
             'symbol': symbol,
-            'timestamp': None, # Can add datetime.now()
-            'profit_pct': profit_pct
+            'timestamp': datetime.now(),
+            'profit_pct': profit_pct,
+            'regime': regime
         })
         
         if profit_pct > 0:
@@ -89,53 +91,61 @@ class DynamicRiskManager:
             'win_loss_ratio': win_loss_ratio
         }
 
-    def calculate_dynamic_levels(self, entry_price: float, atr: float, volatility: float, 
-                                 trend_direction: str, adx: float = 20.0, 
-                                 phase: str = 'markup', crisis_mode: bool = False, **kwargs) -> Dict:
+    # Множители TP от стоп-дистанции (TP1-3)
+    TP_MULTIPLES = (1.5, 3.0, 6.0)
+
+    @classmethod
+    def level_distances(cls, entry_price, atr, volatility, adx=20.0, phase='markup', crisis_mode=False):
         """
-        Advanced dynamic level calculation ported from SignalPro Alpha.
-        Uses ADX for trend tightening and Market Phase for buffers.
+        Дистанции стопа и TP1-3 от входа - формулы calculate_dynamic_levels.
+        Принимает скаляры или numpy массивы (векторная разметка истории, label_engine).
+
+        Returns:
+            (stop_distance, (tp1_dist, tp2_dist, tp3_dist))
         """
+        entry_price, atr, adx = np.asarray(entry_price, dtype=float), np.asarray(atr, dtype=float), np.asarray(adx, dtype=float)
+        volatility, phase, crisis_mode = np.asarray(volatility), np.asarray(phase), np.asarray(crisis_mode, dtype=bool)
+
         # 1. STOP-LOSS (SL) CALCULATION
         # Base multiplier based on volatility state
-        if volatility == 'high':
-            base_multiplier = 3.2
-        elif volatility == 'medium':
-            base_multiplier = 2.4
-        else: # low
-            base_multiplier = 1.8
-            
-        if crisis_mode:
-            base_multiplier = 4.5
+        base_multiplier = np.where(volatility == 'high', 3.2, np.where(volatility == 'medium', 2.4, 1.8))
+        base_multiplier = np.where(crisis_mode, 4.5, base_multiplier)
 
         # Trend tightening based on ADX (stronger trend = tighter stops)
-        trend_tightening = 0.85 if adx > 30 else (0.95 if adx > 20 else 1.15)
-        
+        trend_tightening = np.where(adx > 30, 0.85, np.where(adx > 20, 0.95, 1.15))
+
         # Phase buffer (wider stops during accumulation/distribution)
-        phase_buffer = 1.2 if phase in ['accumulation', 'distribution'] else 1.0
-        if crisis_mode:
-            phase_buffer *= 1.4
+        phase_buffer = np.where(np.isin(phase, ['accumulation', 'distribution']), 1.2, 1.0)
+        phase_buffer = np.where(crisis_mode, phase_buffer * 1.4, phase_buffer)
 
-        final_sl_multiplier = base_multiplier * trend_tightening * phase_buffer
-        stop_dist = atr * final_sl_multiplier
-        
+        stop_dist = atr * base_multiplier * trend_tightening * phase_buffer
         # Minimum stop loss (0.5%)
-        min_stop = entry_price * 0.005
-        stop_distance = max(min_stop, stop_dist)
-        
-        is_long = trend_direction == 'long'
-        sl_price = entry_price - stop_distance if is_long else entry_price + stop_distance
+        stop_distance = np.maximum(entry_price * 0.005, stop_dist)
 
         # 2. TAKE-PROFIT (TP) CALCULATION
         # TP Expansion based on ADX
-        tp_expansion = 1.6 if adx > 35 else (1.2 if adx > 20 else 0.9)
-        if phase in ['markup', 'markdown']:
-            tp_expansion *= 1.25
-        
+        tp_expansion = np.where(adx > 35, 1.6, np.where(adx > 20, 1.2, 0.9))
+        tp_expansion = np.where(np.isin(phase, ['markup', 'markdown']), tp_expansion * 1.25, tp_expansion)
+
         # Original 3-level TP logic but with expansion
-        tp1_dist = stop_distance * 1.5 * tp_expansion
-        tp2_dist = stop_distance * 3.0 * tp_expansion
-        tp3_dist = stop_distance * 6.0 * tp_expansion
+        tp_distances = tuple(stop_distance * multiple * tp_expansion for multiple in cls.TP_MULTIPLES)
+        if stop_distance.ndim == 0:
+            return float(stop_distance), tuple(float(d) for d in tp_distances)
+        return stop_distance, tp_distances
+
+    def calculate_dynamic_levels(self, entry_price: float, atr: float, volatility: float, 
+                                 trend_direction: str, adx: float = 20.0, 
+                                 phase: str = 'markup', crisis_mode: bool = False, **kwargs) -> Dict:
+        """
+        Advanced dynamic level calculation ported from SignalPro Alpha.
+        Uses ADX for trend tightening and Market Phase for buffers.
+        """
+        stop_distance, (tp1_dist, tp2_dist, tp3_dist) = self.level_distances(
+            entry_price, atr, volatility, adx, phase, crisis_mode
+        )
+        
+        is_long = trend_direction == 'long'
+        sl_price = entry_price - stop_distance if is_long else entry_price + stop_distance
 
         if is_long:
             tp1 = entry_price + tp1_dist
@@ -0,0 +1,175 @@
+# src/strategies/scan_pipeline.py
+"""
+Scan Pipeline - конвейерный скан пар: fetch -> compute -> rank.
+
+У каждой стадии свой лимит параллелизма:
+  - fetch:   сетевые запросы (лимиты бирж, потоки ccxt)
+  - compute: анализ индикаторов/модели
+  - rank:    один потребитель с потоковым top-N
+Очередь между fetch и compute ограничена, поэтому загруженные, но еще
+не обработанные данные не копятся в памяти.
+
+StreamingTopN публикует сигнал, как только он гарантированно останется
+в итоговом top-N: ни одна из еще не обработанных пар не может его обойти.
+"""
+import asyncio
+import heapq
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingTopN:
+    """
+    Потоковый top-N по score. При равных score выше пара с меньшим порядковым
+    номером - тот же порядок, что у sorted(..., reverse=True) по исходному списку.
+
+    Args:
+        top_n: размер итоговой выборки
+        total: число ожидаемых элементов (порядковые номера 0..total-1)
+        max_score: верхняя граница score (например, потолок confidence) -
+            элемент с таким score уже нельзя обойти
+    """
+    def __init__(self, top_n: int, total: int, max_score: float = 1.0):
+        self.top_n = top_n
+        self.total = total
+        self.max_score = max_score
+
+        self._heap: List[Tuple[float, int, Any]] = []  # min-heap по (score, -order)
+        self._done = [False] * total
+        self._next_pending = 0  # Минимальный порядковый номер еще не обработанной пары
+        self._published: set = set()
+
+    def add(self, order: int, score: Optional[float] = None, item: Any = None) -> List[Any]:
+        """
+        Отмечает пару order обработанной (score=None - без сигнала).
+        Возвращает элементы, которые только что стали гарантированными.
+        """
+        if order < self.total and not self._done[order]:
+            self._done[order] = True
+            while self._next_pending < self.total and self._done[self._next_pending]:
+                self._next_pending += 1
+
+        if score is not None and self.top_n > 0:
+            entry = (score, -order, item)
+            if len(self._heap) < self.top_n:
+                heapq.heappush(self._heap, entry)
+            elif entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+        return self._pop_certain()
+
+    def _is_certain(self, score: float, order: int) -> bool:
+        if self._next_pending >= self.total:
+            return True
+        # Лучший возможный ключ необработанной пары: (max_score, -next_pending)
+        return (score, -order) > (self.max_score, -self._next_pending)
+
+    def _pop_certain(self) -> List[Any]:
+        fresh = []
+        for score, neg_order, item in sorted(self._heap, reverse=True):
+            if -neg_order in self._published:
+                continue
+            if not self._is_certain(score, -neg_order):
+                break  # Следующие по рангу ниже - тоже не гарантированы
+            self._published.add(-neg_order)
+            fresh.append(item)
+        return fresh
+
+    @property
+    def complete(self) -> bool:
+        """Все места top-N заняты гарантированными элементами - скан можно завершать."""
+        return len(self._published) >= self.top_n
+
+    def results(self) -> List[Any]:
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
+
+
+class PipelinedScanner:
+    """
+    Args:
+        fetch: async fetch(pair) -> data | None
+        compute: async compute(pair, data) -> (score, item) | None
+        fetch_concurrency: одновременных загрузок
+        compute_concurrency: одновременных анализов
+    """
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]],
+                 compute: Callable[[str, Any], Awaitable[Optional[Tuple[float, Any]]]],
+                 fetch_concurrency: int = 16, compute_concurrency: int = 4):
+        self.fetch = fetch
+        self.compute = compute
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.compute_concurrency = max(1, compute_concurrency)
+
+    async def scan(self, pairs: List[str], top_n: int, max_score: float = 1.0,
+                   on_signal: Optional[Callable[[Any], Awaitable[None]]] = None) -> Tuple[List[Any], Dict]:
+        """
+        Прогоняет пары через конвейер. on_signal вызывается для каждого элемента
+        итогового top-N ровно один раз - как только он гарантирован.
+        Возвращает (top-N по убыванию score, статистика).
+        """
+        ranker = StreamingTopN(top_n, len(pairs), max_score)
+        stats = {'pairs': len(pairs), 'processed': 0, 'signals': 0, 'errors': 0, 'published_early': 0}
+        if not pairs:
+            return [], stats
+
+        pair_queue: asyncio.Queue = asyncio.Queue()
+        for order, pair in enumerate(pairs):
+            pair_queue.put_nowait((order, pair))
+        compute_queue: asyncio.Queue = asyncio.Queue(maxsize=self.compute_concurrency * 2)
+        rank_queue: asyncio.Queue = asyncio.Queue()
+
+        async def fetch_worker():
+            while True:
+                try:
+                    order, pair = pair_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    data = await self.fetch(pair)
+                except Exception as e:
+                    logger.warning(f"⚠️ [SCAN] Fetch failed for {pair}: {e}")
+                    stats['errors'] += 1
+                    data = None
+                if data:
+                    await compute_queue.put((order, pair, data))
+                else:
+                    await rank_queue.put((order, None))
+
+        async def compute_worker():
+            while True:
+                order, pair, data = await compute_queue.get()
+                try:
+                    result = await self.compute(pair, data)
+                except Exception as e:
+                    logger.warning(f"⚠️ [SCAN] Compute failed for {pair}: {e}")
+                    stats['errors'] += 1
+                    result = None
+                await rank_queue.put((order, result))
+
+        workers = [asyncio.create_task(fetch_worker()) for _ in range(self.fetch_concurrency)]
+        workers += [asyncio.create_task(compute_worker()) for _ in range(self.compute_concurrency)]
+        try:
+            while stats['processed'] < len(pairs):
+                order, result = await rank_queue.get()
+                stats['processed'] += 1
+                if result is None:
+                    fresh = ranker.add(order)
+                else:
+                    stats['signals'] += 1
+                    score, item = result
+                    fresh = ranker.add(order, score, item)
+
+                if stats['processed'] < len(pairs):
+                    stats['published_early'] += len(fresh)
+                if on_signal:
+                    for item in fresh:
+                        await on_signal(item)
+                if ranker.complete:
+                    break  # Оставшиеся пары уже не могут попасть в top-N
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return ranker.results(), stats
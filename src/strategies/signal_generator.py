@@ -34,6 +34,8 @@ class SignalGenerator:
         self.pattern_validator = PatternValidator({}) # Load history on start
         
         self.signal_cache = {}
+        self.cache_version = 0  # Растет при каждом изменении signal_cache (версия кеша ответов API)
+        self.updated_at: Optional[datetime] = None  # Время последнего изменения signal_cache
 
     async def analyze_symbol(self, symbol: str, multi_tf_data: Dict[str, pd.DataFrame], target_timeframe: str = None) -> Optional[EnhancedSignal]:
         """Analyze symbol for a specific timeframe. If no target_timeframe specified, use primary_timeframe."""
@@ -100,6 +102,8 @@ class SignalGenerator:
             )
             
             self.signal_cache[cache_key] = (final_signal, datetime.now())
+            self.cache_version += 1
+            self.updated_at = self.signal_cache[cache_key][1]
             return final_signal
         except Exception as e:
             logger.exception(f"Signal Gen Error {symbol} ({timeframe}): {e}")
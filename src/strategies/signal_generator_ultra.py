@@ -19,9 +19,10 @@ from src.strategies.adaptive_indicators import ImprovedAdaptiveIndicatorEngine
 from src.strategies.risk_manager import DynamicRiskManager
 
 # Новые Ultra компоненты
-from src.strategies.ml_engine_real import RealMLEngine
+from src.strategies.ml_engine_real import SMART_MONEY_INPUTS, RealMLEngine
 from src.strategies.smart_money_analyzer import SmartMoneyAnalyzer
 from src.strategies.advanced_features import AdvancedFeatureEngineer
+from src.strategies.feature_audit import FeatureCostMeter
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,9 @@ class UltraSignalGenerator:
     - Строгий порог 0.85 (только топ 10-15% сигналов)
     - Фильтр по ADX (нет слабых трендов)
     """
+    # Фичи, которые собирает generate_signal помимо AdvancedFeatureEngineer
+    PIPELINE_FEATURES = ('rsi', 'atr', 'adx', 'funding_rate', 'liq_ratio', 'oi_change_1h', 'oi_change_4h')
+
     def __init__(self, exchange_connector, ws_client=None):
         self.exchange = exchange_connector
         self.config = settings
@@ -52,95 +56,69 @@ class UltraSignalGenerator:
             hyblock_key=getattr(settings, 'hyblock_api_key', ''),
             ws_client=ws_client
         )
-        self.advanced_features = AdvancedFeatureEngineer()
+        # Время расчета каждой фичи -> data/feature_costs.json (train_models.py --audit)
+        self.feature_costs = FeatureCostMeter(settings.feature_costs_path)
+        self.advanced_features = AdvancedFeatureEngineer(cost_meter=self.feature_costs)
         
         self.signal_cache = {}
+        self.cache_version = 0  # Растет при каждом изменении signal_cache (версия кеша ответов API)
+        self.updated_at: Optional[datetime] = None  # Время последнего изменения signal_cache
         
         # Ultra настройки
         self.ULTRA_MIN_CONFIDENCE = getattr(settings, 'ultra_min_confidence', 0.55)
         self.MIN_ADX_THRESHOLD = 15
         logger.info(f"🚀 [INIT] Ultra Mode active. Threshold: {self.ULTRA_MIN_CONFIDENCE:.2%}, ADX: {self.MIN_ADX_THRESHOLD}")
         
-        # Валидация фич (критично для ML)
+        # Валидация фич (критично для ML); повторяется при смене версии моделей
+        self._feature_universe = None
+        self._validated_version = None
         self._validate_feature_consistency()
 
-    def _validate_feature_consistency(self):
+    def _available_features(self) -> set:
+        """Все фичи, которые production умеет считать (без фильтра схемы моделей)"""
+        sample_df = pd.DataFrame({
+            'close': np.random.randn(200) + 50000,
+            'high': np.random.randn(200) + 50100,
+            'low': np.random.randn(200) + 49900,
+            'volume': np.random.randint(1000, 10000, 200)
+        })
+        # Без cost_meter: пробный расчет не должен попадать в замеры стоимости фич
+        engineer = AdvancedFeatureEngineer()
+        return (set(engineer.create_advanced_features(sample_df)) |
+                set(engineer.create_price_features(sample_df)) | set(self.PIPELINE_FEATURES))
+
+    def _validate_feature_consistency(self) -> bool:
         """
-        Проверяет, что фичи в production совпадают с обученными.
-        Это критично для корректности ML predictions.
+        Проверяет, что production умеет считать все фичи схемы загруженных моделей.
+        Схема может быть подмножеством (урезанный feature audit'ом набор).
+        Повторяется при каждой смене версии моделей (hot reload, публикация).
         """
-        import joblib
-        import os
+        self._validated_version = self.ml_engine.version
+        trained_features = set(self.ml_engine.feature_columns)
         
-        feature_path = f"{self.ml_engine.model_path}features.pkl"
-        
-        if not os.path.exists(feature_path):
+        if not trained_features:
             logger.warning("⚠️  No trained models found. ML will return neutral predictions.")
             logger.warning("   Run: python train_models.py")
-            return
+            return False
         
         try:
-            trained_features = joblib.load(feature_path)
-            
-            # Генерируем sample фичи для проверки
-            import pandas as pd
-            import numpy as np
-            sample_df = pd.DataFrame({
-                'close': np.random.randn(200) + 50000,
-                'high': np.random.randn(200) + 50100,
-                'low': np.random.randn(200) + 49900,
-                'volume': np.random.randint(1000, 10000, 200)
-            })
-            
-            adv_features = self.advanced_features.create_advanced_features(sample_df)
-            current_features = list(adv_features.keys()) + [
-                'rsi', 'atr', 'adx', 'sma_20', 'sma_50', 'volume_ratio',
-                'funding_rate', 'liq_ratio'
-            ]
-            test_features = {
-                **adv_features,
-                'rsi': 50.0,
-                'atr': 0.01,
-                'adx': 25.0,
-                'sma_20': 1.0,
-                'sma_50': 1.0,
-                'volume_ratio': 1.0,
-                'source': 'mock',
-                'is_mock': True
-            }
-            
-            # Check for EXACT match with model expectations
-            if set(current_features) != set(trained_features):
-                missing = set(trained_features) - set(current_features)
-                extra = set(current_features) - set(trained_features)
-                logger.error(f"❌ Feature mismatch! Missing: {missing}, Extra: {extra}")
-                # We don't assert to prevent crash, but we log loudly
-            else:
-                logger.info("✅ ML Feature schema synchronized")
-            logger.info(f"🔍 Feature schema: {len(current_features)} total features")
-            
-            # Проверка совпадения
-            trained_set = set(trained_features)
-            current_set = set(current_features)
-            
-            if trained_set != current_set:
-                missing = trained_set - current_set
-                extra = current_set - trained_set
-                
-                error_msg = "❌ FEATURE MISMATCH! Models were trained on different features.\n"
-                if missing:
-                    error_msg += f"   Missing in production: {missing}\n"
-                if extra:
-                    error_msg += f"   Extra in production: {extra}\n"
-                error_msg += "   Solution: Re-train models with 'python train_models.py'"
-                
-                logger.error(error_msg)
-                raise ValueError("Feature schema mismatch. Retrain models!")
-            
-            logger.info(f"✅ Feature validation passed: {len(trained_features)} features")
-            
+            if self._feature_universe is None:
+                self._feature_universe = self._available_features()
+            missing = trained_features - self._feature_universe
+            if missing:
+                logger.error(f"❌ FEATURE MISMATCH! Models v{self._validated_version} expect features "
+                             f"production does not compute: {sorted(missing)}\n"
+                             f"   Solution: Re-train models with 'python train_models.py'")
+                return False
+            logger.info(f"✅ Feature validation passed: models v{self._validated_version} use "
+                        f"{len(trained_features)} of {len(self._feature_universe)} features")
+            if self.ml_engine.smart_money_inputs < SMART_MONEY_INPUTS:
+                logger.warning("⚠️  Models predate MetricsStore smart money features: liq_ratio is held at 1.0 "
+                               "and OI change is not used until they are retrained (python train_models.py)")
+            return True
         except Exception as e:
             logger.warning(f"⚠️  Feature validation failed: {e}")
+            return False
 
     async def generate_signal(self, symbol: str, timeframe: str = '1h', arbitrage_spread: float = 0.0) -> Optional[EnhancedSignal]:
         """
@@ -201,7 +179,11 @@ class UltraSignalGenerator:
                 return None
 
             # === ШАГ 3: ПРОДВИНУТЫЕ ФИЧИ ===
-            adv_features = self.advanced_features.create_advanced_features(primary_data)
+            if self.ml_engine.version != self._validated_version:
+                self._validate_feature_consistency()  # Модели перезагружены - новая схема
+            # Только фичи схемы загруженных моделей (отрезанные feature audit'ом не считаются)
+            model_features = set(self.ml_engine.feature_columns) or None
+            adv_features = self.advanced_features.create_advanced_features(primary_data, features=model_features)
             
             # === ШАГ 4: SMART MONEY ANALYSIS (MOVING UP) ===
             current_price = primary_data['close'].iloc[-1]
@@ -216,19 +198,27 @@ class UltraSignalGenerator:
                 'rsi': float(indicators['rsi'].iloc[-1]) if len(indicators['rsi']) > 0 else 50.0,
                 'atr': float(indicators['atr'].iloc[-1]) / current_price if len(indicators['atr']) > 0 else 0.01,
                 'adx': float(adx),
-                'sma_20': (primary_data['close'].rolling(20).mean().iloc[-1] / current_price) if len(primary_data) >= 20 else 1.0,
-                'sma_50': (primary_data['close'].rolling(50).mean().iloc[-1] / current_price) if len(primary_data) >= 50 else 1.0,
-                'volume_ratio': primary_data['volume'].iloc[-1] / primary_data['volume'].rolling(20).mean().iloc[-1] if len(primary_data) >= 20 else 1.0,
+                **self.advanced_features.create_price_features(primary_data, features=model_features),
                 'funding_rate': float(sm_metrics.get('funding_rate', 0.0)),
                 'liq_ratio': float(sm_metrics.get('liq_ratio', 1.0)),
+                'oi_change_1h': float(sm_metrics.get('oi_change_1h', 0.0)),
+                'oi_change_4h': float(sm_metrics.get('oi_change_4h', 0.0)),
                 # 'arbitrage_spread': float(arbitrage_spread) # DISABLED: Schema mismatch. Used as post-boost only.
             }
+            # Оконные ликвидации (1m/5m/1h/4h) - кандидаты в фичи.
+            # predict_probability берет только колонки обученной схемы, лишние ключи игнорируются.
+            for name, value in sm_metrics.get('liq_features', {}).items():
+                ml_features.setdefault(name, float(value))
+            if self.ml_engine.smart_money_inputs < SMART_MONEY_INPUTS:
+                # Модели обучены на liq_ratio=1.0 - реальное значение для них вне распределения
+                ml_features['liq_ratio'] = 1.0
             
             # Diagnostic Log
             logger.info(f"📊 [ML-FEATURES] {symbol}: SM_Funding={ml_features['funding_rate']:.5f}, LiqRatio={ml_features['liq_ratio']:.2f}, ADX={ml_features['adx']:.1f}")
             
             # === ШАГ 5: РЕАЛЬНЫЙ ML PREDICTION ===
-            ml_prob = self.ml_engine.predict_probability(ml_features)
+            ml_version = self.ml_engine.version
+            ml_prob, ml_models = self.ml_engine.predict_components(ml_features, regime=regime, symbol=symbol)
 
             # === ШАГ 6: СИНТЕЗ УВЕРЕННОСТИ ===
             # Формула: 30% TA + 40% ML + 30% Smart Money
@@ -307,6 +297,8 @@ class UltraSignalGenerator:
                 rationale={
                     'ta_score': ta_score,
                     'ml_probability': float(ml_prob) if ml_prob is not None else 0.5,
+                    'ml_models': ml_models,  # Вероятности базовых моделей -> OutcomeTracker -> онлайн-веса
+                    'ml_version': ml_version,
                     'smart_money': sm_context['rationale'],
                     'regime': regime.trend,
                     'volatility': regime.volatility,
@@ -329,6 +321,8 @@ class UltraSignalGenerator:
             )
             
             self.signal_cache[cache_key] = (final_signal, datetime.now())
+            self.cache_version += 1
+            self.updated_at = self.signal_cache[cache_key][1]
             
             logger.info(
                 f"🚀 [ULTRA SIGNAL] {symbol} ({timeframe}) | "
@@ -3,13 +3,16 @@
 Smart Money Analyzer - детектор институциональных движений.
 Анализ: Liquidity Sweeps, Funding Rates, Order Flow.
 Data Source: Binance WebSocket (Primary), REST Fallback.
+Liquidity: rolling liquidations + local L2 order book (diff-depth WebSocket).
 DefiLlama: DISABLED (using neutral fallback 0.95).
 """
-import aiohttp
 import logging
+import time
 import numpy as np
 from typing import Dict, Optional
 
+from src.services.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 class SmartMoneyAnalyzer:
@@ -17,6 +20,9 @@ class SmartMoneyAnalyzer:
     Ан​ализатор "Умных денег" (институциональная ликвидность).
     Стратегия: Liquidity Sweeps + Funding Rate Contrairan.
     """
+    BOOK_IMBALANCE_THRESHOLD = 0.3   # |imbalance| глубины ±1%
+    WALL_BLOCK_DISTANCE_PCT = 0.5    # Стена ближе 0.5% по ходу сделки
+    SWEEP_TTL_SECONDS = 300          # Sweep учитывается 5 минут
     def __init__(self, coinglass_key: str = "", hyblock_key: str = "", ws_client = None):
         self.coinglass_key = coinglass_key
         self.hyblock_key = hyblock_key
@@ -25,13 +31,49 @@ class SmartMoneyAnalyzer:
         
     async def _ensure_session(self):
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = http_client.session('smart_money')
 
     async def get_liquidity_data(self, symbol: str) -> Dict:
         """
-        [TEMPORARILY DISABLED] Возвращает нейтральные данные.
+        Ликвидность из WebSocket: ликвидации за скользящее окно (LiquidationLedger)
+        + глубина локального стакана (OrderBookManager). Чтение O(1).
+        Без WebSocket - нейтральные данные.
         """
-        return self._get_mock_liquidity(symbol)
+        liq_data = self._get_mock_liquidity(symbol)
+        if not self.ws_client:
+            return liq_data
+
+        window = self.ws_client.get_liquidations(symbol)
+        if window:
+            liq_data.update({
+                # forceOrder SELL закрывает лонги, BUY - шорты
+                'total_long_liq_usd': window['sell_usd'],
+                'total_short_liq_usd': window['buy_usd'],
+                'liq_volume_ratio': window['ratio'],
+                'liq_count': window['buy_count'] + window['sell_count'],
+                'is_mock': False
+            })
+
+        book = self.ws_client.get_order_book_metrics(symbol)
+        if book and book.get('mid', 0) > 0:
+            mid = book['mid']
+            bid_wall, ask_wall = book.get('bid_wall'), book.get('ask_wall')
+            # Пулы ликвидности: стоп-ордера шортов над ask-стеной, лонгов под bid-стеной
+            short_liq_price = ask_wall['price'] if ask_wall else mid * (1 + book['depth_pct'] / 100)
+            long_liq_price = bid_wall['price'] if bid_wall else mid * (1 - book['depth_pct'] / 100)
+            liq_data.update({
+                'short_liq_price': short_liq_price,
+                'long_liq_price': long_liq_price,
+                'liquidity_gap': (short_liq_price - long_liq_price) / mid * 100,
+                'book_imbalance': book['imbalance'],
+                'bid_depth_usd': book['bid_depth_usd'],
+                'ask_depth_usd': book['ask_depth_usd'],
+                'bid_wall': bid_wall,
+                'ask_wall': ask_wall,
+                'last_sweep': book.get('last_sweep'),
+                'has_order_book': True
+            })
+        return liq_data
 
     def _get_mock_liquidity(self, symbol: str) -> Dict:
         """Фолбэк на мок-данные"""
@@ -39,6 +81,14 @@ class SmartMoneyAnalyzer:
             'total_long_liq_usd': 0.0,
             'total_short_liq_usd': 0.0,
             'liq_volume_ratio': 0.95, # Neutral/Slightly Bearish Fallback
+            'short_liq_price': 0.0,
+            'long_liq_price': 0.0,
+            'liquidity_gap': 0.0,
+            'book_imbalance': 0.0,
+            'bid_wall': None,
+            'ask_wall': None,
+            'last_sweep': None,
+            'has_order_book': False,
             'is_mock': True
         }
 
@@ -56,6 +106,9 @@ class SmartMoneyAnalyzer:
                     'open_interest': ws_data['open_interest'],
                     'long_short_ratio': 1.0, 
                     'liq_ratio': ws_data['liq_ratio'],
+                    'liq_features': ws_data.get('liq_features', {}),
+                    'oi_change_1h': ws_data.get('oi_change_1h', 0.0),
+                    'oi_change_4h': ws_data.get('oi_change_4h', 0.0),
                     'source': 'websocket',
                     'is_mock': False
                 }
@@ -132,6 +185,32 @@ class SmartMoneyAnalyzer:
             score_boost += 0.10
             rationale['liquidity'] = 'HIGH_LONG_LIQUIDATION_POTENTIAL'
             
+        # === 1b. ORDER BOOK DEPTH (Local L2 book) ===
+        if liq_data.get('has_order_book'):
+            imbalance = liq_data.get('book_imbalance', 0.0)
+            if imbalance > self.BOOK_IMBALANCE_THRESHOLD and direction == 'BUY':
+                score_boost += 0.05
+                rationale['order_book'] = 'BID_DEPTH_DOMINANT'
+            elif imbalance < -self.BOOK_IMBALANCE_THRESHOLD and direction == 'SELL':
+                score_boost += 0.05
+                rationale['order_book'] = 'ASK_DEPTH_DOMINANT'
+
+            # Стена прямо по ходу сделки - риск отката
+            blocking_wall = liq_data.get('ask_wall') if direction == 'BUY' else liq_data.get('bid_wall')
+            if blocking_wall and blocking_wall['distance_pct'] < self.WALL_BLOCK_DISTANCE_PCT:
+                score_boost -= 0.05
+                rationale['wall'] = 'ASK_WALL_AHEAD' if direction == 'BUY' else 'BID_WALL_AHEAD'
+
+            # Liquidity sweep против направления сделки = сбор стопов перед разворотом
+            sweep = liq_data.get('last_sweep')
+            if sweep and time.time() - sweep['ts'] < self.SWEEP_TTL_SECONDS:
+                if sweep['direction'] == 'down' and direction == 'BUY':
+                    score_boost += 0.05
+                    rationale['sweep'] = 'SELL_SIDE_LIQUIDITY_SWEPT'
+                elif sweep['direction'] == 'up' and direction == 'SELL':
+                    score_boost += 0.05
+                    rationale['sweep'] = 'BUY_SIDE_LIQUIDITY_SWEPT'
+
         # === 2. DYNAMIC FUNDING RATE ANALYSIS ===
         funding = fund_data.get('current_funding', 0)
         
@@ -163,12 +242,16 @@ class SmartMoneyAnalyzer:
             'metrics': {
                 'funding_rate': funding,
                 'liq_ratio': liq_ratio,
+                'liq_features': fund_data.get('liq_features', {}),
+                'oi_change_1h': fund_data.get('oi_change_1h', 0.0),
+                'oi_change_4h': fund_data.get('oi_change_4h', 0.0),
+                'book_imbalance': liq_data.get('book_imbalance', 0.0),
+                'liquidity_gap': liq_data.get('liquidity_gap', 0.0),
                 'is_real_data': fund_data.get('source') == 'websocket',
                 'source': fund_data.get('source', 'rest')
             }
         }
 
     async def close(self):
-        """Cleanup aiohttp session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Сессия общая (http_client) - только отпускаем ссылку"""
+        self.session = None
@@ -0,0 +1,21 @@
+# tests/helpers.py
+"""
+Shared helpers for training tests (test_incremental_update, test_model_router, test_feature_audit)
+"""
+import numpy as np
+import pandas as pd
+
+# Короткие ансамбли для тестов обучения
+FAST_PARAMS = {
+    'xgb': {'n_estimators': 10, 'learning_rate': 0.1},
+    'lgbm': {'num_boost_round': 10, 'learning_rate': 0.1},
+    'catboost': {'iterations': 10, 'learning_rate': 0.1},
+}
+
+
+def make_data(n, seed):
+    """Six features, label driven by f0 and f1"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 6)), columns=[f"f{i}" for i in range(6)])
+    y = pd.Series(((X['f0'] + 0.5 * X['f1'] + rng.normal(scale=0.5, size=n)) > 0).astype(int))
+    return X, y
@@ -0,0 +1,83 @@
+"""
+Tests for the parallel ensemble training orchestrator
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategies.ensemble_trainer import split_cores, train_ensemble
+
+MODEL_FILES = {'xgb_model.json', 'lgbm_model.txt', 'catboost_model.cbm'}
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series((X['a'] + rng.normal(scale=0.5, size=300) > 0).astype(int))
+    return X[:240], y[:240], X[240:], y[240:]
+
+
+class TestSplitCores:
+    """Core budget per model"""
+
+    def test_weighted_split_uses_every_core(self):
+        assert split_cores(10, ['xgb', 'lgbm', 'catboost']) == {'xgb': 4, 'lgbm': 3, 'catboost': 3}
+        assert sum(split_cores(7, ['xgb', 'lgbm', 'catboost']).values()) == 7
+
+    def test_at_least_one_thread_each(self):
+        assert split_cores(2, ['xgb', 'lgbm', 'catboost']) == {'xgb': 1, 'lgbm': 1, 'catboost': 1}
+
+
+class TestTrainEnsemble:
+    """Sequential and multi-process training write the same artifacts"""
+
+    def test_sequential_reports_progress(self, dataset, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        events = []
+        report = train_ensemble(f"{tmp_path}/", *dataset, workers=1, cores=1,
+                                progress=lambda name, i, total, metrics: events.append((name, i)))
+        assert MODEL_FILES <= set(os.listdir(tmp_path))
+        assert ('xgb', 50) in events and {name for name, _ in events} == {'xgb', 'lgbm', 'catboost'}
+        assert report['workers'] == 1 and set(report['cpu_seconds']) == {'xgb', 'lgbm', 'catboost'}
+        assert report['sequential_wall'] == report['wall_seconds'] and report['speedup'] == 1.0
+        assert not os.path.exists(tmp_path / 'catboost_info')  # No training logs in the working directory
+
+    def test_processes_with_core_budget(self, dataset, tmp_path):
+        events = []
+        report = train_ensemble(f"{tmp_path}/", *dataset, workers=3, cores=3,
+                                progress=lambda name, i, total, metrics: events.append((name, i, metrics)))
+        assert MODEL_FILES <= set(os.listdir(tmp_path))
+        assert report['workers'] == 3 and report['cores'] == {'xgb': 1, 'lgbm': 1, 'catboost': 1}
+        assert report['cpu_total'] == pytest.approx(sum(report['cpu_seconds'].values()), abs=0.01)
+        assert report['speedup'] is None  # No sequential wall-clock baseline to compare with
+
+        report = train_ensemble(f"{tmp_path}/", *dataset, workers=3, cores=3, progress=None, sequential_wall=30.0)
+        assert report['speedup'] == pytest.approx(30.0 / report['wall_seconds'], abs=0.01)
+        assert any(name == 'xgb' and 'val_logloss' in metrics for name, _, metrics in events)
+
+    def test_store_matrix_reaches_workers_by_reference(self, dataset, tmp_path, monkeypatch):
+        from src.db.feature_store import FeatureStore, MatrixSlice
+        from src.strategies import ensemble_trainer
+        X_train, y_train, X_val, y_val = dataset
+        X_all, y_all = pd.concat([X_train, X_val], ignore_index=True), pd.concat([y_train, y_val], ignore_index=True)
+        store = FeatureStore(f"{tmp_path}/store/")
+        store.write('BTCUSDT', X_all, y_all, 1_700_000_000_000 + 3600_000 * np.arange(len(X_all)))
+        X, y, _ = store.load()
+
+        submitted, submit = [], ensemble_trainer.ProcessPoolExecutor.submit
+
+        def record(pool, fn, *args):
+            submitted.append(args)
+            return submit(pool, fn, *args)
+        monkeypatch.setattr(ensemble_trainer.ProcessPoolExecutor, 'submit', record)
+        train_ensemble(f"{tmp_path}/", X.iloc[:240], y[:240], X.iloc[240:], y[240:], workers=3, cores=3, progress=None)
+        assert MODEL_FILES <= set(os.listdir(tmp_path))
+        assert all(isinstance(args[2], MatrixSlice) and isinstance(args[4], MatrixSlice) for args in submitted)
+        assert submitted[0][4].start == 240
+
+    def test_worker_failure_is_raised(self, dataset, tmp_path):
+        X_train, y_train, X_val, y_val = dataset
+        constant = X_train * 0  # CatBoost refuses all-constant features
+        with pytest.raises(Exception, match='constant'):
+            train_ensemble(f"{tmp_path}/", constant, y_train, X_val, y_val, workers=3, cores=3, progress=None)
@@ -0,0 +1,113 @@
+"""
+Tests for the publish/subscribe event bus and its WebSocket/SSE endpoints
+"""
+import asyncio
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+from src.services.event_bus import EventBus
+
+
+class TestEventBus:
+    """Encode once, fan out, retain and backpressure"""
+
+    async def test_fan_out_encodes_once(self):
+        bus = EventBus()
+        first, second = bus.subscribe(), bus.subscribe()
+        event = bus.publish('signal', {'symbol': 'BTC/USDT', 'confidence': np.float64(0.9),
+                                       'valid_until': datetime(2024, 1, 1)}, key='BTC/USDT_1h')
+        received = [await first.get(timeout=1), await second.get(timeout=1)]
+        assert received[0] is received[1] is event
+        assert json.loads(event.message) == {
+            'seq': 1, 'topic': 'signal', 'key': 'BTC/USDT_1h',
+            'data': {'symbol': 'BTC/USDT', 'confidence': 0.9, 'valid_until': '2024-01-01T00:00:00'}
+        }
+        assert event.sse.startswith('id: 1\nevent: signal\ndata: {')
+
+    async def test_topic_filter(self):
+        bus = EventBus()
+        only_status = bus.subscribe(['status'])
+        bus.publish('signal', {})
+        bus.publish('status', {'is_running': True})
+        assert (await only_status.get(timeout=1)).topic == 'status'
+        assert only_status.queue.empty()
+
+    async def test_new_subscriber_gets_retained_snapshot(self):
+        bus = EventBus()
+        bus.publish('status', {'v': 1}, retain=True)
+        bus.publish('signal', {'v': 'old'}, key='BTC', retain=True)
+        bus.publish('signal', {'v': 'new'}, key='BTC', retain=True)
+        bus.publish('signal', {'v': 'eth'}, key='ETH', retain=True)
+        bus.publish('metrics', {'v': 'not retained'})
+        late = bus.subscribe()
+        snapshot = [json.loads((await late.get(timeout=1)).data)['v'] for _ in range(3)]
+        assert snapshot == [1, 'new', 'eth'] and late.queue.empty()
+
+    async def test_slow_subscriber_drops_oldest_then_disconnects(self):
+        bus = EventBus(queue_size=3, max_dropped=5)
+        slow, fast = bus.subscribe(), bus.subscribe()
+        for i in range(4):
+            bus.publish('metrics', {'i': i})
+            await fast.get(timeout=1)
+        assert [json.loads(slow.queue.get_nowait().data)['i'] for _ in range(3)] == [1, 2, 3]
+        assert slow.dropped == 1
+
+        for i in range(10):
+            bus.publish('metrics', {'i': i})
+            await fast.get(timeout=1)  # Fast consumer keeps receiving everything
+        assert slow.closed and await slow.get(timeout=1) is None
+        assert bus.stats()['subscribers'] == 1
+
+    async def test_async_iteration_ends_on_unsubscribe(self):
+        bus = EventBus()
+        subscription = bus.subscribe()
+        bus.publish('status', {})
+        received = []
+
+        async def consume():
+            async for event in subscription:
+                received.append(event.topic)
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        bus.unsubscribe(subscription)
+        await asyncio.wait_for(task, 1)
+        assert received == ['status']
+
+
+class TestStreamingEndpoints:
+    """The API serves bus events over WebSocket and SSE"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from src.services import api_server
+        bus = EventBus()
+        monkeypatch.setattr(api_server, 'event_bus', bus)
+        bus.publish('status', {'is_running': True}, retain=True)
+        return TestClient(api_server.app), bus
+
+    def test_websocket_receives_snapshot(self, client):
+        test_client, bus = client
+        with test_client.websocket_connect('/ws?topics=status') as websocket:
+            message = websocket.receive_json()
+        assert message['topic'] == 'status' and message['data'] == {'is_running': True}
+
+    async def test_sse_frames(self, monkeypatch):
+        from src.services import api_server
+        bus = EventBus()
+        monkeypatch.setattr(api_server, 'event_bus', bus)
+        bus.publish('status', {'is_running': True}, retain=True)
+
+        class Request:
+            async def is_disconnected(self):
+                return False
+
+        response = await api_server.stream_events(Request(), topics='status,signal')
+        frames = response.body_iterator
+        assert (await frames.__anext__()).startswith('id: 1\nevent: status\n')
+        bus.publish('signal', {'symbol': 'ETH/USDT'}, key='ETH/USDT_1h')
+        assert 'event: signal' in await asyncio.wait_for(frames.__anext__(), 1)
+        await frames.aclose()
+        assert bus.stats()['subscribers'] == 0
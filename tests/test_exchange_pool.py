@@ -0,0 +1,133 @@
+"""
+Tests for the async ccxt exchange pool
+"""
+import asyncio
+import pytest
+from src.services.exchange_pool import ExchangePool
+
+CONFIGS = {'binance': {'enableRateLimit': False}, 'okx': {'enableRateLimit': False}}
+
+
+@pytest.fixture
+async def pool():
+    p = ExchangePool(CONFIGS, max_concurrency={'binance': 2, 'okx': 5})
+    yield p
+    await p.close()
+
+
+class TestExchangePool:
+    """Shared session, per-exchange limits and lifecycle"""
+
+    async def test_clients_share_one_session(self, pool):
+        binance, okx = await pool.get('binance'), await pool.get('okx')
+        assert binance.session is pool.session and okx.session is pool.session
+        assert not binance.own_session  # ccxt must not close our session
+        assert pool.session.connector.limit_per_host == 32
+
+    async def test_per_exchange_concurrency_cap(self, pool):
+        exchange = await pool.get('binance')
+        active, peak = 0, 0
+
+        async def fake_fetch(symbol, timeframe, since=None, limit=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.001)
+            active -= 1
+            return [[0, 1, 1, 1, 1, 1]]
+
+        exchange.fetch_ohlcv = fake_fetch
+        results = await asyncio.gather(*[pool.fetch_ohlcv('binance', 'BTC/USDT', '1h') for _ in range(20)])
+        assert len(results) == 20 and peak == 2
+
+    async def test_unknown_exchange(self, pool):
+        with pytest.raises(KeyError):
+            await pool.fetch_ohlcv('kraken', 'BTC/USDT')
+
+    async def test_close_releases_session(self, pool):
+        await pool.start()
+        session = pool.session
+        await pool.close()
+        assert session.closed and pool.exchanges == {}
+
+    def test_rebinds_to_new_loop(self):
+        """Bots running a loop per thread get a fresh session per loop"""
+        pool = ExchangePool(CONFIGS)
+
+        async def session_of_loop():
+            await pool.start()
+            return pool.session
+
+        first = asyncio.run(session_of_loop())
+        second = asyncio.run(session_of_loop())
+        assert first is not second
+        assert first.closed  # Previous loop's clients are not leaked
+        asyncio.run(pool.close())
+        assert second.closed
+
+
+def fake_exchange(delay=0.0, error=None, candles=None):
+    calls = []
+
+    async def fetch(symbol, timeframe, since=None, limit=None):
+        calls.append(symbol)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return candles if candles is not None else [[0, 1, 1, 1, 1, 1]]
+
+    fetch.calls = calls
+    return fetch
+
+
+async def install(pool, **fetchers):
+    for name, fetch in fetchers.items():
+        (await pool.get(name)).fetch_ohlcv = fetch
+
+
+class TestHedgedFetch:
+    """Racing the secondary exchange after the primary's p95"""
+
+    async def test_slow_primary_is_hedged(self, pool):
+        for _ in range(10):
+            pool.health['binance'].record_success(0.01)
+        await install(pool, binance=fake_exchange(delay=2.0), okx=fake_exchange(delay=0.01))
+
+        started = asyncio.get_running_loop().time()
+        name, candles = await pool.fetch_ohlcv_hedged('BTC/USDT', '1h')
+        assert name == 'okx' and candles
+        assert asyncio.get_running_loop().time() - started < 0.5
+        assert pool.hedges_fired == 1 and pool.hedges_won == 1
+
+    async def test_fast_primary_no_hedge(self, pool):
+        secondary = fake_exchange()
+        await install(pool, binance=fake_exchange(delay=0.01), okx=secondary)
+        assert (await pool.fetch_ohlcv_hedged('BTC/USDT'))[0] == 'binance'
+        assert secondary.calls == [] and pool.hedges_fired == 0
+
+    async def test_error_fails_over_immediately(self, pool):
+        await install(pool, binance=fake_exchange(error=RuntimeError('503')), okx=fake_exchange())
+        assert (await pool.fetch_ohlcv_hedged('BTC/USDT'))[0] == 'okx'
+        assert pool.health['binance'].errors == 1
+
+    async def test_rejected_data_tries_next(self, pool):
+        await install(pool, binance=fake_exchange(candles=[[0, 1, 1, 1, 1, 1]]),
+                      okx=fake_exchange(candles=[[0, 1, 1, 1, 1, 1]] * 60))
+        name, candles = await pool.fetch_ohlcv_hedged('BTC/USDT', accept=lambda c: len(c) >= 50)
+        assert name == 'okx' and len(candles) == 60
+
+    async def test_all_fail(self, pool):
+        await install(pool, binance=fake_exchange(error=RuntimeError('x')), okx=fake_exchange(error=RuntimeError('y')))
+        assert await pool.fetch_ohlcv_hedged('BTC/USDT') == (None, None)
+
+    def test_ranking_follows_latency_and_errors(self):
+        pool = ExchangePool({'binance': {}, 'okx': {}, 'bybit': {}})
+        assert pool.ranked() == ['binance', 'okx', 'bybit']  # No history: configured priority
+        for _ in range(10):
+            pool.health['binance'].record_success(0.8)
+            pool.health['okx'].record_success(0.2)
+            pool.health['bybit'].record_success(0.1)
+        for _ in range(10):
+            pool.health['bybit'].record_error()
+        assert pool.ranked() == ['okx', 'binance', 'bybit']
+        assert pool.hedge_delay('okx') == pytest.approx(0.2)
@@ -0,0 +1,136 @@
+# tests/test_feature_audit.py
+"""
+Tests for the feature importance / compute-cost audit
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies.advanced_features import AdvancedFeatureEngineer
+from src.strategies.feature_audit import (
+    FeatureCostMeter, audit_features, combined_importance, model_importance, recommend_sets, retrain_sets
+)
+from src.strategies.ml_engine_real import RealMLEngine
+from tests.helpers import FAST_PARAMS, make_data
+
+# f0 / f1 carry the signal, f2-f5 are noise; f4 / f5 are expensive to compute
+COSTS = {'f0': 0.001, 'f1': 0.0001, 'f2': 0.0001, 'f3': 0.0001, 'f4': 0.01, 'f5': 0.02}
+
+
+@pytest.fixture
+def trained(tmp_path):
+    engine = RealMLEngine(model_path=f"{tmp_path}/", train_workers=1)
+    X, y = make_data(600, seed=1)
+    version = engine.train_models(X[:450], y[:450], X[450:], y[450:], params=FAST_PARAMS, publish=False)
+    return engine, version, X, y
+
+
+class TestFeatureCostMeter:
+    """Per-feature timings from the live pipeline"""
+
+    def test_mean_costs_persist(self, tmp_path):
+        path = f"{tmp_path}/costs.json"
+        meter = FeatureCostMeter(path)
+        meter.record('hurst_exponent', 0.004)
+        meter.record('hurst_exponent', 0.002)
+        with meter.timed('sma_20'):
+            pass
+        meter.save()
+
+        restored = FeatureCostMeter(path)
+        assert restored.costs()['hurst_exponent'] == pytest.approx(0.003)
+        assert restored.totals['sma_20'][0] == 1
+
+    def test_engineer_times_only_requested_features(self, sample_ohlcv_data):
+        meter = FeatureCostMeter()
+        engineer = AdvancedFeatureEngineer(cost_meter=meter)
+        features = engineer.create_advanced_features(sample_ohlcv_data, features={'hurst_exponent', 'sma_20'})
+        price = engineer.create_price_features(sample_ohlcv_data, features={'hurst_exponent', 'sma_20'})
+
+        assert set(features) == {'hurst_exponent'} and set(price) == {'sma_20'}
+        assert set(meter.totals) == {'hurst_exponent', 'sma_20'}
+        assert features == AdvancedFeatureEngineer().create_advanced_features(sample_ohlcv_data, {'hurst_exponent'})
+        close = sample_ohlcv_data['close']
+        assert price['sma_20'] == pytest.approx(close.rolling(20).mean().iloc[-1] / close.iloc[-1])
+
+
+class TestImportance:
+    """Gain and SHAP shares from all three models"""
+
+    def test_signal_features_rank_first(self, trained):
+        engine, version, X, _ = trained
+        table = model_importance(engine.version_models(version), X[450:])
+
+        assert set(table.columns) == {f"{m}_{k}" for m in ('xgb', 'lgbm', 'catboost') for k in ('gain', 'shap')}
+        assert np.allclose(table.sum(), 1.0)
+        importance = combined_importance(table, engine.model_weights)
+        assert importance.sum() == pytest.approx(1.0)
+        assert list(importance.sort_values(ascending=False).index[:2]) == ['f0', 'f1']
+
+    def test_audit_marks_shared_features_free(self, trained, monkeypatch):
+        engine, version, X, _ = trained
+        monkeypatch.setattr('src.strategies.feature_audit.SHARED_FEATURES', ('f2',))
+        report = audit_features(engine.version_models(version), X[450:], {**COSTS, 'f2': 0.5})
+
+        rows = {row['feature']: row for row in report['features']}
+        assert rows['f2']['shared'] and rows['f2']['cost_ms'] == 0.0
+        assert not rows['f5']['shared'] and rows['f5']['cost_ms'] == pytest.approx(20.0)
+        assert report['total_cost_ms'] == pytest.approx(sum(v for k, v in COSTS.items() if k != 'f2') * 1000)
+
+
+class TestRecommendSets:
+    """Pruned feature sets trade importance for compute cost"""
+
+    def test_expensive_weak_features_dropped_first(self):
+        importance = pd.Series({'f0': 0.615, 'f1': 0.3, 'f2': 0.04, 'f3': 0.0, 'f4': 0.015, 'f5': 0.03})
+        sets = {s['name']: s for s in recommend_sets(importance, COSTS)}
+
+        assert sets['keep_95']['dropped'][0] == 'f3'  # Useless first
+        assert {'f4', 'f5'} <= set(sets['keep_95']['dropped'])
+        assert sets['keep_95']['importance'] >= 0.95
+        assert 'f2' in sets['keep_95']['features']  # Cheap for its importance - kept
+        assert sets['keep_99']['dropped'] == ['f3']
+        assert sets['keep_95']['saved_ms'] == pytest.approx(30.1)
+
+    def test_free_features_never_pruned(self):
+        importance = pd.Series({'f0': 0.5, 'rsi': 0.01, 'f5': 0.49})
+        assert recommend_sets(importance, {'f0': 0.001, 'f5': 0.001}) == []
+
+
+class TestRetrainSets:
+    """Every pruned set becomes an unpublished registry version"""
+
+    def test_best_set_within_tolerance(self, trained):
+        engine, baseline, X, y = trained
+        sets = recommend_sets(pd.Series({'f0': 0.6, 'f1': 0.36, 'f2': 0.01, 'f3': 0.01, 'f4': 0.01, 'f5': 0.01}),
+                              COSTS, keep_fractions=(0.95,))
+        result = retrain_sets(engine, X[:450], y[:450], X[450:], y[450:], sets,
+                              tolerance=0.05, params=FAST_PARAMS, baseline=baseline)
+
+        assert result['baseline']['version'] == baseline
+        (entry,) = result['results']
+        assert engine.registry.current() is None  # Nothing published
+        assert engine.registry.manifest(entry['version'])['feature_columns'] == sets[0]['features']
+        assert result['best'] == entry and entry['saved_ms'] > 0
+
+
+class TestFeatureValidation:
+    """Pruned schemas pass the generator's startup / reload check"""
+
+    def test_subset_schema_accepted_and_rechecked_on_reload(self, tmp_path):
+        from src.strategies.signal_generator_ultra import UltraSignalGenerator
+        from tests.test_ml_engine import write_models
+        path = f"{tmp_path}/"
+        write_models(path, ['hurst_exponent', 'sma_20', 'funding_rate'])
+        generator = UltraSignalGenerator.__new__(UltraSignalGenerator)
+        generator.ml_engine = RealMLEngine(model_path=path)
+        generator._feature_universe, generator._validated_version = None, None
+
+        assert generator._validate_feature_consistency()
+        assert {'price_entropy', 'volume_ratio', 'oi_change_4h'} <= generator._feature_universe
+
+        write_models(path, ['hurst_exponent', 'unknown_feature'], seed=1)
+        assert generator.ml_engine.reload()
+        assert generator._validated_version != generator.ml_engine.version
+        assert not generator._validate_feature_consistency()
+        assert generator._validated_version == generator.ml_engine.version
@@ -0,0 +1,100 @@
+"""
+Tests for the memory-mapped columnar feature store
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import lightgbm as lgb
+from src.db.feature_store import FeatureStore, MATRIX_DIR, matrix_slice
+
+HOUR = 3600_000
+T0 = 1_700_000_000_000
+
+
+def mapped(array):
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array is not None
+
+
+def frame(n, offset=0.0, columns=('rsi', 'atr')):
+    return pd.DataFrame({c: np.arange(n, dtype=np.float64) + offset + i / 10 for i, c in enumerate(columns)})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path))
+
+
+class TestFeatureStore:
+    """Partition writes and memory-mapped loads"""
+
+    def test_round_trip_is_time_sorted_float32(self, store, tmp_path):
+        store.write('BTC/USDT', frame(3), [1, 0, 1], T0 + HOUR * np.array([0, 2, 4]))
+        store.write('ETH/USDT', frame(3, offset=100), [0, 0, 1], T0 + HOUR * np.array([1, 3, 5]))
+        X, y, times = store.load()
+
+        assert list(X.columns) == ['rsi', 'atr'] and (X.dtypes == np.float32).all()
+        assert X['rsi'].tolist() == [0, 100, 1, 101, 2, 102]
+        assert y.tolist() == [1, 0, 0, 0, 1, 1]
+        assert times.is_monotonic_increasing and times.iloc[0] == pd.to_datetime(T0, unit='ms')
+        assert sorted(os.listdir(tmp_path / 'BTCUSDT' / f"{T0}-{T0 + 4 * HOUR + 1}")) == \
+            ['atr.f4', 'labels.i1', 'meta.json', 'rsi.f4', 'times.i8']
+
+    def test_load_is_backed_by_memmap_without_copies(self, store):
+        store.write('BTCUSDT', frame(50), np.zeros(50), T0 + HOUR * np.arange(50))
+        X, y, _ = store.load()
+        matrix = X.to_numpy()
+        assert mapped(matrix)
+        train = X.iloc[:40]
+        assert np.shares_memory(np.asarray(train, dtype=np.float32), matrix)
+        lgb.Dataset(train, label=y[:40]).construct()
+
+        cached = os.listdir(os.path.join(store.root, MATRIX_DIR))
+        store.load()
+        assert os.listdir(os.path.join(store.root, MATRIX_DIR)) == cached
+
+    def test_matrix_slice_reopens_the_same_rows(self, store):
+        store.write('BTCUSDT', frame(50), np.zeros(50), T0 + HOUR * np.arange(50))
+        X, _, _ = store.load()
+        ref = matrix_slice(X.iloc[10:40])
+
+        assert (ref.start, ref.stop, ref.columns) == (10, 40, ('rsi', 'atr'))
+        reopened = ref.frame()
+        assert mapped(reopened.to_numpy()) and reopened.equals(X.iloc[10:40].reset_index(drop=True))
+        assert matrix_slice(X[['rsi']]) is None and matrix_slice(X.iloc[::2]) is None
+        assert matrix_slice(frame(5).astype(np.float32)) is None  # Not backed by the store
+
+    def test_newer_partition_wins_on_overlap(self, store):
+        store.write('BTCUSDT', frame(4), [0, 0, 0, 0], T0 + HOUR * np.arange(4))
+        store.write('BTCUSDT', frame(4, offset=10), [1, 1, 1, 1], T0 + HOUR * np.arange(2, 6))
+        X, y, _ = store.load(symbols=['BTC/USDT'])
+        assert X['rsi'].tolist() == [0, 1, 10, 11, 12, 13]
+        assert y.tolist() == [0, 0, 1, 1, 1, 1]
+
+    def test_range_and_symbol_filters(self, store):
+        store.write('BTCUSDT', frame(6), np.zeros(6), T0 + HOUR * np.arange(6))
+        store.write('ETHUSDT', frame(6), np.zeros(6), T0 + HOUR * np.arange(6))
+        X, _, times = store.load(symbols=['ETHUSDT'], start_ms=T0 + 2 * HOUR, end_ms=T0 + 4 * HOUR)
+        assert X['rsi'].tolist() == [2, 3]
+        with pytest.raises(ValueError):
+            store.load(symbols=['SOLUSDT'])
+
+    def test_schema_mismatch_requires_recollect(self, store):
+        store.write('BTCUSDT', frame(3), np.zeros(3), T0 + HOUR * np.arange(3))
+        store.write('ETHUSDT', frame(3, columns=('rsi', 'atr', 'adx')), np.zeros(3), T0 + HOUR * np.arange(3))
+        with pytest.raises(ValueError, match='missing features'):
+            store.load()
+        X, _, _ = store.load(columns=['rsi', 'atr'])
+        assert len(X) == 6
+
+    def test_multiple_label_columns(self, store):
+        labels = pd.DataFrame({'long_h4_tp1': [1, 0, 1], 'short_h4_tp1': [0, 1, 0]})
+        store.write('BTCUSDT', frame(3), labels, T0 + HOUR * np.arange(3))
+        _, y, _ = store.load()
+        assert y.name == 'long_h4_tp1' and y.tolist() == [1, 0, 1]
+        _, y, _ = store.load(label='short_h4_tp1')
+        assert y.tolist() == [0, 1, 0]
+        with pytest.raises(ValueError, match='no label'):
+            store.load(label='long_h24_tp1')
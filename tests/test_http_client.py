@@ -0,0 +1,80 @@
+"""
+Tests for the shared HTTP session subsystem
+"""
+import asyncio
+import pytest
+from aiohttp import web
+from src.services.http_client import HttpClient
+from src.services.telegram import TelegramBot
+
+
+@pytest.fixture
+async def server():
+    async def ok(request):
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/ping', ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}/ping'
+    await runner.cleanup()
+
+
+@pytest.fixture
+async def client():
+    c = HttpClient()
+    yield c
+    await c.close()
+
+
+class TestHttpClient:
+    """Long-lived pooled sessions and reuse statistics"""
+
+    async def test_connections_are_reused(self, client, server):
+        for _ in range(5):
+            async with client.borrow('onchain') as session:
+                async with session.get(server) as resp:
+                    assert (await resp.json())['ok']
+
+        stats = client.stats()['sessions']['onchain']
+        assert stats['requests'] == 5
+        assert stats['new_connections'] == 1 and stats['reused_connections'] == 4
+        assert stats['reuse_ratio'] == pytest.approx(0.8)
+
+    async def test_borrow_does_not_close(self, client):
+        async with client.borrow('telegram', ssl=False) as session:
+            pass
+        assert not session.closed
+        assert client.session('telegram') is session
+        assert client.session('onchain') is not session
+
+    async def test_close_and_recreate(self, client):
+        session = client.session()
+        await client.close()
+        assert session.closed
+        assert client.session() is not session
+
+    def test_session_per_event_loop(self):
+        """Bots that run loops in threads must not share a loop-bound session"""
+        c = HttpClient()
+
+        async def grab():
+            session = c.session()
+            await c.close()
+            return session
+
+        assert asyncio.run(grab()) is not asyncio.run(grab())
+
+    async def test_telegram_uses_shared_session(self, monkeypatch):
+        from src.services import telegram
+        shared = HttpClient()
+        monkeypatch.setattr(telegram, 'http_client', shared)
+        bot = TelegramBot()
+        assert await bot._get_session() is await bot._get_session()
+        await bot.close()
+        assert not shared.session('telegram').closed  # Shared: closed only on shutdown
+        await shared.close()
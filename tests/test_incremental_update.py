@@ -0,0 +1,59 @@
+"""
+Tests for warm-start model updates with the validation gate
+"""
+import json
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.strategies.ml_engine_real import RealMLEngine
+from tests.helpers import FAST_PARAMS, make_data
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = RealMLEngine(model_path=f"{tmp_path}/", train_workers=1)
+    X, y = make_data(400, seed=1)
+    engine.train_models(X[:300], y[:300], X[300:], y[300:], params=FAST_PARAMS)
+    return engine
+
+
+class TestIncrementalUpdate:
+    """update_models continues boosting and publishes only improvements"""
+
+    def test_update_continues_from_current_version(self, engine):
+        base = engine.registry.current()
+        X, y = make_data(400, seed=2)
+        version = engine.update_models(X[:300], y[:300], X[300:], y[300:], rounds=20)
+
+        assert version is not None and engine.registry.current() == version
+        manifest = engine.registry.manifest(version)
+        assert manifest['parent'] == base
+        assert manifest['params']['training']['mode'] == 'incremental'
+        assert engine.last_update['new_logloss'] <= engine.last_update['base_logloss']
+        booster = xgb.Booster()
+        booster.load_model(f"{engine.registry.path(version)}xgb_model.json")
+        assert booster.num_boosted_rounds() == 30
+        assert engine.model_info()['model_version'] == version
+
+    def test_gate_rejects_update_without_improvement(self, engine):
+        base = engine.registry.current()
+        X, y = make_data(400, seed=3)
+        version = engine.update_models(X[:300], y[:300], X[300:], y[300:], rounds=5, min_improvement=10.0)
+
+        assert version is None and engine.last_update['accepted'] is False
+        assert engine.registry.current() == base and engine.registry.versions() == [base]
+        with open(f"{engine.registry.path(base)}manifest.json") as f:
+            assert json.load(f)['parent'] is None
+
+    def test_schema_change_requires_full_training(self, engine):
+        X, y = make_data(200, seed=4)
+        X = X.rename(columns={'f5': 'new_feature'})
+        with pytest.raises(ValueError, match='schema'):
+            engine.update_models(X[:150], y[:150], X[150:], y[150:])
+
+    def test_gate_scores_live_predictions(self, engine):
+        X, y = make_data(20, seed=5)
+        live = [engine.predict_probability(row) for row in X.to_dict('records')]
+        probs = np.clip(live, 1e-7, 1 - 1e-7)
+        expected = -np.mean(y * np.log(probs) + (1 - y) * np.log(1 - probs))
+        assert engine._ensemble_logloss(engine.models, X, y) == pytest.approx(expected, rel=1e-6)
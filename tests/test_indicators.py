@@ -0,0 +1,291 @@
+"""
+Parity tests for the vectorized indicator kernel against the original
+ScalpingSignalEngine loop implementations
+"""
+import time
+import numpy as np
+import pytest
+from src.strategies import indicators
+from scalping_engine import ScalpingSignalEngine
+
+
+class LegacyScalping:
+    """Original per-bar loop implementations (reference outputs)"""
+
+    def _calculate_fast_rsi(self, prices, period=7):
+        """Быстрый RSI для скальпинга"""
+        try:
+            deltas = np.diff(prices)
+            gains = np.where(deltas > 0, deltas, 0)
+            losses = np.where(deltas < 0, -deltas, 0)
+            
+            if len(gains) < period:
+                return 50
+            
+            avg_gain = np.mean(gains[:period])
+            avg_loss = np.mean(losses[:period])
+            
+            for i in range(period, len(gains)):
+                avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+                avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+            
+            if avg_loss == 0:
+                return 100
+            rs = avg_gain / avg_loss
+            return 100 - (100 / (1 + rs))
+        except:
+            return 50
+    
+    def _calculate_fast_macd(self, prices):
+        """Быстрый MACD (5,13,4) для скальпинга"""
+        try:
+            if len(prices) < 13:
+                return {'macd': 0, 'signal': 0, 'histogram': 0}
+            
+            ema_5 = self._calculate_ema(prices, 5)
+            ema_13 = self._calculate_ema(prices, 13)
+            macd_line = ema_5 - ema_13
+            
+            # Сигнальная линия (EMA от MACD)
+            macd_array = []
+            for i in range(len(prices)):
+                if i >= 12:
+                    macd_array.append(self._calculate_ema(prices[:i+1], 5) - self._calculate_ema(prices[:i+1], 13))
+            
+            if len(macd_array) >= 4:
+                signal_line = self._calculate_ema(np.array(macd_array), 4)
+                histogram = macd_line - signal_line
+            else:
+                signal_line = macd_line
+                histogram = 0
+            
+            return {
+                'macd': macd_line,
+                'signal': signal_line,
+                'histogram': histogram
+            }
+        except:
+            return {'macd': 0, 'signal': 0, 'histogram': 0}
+    
+    def _calculate_ema(self, prices, period):
+        """Экспоненциальная скользящая средняя"""
+        try:
+            if len(prices) < period:
+                return prices[-1] if len(prices) > 0 else 0
+            
+            alpha = 2 / (period + 1)
+            ema = prices[0]
+            for price in prices[1:]:
+                ema = alpha * price + (1 - alpha) * ema
+            return ema
+        except:
+            return 0
+    
+    def _calculate_fast_stochastic(self, highs, lows, closes, k_period=5, d_period=3):
+        """Быстрый стохастик для скальпинга"""
+        try:
+            if len(highs) < k_period:
+                return {'k': 50, 'd': 50}
+            
+            highest_high = np.max(highs[-k_period:])
+            lowest_low = np.min(lows[-k_period:])
+            
+            if highest_high == lowest_low:
+                k = 50
+            else:
+                k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
+            
+            # D = сглаженная версия K
+            d = k * 0.9  # Упрощенно
+            
+            return {'k': k, 'd': d}
+        except:
+            return {'k': 50, 'd': 50}
+    
+    def _calculate_fast_adx(self, highs, lows, closes, period=7):
+        """Быстрый ADX для скальпинга"""
+        try:
+            if len(highs) < period + 1:
+                return 20
+            
+            # Упрощенный расчет ADX
+            tr_list = []
+            dm_plus_list = []
+            dm_minus_list = []
+            
+            for i in range(1, len(highs)):
+                # True Range
+                tr1 = highs[i] - lows[i]
+                tr2 = abs(highs[i] - closes[i-1])
+                tr3 = abs(lows[i] - closes[i-1])
+                tr = max(tr1, tr2, tr3)
+                tr_list.append(tr)
+                
+                # Directional Movement
+                dm_plus = max(highs[i] - highs[i-1], 0) if highs[i] - highs[i-1] > lows[i-1] - lows[i] else 0
+                dm_minus = max(lows[i-1] - lows[i], 0) if lows[i-1] - lows[i] > highs[i] - highs[i-1] else 0
+                
+                dm_plus_list.append(dm_plus)
+                dm_minus_list.append(dm_minus)
+            
+            if len(tr_list) >= period:
+                atr = np.mean(tr_list[-period:])
+                di_plus = 100 * np.mean(dm_plus_list[-period:]) / atr if atr > 0 else 0
+                di_minus = 100 * np.mean(dm_minus_list[-period:]) / atr if atr > 0 else 0
+                
+                if (di_plus + di_minus) > 0:
+                    dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+                    return dx
+            
+            return 20
+        except:
+            return 20
+    
+    def _calculate_volume_momentum(self, volumes, period=5):
+        """Моментум объема"""
+        try:
+            if len(volumes) < period + 1:
+                return 0
+            
+            current_avg = np.mean(volumes[-period:])
+            previous_avg = np.mean(volumes[-period-1:-1])
+            
+            if previous_avg > 0:
+                return (current_avg - previous_avg) / previous_avg * 100
+            return 0
+        except:
+            return 0
+    
+    def _calculate_price_momentum(self, prices, period=3):
+        """Моментум цены"""
+        try:
+            if len(prices) < period + 1:
+                return 0
+            
+            current_price = prices[-1]
+            previous_price = prices[-period-1]
+            
+            if previous_price > 0:
+                return (current_price - previous_price) / previous_price * 100
+            return 0
+        except:
+            return 0
+    
+    def _calculate_fast_atr(self, highs, lows, closes, period=7):
+        """Быстрый ATR"""
+        try:
+            if len(highs) < period + 1:
+                return abs(highs[-1] - lows[-1]) if len(highs) > 0 else 0
+            
+            tr_list = []
+            for i in range(1, len(highs)):
+                tr1 = highs[i] - lows[i]
+                tr2 = abs(highs[i] - closes[i-1])
+                tr3 = abs(lows[i] - closes[i-1])
+                tr_list.append(max(tr1, tr2, tr3))
+            
+            return np.mean(tr_list[-period:])
+        except:
+            return 0
+    
+    def _calculate_bb_squeeze(self, prices, period=10):
+        """Bollinger Bands Squeeze"""
+        try:
+            if len(prices) < period:
+                return False
+            
+            recent_prices = prices[-period:]
+            sma = np.mean(recent_prices)
+            std = np.std(recent_prices)
+            
+            # Squeeze когда стандартное отклонение очень мало
+            return std / sma < 0.02 if sma > 0 else False
+        except:
+            return False
+    
+    def _calculate_sr_break(self, highs, lows, closes, period=10):
+        """Пробой поддержки/сопротивления"""
+        try:
+            if len(highs) < period:
+                return 0
+            
+            resistance = np.max(highs[-period:])
+            support = np.min(lows[-period:])
+            current_price = closes[-1]
+            
+            # Пробой сопротивления
+            if current_price > resistance * 1.001:
+                return 1
+            # Пробой поддержки
+            elif current_price < support * 0.999:
+                return -1
+            
+            return 0
+        except:
+            return 0
+
+
+def make_ohlcv(n, seed, flat=False):
+    rng = np.random.default_rng(seed)
+    closes = 100 + (np.zeros(n) if flat else np.cumsum(rng.normal(0, 0.5, n)))
+    highs = closes + (0 if flat else rng.uniform(0, 0.6, n))
+    lows = closes - (0 if flat else rng.uniform(0, 0.6, n))
+    volumes = rng.uniform(100, 1000, n)
+    return highs, lows, closes, volumes
+
+
+LEGACY = LegacyScalping()
+ENGINE = ScalpingSignalEngine()
+CASES = [(n, seed) for n in (5, 13, 16, 30, 200) for seed in (1, 2)]
+
+
+class TestIndicatorParity:
+    """Kernel outputs match the original loops"""
+
+    @pytest.mark.parametrize('n,seed', CASES)
+    def test_rsi_ema_macd(self, n, seed):
+        _, _, closes, _ = make_ohlcv(n, seed)
+        assert indicators.rsi(closes, 7) == pytest.approx(LEGACY._calculate_fast_rsi(closes, 7), rel=1e-9)
+        for period in (8, 21):
+            assert indicators.ema_last(closes, period) == pytest.approx(LEGACY._calculate_ema(closes, period), rel=1e-12)
+        new, old = indicators.macd(closes), LEGACY._calculate_fast_macd(closes)
+        for key in ('macd', 'signal', 'histogram'):
+            assert new[key] == pytest.approx(old[key], rel=1e-9, abs=1e-12)
+
+    @pytest.mark.parametrize('n,seed', CASES)
+    def test_range_indicators(self, n, seed):
+        highs, lows, closes, volumes = make_ohlcv(n, seed)
+        assert indicators.stochastic(highs, lows, closes) == pytest.approx(
+            LEGACY._calculate_fast_stochastic(highs, lows, closes))
+        assert indicators.adx_fast(highs, lows, closes) == pytest.approx(LEGACY._calculate_fast_adx(highs, lows, closes))
+        assert indicators.atr_fast(highs, lows, closes) == pytest.approx(LEGACY._calculate_fast_atr(highs, lows, closes))
+        assert indicators.volume_momentum(volumes) == pytest.approx(LEGACY._calculate_volume_momentum(volumes))
+        assert indicators.price_momentum(closes) == pytest.approx(LEGACY._calculate_price_momentum(closes))
+        assert indicators.bb_squeeze(closes) == LEGACY._calculate_bb_squeeze(closes)
+        assert indicators.sr_break(highs, lows, closes) == LEGACY._calculate_sr_break(highs, lows, closes)
+
+    def test_flat_market_edge_cases(self):
+        highs, lows, closes, volumes = make_ohlcv(40, 3, flat=True)
+        assert indicators.rsi(closes) == LEGACY._calculate_fast_rsi(closes) == 100
+        assert indicators.adx_fast(highs, lows, closes) == LEGACY._calculate_fast_adx(highs, lows, closes) == 20
+        assert indicators.stochastic(highs, lows, closes)['k'] == 50
+
+    def test_engine_timeframe_snapshot_matches_legacy(self):
+        """_analyze_scalping_timeframe keeps its output keys and values"""
+        highs, lows, closes, volumes = make_ohlcv(200, 7)
+        candles = [{'high': h, 'low': l, 'close': c, 'volume': v} for h, l, c, v in zip(highs, lows, closes, volumes)]
+        result = ENGINE._analyze_scalping_timeframe(
+            {'historical_data': candles, 'current': candles[-1]}, '1m')
+
+        assert result['rsi_fast'] == pytest.approx(LEGACY._calculate_fast_rsi(closes, 7))
+        assert result['macd_fast']['signal'] == pytest.approx(LEGACY._calculate_fast_macd(closes)['signal'])
+        assert result['ema_cross'] == (1 if LEGACY._calculate_ema(closes, 8) > LEGACY._calculate_ema(closes, 21) else -1)
+        assert result['volatility'] == pytest.approx(LEGACY._calculate_fast_atr(highs, lows, closes) / closes[-1])
+
+    def test_scan_is_fast(self):
+        """20 pairs x 3 timeframes x 200 bars well under a second"""
+        highs, lows, closes, volumes = make_ohlcv(200, 11)
+        start = time.perf_counter()
+        for _ in range(60):
+            indicators.scalping_snapshot(highs, lows, closes, volumes)
+        assert time.perf_counter() - start < 0.5
@@ -0,0 +1,104 @@
+"""
+Tests for the vectorized SL/TP first-touch label engine
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategies.label_engine import ExtremaTable, NO_TOUCH, compute_labels, label_candles
+from src.strategies.outcome_tracker import OutcomeTracker
+from src.strategies.risk_manager import DynamicRiskManager
+from tests.test_outcome_tracker import make_signal
+
+
+def random_candles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.006, n)) * close
+    return pd.DataFrame({'open': close, 'high': close + spread, 'low': close - spread, 'close': close})
+
+
+class RecordingTracker(OutcomeTracker):
+    def _close(self, sig, outcome, profit_pct):
+        self.outcome = outcome
+        super()._close(sig, outcome, profit_pct)
+
+
+def tracker_outcome(df, i, is_long, stop, tps, horizon):
+    """Live OutcomeTracker fed the next `horizon` candles as low/high ranges"""
+    tracker = RecordingTracker(max_hold_seconds=horizon + 0.5)
+    entry = df['close'].iloc[i]
+    sign = 1 if is_long else -1
+    signal = make_signal('BUY' if is_long else 'SELL', entry, entry - sign * stop,
+                         tuple(entry + sign * d for d in tps))
+    tracker.track(signal, ts=i)
+    tracker.outcome = None
+    for j in range(i + 1, i + horizon + 1):
+        tracker.on_price('BTC/USDT', df['close'].iloc[j], ts=j, low=df['low'].iloc[j], high=df['high'].iloc[j])
+        if tracker.outcome:
+            break
+    outcome = tracker.outcome or (f"TP{tracker.open[1].tp_hit}" if tracker.open[1].tp_hit else 'EXPIRED')
+    return {'SL': -1, 'EXPIRED': 0, 'TP1': 1, 'TP2': 2, 'TP3': 3}[outcome]
+
+
+class TestExtremaTable:
+    """Binary-lifting first touch against brute force"""
+
+    def test_first_touch_matches_scan(self):
+        rng = np.random.default_rng(1)
+        high = rng.random(300)
+        table = ExtremaTable(high, -high, 37)
+        start = rng.integers(0, 310, 500)
+        level = rng.random(500)
+        limit = rng.integers(0, 38, 500)
+        got = table.first_touch(start, level, limit, above=True)
+        for s, lvl, lim, g in zip(start, level, limit, got):
+            hits = [j for j in range(s, min(s + lim, 300)) if high[j] >= lvl]
+            assert g == (hits[0] if hits else NO_TOUCH)
+
+
+class TestLabelEngine:
+    """Outcomes match the live SL/TP trade logic"""
+
+    def test_matches_outcome_tracker(self):
+        df = random_candles(160, seed=2)
+        close = df['close'].to_numpy()
+        stop = close * 0.012
+        tps = [stop * m for m in DynamicRiskManager.TP_MULTIPLES]
+        labels = compute_labels(df['high'], df['low'], close, stop, tps, horizons=(6, 24))
+
+        outcomes = set()
+        for i in range(0, 130, 3):
+            for side in ('long', 'short'):
+                for horizon in (6, 24):
+                    expected = tracker_outcome(df, i, side == 'long', stop[i], [d[i] for d in tps], horizon)
+                    assert labels.outcome(side, horizon)[i] == expected, (i, side, horizon)
+                    outcomes.add(expected)
+        assert {-1, 0, 1}.issubset(outcomes)
+
+    def test_same_candle_stop_and_tp_counts_as_stop(self):
+        high = np.array([100.0, 103.0, 100.0])
+        low = np.array([100.0, 97.0, 100.0])
+        labels = compute_labels(high, low, np.full(3, 100.0), np.full(3, 2.0),
+                                [np.full(3, 2.0), np.full(3, 4.0), np.full(3, 8.0)], horizons=(1,))
+        assert labels.long[0, 0] == -1 and labels.short[0, 0] == -1
+
+    def test_breakeven_after_tp1(self):
+        # TP1 on bar 1, back to entry on bar 2, TP2 afterwards - closes at TP1
+        high = np.array([100.0, 102.5, 101.0, 110.0])
+        low = np.array([100.0, 100.5, 99.5, 100.5])
+        labels = compute_labels(high, low, np.full(4, 100.0), np.full(4, 1.0),
+                                [np.full(4, 2.0), np.full(4, 5.0), np.full(4, 20.0)], horizons=(1, 3))
+        assert labels.long[0].tolist() == [1, 1]
+        assert labels.valid[:, 1].tolist() == [True, False, False, False]
+
+    def test_label_candles_uses_risk_manager_levels(self):
+        df = random_candles(400, seed=3)
+        df['atr'] = (df['high'] - df['low']).rolling(14).mean()
+        df['adx'] = 25.0
+        labels = label_candles(df, horizons=(4, 12, 24))
+        frame = labels.frame()
+
+        assert frame.shape == (400, 18) and (frame.dtypes == np.int8).all()
+        assert not labels.valid[:13].any(axis=None) and labels.valid[100:376].all()
+        # A TP1 reached within 4 bars stays reached at 24 (the stop moves to breakeven)
+        assert (frame['long_h24_tp1'] >= frame['long_h4_tp1']).all()
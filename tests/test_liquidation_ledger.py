@@ -0,0 +1,74 @@
+"""
+Tests for rolling liquidation windows
+"""
+import pytest
+from src.strategies.liquidation_ledger import LiquidationLedger
+from src.strategies.binance_ws import BinanceWSClient
+
+class TestLiquidationLedger:
+    """Tests for windowed liquidation aggregates"""
+
+    def test_window_sums_and_counts(self):
+        """Events inside the window are summed per side"""
+        ledger = LiquidationLedger()
+        ledger.record('BUY', 1000.0, ts=1000.0)
+        ledger.record('SELL', 3000.0, ts=1010.0)
+        ledger.record('SELL', 1000.0, ts=1020.0)
+
+        w = ledger.window('1m', now=1030.0)
+        assert w['buy_usd'] == 1000.0
+        assert w['sell_usd'] == 4000.0
+        assert w['buy_count'] == 1
+        assert w['sell_count'] == 2
+        assert w['ratio'] == pytest.approx(4.0)
+
+    def test_events_expire_from_short_window(self):
+        """Old liquidations leave 1m but stay in 1h"""
+        ledger = LiquidationLedger()
+        ledger.record('SELL', 5000.0, ts=1000.0)
+
+        assert ledger.window('1m', now=1030.0)['sell_usd'] == 5000.0
+        assert ledger.window('1m', now=1100.0)['sell_usd'] == 0.0
+        assert ledger.window('5m', now=1100.0)['sell_usd'] == 5000.0
+        assert ledger.window('1h', now=1100.0)['sell_usd'] == 5000.0
+        assert ledger.window('4h', now=1000.0 + 5 * 3600)['sell_usd'] == 0.0
+
+    def test_neutral_ratio_without_liquidations(self):
+        """No liquidations means neutral 1.0 ratio"""
+        ledger = LiquidationLedger()
+        assert ledger.ratio('1h', now=1000.0) == 1.0
+
+    def test_long_idle_gap_resets_windows(self):
+        """A gap longer than every window clears all sums"""
+        ledger = LiquidationLedger()
+        for i in range(100):
+            ledger.record('BUY', 10.0, ts=1000.0 + i)
+        w = ledger.window('4h', now=1000.0 + 10 * 3600)
+        assert w['total_usd'] == 0.0
+        assert w['buy_count'] == 0
+
+    def test_features_cover_all_windows(self):
+        """Feature candidates exist for every window"""
+        ledger = LiquidationLedger()
+        ledger.record('SELL', 100.0, ts=1000.0)
+        features = ledger.features(now=1001.0)
+
+        for name in LiquidationLedger.WINDOWS:
+            assert f'liq_ratio_{name}' in features
+            assert f'liq_count_{name}' in features
+        assert features['liq_count_1m'] == 1.0
+
+    def test_unknown_window(self):
+        ledger = LiquidationLedger()
+        with pytest.raises(ValueError):
+            ledger.window('2d')
+
+    def test_ws_client_uses_ledger(self):
+        """BinanceWSClient exposes windowed liquidations via fuzzy symbol match"""
+        client = BinanceWSClient(['BTC/USDT:USDT'])
+        client.ledgers['BTC/USDT:USDT'].record('SELL', 2500.0)
+
+        liq = client.get_liquidations('BTC/USDT', window='5m')
+        assert liq['sell_usd'] == 2500.0
+        assert 'liq_ratio_4h' in client.get_liquidation_features('BTCUSDT')
+        assert client.get_liquidations('ETH/USDT') == {}
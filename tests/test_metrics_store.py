@@ -0,0 +1,170 @@
+"""
+Tests for the append-only metrics store and candle alignment helpers
+"""
+import time
+import numpy as np
+import pytest
+from src.db.metrics_store import MetricsStore, DAY_MS
+from src.strategies.binance_ws import BinanceWSClient
+
+DAY0 = 19700 * DAY_MS  # 2023-12-09 00:00 UTC
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(str(tmp_path))
+
+
+class TestMetricsStore:
+    """Write/scan round trips"""
+
+    def test_flush_and_scan_across_day_boundary(self, store, tmp_path):
+        """A batch spanning midnight lands in two day partitions and scans back in order"""
+        store.append('BTC/USDT:USDT', 'open_interest', DAY0 + DAY_MS + 1000, 2.0)
+        store.append('BTCUSDT', 'open_interest', DAY0 + DAY_MS - 1000, 1.0)
+        assert store.pending() == 2
+        assert store.flush() == 2
+        assert store.pending() == 0
+
+        parts = sorted(p.name for p in (tmp_path / 'open_interest' / 'BTCUSDT').iterdir())
+        assert parts == ['2023-12-09.ts', '2023-12-09.val', '2023-12-10.ts', '2023-12-10.val']
+
+        ts, vals = store.scan('BTC/USDT', 'open_interest', DAY0, DAY0 + 2 * DAY_MS)
+        assert list(ts) == [DAY0 + DAY_MS - 1000, DAY0 + DAY_MS + 1000]
+        assert list(vals) == [1.0, 2.0]
+
+    def test_scan_is_half_open_and_appends_accumulate(self, store):
+        for i in range(5):
+            store.append('ETHUSDT', 'funding_rate', DAY0 + i * 1000, i * 0.0001)
+            store.flush()
+
+        ts, vals = store.scan('ETHUSDT', 'funding_rate', DAY0 + 1000, DAY0 + 3000)
+        assert list(ts) == [DAY0 + 1000, DAY0 + 2000]
+        assert store.latest_before('ETHUSDT', 'funding_rate', DAY0 + 3500) == pytest.approx(0.0003)
+        assert store.latest_before('SOLUSDT', 'funding_rate', DAY0) is None
+
+    def test_liquidations_are_signed(self, store):
+        store.append_liquidation('BTCUSDT', 'BUY', DAY0, 100.0)
+        store.append_liquidation('BTCUSDT', 'SELL', DAY0 + 1, 300.0)
+        store.flush()
+
+        _, vals = store.scan('BTCUSDT', 'liquidations', DAY0, DAY0 + 10)
+        assert list(vals) == [100.0, -300.0]
+
+    def test_unknown_metric(self, store):
+        with pytest.raises(ValueError):
+            store.append('BTCUSDT', 'volume', DAY0, 1.0)
+
+
+class TestAlignment:
+    """Vectorized candle alignment"""
+
+    def test_align_asof(self):
+        ts = np.array([100, 200, 300], dtype=np.int64)
+        vals = np.array([1.0, 2.0, 3.0])
+        out = MetricsStore.align_asof(ts, vals, np.array([50, 100, 250, 1000]))
+        assert list(out) == [0.0, 1.0, 2.0, 3.0]
+
+        stale = MetricsStore.align_asof(ts, vals, np.array([1000]), max_age_ms=100)
+        assert list(stale) == [0.0]
+
+    def test_window_liq_ratio_matches_ledger_formula(self):
+        ts = np.array([10, 20, 30, 150], dtype=np.int64)
+        usd = np.array([1000.0, -3000.0, -1000.0, 500.0])
+        ratio = MetricsStore.window_liq_ratio(ts, usd, np.array([0, 100, 200]), np.array([100, 200, 300]))
+
+        assert ratio[0] == pytest.approx(4.0)
+        assert ratio[1] == 0.0  # Only shorts liquidated
+        assert ratio[2] == 1.0  # Neutral without liquidations
+
+    def test_pct_change_asof(self):
+        ts = np.array([0, 3600_000], dtype=np.int64)
+        vals = np.array([100.0, 110.0])
+        out = MetricsStore.pct_change_asof(ts, vals, np.array([3600_000, 1000]), 3600_000)
+        assert out[0] == pytest.approx(0.10)
+        assert out[1] == 0.0  # No history one hour back
+
+
+class TestWSClientStore:
+    """BinanceWSClient writes every stream into the store"""
+
+    def test_payloads_are_persisted(self, store):
+        client = BinanceWSClient(['BTC/USDT:USDT'], store=store)
+        client._handle_payload({'stream': 'btcusdt@markPrice@1s',
+                                'data': {'E': DAY0, 'r': '0.0001', 'p': '50000'}})
+        client._handle_payload({'stream': 'btcusdt@forceOrder',
+                                'data': {'E': DAY0 + 5, 'o': {'S': 'SELL', 'q': '2', 'p': '50000', 'T': DAY0 + 5}}})
+        store.flush()
+
+        assert store.latest_before('BTCUSDT', 'funding_rate', DAY0) == pytest.approx(0.0001)
+        assert store.latest_before('BTCUSDT', 'mark_price', DAY0) == 50000.0
+        assert store.latest_before('BTCUSDT', 'liquidations', DAY0 + 5) == -100000.0
+
+    def test_oi_change_from_history(self, store):
+        client = BinanceWSClient(['BTC/USDT:USDT'], store=store)
+        now_ms = int(time.time() * 1000)
+        store.append('BTCUSDT', 'open_interest', now_ms - 3600_000 - 60_000, 1000.0)
+        store.flush()
+        client._handle_payload({'stream': 'btcusdt@openInterest',
+                                'data': {'E': now_ms, 'o': '1100'}})
+
+        metrics = client.get_metrics('BTC/USDT')
+        assert metrics['oi_change_1h'] == pytest.approx(0.10)
+        assert metrics['oi_change_4h'] == 0.0
+
+    def test_oi_change_reads_memory_not_store(self, store, monkeypatch):
+        client = BinanceWSClient(['BTC/USDT:USDT'], store=store)
+        now_ms = int(time.time() * 1000)
+        for minutes_ago, oi in ((65, 1000.0), (30, 1050.0), (0, 1200.0)):
+            client._handle_payload({'stream': 'btcusdt@openInterest',
+                                    'data': {'E': now_ms - minutes_ago * 60_000, 'o': str(oi)}})
+        monkeypatch.setattr(store, 'scan', lambda *a, **k: pytest.fail('disk scan on get_metrics'))
+        monkeypatch.setattr(store, 'latest_before', lambda *a, **k: pytest.fail('disk scan on get_metrics'))
+
+        metrics = client.get_metrics('BTC/USDT')
+        assert metrics['oi_change_1h'] == pytest.approx(0.20)
+        assert len(client._oi_history['BTC/USDT:USDT']) == 3
+
+
+
+class FakeFundingExchange:
+    """REST funding settlements every 8h; records the requested range"""
+
+    def __init__(self, rate=0.0003):
+        self.rate = rate
+        self.requests = []
+
+    def fapiPublicGetFundingRate(self, params):
+        self.requests.append(params)
+        first = -(-params['startTime'] // (8 * 3600_000)) * 8 * 3600_000
+        return [{'fundingTime': t, 'fundingRate': str(self.rate)}
+                for t in range(first, params['endTime'] + 1, 8 * 3600_000)]
+
+
+class TestFundingHistory:
+    """Training funding merges REST settlements with the recorded store"""
+
+    @pytest.fixture
+    def pipeline(self, store, tmp_path):
+        from src.db.feature_store import FeatureStore
+        from src.strategies.data_pipeline import TradingDataPipeline
+        pipeline = TradingDataPipeline(store=store, feature_store=FeatureStore(str(tmp_path / 'features')))
+        pipeline.exchange = FakeFundingExchange()
+        return pipeline
+
+    def test_rest_fills_range_before_first_store_point(self, pipeline, store):
+        store.append('BTCUSDT', 'funding_rate', DAY0 + 2 * DAY_MS, 0.0001)
+        store.flush()
+        open_ms = np.arange(DAY0, DAY0 + 3 * DAY_MS, 3600_000, dtype=np.int64)
+
+        funding = pipeline._smart_money_features('BTC/USDT', open_ms)['funding_rate'].to_numpy()
+        assert pipeline.exchange.requests[0]['endTime'] == DAY0 + 2 * DAY_MS - 1
+        assert funding[:47] == pytest.approx(0.0003)  # Before the bot's first run - REST
+        assert funding[-1] == pytest.approx(0.0001)   # Recorded live - store
+
+    def test_store_covering_range_skips_rest(self, pipeline, store):
+        store.append('BTCUSDT', 'funding_rate', DAY0 - 3600_000, 0.0001)
+        store.flush()
+        ts, vals = pipeline._load_funding_history('BTCUSDT', DAY0, DAY0 + DAY_MS)
+
+        assert pipeline.exchange.requests == [] and list(vals) == [0.0001]
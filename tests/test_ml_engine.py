@@ -67,3 +67,74 @@ class TestRealMLEngine:
         # Weights should sum to 1.0
         total_weight = sum(engine.model_weights.values())
         assert abs(total_weight - 1.0) < 0.01
+
+
+def write_models(path, columns, seed=0):
+    """Small XGBoost + LightGBM pair and feature schema, as train_models saves them"""
+    import joblib
+    import lightgbm as lgb
+    import xgboost as xgb
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(200, len(columns))), columns=columns)
+    y = (X[columns[0]] + rng.normal(scale=0.5, size=200) > 0).astype(int)
+    xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X, y).save_model(f"{path}xgb_model.json")
+    lgb.train({'objective': 'binary', 'verbose': -1}, lgb.Dataset(X, label=y),
+              num_boost_round=5).save_model(f"{path}lgbm_model.txt")
+    joblib.dump(list(columns), f"{path}features.pkl")
+
+
+class TestHotReload:
+    """New model versions are swapped in without restarting"""
+
+    @pytest.fixture
+    def model_dir(self, tmp_path):
+        path = f"{tmp_path}/"
+        write_models(path, ['a', 'b', 'c'])
+        return path
+
+    def test_reload_swaps_new_version(self, model_dir):
+        engine = RealMLEngine(model_path=model_dir)
+        assert engine.model_info()['version'] == 1 and engine.feature_columns == ['a', 'b', 'c']
+        assert engine.reload() is False  # Files unchanged
+
+        old_models = engine.models
+        write_models(model_dir, ['a', 'b', 'c', 'd'], seed=1)
+        assert engine.reload() is True
+        assert engine.models is not old_models and engine.feature_columns == ['a', 'b', 'c', 'd']
+        assert 0.0 <= engine.predict_probability({'a': 1.0, 'd': -1.0}) <= 1.0
+        assert engine.model_info()['version'] == 2
+
+    def test_schema_mismatch_keeps_current_models(self, model_dir):
+        import joblib
+        engine = RealMLEngine(model_path=model_dir)
+        before = engine.predict_probability({'a': 2.0})
+        joblib.dump(['a', 'b'], f"{model_dir}features.pkl")
+
+        assert engine.reload() is False
+        assert engine.feature_columns == ['a', 'b', 'c']
+        assert engine.predict_probability({'a': 2.0}) == before
+        info = engine.model_info()
+        assert info['version'] == 1 and info['rejected'] == 1 and 'features' in info['last_error']
+
+    def test_watcher_picks_up_retrained_models(self, model_dir):
+        import time
+        engine = RealMLEngine(model_path=model_dir)
+        engine.watch(interval=0.05)
+        try:
+            write_models(model_dir, ['x', 'y'], seed=2)
+            deadline = time.monotonic() + 5
+            while engine.feature_columns != ['x', 'y']:
+                assert time.monotonic() < deadline, 'watcher did not reload'
+                time.sleep(0.02)
+        finally:
+            engine.stop_watching()
+        assert engine.model_info()['reloads'] == 2
+
+    def test_live_prediction_matches_validation_path(self, model_dir):
+        engine = RealMLEngine(model_path=model_dir)
+        features = {'a': 1.5, 'b': -0.3, 'c': 0.2}
+        _, predictions = engine.predict_components(features)
+
+        X = np.array([[1.5, -0.3, 0.2]])
+        assert predictions['lgbm'] == pytest.approx(engine.models['lgbm'].predict(X)[0])  # No extra sigmoid
+        assert predictions == pytest.approx({k: v[0] for k, v in engine._predict_matrix(engine.models, X).items()})
@@ -0,0 +1,132 @@
+"""
+Tests for the versioned model registry and registry-backed model loading
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategies.ml_engine_real import SMART_MONEY_INPUTS, RealMLEngine
+from src.strategies.model_registry import ModelRegistry, schema_hash
+from tests.test_ml_engine import write_models
+
+
+def stage_version(registry, columns, seed=0):
+    staging = registry.begin()
+    write_models(staging, columns, seed=seed)
+    return registry.commit(staging, columns, metrics={'seed': seed},
+                           training_window={'lookback_days': 180})
+
+
+class TestModelRegistry:
+    """Commit, publish, verify and rollback"""
+
+    def test_commit_writes_manifest(self, tmp_path):
+        registry = ModelRegistry(f"{tmp_path}/")
+        version = stage_version(registry, ['a', 'b'])
+        manifest = registry.manifest(version)
+        assert registry.versions() == [version] and registry.current() is None
+        assert manifest['feature_schema_hash'] == schema_hash(['a', 'b'])
+        assert set(manifest['files']) == {'xgb_model.json', 'lgbm_model.txt', 'features.pkl'}
+        assert manifest['training_window'] == {'lookback_days': 180}
+        assert not [name for name in os.listdir(registry.versions_dir) if name.startswith('.')]
+
+    def test_publish_and_rollback(self, tmp_path):
+        registry = ModelRegistry(f"{tmp_path}/")
+        first = stage_version(registry, ['a'], seed=1)
+        second = stage_version(registry, ['a'], seed=2)
+        registry.publish(first)
+        registry.publish(second)
+        assert registry.current() == second
+        assert registry.rollback() == first and registry.current() == first
+        with pytest.raises(ValueError):
+            registry.rollback()
+
+    def test_tampered_version_cannot_be_published(self, tmp_path):
+        registry = ModelRegistry(f"{tmp_path}/")
+        version = stage_version(registry, ['a'])
+        with open(f"{registry.path(version)}lgbm_model.txt", 'a') as f:
+            f.write('garbage')
+        with pytest.raises(ValueError, match='checksum'):
+            registry.publish(version)
+        assert registry.current() is None
+
+    def test_prune_keeps_active(self, tmp_path):
+        registry = ModelRegistry(f"{tmp_path}/")
+        versions = [stage_version(registry, ['a'], seed=i) for i in range(4)]
+        registry.publish(versions[0])
+        assert registry.prune(keep=2) == [versions[1]]
+        assert registry.versions() == [versions[0]] + versions[2:]
+
+
+class TestRegistryBackedEngine:
+    """RealMLEngine loads only the published version"""
+
+    def test_engine_follows_current_pointer(self, tmp_path):
+        root = f"{tmp_path}/"
+        write_models(root, ['legacy'])  # Flat files are ignored once a version is published
+        registry = ModelRegistry(root)
+        first = stage_version(registry, ['a', 'b'], seed=1)
+        second = stage_version(registry, ['a', 'b', 'c'], seed=2)
+        registry.publish(first)
+
+        engine = RealMLEngine(model_path=root)
+        assert engine.model_info()['model_version'] == first and engine.feature_columns == ['a', 'b']
+        registry.publish(second)
+        assert engine.reload() is True and engine.feature_columns == ['a', 'b', 'c']
+        registry.rollback()
+        assert engine.reload() is True and engine.model_info()['model_version'] == first
+
+    def test_corrupted_version_is_rejected(self, tmp_path):
+        root = f"{tmp_path}/"
+        registry = ModelRegistry(root)
+        good = stage_version(registry, ['a'], seed=1)
+        bad = stage_version(registry, ['a'], seed=2)
+        registry.publish(good)
+        registry.publish(bad)
+        engine = RealMLEngine(model_path=root)
+        assert engine.model_info()['model_version'] == bad
+
+        registry.rollback()
+        with open(f"{registry.path(good)}xgb_model.json", 'a') as f:
+            f.write(' ')
+        assert engine.reload() is False
+        assert engine.model_info()['model_version'] == bad and 'checksum' in engine.model_info()['last_error']
+
+    def test_train_models_publishes_version(self, tmp_path):
+        rng = np.random.default_rng(0)
+        columns = ['f1', 'f2', 'f3']
+        X = pd.DataFrame(rng.normal(size=(300, 3)), columns=columns)
+        y = pd.Series((X['f1'] + rng.normal(scale=0.5, size=300) > 0).astype(int))
+        engine = RealMLEngine(model_path=f"{tmp_path}/", train_workers=1)
+
+        version = engine.train_models(X[:240], y[:240], X[240:], y[240:],
+                                      training_window={'lookback_days': 30})
+        manifest = engine.registry.manifest(version)
+        assert engine.registry.current() == version and engine.model_info()['model_version'] == version
+        assert manifest['metrics']['xgb_auc'] > 0.5 and manifest['metrics']['n_train'] == 240
+        assert engine.reload() is False  # Already serving the version it just trained
+        training = manifest['params']['training']
+        assert training['workers'] == 1 and training['sequential_wall'] == training['wall_seconds']
+        assert engine._sequential_wall(480) == pytest.approx(2 * training['wall_seconds'])  # Scaled to rows
+        assert engine.smart_money_inputs == SMART_MONEY_INPUTS
+        legacy = f"{tmp_path}/legacy/"
+        os.makedirs(legacy)
+        write_models(legacy, ['f1', 'f2'])
+        assert RealMLEngine(model_path=legacy).smart_money_inputs == 0  # Pre-registry flat files
+        assert not os.path.exists(f"{tmp_path}/xgb_model.json")
+
+    def test_publish_validates_before_serving(self, tmp_path, monkeypatch):
+        root = f"{tmp_path}/"
+        registry = ModelRegistry(root)
+        good = stage_version(registry, ['a'], seed=1)
+        registry.publish(good)
+        engine = RealMLEngine(model_path=root)
+        bad = stage_version(engine.registry, ['a'], seed=2)
+
+        def reject(bundle):
+            raise ValueError('probe prediction out of range')
+        monkeypatch.setattr(engine, '_validate_bundle', reject)
+        with pytest.raises(ValueError, match='out of range'):
+            engine._publish(bad)
+        assert engine.registry.current() == good
+        assert engine.model_info()['model_version'] == good and engine.version == 1
@@ -0,0 +1,82 @@
+"""
+Tests for per-regime / per-cluster model routing
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+from src.strategies.ml_engine_real import RealMLEngine
+from src.strategies.model_router import REGIME_ROUTES, regime_codes, route_key, symbol_clusters
+from tests.helpers import FAST_PARAMS
+
+
+def regime(trend, volatility):
+    return SimpleNamespace(trend=trend, volatility=volatility)
+
+
+def routed_data(n, seed):
+    """Opposite relationships in two regimes: the global model cannot fit both"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=['f0', 'f1', 'f2', 'f3'])
+    keys = np.where(np.arange(n) % 2 == 0, 'bullish:low', 'bearish:high')
+    signal = np.where(keys == 'bullish:low', X['f0'], -X['f0'])
+    y = pd.Series((signal + rng.normal(scale=0.3, size=n) > 0).astype(int))
+    return X, y, keys
+
+
+class TestRouting:
+    """Route keys and symbol clusters"""
+
+    def test_route_key_by_mode(self):
+        assert route_key({'mode': 'regime'}, regime('bullish', 'high')) == 'bullish:high'
+        routing = {'mode': 'cluster', 'clusters': {'BTCUSDT': 1}}
+        assert route_key(routing, regime('bullish', 'high'), 'BTC/USDT:USDT') == 'cluster:1'
+        assert route_key(routing, symbol='DOGE/USDT') is None
+        assert route_key({}, regime('bullish', 'high'), 'BTC/USDT') is None
+
+    def test_regime_codes_match_route_table(self):
+        codes = regime_codes(np.array(['low', 'high', 'medium']), np.array(['markup', 'markdown', 'accumulation']))
+        assert [REGIME_ROUTES[c] for c in codes] == ['bullish:low', 'bearish:high', 'neutral:medium']
+
+    def test_symbol_clusters_follow_correlation(self):
+        rng = np.random.default_rng(0)
+        a, b = rng.normal(size=300), rng.normal(size=300)
+        returns = pd.DataFrame({
+            'BTC/USDT': a, 'ETH/USDT': a + rng.normal(scale=0.1, size=300),
+            'SOL/USDT': b, 'AVAX/USDT': b + rng.normal(scale=0.1, size=300),
+        })
+        clusters = symbol_clusters(returns, n_clusters=2)
+        assert clusters['BTCUSDT'] == clusters['ETHUSDT'] != clusters['SOLUSDT'] == clusters['AVAXUSDT']
+
+
+class TestRoutedEngine:
+    """RealMLEngine trains, stores and dispatches route models"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = RealMLEngine(model_path=f"{tmp_path}/", train_workers=1)
+        X, y, keys = routed_data(1200, seed=1)
+        keys[:40] = 'neutral:low'  # Too few rows - no route, global ensemble serves it
+        engine.train_models(X[:900], y[:900], X[900:], y[900:], params=FAST_PARAMS,
+                            routing={'mode': 'regime', 'train': keys[:900], 'val': keys[900:], 'min_samples': 200})
+        return engine
+
+    def test_routes_are_versioned_and_dispatched(self, engine):
+        manifest = engine.registry.manifest(engine.registry.current())
+        assert sorted(manifest['params']['routing']['routes']) == ['bearish:high', 'bullish:low']
+        assert 'routes/bullish-low/xgb_model.json' in manifest['files']
+        assert engine.model_info()['routes'] == ['bearish:high', 'bullish:low']
+
+        features = {'f0': 2.0, 'f1': 0.0, 'f2': 0.0, 'f3': 0.0}
+        up = engine.predict_probability(features, regime=regime('bullish', 'low'))
+        down = engine.predict_probability(features, regime=regime('bearish', 'high'))
+        engine.predict_probability(features, regime=regime('neutral', 'low'))
+        assert up > 0.5 > down
+        assert engine.route_stats == {'bullish:low': 1, 'bearish:high': 1, 'global': 1}
+
+    def test_routes_survive_reload(self, engine):
+        fresh = RealMLEngine(model_path=engine.model_path)
+        assert fresh.model_info()['routes'] == ['bearish:high', 'bullish:low']
+        features = {'f0': -2.0}
+        assert fresh.predict_probability(features, regime=regime('bearish', 'high')) == \
+            engine.predict_probability(features, regime=regime('bearish', 'high'))
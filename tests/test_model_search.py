@@ -0,0 +1,125 @@
+"""
+Tests for walk-forward folds and the hyperparameter search engine
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.strategies import model_search
+from src.strategies.ml_engine_real import RealMLEngine
+from src.core.settings import settings
+from src.strategies.model_search import embargo_split, search, walk_forward_folds
+
+
+@pytest.fixture
+def dataset():
+    """Two symbols per hourly candle, already in time order"""
+    rng = np.random.default_rng(0)
+    times = pd.Series(np.repeat(pd.date_range('2024-01-01', periods=200, freq='h').values, 2))
+    X = pd.DataFrame(rng.normal(size=(400, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series((X['a'] + rng.normal(scale=0.7, size=400) > 0).astype(int))
+    return X, y, times
+
+
+class TestWalkForwardFolds:
+    """Time-ordered folds with an embargo gap"""
+
+    def test_expanding_folds_never_look_ahead(self):
+        times = np.arange(100)
+        folds = walk_forward_folds(times, n_folds=4, gap=3)
+        assert len(folds) == 4
+        for train_idx, val_idx in folds:
+            assert times[train_idx].max() < times[val_idx].min() - 3
+        assert [len(train) for train, _ in folds] == sorted(len(train) for train, _ in folds)
+        assert folds[0][0][0] == 0 and folds[-1][1][-1] == 99
+
+    def test_rolling_window(self):
+        folds = walk_forward_folds(np.arange(100), n_folds=4, mode='rolling', window=1, gap=0)
+        assert all(len(train) == 20 for train, _ in folds)
+        assert folds[2][0][0] == 40
+
+    def test_datetime_rows_of_one_candle_stay_together(self, dataset):
+        _, _, times = dataset
+        horizon = pd.Timedelta(hours=max(settings.ml_label_horizons))  # Default gap: longest label horizon
+        for train_idx, val_idx in walk_forward_folds(times, n_folds=3):
+            assert times.iloc[train_idx].max() + horizon < times.iloc[val_idx].min()
+
+    def test_embargo_split_drops_overlapping_train_rows(self, dataset):
+        _, _, times = dataset
+        train_end, val_start = embargo_split(times, fraction=0.8)
+        assert val_start == 320 and times.iloc[val_start] == pd.Timestamp('2024-01-07 16:00')
+        horizon = pd.Timedelta(hours=max(settings.ml_label_horizons))
+        assert times.iloc[train_end - 1] + horizon < times.iloc[val_start] <= times.iloc[train_end] + horizon
+        assert embargo_split(np.arange(100), fraction=0.8, gap=5) == (75, 80)
+
+
+class TestSearch:
+    """Random search with fold-level pruning"""
+
+    def test_inline_search_prunes_and_reuses_fold_datasets(self, dataset):
+        X, y, times = dataset
+        results = search(X, y, times, families=('xgb', 'lgbm'), n_trials=12, n_folds=3, workers=1,
+                         min_trials_to_prune=2)
+        for family in ('xgb', 'lgbm'):
+            result = results[family]
+            assert result.best is not None and len(result.best.scores) == 3
+            assert result.trials == 12 and result.complete + result.pruned + result.failed == 12
+            assert result.best.score == min(trial.score for trial in result.top)
+        assert sum(result.pruned for result in results.values()) > 0
+        # Native fold datasets are built once per family and fold, not per trial
+        assert set(model_search._worker['cache']) == {(f, k) for f in ('xgb', 'lgbm') for k in range(3)}
+        summary = results['xgb'].summary()
+        assert summary['best']['params'] == results['xgb'].best_params
+
+    def test_trials_fit_like_production(self, dataset, tmp_path):
+        """Same early stopping as ensemble_trainer: a trial scores the model training would ship"""
+        import lightgbm as lgb
+        from catboost import CatBoostClassifier
+        from src.strategies.ensemble_trainer import fit_catboost, fit_lgbm
+        X, y, _ = dataset
+        X, y = X.to_numpy(), y.to_numpy()
+        train_idx, val_idx = np.arange(300), np.arange(300, 400)
+        model_search._init_worker(X, y, [(train_idx, val_idx)], 1)
+        directory = f"{tmp_path}/"
+
+        params = {'num_boost_round': 2000, 'learning_rate': 0.1}
+        fit_lgbm(directory, X[train_idx], y[train_idx], X[val_idx], y[val_idx], 1, params=params)
+        shipped = lgb.Booster(model_file=f"{directory}lgbm_model.txt").predict(X[val_idx])
+        np.testing.assert_allclose(model_search._fit_predict('lgbm', params, 0), shipped)
+
+        params = {'iterations': 2000, 'learning_rate': 0.1}
+        fit_catboost(directory, X[train_idx], y[train_idx], X[val_idx], y[val_idx], 1, params=params)
+        model = CatBoostClassifier()
+        model.load_model(f"{directory}catboost_model.cbm")
+        assert model.tree_count_ < 2000
+        np.testing.assert_allclose(model_search._fit_predict('catboost', params, 0),
+                                   model.predict_proba(X[val_idx])[:, 1])
+
+    def test_process_pool_search(self, dataset, tmp_path, monkeypatch):
+        from src.db.feature_store import FeatureStore, MatrixSlice
+        X, y, times = dataset
+        store = FeatureStore(f"{tmp_path}/")
+        for symbol, rows in (('BTCUSDT', slice(0, None, 2)), ('ETHUSDT', slice(1, None, 2))):
+            store.write(symbol, X.iloc[rows], y.iloc[rows], times.iloc[rows].astype('int64') // 10**6)
+        X, y, times = store.load()
+
+        initargs = []
+        monkeypatch.setattr(model_search, 'ProcessPoolExecutor',
+                            lambda **kwargs: initargs.append(kwargs['initargs']) or ProcessPoolExecutor(**kwargs))
+        results = search(X, y, times, families=('lgbm',), n_trials=4, n_folds=2, workers=2)
+        assert results['lgbm'].complete >= 1
+        assert isinstance(initargs[0][0], MatrixSlice)  # Workers map the store file instead of a pickled copy
+
+    def test_winning_params_carry_into_next_training(self, dataset, tmp_path):
+        X, y, _ = dataset
+        engine = RealMLEngine(model_path=f"{tmp_path}/", train_workers=1)
+        first = engine.train_models(X[:320], y[:320], X[320:], y[320:],
+                                    params={'xgb': {'n_estimators': 20, 'max_depth': 3}},
+                                    search={'xgb': {'trials': 1}})
+        manifest = engine.registry.manifest(first)
+        assert manifest['params']['models']['xgb']['n_estimators'] == 20
+        assert manifest['params']['search'] == {'xgb': {'trials': 1}}
+
+        second = engine.train_models(X[:320], y[:320], X[320:], y[320:])
+        assert engine.registry.manifest(second)['params']['models']['xgb']['max_depth'] == 3
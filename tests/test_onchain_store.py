@@ -0,0 +1,121 @@
+"""
+Tests for the background-refreshed on-chain store
+"""
+import asyncio
+import pytest
+from src.services.onchain_store import OnChainStore
+
+
+class FakeSources:
+    """Counts provider calls; values carry a version so refreshes are visible"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.version = 1
+        self.dataset_calls = 0
+        self.batches = []
+        self.fail = False
+
+    async def load_rows(self):
+        self.dataset_calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('503')
+        return [{'asset': 'BTC', 'v': self.version}, {'asset': 'ETH', 'v': self.version}]
+
+    @staticmethod
+    def select(rows, asset):
+        return [row['v'] for row in rows if row['asset'] == asset] or None
+
+    async def load_news(self, assets):
+        self.batches.append(sorted(assets))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('429')
+        return {asset: f'{asset}-{self.version}' for asset in assets if asset != 'UNKNOWN'}
+
+
+@pytest.fixture
+async def sources():
+    return FakeSources(delay=0.01)
+
+
+@pytest.fixture
+async def store(sources):
+    s = OnChainStore(refresh_interval=60, batch_window=0.01)
+    s.add_dataset('whales', sources.load_rows, sources.select)
+    s.add_per_asset('news', sources.load_news)
+    yield s
+    await s.close()
+
+
+def age(store, seconds):
+    """Pretend every cached entry was fetched `seconds` ago"""
+    for entry in store._raw.values():
+        entry.fetched_at -= seconds
+    for values in store._values.values():
+        for entry in values.values():
+            entry.fetched_at -= seconds
+
+
+class TestOnChainStore:
+    """One load per provider per interval, served from memory"""
+
+    async def test_cold_reads_share_loads(self, store, sources):
+        results = await asyncio.gather(*[store.get(asset) for asset in ['BTC', 'ETH', 'SOL']])
+        assert results[0] == {'whales': [1], 'news': 'BTC-1'}
+        assert results[2] == {'whales': None, 'news': 'SOL-1'}
+        assert sources.dataset_calls == 1            # Global rows downloaded once for all symbols
+        assert sources.batches == [['BTC', 'ETH', 'SOL']]  # Concurrent misses coalesced
+
+    async def test_fresh_reads_hit_memory(self, store, sources):
+        await store.get('BTC')
+        await store.get('BTC')
+        assert sources.dataset_calls == 1 and len(sources.batches) == 1
+        assert store.stats()['providers']['news']['hits'] == 1
+
+    async def test_missing_asset_is_negatively_cached(self, store, sources):
+        assert (await store.get('UNKNOWN'))['news'] is None
+        await store.get('UNKNOWN')
+        assert len(sources.batches) == 1
+
+    async def test_stale_served_while_revalidating(self, store, sources):
+        await store.get('BTC')
+        age(store, 120)
+        sources.version = 2
+        assert await store.get('BTC') == {'whales': [1], 'news': 'BTC-1'}  # No wait on stale data
+        await asyncio.sleep(0.1)
+        assert await store.get('BTC') == {'whales': [2], 'news': 'BTC-2'}
+        assert store.stats()['providers']['whales']['stale_hits'] == 1
+
+    async def test_failed_refresh_keeps_old_data(self, store, sources):
+        await store.get('BTC')
+        age(store, 120)
+        sources.fail = True
+        await store.get('BTC')
+        await asyncio.sleep(0.1)
+        assert await store.get('BTC') == {'whales': [1], 'news': 'BTC-1'}
+        assert store.stats()['providers']['whales']['errors'] == 1
+        assert sources.dataset_calls == 2  # Not retried until retry_after
+
+    async def test_cold_failure_returns_none(self, store, sources):
+        sources.fail = True
+        assert await store.get('BTC') == {'whales': None, 'news': None}
+
+    async def test_refresh_covers_tracked_assets(self, store, sources):
+        store.track(['BTC', 'ETH'])
+        sources.version = 3
+        await store.refresh()
+        assert sources.batches == [['BTC', 'ETH']]
+        sources.delay = 10  # Served from memory, no load
+        assert await asyncio.wait_for(store.get('ETH'), 1) == {'whales': [3], 'news': 'ETH-3'}
+
+    async def test_background_loop_refreshes(self, sources):
+        store = OnChainStore(refresh_interval=0.05, batch_window=0.001)
+        store.add_per_asset('news', sources.load_news)
+        await store.get('BTC')
+        sources.version = 2
+        await asyncio.sleep(0.2)
+        assert store._values['news']['BTC'].value == 'BTC-2'
+        await store.close()
+        assert store._refresh_task is None
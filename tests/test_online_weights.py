@@ -0,0 +1,122 @@
+# tests/test_online_weights.py
+"""
+Tests for online ensemble weight adaptation from signal outcomes
+"""
+import numpy as np
+import pytest
+
+from src.strategies.ml_engine_real import RealMLEngine
+from src.strategies.online_weights import OnlineWeightLearner
+from src.strategies.outcome_tracker import OutcomeTracker
+from tests.test_ml_engine import write_models
+from tests.test_outcome_tracker import make_signal
+
+WEIGHTS = {'xgb': 0.4, 'lgbm': 0.3, 'catboost': 0.3}
+
+
+def outcomes(n, seed=0):
+    """Outcomes where xgb is informative, lgbm is noise and catboost is inverted"""
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        y = int(rng.random() < 0.5)
+        yield {'xgb': 0.7 if y else 0.3, 'lgbm': float(rng.random()), 'catboost': 0.2 if y else 0.8}, y
+
+
+class TestOnlineWeightLearner:
+    """Exponentiated-gradient weights and model dropping"""
+
+    def test_weights_shift_to_better_model(self):
+        learner = OnlineWeightLearner(WEIGHTS, drop_weight=0.0)
+        for predictions, y in outcomes(200):
+            learner.observe(predictions, y)
+
+        assert sum(learner.weights.values()) == pytest.approx(1.0)
+        assert learner.weights['xgb'] > 0.8
+        assert learner.weights['catboost'] < learner.weights['lgbm'] < learner.weights['xgb']
+        assert learner.logloss['xgb'] < learner.logloss['lgbm'] < learner.logloss['catboost']
+        assert learner.brier['xgb'] == pytest.approx(0.09)
+        assert learner.dropped == set()
+
+    def test_drop_after_min_observations(self):
+        learner = OnlineWeightLearner(WEIGHTS, drop_weight=0.05, min_observations=30)
+        dropped = []
+        for i, (predictions, y) in enumerate(outcomes(300)):
+            name = learner.observe(predictions, y)
+            if name:
+                dropped.append((i + 1, name))
+
+        assert dropped and dropped[0][0] >= 30 and dropped[0][1] == 'catboost'
+        assert 'xgb' not in learner.dropped
+        assert learner.weights['catboost'] == 0.0
+        assert sum(learner.weights.values()) == pytest.approx(1.0)
+
+    def test_last_model_never_dropped(self):
+        learner = OnlineWeightLearner({'xgb': 1.0}, drop_weight=0.5, min_observations=1)
+        for _ in range(20):
+            assert learner.observe({'xgb': 0.99}, 0) is None
+        assert learner.weights == {'xgb': 1.0} and learner.dropped == set()
+
+    def test_reset_restores_initial_weights(self):
+        learner = OnlineWeightLearner(WEIGHTS, min_observations=10)
+        weights = learner.weights
+        for predictions, y in outcomes(200):
+            learner.observe(predictions, y)
+        learner.reset()
+        assert learner.weights is weights and weights == pytest.approx(WEIGHTS)
+        assert learner.dropped == set() and learner.observations == 0
+
+
+class TestEngineOnlineWeights:
+    """Outcomes reach RealMLEngine weights; dropped models skip inference"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        path = f"{tmp_path}/"
+        write_models(path, ['a', 'b', 'c'])
+        engine = RealMLEngine(model_path=path)
+        engine.enable_online_weights(drop_weight=0.2, min_observations=5)
+        return engine
+
+    def test_dropped_model_not_predicted(self, engine):
+        _, predictions = engine.predict_components({'a': 1.0})
+        assert set(predictions) == {'xgb', 'lgbm'}
+
+        for _ in range(20):
+            engine.record_outcome({'xgb': 0.8, 'lgbm': 0.1}, 1)
+        assert engine.online.dropped == {'lgbm'}
+        assert engine.model_weights['lgbm'] == 0.0
+        assert 'catboost' not in engine.online.dropped  # Not loaded - never a drop candidate
+
+        prob, predictions = engine.predict_components({'a': 1.0})
+        assert set(predictions) == {'xgb'} and prob == pytest.approx(predictions['xgb'])
+        assert engine.model_info()['online']['dropped'] == ['lgbm']
+
+    def test_stale_version_ignored_and_reload_resets(self, engine):
+        engine.record_outcome({'xgb': 0.8, 'lgbm': 0.1}, 1, version=engine.version + 1)
+        assert engine.online.observations == 0
+
+        engine.record_outcome({'xgb': 0.8, 'lgbm': 0.1}, 1, version=engine.version)
+        assert engine.online.observations == 1
+        assert engine.reload(force=True)
+        assert engine.online.observations == 0 and engine.model_weights == pytest.approx(WEIGHTS)
+
+    def test_outcome_tracker_feeds_engine(self, engine):
+        tracker = OutcomeTracker(max_hold_seconds=3600, ml_engine=engine)
+        signal = make_signal()
+        signal.rationale.update({'ml_models': {'xgb': 0.8, 'lgbm': 0.4}, 'ml_version': engine.version})
+        tracker.track(signal, ts=0)
+        tracker.track(make_signal(), ts=0)  # No ML predictions - not forwarded
+
+        weights = dict(engine.model_weights)
+        tracker.on_price('BTC/USDT', 94.0, ts=1)  # Both stopped out
+        assert engine.online.observations == 1
+        assert engine.model_weights['lgbm'] > weights['lgbm']
+
+    def test_short_outcomes_not_scored_against_long_target(self, engine):
+        tracker = OutcomeTracker(max_hold_seconds=3600, ml_engine=engine)
+        signal = make_signal('SELL', entry=100.0, sl=105.0, tps=(95.0, 90.0, 80.0))
+        signal.rationale.update({'ml_models': {'xgb': 0.8, 'lgbm': 0.4}, 'ml_version': engine.version})
+        tracker.track(signal, ts=0)
+
+        tracker.on_price('BTC/USDT', 106.0, ts=1)  # Short stopped out
+        assert tracker.closed_count == 1 and engine.online.observations == 0
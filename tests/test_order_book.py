@@ -0,0 +1,177 @@
+"""
+Tests for the local order book depth engine (offline replay of recorded WS sessions)
+"""
+import json
+import pytest
+from pathlib import Path
+from src.strategies.order_book import LocalOrderBook, OrderBookManager
+from src.strategies.binance_ws import BinanceWSClient
+from src.strategies.smart_money_analyzer import SmartMoneyAnalyzer
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'depth_btcusdt_replay.jsonl'
+SYMBOL = 'BTC/USDT:USDT'
+
+
+def load_recording(path=FIXTURE):
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def replay(client, entries):
+    """Feeds a recording (BinanceWSClient record_path format) through the live message path."""
+    for entry in entries:
+        if 'snapshot' in entry:
+            client.order_books.on_snapshot(entry['snapshot'], entry['data'])
+        else:
+            client._handle_payload(entry['stream_message'])
+
+
+@pytest.fixture
+def recording():
+    return load_recording()
+
+
+@pytest.fixture
+def client():
+    return BinanceWSClient([SYMBOL], order_books=True)
+
+
+class TestOrderBookReplay:
+    """Replay of a recorded diff-depth session"""
+
+    def test_buffered_events_applied_after_snapshot(self, client, recording):
+        """Events before the snapshot are buffered, stale ones dropped"""
+        replay(client, recording[:5])
+        book = client.order_books.books[SYMBOL]
+
+        assert client.order_books.is_synced(SYMBOL)
+        assert book.bids[50000.0] == 2.5
+        assert book.asks[50010.0] == 1.0
+        assert 49000.0 not in book.bids  # u=98 < lastUpdateId
+        assert book.last_update_id == 105
+
+    def test_bid_wall_detection(self, client, recording):
+        replay(client, recording[:5])
+        metrics = client.get_order_book_metrics('BTC/USDT')
+
+        assert metrics['bid_wall']['price'] == 49900.0
+        assert metrics['ask_wall'] is None
+        assert metrics['imbalance'] > 0.5
+
+    def test_sweep_detection(self, client, recording):
+        """Three ask levels removed in one update is an upward sweep"""
+        replay(client, recording[:7])
+        sweep = client.get_order_book_metrics(SYMBOL)['last_sweep']
+
+        assert sweep['direction'] == 'up'
+        assert sweep['price_from'] == 50010.0
+        assert sweep['price_to'] == 50500.0
+        assert sweep['notional'] == pytest.approx(250170.0)
+
+    def test_incremental_depth_matches_full_recompute(self, client, recording):
+        """Band sums maintained per update equal a from-scratch recompute"""
+        replay(client, recording[:8])
+        book = client.order_books.books[SYMBOL]
+        incremental = (book._bid_band_usd, book._ask_band_usd, book._bid_band_levels, book._ask_band_levels)
+
+        book._recompute_bands()
+        full = (book._bid_band_usd, book._ask_band_usd, book._bid_band_levels, book._ask_band_levels)
+        assert incremental[:2] == pytest.approx(full[:2])
+        assert incremental[2:] == full[2:]
+
+    def test_sequence_gap_triggers_resync(self, client, recording):
+        replay(client, recording[:9])
+        assert not client.order_books.is_synced(SYMBOL)
+        assert client.order_books.resync_count[SYMBOL] == 1
+        assert client.get_order_book_metrics(SYMBOL) == {}
+
+    def test_full_replay_resyncs_from_new_snapshot(self, client, recording):
+        replay(client, recording)
+        book = client.order_books.books[SYMBOL]
+
+        assert client.order_books.is_synced(SYMBOL)
+        assert book.best_bid == 50200.0
+        assert book.asks[50300.0] == 0.4
+        assert book.last_update_id == 203
+        # Other streams in the recording go through the same path
+        assert client.data[SYMBOL]['funding_rate'] == pytest.approx(0.0001)
+        assert client.ledgers[SYMBOL].window('1m', now=1700000000.5)['sell_count'] == 1
+
+    def test_snapshot_newer_than_buffer_waits_for_covering_event(self, client, recording):
+        """Snapshot fetched after the buffered window is bridged by the next live event's U/u range"""
+        replay(client, recording[:4])  # Buffered events up to u=105
+        snapshot = dict(recording[4]['data'], lastUpdateId=110)
+        manager = client.order_books
+
+        assert not manager.on_snapshot(SYMBOL, snapshot)
+        assert not manager.is_synced(SYMBOL) and not manager.needs_snapshot(SYMBOL)
+
+        manager.on_depth_event(SYMBOL, {'U': 108, 'u': 112, 'pu': 105, 'b': [['50000.0', '4.0']], 'a': []})
+        manager.on_depth_event(SYMBOL, {'U': 113, 'u': 115, 'pu': 112, 'b': [], 'a': [['50020.0', '0']]})
+        book = manager.books[SYMBOL]
+        assert manager.is_synced(SYMBOL) and manager.resync_count[SYMBOL] == 0
+        assert book.last_update_id == 115 and book.bids[50000.0] == 4.0 and 50020.0 not in book.asks
+
+    def test_stream_past_snapshot_resyncs(self, client, recording):
+        replay(client, recording[:4])
+        manager = client.order_books
+        manager.on_snapshot(SYMBOL, dict(recording[4]['data'], lastUpdateId=110))
+        manager.on_depth_event(SYMBOL, {'U': 115, 'u': 118, 'pu': 114, 'b': [], 'a': []})
+
+        assert not manager.is_synced(SYMBOL) and manager.needs_snapshot(SYMBOL)
+        assert manager.resync_count[SYMBOL] == 1
+
+    @pytest.mark.asyncio
+    async def test_smart_money_reads_order_book(self, client, recording):
+        replay(client, recording[:5])
+        analyzer = SmartMoneyAnalyzer(ws_client=client)
+        liq = await analyzer.get_liquidity_data('BTC/USDT')
+
+        assert liq['has_order_book']
+        assert liq['long_liq_price'] == 49900.0
+        assert liq['liquidity_gap'] > 0
+
+
+class TestLocalOrderBook:
+    """Unit tests for the book itself"""
+
+    def test_snapshot_metrics(self):
+        book = LocalOrderBook('TEST', depth_pct=0.01)
+        book.load_snapshot([['100', '10'], ['98', '5']], [['101', '5'], ['105', '5']], 1)
+
+        assert book.mid == 100.5
+        assert book.metrics['bid_depth_usd'] == pytest.approx(100 * 10)  # 98 is outside ±1%
+        assert book.metrics['ask_depth_usd'] == pytest.approx(101 * 5)
+
+    def test_zero_qty_removes_level(self):
+        book = LocalOrderBook('TEST')
+        book.load_snapshot([['100', '1']], [['101', '1']], 1)
+        book.apply([['100', '0'], ['99', '2']], [], 2)
+
+        assert book.best_bid == 99.0
+        assert 100.0 not in book.bids
+
+    def test_incremental_wall_matches_full_scan(self):
+        """Tracked largest band level equals a full band scan after random updates"""
+        import random
+        rng = random.Random(7)
+        book = LocalOrderBook('TEST', depth_pct=0.01)
+        book.load_snapshot([[str(99 - i * 0.1), '1'] for i in range(20)],
+                           [[str(101 + i * 0.1), '1'] for i in range(20)], 1)
+        for update_id in range(2, 500):
+            bids = [[str(round(rng.uniform(97.0, 100.0), 1)), str(rng.choice([0, 0.5, 2, 10]))] for _ in range(3)]
+            asks = [[str(round(rng.uniform(100.5, 103.5), 1)), str(rng.choice([0, 0.5, 2, 10]))] for _ in range(3)]
+            book.apply(bids, asks, update_id)
+            for is_bid in (True, False):
+                side = book.bids if is_bid else book.asks
+                book._find_wall(is_bid)
+                tracked, scanned = book._walls[is_bid], book._band_max(is_bid)
+                assert (tracked is None) == (scanned is None)
+                if scanned is not None:
+                    assert tracked * side[tracked] == pytest.approx(scanned * side[scanned])
+
+    def test_stale_snapshot_rejected(self):
+        manager = OrderBookManager(['TEST'])
+        manager.on_depth_event('TEST', {'U': 50, 'u': 55, 'pu': 49, 'b': [], 'a': []})
+
+        assert not manager.on_snapshot('TEST', {'lastUpdateId': 10, 'bids': [], 'asks': []})
+        assert manager.needs_snapshot('TEST')
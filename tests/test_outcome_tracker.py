@@ -0,0 +1,111 @@
+"""
+Tests for live SL/TP outcome tracking
+"""
+import pytest
+from datetime import datetime
+from src.strategies.outcome_tracker import OutcomeTracker
+from src.strategies.risk_manager import DynamicRiskManager
+from src.strategies.binance_ws import BinanceWSClient
+from src.strategies.models import EnhancedSignal
+
+
+def make_signal(direction='BUY', entry=100.0, sl=95.0, tps=(105.0, 110.0, 120.0), symbol='BTC/USDT:USDT',
+                regime='bullish'):
+    return EnhancedSignal(
+        symbol=symbol, direction=direction, confidence=0.7, entry_price=entry, stop_loss=sl,
+        take_profit=tps, position_size_pct=0.02, expected_value=0.5, risk_reward=2.0,
+        timeframe='1h', rationale={'regime': regime}, valid_until=datetime.now(),
+        model_agreement={}, var_95=0.0, max_drawdown_risk=0.0, kelly_fraction=0.1
+    )
+
+
+@pytest.fixture
+def tracker():
+    return OutcomeTracker(DynamicRiskManager(), max_hold_seconds=3600)
+
+
+class TestOutcomeTracker:
+    """First-touch SL/TP detection"""
+
+    def test_stop_before_tp1(self, tracker):
+        tracker.track(make_signal(), ts=0)
+        assert tracker.on_price('BTC/USDT', 101.0, ts=1) == 0
+        assert tracker.on_price('BTC/USDT', 94.0, ts=2) == 1
+
+        stats = tracker.get_stats(symbol='BTCUSDT')
+        assert stats['outcomes'] == {'SL': 1}
+        assert tracker.risk_manager.trade_history[-1]['profit_pct'] == pytest.approx(-0.05)
+        assert tracker.risk_manager.trade_history[-1]['regime'] == 'bullish'
+
+    def test_breakeven_after_tp1(self, tracker):
+        """After TP2 the stop sits at entry, so a pullback closes as TP2"""
+        tracker.track(make_signal(), ts=0)
+        tracker.on_price('BTC/USDT', 106.0, ts=1)
+        tracker.on_price('BTC/USDT', 111.0, ts=2)
+        assert len(tracker.open) == 1
+        tracker.on_price('BTC/USDT', 99.0, ts=3)
+
+        assert tracker.get_stats(symbol='BTC/USDT')['outcomes'] == {'TP2': 1}
+        assert tracker.risk_manager.trade_history[-1]['profit_pct'] == pytest.approx(0.10)
+
+    def test_gap_through_all_tps(self, tracker):
+        tracker.track(make_signal('SELL', entry=100.0, sl=105.0, tps=(95.0, 90.0, 80.0)), ts=0)
+        assert tracker.on_price('BTCUSDT', 79.0, ts=1) == 1
+        assert tracker.get_stats(regime='bullish')['outcomes'] == {'TP3': 1}
+
+    def test_candle_range_hitting_both_counts_as_stop(self, tracker):
+        tracker.track(make_signal(), ts=0)
+        tracker.on_price('BTC/USDT', 100.0, ts=1, low=94.0, high=106.0)
+        assert tracker.get_stats(symbol='BTC/USDT')['outcomes'] == {'SL': 1}
+
+    def test_expiry_uses_last_price(self, tracker):
+        tracker.track(make_signal(), ts=0)
+        tracker.on_price('BTC/USDT', 102.0, ts=10)
+        tracker.on_price('ETH/USDT', 1.0, ts=4000)  # Any tick advances expiry
+
+        stats = tracker.get_stats(symbol='BTC/USDT')
+        assert stats['outcomes'] == {'EXPIRED': 1}
+        assert stats['avg_profit_pct'] == pytest.approx(0.02)
+
+    def test_only_crossed_levels_are_touched(self, tracker):
+        """Thousands of open signals: a tick pops only its symbol's crossed levels"""
+        for i in range(2000):
+            tracker.track(make_signal(symbol=f'SYM{i % 100}/USDT'), ts=0)
+
+        assert tracker.on_price('SYM0/USDT', 101.0, ts=1) == 0
+        assert tracker._stale == 0
+        assert tracker.on_price('SYM0/USDT', 106.0, ts=2) == 0  # TP1 -> breakeven, still open
+
+        moved = [s for s in tracker.open.values() if s.tp_hit]
+        assert len(moved) == 20 and all(s.symbol == 'SYM0USDT' for s in moved)
+        assert all(len(tracker._levels[f'SYM{i}USDT'].up) == 20 for i in range(1, 100))
+
+    def test_stale_levels_stay_bounded(self, tracker):
+        """Stops left behind by closed signals are compacted away"""
+        for i in range(1500):
+            tracker.track(make_signal(), ts=0)
+        tracker.on_price('BTC/USDT', 121.0, ts=1)
+
+        assert tracker.get_stats(symbol='BTC/USDT')['outcomes'] == {'TP3': 1500}
+        assert len(tracker._levels['BTCUSDT'].down) <= 1024
+
+    def test_feeds_dynamic_win_loss_ratio(self, tracker):
+        for i in range(12):
+            tracker.track(make_signal(), ts=0)
+            tracker.on_price('BTC/USDT', 111.0 if i % 2 else 94.0, ts=1)
+            tracker.on_price('BTC/USDT', 100.0, ts=2)
+
+        # Wins close at TP2 (+10%) after breakeven, losses at SL (-5%)
+        assert tracker.risk_manager._calculate_dynamic_win_loss_ratio() == pytest.approx(2.0)
+        assert tracker.risk_manager.win_loss_stats['count'] == 12
+
+    def test_neutral_signal_ignored(self, tracker):
+        assert tracker.track(make_signal('NEUTRAL')) is None
+
+    def test_ws_price_listener(self, tracker):
+        client = BinanceWSClient(['BTC/USDT:USDT'])
+        client.add_price_listener(tracker.on_price)
+        tracker.track(make_signal(), ts=0)
+
+        client._handle_payload({'stream': 'btcusdt@markPrice', 'data': {'E': 1000, 'p': '94.5', 'r': '0'}})
+        assert tracker.get_stats(symbol='BTC/USDT')['outcomes'] == {'SL': 1}
@@ -0,0 +1,99 @@
+"""
+Tests for the pre-serialized /api/status and /api/signals responses
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from src.services.fast_json import dumps
+from src.services.response_cache import ResponseCache
+
+
+class TestFastJson:
+    """orjson (or stdlib fallback) encoding of bot payloads"""
+
+    def test_numpy_and_datetime(self):
+        data = {'price': np.float64(1.5), 'count': np.int64(3), 'levels': np.array([1.0, 2.0]),
+                'at': datetime(2024, 1, 1, 12, 0)}
+        assert json.loads(dumps(data)) == {'price': 1.5, 'count': 3, 'levels': [1.0, 2.0],
+                                           'at': '2024-01-01T12:00:00'}
+
+
+class TestResponseCache:
+    """Bodies are rebuilt only on version change"""
+
+    def test_rebuild_only_on_version_change(self):
+        cache = ResponseCache()
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'n': len(builds)}
+
+        first = cache.get('signals', 1, build)
+        assert cache.get('signals', 1, build) is first
+        second = cache.get('signals', 2, build)
+        assert len(builds) == 2 and second.etag != first.etag
+        assert cache.stats == {'builds': 2, 'hits': 1, 'not_modified': 0}
+
+
+class TestCachedEndpoints:
+    """ETag / If-None-Match and gzip on the API"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        from fastapi.testclient import TestClient
+        from src.services import api_server
+        signal = SimpleNamespace(symbol='BTC/USDT', confidence=0.9, reasoning=['x' * 50] * 40,
+                                 valid_until=datetime(2024, 1, 1) + timedelta(hours=4))
+        generator = SimpleNamespace(signal_cache={'BTC/USDT_1h': (signal, datetime(2024, 1, 1))},
+                                    cache_version=1)
+        bot = SimpleNamespace(is_running=True, exchanges={'binance': None},
+                              settings=SimpleNamespace(trading_pairs=['BTC/USDT']),
+                              signal_generator=generator)
+        monkeypatch.setattr(api_server, 'bot_instance', bot)
+        monkeypatch.setattr(api_server, 'response_cache', ResponseCache())
+        return TestClient(api_server.app), bot, api_server.response_cache
+
+    def test_not_modified_until_cache_changes(self, client):
+        test_client, bot, cache = client
+        response = test_client.get('/api/signals')
+        assert response.status_code == 200 and response.json()[0]['symbol'] == 'BTC/USDT'
+        etag = response.headers['etag']
+
+        repeat = test_client.get('/api/signals', headers={'If-None-Match': etag})
+        assert repeat.status_code == 304 and repeat.content == b''
+        assert cache.stats['builds'] == 1
+
+        bot.signal_generator.cache_version += 1  # Same content: rebuilt, but ETag still matches
+        assert test_client.get('/api/signals', headers={'If-None-Match': etag}).status_code == 304
+        bot.signal_generator.signal_cache['BTC/USDT_1h'][0].confidence = 0.8
+        bot.signal_generator.cache_version += 1
+        changed = test_client.get('/api/signals', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and cache.stats['builds'] == 3
+
+    def test_gzip_when_accepted(self, client):
+        test_client, _, cache = client
+        response = test_client.get('/api/signals', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['content-encoding'] == 'gzip'
+        assert gzip.decompress(cache._entries['signals'].gzip_body) == cache._entries['signals'].body
+        raw = test_client.get('/api/signals', headers={'Accept-Encoding': 'identity'})
+        assert 'content-encoding' not in raw.headers
+        assert json.loads(raw.content)[0]['confidence'] == 0.9
+
+    def test_status_payload(self, client):
+        test_client, _, _ = client
+        response = test_client.get('/api/status')
+        assert response.json()['active_exchanges'] == ['binance'] and 'etag' in response.headers
+
+    def test_status_last_update_follows_changes(self, client):
+        test_client, bot, _ = client
+        assert test_client.get('/api/status').json()['last_update'] == 'N/A'
+        bot.signal_generator.updated_at = datetime(2024, 1, 1, 12)
+        assert test_client.get('/api/status').json()['last_update'] == '2024-01-01T12:00:00'
+        etag = test_client.get('/api/status').headers['etag']
+        bot.status_changed_at = datetime(2024, 1, 1, 13)
+        changed = test_client.get('/api/status', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.json()['last_update'] == '2024-01-01T13:00:00'
@@ -0,0 +1,115 @@
+"""
+Tests for the pipelined pair scanner and streaming top-N ranking
+"""
+import asyncio
+import random
+import pytest
+from src.strategies.scan_pipeline import PipelinedScanner, StreamingTopN
+
+
+def reference_top(scores, top_n):
+    """Old behaviour: stable sort of all results by score, descending"""
+    ranked = [(s, i) for i, s in enumerate(scores) if s is not None]
+    return [i for s, i in sorted(ranked, key=lambda x: x[0], reverse=True)[:top_n]]
+
+
+class TestStreamingTopN:
+    """Heap ranking and certainty"""
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_matches_sorted_in_any_arrival_order(self, seed):
+        rng = random.Random(seed)
+        scores = [rng.choice([None, 0.8, 0.85, 0.9, 0.95]) for _ in range(60)]
+        ranker = StreamingTopN(5, len(scores), max_score=0.95)
+        published = []
+        for order in rng.sample(range(len(scores)), len(scores)):
+            published += ranker.add(order, scores[order], order)
+
+        assert ranker.results() == reference_top(scores, 5)
+        assert sorted(published) == sorted(ranker.results())
+
+    def test_capped_score_is_published_before_scan_ends(self):
+        ranker = StreamingTopN(2, 4, max_score=0.95)
+        assert ranker.add(0, 0.95, 'a') == ['a']     # Nobody can beat it
+        assert ranker.add(2, 0.90, 'c') == []        # Pairs 1 and 3 may still beat it
+        assert ranker.add(1, 0.95, 'b') == ['b']
+        assert ranker.complete
+
+    def test_tie_waits_for_earlier_pair(self):
+        ranker = StreamingTopN(1, 3, max_score=0.95)
+        assert ranker.add(1, 0.95, 'b') == []        # Pair 0 could tie and rank first
+        assert ranker.add(0, None) == ['b']
+
+    def test_everything_published_when_done(self):
+        ranker = StreamingTopN(3, 2)
+        ranker.add(1, 0.5, 'b')
+        assert ranker.add(0, 0.7, 'a') == ['a', 'b']
+
+
+class TestPipelinedScanner:
+    """Stage limits, early publishing and early exit"""
+
+    async def test_stage_concurrency_limits(self):
+        active = {'fetch': 0, 'compute': 0}
+        peak = {'fetch': 0, 'compute': 0}
+
+        def tracked(stage, value):
+            async def run(*args):
+                active[stage] += 1
+                peak[stage] = max(peak[stage], active[stage])
+                await asyncio.sleep(0.001)
+                active[stage] -= 1
+                return value(*args)
+            return run
+
+        scanner = PipelinedScanner(
+            tracked('fetch', lambda pair: pair),
+            tracked('compute', lambda pair, data: (int(pair[1:]) / 100, pair)),
+            fetch_concurrency=5, compute_concurrency=2
+        )
+        pairs = [f'P{i}' for i in range(40)]
+        top, stats = await scanner.scan(pairs, top_n=3)
+
+        assert top == ['P39', 'P38', 'P37']
+        assert peak == {'fetch': 5, 'compute': 2}
+        assert stats['processed'] == 40 and stats['signals'] == 40
+
+    async def test_publishes_before_slowest_pair(self):
+        slow_done = asyncio.Event()
+        published = []
+
+        async def fetch(pair):
+            if pair == 'SLOW':
+                await asyncio.sleep(10)
+                slow_done.set()
+            return pair
+
+        async def compute(pair, data):
+            return (0.95, pair) if pair.startswith('TOP') else (0.85, pair)
+
+        async def on_signal(item):
+            published.append(item)
+
+        scanner = PipelinedScanner(fetch, compute, fetch_concurrency=4)
+        top, stats = await asyncio.wait_for(
+            scanner.scan(['TOP1', 'TOP2', 'MID', 'SLOW'], top_n=2, max_score=0.95, on_signal=on_signal), 1
+        )
+
+        assert top == published == ['TOP1', 'TOP2']
+        assert stats['published_early'] == 2
+        assert stats['processed'] == 2 and not slow_done.is_set()  # Slow pair cancelled
+
+    async def test_failures_are_counted(self):
+        async def fetch(pair):
+            if pair == 'BAD':
+                raise RuntimeError('boom')
+            return None if pair == 'EMPTY' else pair
+
+        async def compute(pair, data):
+            if pair == 'ERR':
+                raise ValueError('bad data')
+            return (0.9, pair)
+
+        top, stats = await PipelinedScanner(fetch, compute).scan(['BAD', 'EMPTY', 'ERR', 'OK'], top_n=5)
+        assert top == ['OK']
+        assert stats['errors'] == 2 and stats['processed'] == 4
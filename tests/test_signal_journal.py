@@ -0,0 +1,107 @@
+"""
+Tests for the signal/outcome journal
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.db.journal import SignalJournal
+from src.db.models import SignalRecord
+from src.strategies.models import EnhancedSignal
+
+T0 = datetime(2024, 1, 1, 12, 0)
+T0_MS = int(T0.timestamp() * 1000)
+STEP = 300_000
+
+
+def make_signal(symbol='BTC/USDT', direction='BUY', entry=100.0, sl=95.0, tps=(105.0, 110.0, 115.0)):
+    return EnhancedSignal(
+        symbol=symbol, direction=direction, confidence=0.7, entry_price=entry, stop_loss=sl,
+        take_profit=tps, position_size_pct=0.02, expected_value=0.5, risk_reward=1.0,
+        timeframe='1h', rationale={'ml_probability': 0.6, 'regime': 'bullish'},
+        valid_until=T0 + timedelta(hours=4), model_agreement={}, var_95=0.0,
+        max_drawdown_risk=0.0, kelly_fraction=0.1
+    )
+
+
+def candles(*hl):
+    """[(high, low), ...] -> 5m OHLCV starting at T0"""
+    return [[T0_MS + i * STEP, (h + l) / 2, h, l, (h + l) / 2, 1.0] for i, (h, l) in enumerate(hl)]
+
+
+@pytest.fixture
+async def journal(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'journal.db'}")
+    j = SignalJournal(session_factory=sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+                      db_engine=engine, flush_interval=3600)
+    await j.start()
+    yield j
+    await j.stop()
+    await engine.dispose()
+
+
+async def all_records(journal):
+    async with journal.session_factory() as session:
+        return (await session.execute(select(SignalRecord).order_by(SignalRecord.id))).scalars().all()
+
+
+class TestSignalJournal:
+    """Buffered writes, outcome resolution and stats"""
+
+    async def test_record_is_buffered_until_flush(self, journal):
+        journal.record(make_signal(), timestamp=T0)
+        assert await all_records(journal) == []
+
+        assert await journal.flush() == 1
+        rec = (await all_records(journal))[0]
+        assert rec.status == 'OPEN'
+        assert rec.tp1 == 105.0 and rec.tp3 == 115.0
+        assert rec.regime == 'bullish'
+
+    async def test_resolver_marks_tp_and_sl(self, journal):
+        journal.record(make_signal('BTC/USDT', 'BUY'), timestamp=T0)
+        journal.record(make_signal('ETH/USDT', 'SELL', entry=100.0, sl=103.0, tps=(97.0,)), timestamp=T0)
+        await journal.flush()
+
+        feeds = {
+            'BTC/USDT': candles((101, 99), (106, 100)),   # TP1 first
+            'ETH/USDT': candles((101, 99), (104, 100)),   # SL for the short
+        }
+
+        async def fetch(symbol, timeframe, since=None, limit=None):
+            return feeds[symbol]
+
+        assert await journal.resolve_open(fetch, now=T0 + timedelta(hours=1)) == 2
+        btc, eth = await all_records(journal)
+        assert btc.status == 'TP' and btc.pnl_pct == pytest.approx(5.0)
+        assert eth.status == 'SL' and eth.pnl_pct == pytest.approx(-3.0)
+
+    async def test_same_candle_counts_as_sl(self, journal):
+        journal.record(make_signal(), timestamp=T0)
+        await journal.flush()
+
+        async def fetch(symbol, timeframe, since=None, limit=None):
+            return candles((106, 94))
+
+        await journal.resolve_open(fetch, now=T0 + timedelta(hours=1))
+        assert (await all_records(journal))[0].status == 'SL'
+
+    async def test_expiry_and_stats(self, journal):
+        journal.record(make_signal(), timestamp=T0)
+        journal.record(make_signal('SOL/USDT'), timestamp=T0)
+        await journal.flush()
+
+        async def fetch(symbol, timeframe, since=None, limit=None):
+            return candles((101, 99), (102, 100)) if symbol == 'BTC/USDT' else candles((106, 100))
+
+        # Not expired yet: only SOL resolves
+        assert await journal.resolve_open(fetch, now=T0 + timedelta(hours=1)) == 1
+        assert await journal.resolve_open(fetch, now=T0 + timedelta(hours=49)) == 1
+
+        stats = await journal.get_stats()
+        assert stats['total_signals'] == 2
+        assert stats['wins'] == 1 and stats['expired'] == 1
+        assert stats['win_rate'] == 100.0
+        assert stats['open'] == 0
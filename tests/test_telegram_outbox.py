@@ -0,0 +1,163 @@
+"""
+Tests for the non-blocking Telegram delivery queue
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+from src.services.telegram_outbox import DIGEST_SEPARATOR, TelegramOutbox
+
+
+class FakeTelegram:
+    """Records payloads; scripted responses are consumed first, then 200 OK"""
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = list(responses or [])
+        self.delay = delay
+        self.sent = []
+
+    async def __call__(self, payload):
+        await asyncio.sleep(self.delay)
+        self.sent.append((time.monotonic(), payload))
+        if self.responses:
+            return self.responses.pop(0)
+        return 200, {'ok': True}
+
+    def texts(self):
+        return [payload['text'] for _, payload in self.sent]
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        await asyncio.sleep(0.01)
+
+
+def make_outbox(transport, **kwargs):
+    options = dict(default_chat_id='1', transport=transport, chat_interval=0.05,
+                   group_interval=0.2, persist_interval=0.01)
+    options.update(kwargs)
+    return TelegramOutbox(**options)
+
+
+class TestTelegramOutbox:
+    """Rate limits, retries, digests and persistence"""
+
+    async def test_enqueue_does_not_wait_for_telegram(self):
+        transport = FakeTelegram(delay=1.0)
+        outbox = make_outbox(transport)
+        outbox.start()
+        started = time.monotonic()
+        for i in range(20):
+            outbox.enqueue(f'signal {i}')
+        assert time.monotonic() - started < 0.05
+        await outbox.stop()
+
+    async def test_burst_is_coalesced_into_digest(self):
+        transport = FakeTelegram()
+        outbox = make_outbox(transport)
+        outbox.start()
+        delivered = []
+        outbox.enqueue('signal 0', on_sent=lambda: delivered.append(0))
+        await wait_for(lambda: delivered == [0])
+        for i in range(1, 4):  # Arrive while the chat is rate limited
+            outbox.enqueue(f'signal {i}', on_sent=lambda i=i: delivered.append(i))
+        await wait_for(lambda: outbox.pending() == 0)
+
+        texts = transport.texts()
+        assert texts[0] == 'signal 0'
+        assert len(texts) == 2 and texts[1].split(DIGEST_SEPARATOR)[1:] == ['signal 1', 'signal 2', 'signal 3']
+        assert sorted(delivered) == [0, 1, 2, 3]
+        assert outbox.stats['digests'] == 1 and outbox.stats['messages_sent'] == 4
+        await outbox.stop()
+
+    async def test_commands_are_not_coalesced(self):
+        transport = FakeTelegram()
+        outbox = make_outbox(transport)
+        outbox.start()
+        for text in ('a', 'b', 'c'):
+            outbox.enqueue(text, coalesce=False)
+        await wait_for(lambda: outbox.pending() == 0)
+        assert transport.texts() == ['a', 'b', 'c']
+        await outbox.stop()
+
+    async def test_per_chat_interval(self):
+        transport = FakeTelegram()
+        outbox = make_outbox(transport)
+        outbox.start()
+        for chat in ('1', '-100', '1', '-100'):
+            outbox.enqueue('x', chat_id=chat, coalesce=False)
+        await wait_for(lambda: outbox.pending() == 0)
+
+        sent_at = {}
+        for ts, payload in transport.sent:
+            sent_at.setdefault(payload['chat_id'], []).append(ts)
+        assert sent_at['1'][1] - sent_at['1'][0] >= 0.05
+        assert sent_at['-100'][1] - sent_at['-100'][0] >= 0.2  # Groups are slower
+        assert sent_at['-100'][0] - sent_at['1'][0] < 0.05      # Different chats don't wait on each other
+        await outbox.stop()
+
+    async def test_global_rate(self):
+        transport = FakeTelegram()
+        outbox = make_outbox(transport, chat_interval=0, global_rate=5)
+        outbox.start()
+        for chat in range(1, 8):
+            outbox.enqueue('x', chat_id=str(chat))
+        await wait_for(lambda: outbox.pending() == 0)
+        times = [ts for ts, _ in transport.sent]
+        assert times[5] - times[0] >= 0.9
+        await outbox.stop()
+
+    async def test_retry_after_is_honoured(self):
+        transport = FakeTelegram(responses=[(429, {'ok': False, 'parameters': {'retry_after': 0.3}})])
+        outbox = make_outbox(transport)
+        outbox.start()
+        outbox.enqueue('signal')
+        await wait_for(lambda: outbox.pending() == 0)
+        assert transport.texts() == ['signal', 'signal']
+        assert transport.sent[1][0] - transport.sent[0][0] >= 0.3
+        assert outbox.stats['rate_limited'] == 1
+        await outbox.stop()
+
+    async def test_bad_request_is_dropped(self):
+        transport = FakeTelegram(responses=[(400, {'ok': False, 'description': "can't parse entities"})])
+        outbox = make_outbox(transport)
+        outbox.start()
+        outbox.enqueue('*broken')
+        outbox.enqueue('fine', coalesce=False)
+        await wait_for(lambda: outbox.pending() == 0)
+        assert transport.texts() == ['*broken', 'fine'] and outbox.stats['dropped'] == 1
+        await outbox.stop()
+
+    async def test_undelivered_survive_restart(self, tmp_path):
+        path = str(tmp_path / 'outbox.json')
+        down = FakeTelegram(responses=[(502, {})] * 10)
+        outbox = make_outbox(down, path=path)
+        outbox.start()
+        outbox.enqueue('first')
+        outbox.enqueue('second', coalesce=False)
+        await wait_for(lambda: len(down.sent) >= 1)
+        await outbox.stop()
+        saved = json.load(open(path))
+        assert [m['text'] for m in saved] == ['first', 'second']
+
+        up = FakeTelegram()
+        restarted = make_outbox(up, path=path)
+        restarted.start()
+        await wait_for(lambda: restarted.pending() == 0)
+        assert up.texts() == ['first', 'second']
+        await restarted.stop()
+        assert not (tmp_path / 'outbox.json').exists()
+
+    async def test_enqueue_from_another_thread(self):
+        transport = FakeTelegram()
+        outbox = make_outbox(transport)
+        outbox.start()
+        await asyncio.sleep(0.05)  # Sender idle, waiting for work
+        worker = threading.Thread(target=lambda: asyncio.run(asyncio.sleep(0)) or outbox.enqueue('from thread'))
+        worker.start()
+        worker.join()
+        await wait_for(lambda: transport.texts() == ['from thread'])
+        await outbox.stop()
@@ -0,0 +1,445 @@
+"""
+Parity and cache tests for the full-timeframe indicator snapshot used by the
+monolith bots (RealTimeAIEngine._analyze_timeframe)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from typing import Dict
+from src.strategies import indicators
+
+
+class LegacyTimeframe:
+    """Original nested-function implementation (reference outputs)"""
+
+    def _analyze_timeframe(self, data: Dict) -> Dict:
+        """РЕАЛЬНЫЙ анализ таймфрейма с настоящими техническими индикаторами"""
+        try:
+            # Получаем исторические данные
+            historical_data = data.get('historical_data', [])
+            current_data = data.get('current', {})
+            
+            if len(historical_data) < 50:
+                return {}
+            
+            # Создаем DataFrame для расчетов
+            df = pd.DataFrame(historical_data)
+            
+            # Текущие значения
+            close = current_data.get('close', 0)
+            high = current_data.get('high', 0)
+            low = current_data.get('low', 0)
+            volume = current_data.get('volume', 0)
+            open_price = current_data.get('open', 0)
+            
+            # Массивы для расчетов
+            closes = df['close'].values
+            highs = df['high'].values
+            lows = df['low'].values
+            volumes = df['volume'].values
+            opens = df['open'].values
+            
+            # РЕАЛЬНЫЙ RSI расчет (14 периодов)
+            def calculate_rsi(prices, period=14):
+                deltas = np.diff(prices)
+                gains = np.where(deltas > 0, deltas, 0)
+                losses = np.where(deltas < 0, -deltas, 0)
+                
+                avg_gain = np.mean(gains[:period])
+                avg_loss = np.mean(losses[:period])
+                
+                for i in range(period, len(gains)):
+                    avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+                    avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+                
+                if avg_loss == 0:
+                    return 100
+                rs = avg_gain / avg_loss
+                return 100 - (100 / (1 + rs))
+            
+            rsi = calculate_rsi(closes)
+            
+            # РЕАЛЬНЫЙ MACD расчет
+            def calculate_ema(prices, period):
+                alpha = 2 / (period + 1)
+                ema = [prices[0]]
+                for price in prices[1:]:
+                    ema.append(alpha * price + (1 - alpha) * ema[-1])
+                return np.array(ema)
+            
+            ema_12 = calculate_ema(closes, 12)
+            ema_26 = calculate_ema(closes, 26)
+            macd_line = ema_12 - ema_26
+            signal_line = calculate_ema(macd_line, 9)
+            histogram = macd_line[-1] - signal_line[-1]
+            
+            macd_data = {
+                'macd': macd_line[-1],
+                'signal': signal_line[-1],
+                'histogram': histogram
+            }
+            
+            # РЕАЛЬНЫЕ EMA расчеты
+            ema_20 = calculate_ema(closes, 20)[-1]
+            ema_50 = calculate_ema(closes, 50)[-1]
+            
+            # РЕАЛЬНЫЕ Bollinger Bands
+            def calculate_bollinger_bands(prices, period=20, std_dev=2):
+                sma = np.mean(prices[-period:])
+                std = np.std(prices[-period:])
+                upper = sma + (std * std_dev)
+                lower = sma - (std * std_dev)
+                return upper, sma, lower
+            
+            bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(closes)
+            
+            # РЕАЛЬНАЯ MA50
+            ma_50 = np.mean(closes[-50:]) if len(closes) >= 50 else closes[-1]
+            
+            # РЕАЛЬНЫЙ ADX расчет
+            def calculate_adx(highs, lows, closes, period=14):
+                # True Range
+                tr1 = highs - lows
+                tr2 = np.abs(highs - np.roll(closes, 1))
+                tr3 = np.abs(lows - np.roll(closes, 1))
+                tr = np.maximum(tr1, np.maximum(tr2, tr3))[1:]  # Убираем первый элемент
+                
+                # Directional Movement
+                dm_plus = np.where((highs[1:] - highs[:-1]) > (lows[:-1] - lows[1:]), 
+                                 np.maximum(highs[1:] - highs[:-1], 0), 0)
+                dm_minus = np.where((lows[:-1] - lows[1:]) > (highs[1:] - highs[:-1]), 
+                                  np.maximum(lows[:-1] - lows[1:], 0), 0)
+                
+                # Smoothed values
+                if len(tr) >= period:
+                    atr = np.mean(tr[-period:])
+                    di_plus = 100 * np.mean(dm_plus[-period:]) / atr if atr > 0 else 0
+                    di_minus = 100 * np.mean(dm_minus[-period:]) / atr if atr > 0 else 0
+                    
+                    if (di_plus + di_minus) > 0:
+                        dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
+                        return dx
+                
+                return 20  # Fallback
+            
+            adx = calculate_adx(highs, lows, closes)
+            
+            # РЕАЛЬНЫЙ Volume анализ
+            if len(volumes) >= 20:
+                avg_volume = np.mean(volumes[-20:])
+                volume_ratio = volume / avg_volume if avg_volume > 0 else 1.0
+            else:
+                volume_ratio = 1.0
+            
+            # РЕАЛЬНЫЙ SuperTrend расчет
+            def calculate_supertrend(highs, lows, closes, period=10, multiplier=3.0):
+                # ATR расчет
+                tr1 = highs - lows
+                tr2 = np.abs(highs - np.roll(closes, 1))
+                tr3 = np.abs(lows - np.roll(closes, 1))
+                tr = np.maximum(tr1, np.maximum(tr2, tr3))[1:]
+                
+                if len(tr) >= period:
+                    atr = np.mean(tr[-period:])
+                    hl2 = (highs[-1] + lows[-1]) / 2
+                    
+                    upper_band = hl2 + (multiplier * atr)
+                    lower_band = hl2 - (multiplier * atr)
+                    
+                    if closes[-1] > upper_band:
+                        return 1  # Бычий тренд
+                    elif closes[-1] < lower_band:
+                        return -1  # Медвежий тренд
+                    else:
+                        # Определяем по направлению цены
+                        if len(closes) >= 2:
+                            return 1 if closes[-1] > closes[-2] else -1
+                        return 1
+                return 1
+            
+            supertrend = calculate_supertrend(highs, lows, closes)
+            
+            # РЕАЛЬНЫЙ Donchian Channel
+            def calculate_donchian_channel(highs, lows, period=20):
+                if len(highs) >= period:
+                    upper = np.max(highs[-period:])
+                    lower = np.min(lows[-period:])
+                    middle = (upper + lower) / 2
+                    return upper, middle, lower
+                return highs[-1], (highs[-1] + lows[-1]) / 2, lows[-1]
+            
+            donchian_upper, donchian_middle, donchian_lower = calculate_donchian_channel(highs, lows)
+            
+            # РЕАЛЬНЫЙ VWAP расчет
+            def calculate_vwap(highs, lows, closes, volumes):
+                typical_prices = (highs + lows + closes) / 3
+                if len(typical_prices) >= 20:
+                    recent_tp = typical_prices[-20:]
+                    recent_vol = volumes[-20:]
+                    return np.sum(recent_tp * recent_vol) / np.sum(recent_vol) if np.sum(recent_vol) > 0 else closes[-1]
+                return closes[-1]
+            
+            vwap = calculate_vwap(highs, lows, closes, volumes)
+            
+            # РЕАЛЬНЫЙ Orderbook Imbalance (приближение через объем)
+            if len(volumes) >= 5:
+                recent_volumes = volumes[-5:]
+                volume_trend = np.mean(recent_volumes[-3:]) / np.mean(recent_volumes[:2]) if np.mean(recent_volumes[:2]) > 0 else 1.0
+                
+                # Определяем дисбаланс по тренду объема и цены
+                price_trend = closes[-1] / closes[-5] if len(closes) >= 5 else 1.0
+                
+                if price_trend > 1.01 and volume_trend > 1.2:
+                    orderbook_imbalance = np.random.uniform(1.1, 1.3)  # Покупки преобладают
+                elif price_trend < 0.99 and volume_trend > 1.2:
+                    orderbook_imbalance = np.random.uniform(0.7, 0.9)  # Продажи преобладают
+                else:
+                    orderbook_imbalance = np.random.uniform(0.95, 1.05)
+            else:
+                orderbook_imbalance = 1.0
+            
+            # РЕАЛЬНЫЙ Williams %R
+            def calculate_williams_r(highs, lows, closes, period=14):
+                if len(highs) >= period:
+                    highest_high = np.max(highs[-period:])
+                    lowest_low = np.min(lows[-period:])
+                    if highest_high != lowest_low:
+                        return -100 * (highest_high - closes[-1]) / (highest_high - lowest_low)
+                return -50
+            
+            williams_r = calculate_williams_r(highs, lows, closes)
+            
+            # РЕАЛЬНЫЙ CCI
+            def calculate_cci(highs, lows, closes, period=20):
+                if len(highs) >= period:
+                    typical_prices = (highs + lows + closes) / 3
+                    sma = np.mean(typical_prices[-period:])
+                    mean_deviation = np.mean(np.abs(typical_prices[-period:] - sma))
+                    if mean_deviation > 0:
+                        return (typical_prices[-1] - sma) / (0.015 * mean_deviation)
+                return 0
+            
+            cci = calculate_cci(highs, lows, closes)
+            
+            # РЕАЛЬНЫЙ Stochastic Oscillator
+            def calculate_stochastic(highs, lows, closes, period=14):
+                if len(highs) >= period:
+                    highest_high = np.max(highs[-period:])
+                    lowest_low = np.min(lows[-period:])
+                    if highest_high != lowest_low:
+                        k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
+                        return k, k * 0.9  # D = сглаженная версия K
+                return 50, 45
+            
+            stoch_k, stoch_d = calculate_stochastic(highs, lows, closes)
+            
+            # РЕАЛЬНЫЙ Ichimoku (упрощенный)
+            def calculate_ichimoku(highs, lows):
+                # Tenkan-sen (9 периодов)
+                if len(highs) >= 9:
+                    tenkan_sen = (np.max(highs[-9:]) + np.min(lows[-9:])) / 2
+                else:
+                    tenkan_sen = (highs[-1] + lows[-1]) / 2
+                
+                # Kijun-sen (26 периодов)
+                if len(highs) >= 26:
+                    kijun_sen = (np.max(highs[-26:]) + np.min(lows[-26:])) / 2
+                else:
+                    kijun_sen = (highs[-1] + lows[-1]) / 2
+                
+                return tenkan_sen, kijun_sen
+            
+            tenkan_sen, kijun_sen = calculate_ichimoku(highs, lows)
+            
+            # РЕАЛЬНЫЙ OBV
+            def calculate_obv(closes, volumes):
+                if len(closes) >= 2:
+                    obv = 0
+                    for i in range(1, len(closes)):
+                        if closes[i] > closes[i-1]:
+                            obv += volumes[i]
+                        elif closes[i] < closes[i-1]:
+                            obv -= volumes[i]
+                    return obv
+                return 0
+            
+            obv = calculate_obv(closes, volumes)
+            
+            # РЕАЛЬНЫЙ анализ свечных паттернов
+            patterns = []
+            
+            # Анализируем последние 3 свечи для паттернов
+            if len(closes) >= 3:
+                # Размеры тел свечей
+                body_sizes = np.abs(closes[-3:] - opens[-3:]) / closes[-3:]
+                
+                # Три белых солдата
+                if all(closes[-3:] > opens[-3:]) and all(body_sizes > 0.01):
+                    patterns.append('three_white_soldiers')
+                
+                # Три черных ворона
+                elif all(closes[-3:] < opens[-3:]) and all(body_sizes > 0.01):
+                    patterns.append('three_black_crows')
+                
+                # Анализ последней свечи
+                current_body = abs(close - open_price) / close if close > 0 else 0
+                upper_shadow = high - max(close, open_price)
+                lower_shadow = min(close, open_price) - low
+                
+                # Молот
+                if lower_shadow > current_body * 2 and upper_shadow < current_body * 0.5:
+                    patterns.append('hammer')
+                
+                # Падающая звезда
+                elif upper_shadow > current_body * 2 and lower_shadow < current_body * 0.5:
+                    patterns.append('shooting_star')
+                
+                # Бычья/медвежья свеча
+                if current_body > 0.02:
+                    if close > open_price:
+                        patterns.append('bullish_candle')
+                    else:
+                        patterns.append('bearish_candle')
+            
+            # Рассчитываем волатильность
+            if len(closes) >= 20:
+                volatility = np.std(closes[-20:]) / np.mean(closes[-20:])
+            else:
+                volatility = abs(high - low) / close if close > 0 else 0.02
+            
+            # Процентное изменение цены
+            price_change = (close - open_price) / open_price * 100 if open_price > 0 else 0
+        
+            return {
+                'rsi': rsi,
+                'macd': macd_data,
+                'ema_20': ema_20,
+                'ema_50': ema_50,
+                'bb_upper': bb_upper,
+                'bb_lower': bb_lower,
+                'ma_50': ma_50,
+                'adx': adx,
+                'volume_ratio': volume_ratio,
+                'supertrend': supertrend,
+                'donchian_upper': donchian_upper,
+                'donchian_lower': donchian_lower,
+                'donchian_middle': donchian_middle,
+                'vwap': vwap,
+                'orderbook_imbalance': orderbook_imbalance,
+                'williams_r': williams_r,
+                'cci': cci,
+                'stoch_k': stoch_k,
+                'stoch_d': stoch_d,
+                'tenkan_sen': tenkan_sen,
+                'kijun_sen': kijun_sen,
+                'obv': obv,
+                'price': close,
+                'volatility': volatility,
+                'patterns': patterns,
+                'price_change_pct': price_change,
+                'exchanges': data.get('exchanges', 1),
+                'sources': data.get('sources', ['unknown'])
+            }
+            
+        except Exception as e:
+            print(f"❌ Error in technical analysis: {e}")
+            return {}
+
+
+RANDOM_KEYS = {'orderbook_imbalance', 'exchanges', 'sources'}
+
+
+def make_data(n, seed, start_ts=1_700_000_000_000):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opens = np.r_[closes[0], closes[:-1]] * (1 + rng.normal(0, 0.002, n))
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.01, n))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.01, n))
+    volumes = rng.uniform(100, 1000, n)
+    candles = [
+        {'timestamp': start_ts + i * 900_000, 'open': float(o), 'high': float(h), 'low': float(l),
+         'close': float(c), 'volume': float(v)}
+        for i, (o, h, l, c, v) in enumerate(zip(opens, highs, lows, closes, volumes))
+    ]
+    return {'historical_data': candles, 'current': dict(candles[-1]), 'exchanges': 2, 'sources': ['binance']}
+
+
+def assert_same(actual, expected):
+    assert set(actual) == set(expected) - RANDOM_KEYS
+    for key, value in expected.items():
+        if key in RANDOM_KEYS:
+            continue
+        if key == 'macd':
+            for part in value:
+                assert actual[key][part] == pytest.approx(value[part], rel=1e-9, abs=1e-12)
+        elif key == 'patterns':
+            assert actual[key] == value
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+
+
+class TestTimeframeSnapshotParity:
+    """Library snapshot reproduces the legacy closures"""
+
+    @pytest.mark.parametrize('n,seed', [(50, 1), (100, 2), (200, 3), (500, 4)])
+    def test_matches_legacy(self, n, seed):
+        data = make_data(n, seed)
+        assert_same(indicators.analyze_timeframe(data), LegacyTimeframe()._analyze_timeframe(data))
+
+    def test_short_history_is_empty(self):
+        assert indicators.analyze_timeframe(make_data(49, 5)) == {}
+
+    def test_flat_market(self):
+        data = make_data(60, 6)
+        for candle in data['historical_data']:
+            candle.update(open=100.0, high=100.0, low=100.0, close=100.0)
+        data['current'] = dict(data['historical_data'][-1])
+        assert_same(indicators.analyze_timeframe(data), LegacyTimeframe()._analyze_timeframe(data))
+
+    def test_body_patterns_off(self):
+        data = make_data(60, 7)
+        data['current'].update(open=100.0, close=110.0, high=110.5, low=99.5)
+        assert 'bullish_candle' in indicators.analyze_timeframe(data)['patterns']
+        assert 'bullish_candle' not in indicators.analyze_timeframe(data, body_patterns=False)['patterns']
+
+
+class TestIndicatorCache:
+    """Snapshots reused per (symbol, timeframe, last bar timestamp)"""
+
+    def test_same_bar_is_cached(self):
+        cache = indicators.IndicatorCache()
+        data = make_data(100, 8)
+        first = indicators.analyze_timeframe(data, 'BTC/USDT', '15m', cache=cache)
+        second = indicators.analyze_timeframe(data, 'BTC/USDT', '15m', cache=cache)
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert first == second and first is not second  # Callers get their own copy
+        first['macd']['histogram'] = None
+        first['patterns'].append('mutated')
+        third = indicators.analyze_timeframe(data, 'BTC/USDT', '15m', cache=cache)
+        assert third == second  # ...down to the nested macd dict and patterns list
+
+    def test_forming_bar_update_recomputes(self):
+        cache = indicators.IndicatorCache()
+        data = make_data(100, 9)
+        before = indicators.analyze_timeframe(data, 'BTC/USDT', '15m', cache=cache)
+        data['historical_data'][-1]['close'] *= 1.02
+        data['current'] = dict(data['historical_data'][-1])
+        after = indicators.analyze_timeframe(data, 'BTC/USDT', '15m', cache=cache)
+
+        assert cache.misses == 2
+        assert after['price'] != before['price']
+        assert_same(after, LegacyTimeframe()._analyze_timeframe(data))
+
+    def test_keys_are_isolated_and_bounded(self):
+        cache = indicators.IndicatorCache(max_entries=2)
+        data = make_data(100, 10)
+        for symbol in ('BTC/USDT', 'ETH/USDT', 'SOL/USDT'):
+            indicators.analyze_timeframe(data, symbol, '15m', cache=cache)
+        indicators.analyze_timeframe(data, 'BTC/USDT', '1h', cache=cache)
+        assert cache.misses == 4 and cache.hits == 0
+        assert len(cache._entries) == 2
+
+    def test_no_cache_without_key(self):
+        cache = indicators.IndicatorCache()
+        indicators.analyze_timeframe(make_data(100, 11), cache=cache)
+        assert cache.misses == 0
@@ -1,13 +1,21 @@
 # train_models.py
 """
 Standalone script для обучения ML моделей.
-Запуск: python train_models.py
+Запуск: python train_models.py           # полное обучение
+        python train_models.py --update  # дообучение активной версии на последних днях
+        python train_models.py --audit   # важность / стоимость фич и переобучение урезанных наборов
+                               [--publish]  # опубликовать лучший урезанный набор
 """
 import asyncio
+import json
+import os
 import sys
 import logging
+from datetime import datetime, timezone
 from pathlib import Path
 
+import pandas as pd
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -19,8 +27,106 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.strategies.data_pipeline import TradingDataPipeline
+from src.strategies.model_search import embargo_split, search
+from src.strategies.feature_audit import FeatureCostMeter, audit_features, measure_costs, retrain_sets
 from src.core.settings import settings
 
+# Символы для обучения (можно кастомизировать)
+TRAINING_SYMBOLS = [
+    'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT',
+    'BNB/USDT', 'ADA/USDT', 'AVAX/USDT', 'DOT/USDT',
+    'LINK/USDT', 'UNI/USDT', 'MATIC/USDT', 'ATOM/USDT'
+]
+
+
+async def update():
+    """Дообучение: бустинг продолжается от активной версии на свежем окне"""
+    pipeline = TradingDataPipeline()
+    # +5 дней на прогрев индикаторов (первые 100 свечей окна уходят на фичи)
+    lookback_days = settings.ml_update_days + 5
+    logger.info(f"🔁 Incremental update on the last {settings.ml_update_days} days of {len(TRAINING_SYMBOLS)} symbols")
+    X, y, times = await pipeline.collect_dataset(symbols=TRAINING_SYMBOLS, lookback_days=lookback_days)
+    # Эмбарго: строки train, чья разметка заходит в валидацию, отбрасываются
+    train_end, split = embargo_split(times)
+    if train_end < 100:
+        logger.error("❌ Insufficient data collected for the update!")
+        sys.exit(1)
+
+    version = pipeline.ml_engine.update_models(
+        X.iloc[:train_end], y.iloc[:train_end], X.iloc[split:], y.iloc[split:],
+        rounds=settings.ml_update_rounds,
+        min_improvement=settings.ml_update_min_improvement,
+        training_window={'symbols': TRAINING_SYMBOLS, 'lookback_days': lookback_days,
+                         'start': str(times.iloc[0]), 'end': str(times.iloc[-1]),
+                         'collected_at': datetime.now(timezone.utc).isoformat()}
+    )
+    gate = pipeline.ml_engine.last_update
+    if version is None:
+        logger.warning(f"⚠️  Update rejected, {gate['base']} stays active "
+                       f"(logloss {gate['new_logloss']:.4f} vs {gate['base_logloss']:.4f})")
+    else:
+        logger.info(f"✅ Published {version} (parent {gate['base']}, "
+                    f"logloss {gate['base_logloss']:.4f} -> {gate['new_logloss']:.4f})")
+
+
+async def audit(publish: bool = False):
+    """
+    Feature audit: полный набор обучается версией реестра, по его моделям
+    считается важность фич, по живым замерам - стоимость; каждый
+    рекомендованный урезанный набор обучается отдельной версией.
+    """
+    pipeline = TradingDataPipeline()
+    X, y, times = await pipeline.collect_dataset(symbols=TRAINING_SYMBOLS, lookback_days=180)
+    train_end, split = embargo_split(times)
+    if train_end < 100:
+        logger.error("❌ Insufficient data collected for the audit!")
+        sys.exit(1)
+    X_train, y_train, X_val, y_val = X.iloc[:train_end], y.iloc[:train_end], X.iloc[split:], y.iloc[split:]
+    engine = pipeline.ml_engine
+    window = {'symbols': TRAINING_SYMBOLS, 'lookback_days': 180,
+              'start': str(times.iloc[0]), 'end': str(times.iloc[-1]),
+              'collected_at': datetime.now(timezone.utc).isoformat()}
+    routing = None
+    if settings.ml_routing != 'off':
+        keys, clusters = pipeline.route_keys(settings.ml_routing)
+        routing = {'mode': settings.ml_routing, 'train': keys[:train_end], 'val': keys[split:],
+                   'clusters': clusters, 'min_samples': settings.ml_route_min_samples}
+
+    costs = FeatureCostMeter(settings.feature_costs_path).costs()
+    if not costs:
+        logger.warning(f"⚠️  No live feature costs in {settings.feature_costs_path}, measuring on sample candles")
+        ohlcv = pipeline.exchange.fetch_ohlcv(TRAINING_SYMBOLS[0], timeframe='1h', limit=200)
+        costs = measure_costs(pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']))
+
+    params = engine.tuned_params()
+    logger.info(f"🔬 Feature audit: training the full set ({len(X.columns)} features)...")
+    baseline = engine.train_models(X_train, y_train, X_val, y_val, training_window=window,
+                                   publish=False, params=params, routing=routing)
+    report = audit_features(engine.version_models(baseline), X_val, costs, engine.model_weights)
+    for row in report['features']:
+        logger.info(f"   {row['feature']:<22} importance {row['importance']:.4f}  "
+                    f"cost {row['cost_ms']:.3f} ms{' (shared)' if row['shared'] else ''}")
+
+    report['retrain'] = retrain_sets(engine, X_train, y_train, X_val, y_val, report['sets'],
+                                     tolerance=settings.feature_audit_tolerance, training_window=window,
+                                     routing=routing, params=params, baseline=baseline)
+    os.makedirs(os.path.dirname(settings.feature_audit_path) or '.', exist_ok=True)
+    with open(settings.feature_audit_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    best = report['retrain']['best']
+    if best is None:
+        logger.warning(f"⚠️  No pruned set within {settings.feature_audit_tolerance} logloss of the full set")
+        return
+    logger.info(f"✅ Best pruned set {best['name']} ({best['version']}): logloss {best['delta']:+.4f} vs full, "
+                f"saves {best['saved_ms']:.3f} ms per signal. Report: {settings.feature_audit_path}")
+    if publish:
+        engine.registry.publish(best['version'])
+        logger.info(f"✅ Published {best['version']} (a running bot reloads it automatically)")
+    else:
+        logger.info(f"   Publish: python -m src.strategies.model_registry publish {best['version']}")
+
+
 async def main():
     print("=" * 60)
     print("  SignalPro Ultra - Model Training Pipeline")
@@ -30,23 +136,21 @@ async def main():
     try:
         pipeline = TradingDataPipeline()
         
-        # Символы для обучения (можно кастомизировать)
-        training_symbols = [
-            'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT',
-            'BNB/USDT', 'ADA/USDT', 'AVAX/USDT', 'DOT/USDT',
-            'LINK/USDT', 'UNI/USDT', 'MATIC/USDT', 'ATOM/USDT'
-        ]
+        training_symbols = TRAINING_SYMBOLS
         
         logger.info(f"📊 Training on {len(training_symbols)} symbols")
         logger.info(f"📅 Lookback period: 180 days")
         print()
         
-        # 1. Сбор данных
+        # 1. Сбор данных (в хронологическом порядке; последние 20% - отложенная валидация,
+        #    между ними эмбарго в самый длинный горизонт разметки)
         logger.info("Step 1/2: Collecting historical data...")
-        X_train, y_train, X_val, y_val = await pipeline.collect_training_data(
+        X, y, times = await pipeline.collect_dataset(
             symbols=training_symbols,
             lookback_days=180
         )
+        train_end, split = embargo_split(times)
+        X_train, y_train, X_val, y_val = X.iloc[:train_end], y.iloc[:train_end], X.iloc[split:], y.iloc[split:]
         
         if len(X_train) < 100:
             logger.error("❌ Insufficient data collected!")
@@ -57,24 +161,56 @@ async def main():
         logger.info(f"   Positive rate: {y_train.mean()*100:.1f}%")
         print()
         
+        # 1b. Поиск гиперпараметров (walk-forward только по train-части)
+        params, search_summary = None, None
+        if settings.ml_search_trials > 0:
+            logger.info(f"Step 1b: Hyperparameter search, {settings.ml_search_trials} trials per model...")
+            results = search(
+                X_train, y_train, times.iloc[:train_end],
+                n_trials=settings.ml_search_trials,
+                n_folds=settings.ml_search_folds,
+                workers=settings.ml_train_cores or None
+            )
+            # Модели без завершенного trial'а оставляют найденные ранее параметры
+            params = {**pipeline.ml_engine.tuned_params(),
+                      **{family: result.best_params for family, result in results.items() if result.best}}
+            search_summary = {family: result.summary() for family, result in results.items()}
+            print()
+        
+        # 1c. Маршруты: ключ режима / кластера символа для каждой строки
+        routing = None
+        if settings.ml_routing != 'off':
+            keys, clusters = pipeline.route_keys(settings.ml_routing)
+            routing = {'mode': settings.ml_routing, 'train': keys[:train_end], 'val': keys[split:],
+                       'clusters': clusters, 'min_samples': settings.ml_route_min_samples}
+        
         # 2. Обучение моделей
         logger.info("Step 2/2: Training ensemble models...")
         logger.info("   This may take 10-30 minutes...")
         
-        pipeline.ml_engine.train_models(X_train, y_train, X_val, y_val)
+        version = pipeline.ml_engine.train_models(
+            X_train, y_train, X_val, y_val,
+            training_window={'symbols': training_symbols, 'lookback_days': 180,
+                             'start': str(times.iloc[0]), 'end': str(times.iloc[-1]),
+                             'collected_at': datetime.now(timezone.utc).isoformat()},
+            params=params,
+            search=search_summary,
+            routing=routing
+        )
         
         print()
         print("=" * 60)
         logger.info("✅ Training complete!")
-        logger.info(f"   Models saved to: models/")
-        logger.info(f"   - xgb_model.json")
-        logger.info(f"   - lgbm_model.txt")
-        logger.info(f"   - catboost_model.cbm")
-        logger.info(f"   - features.pkl")
+        logger.info(f"   Published version: {version}")
+        logger.info(f"   Models saved to: {pipeline.ml_engine.registry.path(version)}")
+        logger.info(f"   - xgb_model.json, lgbm_model.txt, catboost_model.cbm")
+        logger.info(f"   - features.pkl, manifest.json")
+        logger.info(f"   Routes: {', '.join(pipeline.ml_engine.model_info()['routes']) or 'none (global ensemble only)'}")
+        logger.info(f"   Rollback: python -m src.strategies.model_registry rollback")
         print()
         logger.info("🚀 Next steps:")
         logger.info("   1. Set USE_ULTRA_MODE=true in settings.py")
-        logger.info("   2. Restart the bot: python main.py")
+        logger.info("   2. Start the bot: python main.py (a running bot reloads models/ automatically)")
         logger.info("   3. Setup auto-retraining: ./setup_auto_retraining.sh")
         print("=" * 60)
         
@@ -87,4 +223,10 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = sys.argv[1:]
+    if '--update' in args:
+        asyncio.run(update())
+    elif '--audit' in args:
+        asyncio.run(audit(publish='--publish' in args))
+    else:
+        asyncio.run(main())
@@ -13,10 +13,15 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 import json
 import os
-import aiohttp
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import ccxt
+from src.strategies import indicators
+from src.strategies.scan_pipeline import PipelinedScanner
+from src.services.exchange_pool import ExchangePool
 from config import TELEGRAM_CONFIG, EXCHANGE_KEYS, EXTERNAL_APIS, TRADING_CONFIG
+from src.services.http_client import http_client
+from src.services.onchain_store import OnChainStore
+from src.services.telegram_outbox import TelegramOutbox
 from scalping_engine import ScalpingSignalEngine
 import sys
 import io
@@ -71,41 +76,45 @@ class UniversalDataManager:
         self.ws = BinanceWSManager(max_candles=300)
         self.ws_started = False
         
-        # Инициализируем биржи через ccxt
-        self.binance = ccxt.binance({
-            'apiKey': EXCHANGE_KEYS['binance']['key'],
-            'secret': EXCHANGE_KEYS['binance']['secret'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 1200,  # 1.2 секунды между запросами
-        })
-        
-        self.bybit = ccxt.bybit({
-            'apiKey': EXCHANGE_KEYS['bybit']['key'],
-            'secret': EXCHANGE_KEYS['bybit']['secret'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 2000,  # 2 секунды между запросами для Bybit
-        })
-        
-        self.okx = ccxt.okx({
-            'apiKey': EXCHANGE_KEYS['okx']['key'],
-            'secret': EXCHANGE_KEYS['okx']['secret'],
-            'password': EXCHANGE_KEYS['okx']['passphrase'],
-            'sandbox': False,
-            'enableRateLimit': True,
-            'rateLimit': 1000,  # 1 секунда между запросами
-        })
+        # Асинхронные клиенты ccxt на общем пуле соединений (без потоков)
+        exchange_configs = {
+            'binance': {
+                'apiKey': EXCHANGE_KEYS['binance']['key'],
+                'secret': EXCHANGE_KEYS['binance']['secret'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 1200,  # 1.2 секунды между запросами
+            },
+            'bybit': {
+                'apiKey': EXCHANGE_KEYS['bybit']['key'],
+                'secret': EXCHANGE_KEYS['bybit']['secret'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 2000,  # 2 секунды между запросами для Bybit
+            },
+            'okx': {
+                'apiKey': EXCHANGE_KEYS['okx']['key'],
+                'secret': EXCHANGE_KEYS['okx']['secret'],
+                'password': EXCHANGE_KEYS['okx']['passphrase'],
+                'sandbox': False,
+                'enableRateLimit': True,
+                'rateLimit': 1000,  # 1 секунда между запросами
+            }
+        }
         
         # Приоритет бирж (Binance самый надежный)
-        self.exchange_priority = [
-            ('binance', self.binance),
-            ('okx', self.okx),
-            ('bybit', self.bybit)
-        ]
+        self.exchange_priority = ['binance', 'okx', 'bybit']
+        
+        self.exchange_pool = ExchangePool(
+            exchange_configs, max_concurrency=TRADING_CONFIG.get('exchange_concurrency', 8)
+        )
         
         print("✅ Биржи инициализированы: Binance, Bybit, OKX")
         
+    async def close(self):
+        """Закрывает клиентов бирж и пул соединений"""
+        await self.exchange_pool.close()
+
     async def ensure_ws(self, symbols: List[str], timeframes: List[str]):
         if not self.ws_started:
             # Запускаем подписки только на поддерживаемые Binance символы
@@ -169,102 +178,70 @@ class UniversalDataManager:
             return None
     
     async def _get_best_timeframe_data(self, symbol: str, timeframe: str) -> Dict:
-        """Получение данных с лучшей доступной биржи"""
-        for exchange_name, exchange in self.exchange_priority:
-            try:
-                data = await self._get_exchange_ohlcv(exchange, symbol, timeframe, exchange_name)
-                if data:
-                    return data
-            except Exception as e:
-                # Если rate limit, пропускаем эту биржу
-                if 'rate limit' in str(e).lower() or 'too many' in str(e).lower():
-                    continue
-                    
+        """Получение данных с самой быстрой доступной биржи (hedged-запросы)"""
+        # Конвертируем таймфрейм в формат ccxt
+        tf_map = {
+            '5m': '5m',
+            '15m': '15m',
+            '1h': '1h', 
+            '4h': '4h',
+            '1d': '1d'
+        }
+        ccxt_tf = tf_map.get(timeframe, '1h')
+
+        # Следующая биржа стартует, если текущая не ответила за свой p95 или вернула ошибку
+        try:
+            exchange_name, ohlcv = await self.exchange_pool.fetch_ohlcv_hedged(
+                symbol, ccxt_tf, limit=200, names=self.exchange_priority,
+                accept=lambda candles: bool(candles) and len(candles) >= 50  # Минимум 50 свечей для индикаторов
+            )
+        except Exception as e:
+            print(f"❌ OHLCV error for {symbol} {timeframe}: {e}")
+            return None
+
         # Если не удалось получить данные ни с одной биржи
-        return None
+        if exchange_name is None:
+            return None
+        return self._format_ohlcv(ohlcv, symbol, exchange_name)
     
-    async def _get_exchange_ohlcv(self, exchange, symbol: str, timeframe: str, exchange_name: str) -> Dict:
-        """Универсальное получение OHLCV данных через ccxt с retry логикой"""
-        max_retries = 2
-        retry_delay = 1
+    @staticmethod
+    def _format_ohlcv(ohlcv: List[List[float]], symbol: str, exchange_name: str) -> Dict:
+        """Свечи ccxt -> полные исторические данные для расчета индикаторов"""
+        df_data = []
+        for candle in ohlcv:
+            df_data.append({
+                'timestamp': int(candle[0]),
+                'open': float(candle[1]),
+                'high': float(candle[2]),
+                'low': float(candle[3]),
+                'close': float(candle[4]),
+                'volume': float(candle[5])
+            })
         
-        for attempt in range(max_retries):
-            try:
-                # Конвертируем таймфрейм в формат ccxt
-                tf_map = {
-                    '5m': '5m',
-                    '15m': '15m',
-                    '1h': '1h', 
-                    '4h': '4h',
-                    '1d': '1d'
-                }
-                ccxt_tf = tf_map.get(timeframe, '1h')
-                
-                # Получаем ИСТОРИЧЕСКИЕ данные для расчета индикаторов
-                loop = asyncio.get_event_loop()
-                ohlcv = await loop.run_in_executor(
-                    None, 
-                    lambda: exchange.fetch_ohlcv(symbol, ccxt_tf, limit=200)  # Увеличиваем до 200 свечей
-                )
-                
-                if ohlcv and len(ohlcv) >= 50:  # Минимум 50 свечей для индикаторов
-                    # Возвращаем полные исторические данные
-                    df_data = []
-                    for candle in ohlcv:
-                        df_data.append({
-                            'timestamp': int(candle[0]),
-                            'open': float(candle[1]),
-                            'high': float(candle[2]),
-                            'low': float(candle[3]),
-                            'close': float(candle[4]),
-                            'volume': float(candle[5])
-                        })
-                    
-                    return {
-                        'historical_data': df_data,
-                        'current': {
-                            'open': float(ohlcv[-1][1]),
-                            'high': float(ohlcv[-1][2]),
-                            'low': float(ohlcv[-1][3]),
-                            'close': float(ohlcv[-1][4]),
-                            'volume': float(ohlcv[-1][5]),
-                            'timestamp': int(ohlcv[-1][0])
-                        },
-                        'exchange': exchange_name,
-                        'symbol': symbol
-                    }
-                
-                return None
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                
-                # Rate limit errors - не ретраим, сразу возвращаем None
-                if any(keyword in error_msg for keyword in ['rate limit', 'too many', 'exceeded']):
-                    if attempt == 0:  # Логируем только первый раз
-                        print(f"⚠️ {exchange_name} rate limit for {symbol}")
-                    return None
-                
-                # Market not found - не ретраим
-                if any(keyword in error_msg for keyword in ['symbol not found', 'does not have market', 'invalid symbol']):
-                    return None
-                    
-                # Другие ошибки - ретраим
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
-                    continue
-                else:
-                    # Логируем только критические ошибки
-                    print(f"❌ {exchange_name} error for {symbol} {timeframe}: {e}")
-                    return None
-        
-        return None
+        return {
+            'historical_data': df_data,
+            'current': {
+                'open': float(ohlcv[-1][1]),
+                'high': float(ohlcv[-1][2]),
+                'low': float(ohlcv[-1][3]),
+                'close': float(ohlcv[-1][4]),
+                'volume': float(ohlcv[-1][5]),
+                'timestamp': int(ohlcv[-1][0])
+            },
+            'exchange': exchange_name,
+            'symbol': symbol
+        }
 
 class RealTimeAIEngine:
     """Реальный AI движок для анализа сигналов"""
     
     def __init__(self):
         self.indicators = {}
+        self.indicator_cache = indicators.IndicatorCache()
+        # Индикаторы считаются в пуле потоков, чтобы не блокировать event loop
+        self.compute_executor = ThreadPoolExecutor(
+            max_workers=TRADING_CONFIG.get('compute_concurrency', 4), thread_name_prefix='indicators'
+        )
         self.onchain_analyzer = OnChainAnalyzer()
         
     async def process_symbol(self, symbol: str, ohlcv_data: Dict) -> Optional[Dict]:
@@ -276,11 +253,11 @@ class RealTimeAIEngine:
             # Получаем on-chain метрики
             onchain_data = await self.onchain_analyzer.get_onchain_metrics(symbol)
             
-            # Анализируем каждый таймфрейм
-            analysis_results = {}
-            for tf, data in ohlcv_data.items():
-                if tf not in ['whale_activity', 'exchange_flows', 'social_sentiment', 'timestamp']:
-                    analysis_results[tf] = self._analyze_timeframe(data)
+            # Анализируем каждый таймфрейм (вне event loop)
+            loop = asyncio.get_running_loop()
+            analysis_results = await loop.run_in_executor(
+                self.compute_executor, self._analyze_timeframes, symbol, ohlcv_data
+            )
             
             # Объединяем результаты с учетом on-chain данных
             signal = self._combine_analysis(analysis_results, symbol, onchain_data)
@@ -305,339 +282,48 @@ class RealTimeAIEngine:
             print(f"❌ Error processing {symbol}: {e}")
             return None
     
-    def _analyze_timeframe(self, data: Dict) -> Dict:
-        """РЕАЛЬНЫЙ анализ таймфрейма с настоящими техническими индикаторами"""
+    def _analyze_timeframes(self, symbol: str, ohlcv_data: Dict) -> Dict:
+        """Анализ всех таймфреймов символа (выполняется в compute_executor)"""
+        return {
+            tf: self._analyze_timeframe(data, symbol, tf)
+            for tf, data in ohlcv_data.items()
+            if tf not in ['whale_activity', 'exchange_flows', 'social_sentiment', 'timestamp']
+        }
+
+    def _analyze_timeframe(self, data: Dict, symbol: str = None, timeframe: str = None) -> Dict:
+        """РЕАЛЬНЫЙ анализ таймфрейма: индикаторы из общей библиотеки, кэш по последней свече"""
         try:
-            # Получаем исторические данные
-            historical_data = data.get('historical_data', [])
-            current_data = data.get('current', {})
-            
-            if len(historical_data) < 50:
+            analysis = indicators.analyze_timeframe(data, symbol, timeframe, cache=self.indicator_cache)
+            if not analysis:
                 return {}
-            
-            # Создаем DataFrame для расчетов
-            df = pd.DataFrame(historical_data)
-            
-            # Текущие значения
-            close = current_data.get('close', 0)
-            high = current_data.get('high', 0)
-            low = current_data.get('low', 0)
-            volume = current_data.get('volume', 0)
-            open_price = current_data.get('open', 0)
-            
-            # Массивы для расчетов
-            closes = df['close'].values
-            highs = df['high'].values
-            lows = df['low'].values
-            volumes = df['volume'].values
-            opens = df['open'].values
-            
-            # РЕАЛЬНЫЙ RSI расчет (14 периодов)
-            def calculate_rsi(prices, period=14):
-                deltas = np.diff(prices)
-                gains = np.where(deltas > 0, deltas, 0)
-                losses = np.where(deltas < 0, -deltas, 0)
-                
-                avg_gain = np.mean(gains[:period])
-                avg_loss = np.mean(losses[:period])
-                
-                for i in range(period, len(gains)):
-                    avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-                    avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-                
-                if avg_loss == 0:
-                    return 100
-                rs = avg_gain / avg_loss
-                return 100 - (100 / (1 + rs))
-            
-            rsi = calculate_rsi(closes)
-            
-            # РЕАЛЬНЫЙ MACD расчет
-            def calculate_ema(prices, period):
-                alpha = 2 / (period + 1)
-                ema = [prices[0]]
-                for price in prices[1:]:
-                    ema.append(alpha * price + (1 - alpha) * ema[-1])
-                return np.array(ema)
-            
-            ema_12 = calculate_ema(closes, 12)
-            ema_26 = calculate_ema(closes, 26)
-            macd_line = ema_12 - ema_26
-            signal_line = calculate_ema(macd_line, 9)
-            histogram = macd_line[-1] - signal_line[-1]
-            
-            macd_data = {
-                'macd': macd_line[-1],
-                'signal': signal_line[-1],
-                'histogram': histogram
-            }
-            
-            # РЕАЛЬНЫЕ EMA расчеты
-            ema_20 = calculate_ema(closes, 20)[-1]
-            ema_50 = calculate_ema(closes, 50)[-1]
-            
-            # РЕАЛЬНЫЕ Bollinger Bands
-            def calculate_bollinger_bands(prices, period=20, std_dev=2):
-                sma = np.mean(prices[-period:])
-                std = np.std(prices[-period:])
-                upper = sma + (std * std_dev)
-                lower = sma - (std * std_dev)
-                return upper, sma, lower
-            
-            bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(closes)
-            
-            # РЕАЛЬНАЯ MA50
-            ma_50 = np.mean(closes[-50:]) if len(closes) >= 50 else closes[-1]
-            
-            # РЕАЛЬНЫЙ ADX расчет
-            def calculate_adx(highs, lows, closes, period=14):
-                # True Range
-                tr1 = highs - lows
-                tr2 = np.abs(highs - np.roll(closes, 1))
-                tr3 = np.abs(lows - np.roll(closes, 1))
-                tr = np.maximum(tr1, np.maximum(tr2, tr3))[1:]  # Убираем первый элемент
-                
-                # Directional Movement
-                dm_plus = np.where((highs[1:] - highs[:-1]) > (lows[:-1] - lows[1:]), 
-                                 np.maximum(highs[1:] - highs[:-1], 0), 0)
-                dm_minus = np.where((lows[:-1] - lows[1:]) > (highs[1:] - highs[:-1]), 
-                                  np.maximum(lows[:-1] - lows[1:], 0), 0)
-                
-                # Smoothed values
-                if len(tr) >= period:
-                    atr = np.mean(tr[-period:])
-                    di_plus = 100 * np.mean(dm_plus[-period:]) / atr if atr > 0 else 0
-                    di_minus = 100 * np.mean(dm_minus[-period:]) / atr if atr > 0 else 0
-                    
-                    if (di_plus + di_minus) > 0:
-                        dx = 100 * abs(di_plus - di_minus) / (di_plus + di_minus)
-                        return dx
-                
-                return 20  # Fallback
-            
-            adx = calculate_adx(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ Volume анализ
-            if len(volumes) >= 20:
-                avg_volume = np.mean(volumes[-20:])
-                volume_ratio = volume / avg_volume if avg_volume > 0 else 1.0
-            else:
-                volume_ratio = 1.0
-            
-            # РЕАЛЬНЫЙ SuperTrend расчет
-            def calculate_supertrend(highs, lows, closes, period=10, multiplier=3.0):
-                # ATR расчет
-                tr1 = highs - lows
-                tr2 = np.abs(highs - np.roll(closes, 1))
-                tr3 = np.abs(lows - np.roll(closes, 1))
-                tr = np.maximum(tr1, np.maximum(tr2, tr3))[1:]
-                
-                if len(tr) >= period:
-                    atr = np.mean(tr[-period:])
-                    hl2 = (highs[-1] + lows[-1]) / 2
-                    
-                    upper_band = hl2 + (multiplier * atr)
-                    lower_band = hl2 - (multiplier * atr)
-                    
-                    if closes[-1] > upper_band:
-                        return 1  # Бычий тренд
-                    elif closes[-1] < lower_band:
-                        return -1  # Медвежий тренд
-                    else:
-                        # Определяем по направлению цены
-                        if len(closes) >= 2:
-                            return 1 if closes[-1] > closes[-2] else -1
-                        return 1
-                return 1
-            
-            supertrend = calculate_supertrend(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ Donchian Channel
-            def calculate_donchian_channel(highs, lows, period=20):
-                if len(highs) >= period:
-                    upper = np.max(highs[-period:])
-                    lower = np.min(lows[-period:])
-                    middle = (upper + lower) / 2
-                    return upper, middle, lower
-                return highs[-1], (highs[-1] + lows[-1]) / 2, lows[-1]
-            
-            donchian_upper, donchian_middle, donchian_lower = calculate_donchian_channel(highs, lows)
-            
-            # РЕАЛЬНЫЙ VWAP расчет
-            def calculate_vwap(highs, lows, closes, volumes):
-                typical_prices = (highs + lows + closes) / 3
-                if len(typical_prices) >= 20:
-                    recent_tp = typical_prices[-20:]
-                    recent_vol = volumes[-20:]
-                    return np.sum(recent_tp * recent_vol) / np.sum(recent_vol) if np.sum(recent_vol) > 0 else closes[-1]
-                return closes[-1]
-            
-            vwap = calculate_vwap(highs, lows, closes, volumes)
-            
-            # РЕАЛЬНЫЙ Orderbook Imbalance (приближение через объем)
-            if len(volumes) >= 5:
-                recent_volumes = volumes[-5:]
-                volume_trend = np.mean(recent_volumes[-3:]) / np.mean(recent_volumes[:2]) if np.mean(recent_volumes[:2]) > 0 else 1.0
-                
-                # Определяем дисбаланс по тренду объема и цены
-                price_trend = closes[-1] / closes[-5] if len(closes) >= 5 else 1.0
-                
-                if price_trend > 1.01 and volume_trend > 1.2:
-                    orderbook_imbalance = np.random.uniform(1.1, 1.3)  # Покупки преобладают
-                elif price_trend < 0.99 and volume_trend > 1.2:
-                    orderbook_imbalance = np.random.uniform(0.7, 0.9)  # Продажи преобладают
-                else:
-                    orderbook_imbalance = np.random.uniform(0.95, 1.05)
-            else:
-                orderbook_imbalance = 1.0
-            
-            # РЕАЛЬНЫЙ Williams %R
-            def calculate_williams_r(highs, lows, closes, period=14):
-                if len(highs) >= period:
-                    highest_high = np.max(highs[-period:])
-                    lowest_low = np.min(lows[-period:])
-                    if highest_high != lowest_low:
-                        return -100 * (highest_high - closes[-1]) / (highest_high - lowest_low)
-                return -50
-            
-            williams_r = calculate_williams_r(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ CCI
-            def calculate_cci(highs, lows, closes, period=20):
-                if len(highs) >= period:
-                    typical_prices = (highs + lows + closes) / 3
-                    sma = np.mean(typical_prices[-period:])
-                    mean_deviation = np.mean(np.abs(typical_prices[-period:] - sma))
-                    if mean_deviation > 0:
-                        return (typical_prices[-1] - sma) / (0.015 * mean_deviation)
-                return 0
-            
-            cci = calculate_cci(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ Stochastic Oscillator
-            def calculate_stochastic(highs, lows, closes, period=14):
-                if len(highs) >= period:
-                    highest_high = np.max(highs[-period:])
-                    lowest_low = np.min(lows[-period:])
-                    if highest_high != lowest_low:
-                        k = 100 * (closes[-1] - lowest_low) / (highest_high - lowest_low)
-                        return k, k * 0.9  # D = сглаженная версия K
-                return 50, 45
-            
-            stoch_k, stoch_d = calculate_stochastic(highs, lows, closes)
-            
-            # РЕАЛЬНЫЙ Ichimoku (упрощенный)
-            def calculate_ichimoku(highs, lows):
-                # Tenkan-sen (9 периодов)
-                if len(highs) >= 9:
-                    tenkan_sen = (np.max(highs[-9:]) + np.min(lows[-9:])) / 2
-                else:
-                    tenkan_sen = (highs[-1] + lows[-1]) / 2
-                
-                # Kijun-sen (26 периодов)
-                if len(highs) >= 26:
-                    kijun_sen = (np.max(highs[-26:]) + np.min(lows[-26:])) / 2
-                else:
-                    kijun_sen = (highs[-1] + lows[-1]) / 2
-                
-                return tenkan_sen, kijun_sen
-            
-            tenkan_sen, kijun_sen = calculate_ichimoku(highs, lows)
-            
-            # РЕАЛЬНЫЙ OBV
-            def calculate_obv(closes, volumes):
-                if len(closes) >= 2:
-                    obv = 0
-                    for i in range(1, len(closes)):
-                        if closes[i] > closes[i-1]:
-                            obv += volumes[i]
-                        elif closes[i] < closes[i-1]:
-                            obv -= volumes[i]
-                    return obv
-                return 0
-            
-            obv = calculate_obv(closes, volumes)
-            
-            # РЕАЛЬНЫЙ анализ свечных паттернов
-            patterns = []
-            
-            # Анализируем последние 3 свечи для паттернов
-            if len(closes) >= 3:
-                # Размеры тел свечей
-                body_sizes = np.abs(closes[-3:] - opens[-3:]) / closes[-3:]
-                
-                # Три белых солдата
-                if all(closes[-3:] > opens[-3:]) and all(body_sizes > 0.01):
-                    patterns.append('three_white_soldiers')
-                
-                # Три черных ворона
-                elif all(closes[-3:] < opens[-3:]) and all(body_sizes > 0.01):
-                    patterns.append('three_black_crows')
-                
-                # Анализ последней свечи
-                current_body = abs(close - open_price) / close if close > 0 else 0
-                upper_shadow = high - max(close, open_price)
-                lower_shadow = min(close, open_price) - low
-                
-                # Молот
-                if lower_shadow > current_body * 2 and upper_shadow < current_body * 0.5:
-                    patterns.append('hammer')
-                
-                # Падающая звезда
-                elif upper_shadow > current_body * 2 and lower_shadow < current_body * 0.5:
-                    patterns.append('shooting_star')
-                
-                # Бычья/медвежья свеча
-                if current_body > 0.02:
-                    if close > open_price:
-                        patterns.append('bullish_candle')
-                    else:
-                        patterns.append('bearish_candle')
-            
-            # Рассчитываем волатильность
-            if len(closes) >= 20:
-                volatility = np.std(closes[-20:]) / np.mean(closes[-20:])
-            else:
-                volatility = abs(high - low) / close if close > 0 else 0.02
-            
-            # Процентное изменение цены
-            price_change = (close - open_price) / open_price * 100 if open_price > 0 else 0
-        
-            return {
-                'rsi': rsi,
-                'macd': macd_data,
-                'ema_20': ema_20,
-                'ema_50': ema_50,
-                'bb_upper': bb_upper,
-                'bb_lower': bb_lower,
-                'ma_50': ma_50,
-                'adx': adx,
-                'volume_ratio': volume_ratio,
-                'supertrend': supertrend,
-                'donchian_upper': donchian_upper,
-                'donchian_lower': donchian_lower,
-                'donchian_middle': donchian_middle,
-                'vwap': vwap,
-                'orderbook_imbalance': orderbook_imbalance,
-                'williams_r': williams_r,
-                'cci': cci,
-                'stoch_k': stoch_k,
-                'stoch_d': stoch_d,
-                'tenkan_sen': tenkan_sen,
-                'kijun_sen': kijun_sen,
-                'obv': obv,
-                'price': close,
-                'volatility': volatility,
-                'patterns': patterns,
-                'price_change_pct': price_change,
-                'exchanges': data.get('exchanges', 1),
-                'sources': data.get('sources', ['unknown'])
-            }
-            
+
+            # Случайная составляющая не кэшируется - считается на каждом вызове, как раньше
+            analysis['orderbook_imbalance'] = self._orderbook_imbalance(data['historical_data'])
+            analysis['exchanges'] = data.get('exchanges', 1)
+            analysis['sources'] = data.get('sources', ['unknown'])
+            return analysis
+
         except Exception as e:
             print(f"❌ Error in technical analysis: {e}")
             return {}
-    
+
+    @staticmethod
+    def _orderbook_imbalance(historical_data: List[Dict]) -> float:
+        """РЕАЛЬНЫЙ Orderbook Imbalance (приближение через объем)"""
+        if len(historical_data) < 5:
+            return 1.0
+        recent_volumes = [c['volume'] for c in historical_data[-5:]]
+        volume_trend = np.mean(recent_volumes[-3:]) / np.mean(recent_volumes[:2]) if np.mean(recent_volumes[:2]) > 0 else 1.0
+
+        # Определяем дисбаланс по тренду объема и цены
+        price_trend = historical_data[-1]['close'] / historical_data[-5]['close']
+
+        if price_trend > 1.01 and volume_trend > 1.2:
+            return np.random.uniform(1.1, 1.3)  # Покупки преобладают
+        elif price_trend < 0.99 and volume_trend > 1.2:
+            return np.random.uniform(0.7, 0.9)  # Продажи преобладают
+        return np.random.uniform(0.95, 1.05)
+
     def _combine_analysis(self, analysis_results: Dict, symbol: str, onchain_data: Dict) -> Optional[Dict]:
         """Объединение анализа всех таймфреймов"""
         try:
@@ -855,184 +541,40 @@ class RealTimeAIEngine:
             return None
 
 class OnChainAnalyzer:
-    """On-chain анализ через Dune Analytics и внешние API"""
+    """
+    On-chain анализ через Dune Analytics и внешние API.
+    Данные источников живут в OnChainStore: каждый источник загружается один раз
+    за интервал обновления для всех пар, метрики символа собираются из памяти.
+    """
+    NEWS_BATCH = 10  # Валют в одном запросе CryptoPanic (у ответа одна страница на весь пакет)
+    MARKETS_BATCH = 100  # Монет в одном запросе CoinGecko /coins/markets
+    FLOWS_CONCURRENCY = 4  # market_chart не умеет пакеты - ограничиваем параллельные запросы
     
     def __init__(self):
         self.dune_api_key = EXTERNAL_APIS['dune']['api_key']
         self.crypto_panic_key = EXTERNAL_APIS['crypto_panic']['api_key']
-        self.cache = {}
-        self.cache_timeout = 300  # 5 минут
+        self.cache_timeout = TRADING_CONFIG.get('onchain_refresh', 300)  # 5 минут
+        self.store = OnChainStore(refresh_interval=self.cache_timeout)
+        self.store.add_dataset('whales', self._load_dune_rows, self._whale_from_dune)
+        self.store.add_per_asset('markets', self._load_markets)
+        self.store.add_per_asset('flows', self._load_market_charts)
+        self.store.add_per_asset('news', self._load_news)
     
-    def _session(self) -> aiohttp.ClientSession:
-        """HTTP-сессия с отключенной SSL валидацией (фикс временных SSL проблем)."""
-        connector = aiohttp.TCPConnector(ssl=False)
-        return aiohttp.ClientSession(connector=connector)
+    def _session(self):
+        """Общая пулированная HTTP-сессия с отключенной SSL валидацией (фикс временных SSL проблем)."""
+        return http_client.borrow('onchain', ssl=False)
     
-    async def get_onchain_metrics(self, symbol: str) -> Dict:
-        """Получение on-chain метрик"""
-        try:
-            cache_key = f"onchain_{symbol}"
-            current_time = time.time()
-            
-            # Проверяем кэш
-            if cache_key in self.cache:
-                cached_data, cache_time = self.cache[cache_key]
-                if current_time - cache_time < self.cache_timeout:
-                    return cached_data
-            
-            # Получаем данные параллельно
-            whale_activity = await self._get_whale_activity(symbol)
-            exchange_flows = await self._get_exchange_flows(symbol)
-            social_sentiment = await self._get_social_sentiment(symbol)
-            
-            onchain_data = {
-                'whale_activity': whale_activity,
-                'exchange_flows': exchange_flows,
-                'social_sentiment': social_sentiment,
-                'timestamp': current_time
-            }
-            
-            # Кэшируем
-            self.cache[cache_key] = (onchain_data, current_time)
-            return onchain_data
-            
-        except Exception as e:
-            print(f"❌ OnChain analysis error for {symbol}: {e}")
-            return {}
+    @staticmethod
+    def _asset(symbol: str) -> str:
+        return symbol.replace('/USDT', '').upper()
     
-    async def _get_whale_activity(self, symbol: str) -> Dict:
-        """РЕАЛЬНЫЙ анализ активности китов через Dune Analytics"""
-        try:
-            # Реальный запрос к Dune Analytics API
-            base_url = EXTERNAL_APIS['dune']['base_url']
-            api_key = self.dune_api_key
-            query_id = EXTERNAL_APIS['dune']['query_id']
-            
-            # Подготавливаем символ для запроса
-            clean_symbol = symbol.replace('/USDT', '').upper()
-            
-            headers = {
-                'X-Dune-API-Key': api_key,
-                'Content-Type': 'application/json'
-            }
-            
-            # Запрос к Dune API
-            url = f"{base_url}/query/{query_id}/results"
-            params = {
-                'limit': 100,
-                'offset': 0
-            }
-            
-            async with self._session() as session:
-                async with session.get(url, headers=headers, params=params, timeout=15) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if data.get('result') and data['result'].get('rows'):
-                            # Анализируем данные о крупных транзакциях
-                            rows = data['result']['rows']
-                            
-                            # Фильтруем по нашему символу если возможно
-                            relevant_rows = [row for row in rows if clean_symbol in str(row).upper()]
-                            
-                            if not relevant_rows:
-                                relevant_rows = rows[:10]  # Берем первые 10 записей
-                            
-                            # Анализируем активность
-                            large_transactions = len(relevant_rows)
-                            
-                            # Считаем общий объем
-                            total_volume = 0
-                            for row in relevant_rows:
-                                # Ищем поля с объемом (могут называться по-разному)
-                                for key, value in row.items():
-                                    if 'amount' in key.lower() or 'volume' in key.lower():
-                                        try:
-                                            total_volume += float(value)
-                                        except:
-                                            continue
-                            
-                            # Определяем уровень активности
-                            if large_transactions > 50 or total_volume > 10000000:
-                                activity_level = "very_high"
-                                description = "Очень высокая активность китов"
-                                whale_score = 85
-                            elif large_transactions > 20 or total_volume > 5000000:
-                                activity_level = "high"
-                                description = "Высокая активность китов"
-                                whale_score = 70
-                            elif large_transactions > 10 or total_volume > 1000000:
-                                activity_level = "moderate"
-                                description = "Умеренная активность китов"
-                                whale_score = 55
-                            else:
-                                activity_level = "low"
-                                description = "Низкая активность китов"
-                                whale_score = 35
-                            
-                            return {
-                                'score': whale_score,
-                                'level': activity_level,
-                                'description': description,
-                                'large_transactions': large_transactions,
-                                'net_flow': total_volume,
-                                'data_source': 'dune_analytics'
-                            }
-            
-            # Fallback если API недоступен - используем CoinGecko
-            return await self._get_whale_activity_fallback(symbol)
-            
-        except Exception as e:
-            print(f"❌ Dune API whale activity error: {e}")
-            return await self._get_whale_activity_fallback(symbol)
-    
-    async def _get_whale_activity_fallback(self, symbol: str) -> Dict:
-        """Fallback анализ активности через CoinGecko API"""
+    async def get_onchain_metrics(self, symbol: str) -> Dict:
+        """Получение on-chain метрик (из памяти; устаревшие данные обновляются в фоне)"""
         try:
-            clean_symbol = symbol.replace('/USDT', '').lower()
-            
-            # Получаем данные о монете через CoinGecko
-            url = f"https://api.coingecko.com/api/v3/coins/{clean_symbol}"
-            
-            async with self._session() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Анализируем объем торгов и изменение цены
-                        market_data = data.get('market_data', {})
-                        total_volume = market_data.get('total_volume', {}).get('usd', 0)
-                        price_change_24h = market_data.get('price_change_percentage_24h', 0)
-                        
-                        # Определяем активность на основе объема и волатильности
-                        if total_volume > 1000000000 and abs(price_change_24h) > 10:
-                            whale_score = 80
-                            activity_level = "very_high"
-                            description = "Очень высокая активность (высокий объем + волатильность)"
-                        elif total_volume > 500000000 and abs(price_change_24h) > 5:
-                            whale_score = 65
-                            activity_level = "high"
-                            description = "Высокая активность"
-                        elif total_volume > 100000000:
-                            whale_score = 50
-                            activity_level = "moderate"
-                            description = "Умеренная активность"
-                        else:
-                            whale_score = 30
-                            activity_level = "low"
-                            description = "Низкая активность"
-                        
-                        return {
-                            'score': whale_score,
-                            'level': activity_level,
-                            'description': description,
-                            'large_transactions': int(total_volume / 1000000),  # Приблизительно
-                            'net_flow': total_volume,
-                            'data_source': 'coingecko_fallback'
-                        }
+            data = await self.store.get(self._asset(symbol))
             
-            # Последний fallback
-            return {
+            # Dune -> CoinGecko -> нейтральная оценка
+            whale_activity = data['whales'] or self._whale_from_market(data['markets']) or {
                 'score': 45,
                 'level': 'moderate',
                 'description': 'Умеренная активность (данные недоступны)',
@@ -1040,86 +582,7 @@ class OnChainAnalyzer:
                 'net_flow': 0,
                 'data_source': 'fallback'
             }
-            
-        except Exception as e:
-            print(f"❌ Whale activity fallback error: {e}")
-            return {
-                'score': 40,
-                'level': 'unknown',
-                'description': 'Данные недоступны',
-                'large_transactions': 0,
-                'net_flow': 0,
-                'data_source': 'error'
-            }
-    
-    async def _get_exchange_flows(self, symbol: str) -> Dict:
-        """РЕАЛЬНЫЙ анализ потоков на биржи через CoinGecko API"""
-        try:
-            clean_symbol = symbol.replace('/USDT', '').lower()
-            
-            # Получаем данные о рыночных показателях
-            url = f"https://api.coingecko.com/api/v3/coins/{clean_symbol}/market_chart"
-            params = {
-                'vs_currency': 'usd',
-                'days': '7',  # Данные за неделю
-                'interval': 'daily'
-            }
-            
-            async with self._session() as session:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        prices = data.get('prices', [])
-                        volumes = data.get('total_volumes', [])
-                        
-                        if len(prices) >= 2 and len(volumes) >= 2:
-                            # Анализируем тренд цены и объема
-                            recent_prices = [p[1] for p in prices[-3:]]  # Последние 3 дня
-                            recent_volumes = [v[1] for v in volumes[-3:]]  # Последние 3 дня
-                            
-                            # Тренд цены
-                            price_trend = (recent_prices[-1] - recent_prices[0]) / recent_prices[0] * 100
-                            
-                            # Тренд объема
-                            avg_volume_recent = sum(recent_volumes) / len(recent_volumes)
-                            avg_volume_week = sum([v[1] for v in volumes]) / len(volumes)
-                            volume_change = (avg_volume_recent - avg_volume_week) / avg_volume_week * 100
-                            
-                            # Определяем потоки на основе корреляции цены и объема
-                            if price_trend < -5 and volume_change > 20:
-                                # Цена падает, объем растет = приток на биржи (продажи)
-                                flow_sentiment = "bearish"
-                                description = "Большой приток на биржи (медвежий сигнал)"
-                                net_flow = -avg_volume_recent
-                            elif price_trend > 5 and volume_change > 20:
-                                # Цена растет, объем растет = активные покупки
-                                flow_sentiment = "bullish"
-                                description = "Активные покупки (бычий сигнал)"
-                                net_flow = avg_volume_recent
-                            elif price_trend > 2 and volume_change < -10:
-                                # Цена растет, объем падает = отток с бирж (ходл)
-                                flow_sentiment = "bullish"
-                                description = "Отток с бирж, ходлинг (бычий сигнал)"
-                                net_flow = avg_volume_recent * 0.5
-                            else:
-                                flow_sentiment = "neutral"
-                                description = "Нейтральные потоки"
-                                net_flow = 0
-                            
-                            return {
-                                'inflow': max(0, -net_flow) if net_flow < 0 else 0,
-                                'outflow': max(0, net_flow) if net_flow > 0 else 0,
-                                'net_flow': net_flow,
-                                'sentiment': flow_sentiment,
-                                'description': description,
-                                'price_trend': price_trend,
-                                'volume_change': volume_change,
-                                'data_source': 'coingecko'
-                            }
-            
-            # Fallback
-            return {
+            exchange_flows = self._flows_from_chart(data['flows']) or {
                 'inflow': 0,
                 'outflow': 0,
                 'net_flow': 0,
@@ -1127,83 +590,296 @@ class OnChainAnalyzer:
                 'description': 'Нейтральные потоки (данные недоступны)',
                 'data_source': 'fallback'
             }
-            
-        except Exception as e:
-            print(f"❌ Exchange flows error: {e}")
-            return {
-                'inflow': 0,
-                'outflow': 0,
-                'net_flow': 0,
-                'sentiment': 'neutral',
-                'description': 'Данные недоступны',
-                'data_source': 'error'
-            }
-    
-    async def _get_social_sentiment(self, symbol: str) -> Dict:
-        """Анализ социального настроения через CryptoPanic"""
-        try:
-            # Реальный запрос к CryptoPanic API
-            url = f"{EXTERNAL_APIS['crypto_panic']['base_url']}/posts/"
-            params = {
-                'auth_token': self.crypto_panic_key,
-                'currencies': symbol.replace('/USDT', ''),
-                'kind': 'news',
-                'filter': 'rising'
-            }
-            
-            async with self._session() as session:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if data.get('results'):
-                            # Анализируем новости
-                            positive_count = 0
-                            negative_count = 0
-                            total_count = len(data['results'])
-                            
-                            for post in data['results'][:10]:  # Берем первые 10 новостей
-                                votes = post.get('votes', {})
-                                if votes.get('positive', 0) > votes.get('negative', 0):
-                                    positive_count += 1
-                                elif votes.get('negative', 0) > votes.get('positive', 0):
-                                    negative_count += 1
-                            
-                            if total_count > 0:
-                                sentiment_score = (positive_count - negative_count) / total_count * 100
-                            else:
-                                sentiment_score = 0
-                            
-                            if sentiment_score > 20:
-                                sentiment = "bullish"
-                                description = "Позитивные новости преобладают"
-                            elif sentiment_score < -20:
-                                sentiment = "bearish"
-                                description = "Негативные новости преобладают"
-                            else:
-                                sentiment = "neutral"
-                                description = "Смешанные новости"
-                            
-                            return {
-                                'score': sentiment_score,
-                                'sentiment': sentiment,
-                                'description': description,
-                                'news_count': total_count,
-                                'positive_news': positive_count,
-                                'negative_news': negative_count
-                            }
-            
-            # Fallback если API недоступен
-            return {
+            social_sentiment = self._sentiment_from_posts(data['news']) or {
                 'score': 0,
                 'sentiment': 'neutral',
                 'description': 'Нейтральные новости',
                 'news_count': 0
             }
             
+            return {
+                'whale_activity': whale_activity,
+                'exchange_flows': exchange_flows,
+                'social_sentiment': social_sentiment,
+                'timestamp': time.time()
+            }
+            
         except Exception as e:
-            print(f"❌ Social sentiment error: {e}")
-            return {'sentiment': 'neutral', 'description': 'Данные недоступны'}
+            print(f"❌ OnChain analysis error for {symbol}: {e}")
+            return {}
+    
+    async def close(self):
+        await self.store.close()
+    
+    # === Загрузка источников (один раз за интервал на все пары) ===
+    
+    async def _load_dune_rows(self) -> List[Dict]:
+        """Глобальная выборка крупных транзакций из Dune Analytics"""
+        base_url = EXTERNAL_APIS['dune']['base_url']
+        query_id = EXTERNAL_APIS['dune']['query_id']
+        headers = {
+            'X-Dune-API-Key': self.dune_api_key,
+            'Content-Type': 'application/json'
+        }
+        url = f"{base_url}/query/{query_id}/results"
+        params = {
+            'limit': 100,
+            'offset': 0
+        }
+        
+        async with self._session() as session:
+            async with session.get(url, headers=headers, params=params, timeout=15) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Dune API HTTP {response.status}")
+                data = await response.json()
+        return (data.get('result') or {}).get('rows') or []
+    
+    async def _load_markets(self, assets: List[str]) -> Dict[str, Dict]:
+        """Объем и изменение цены за 24ч по всем активам пакетами CoinGecko /coins/markets"""
+        url = f"{EXTERNAL_APIS['coingecko']['base_url']}/coins/markets"
+        markets = {}
+        async with self._session() as session:
+            for start in range(0, len(assets), self.MARKETS_BATCH):
+                batch = assets[start:start + self.MARKETS_BATCH]
+                params = {
+                    'vs_currency': 'usd',
+                    'ids': ','.join(asset.lower() for asset in batch),
+                    'per_page': 250
+                }
+                async with session.get(url, params=params, timeout=10) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"CoinGecko markets HTTP {response.status}")
+                    for coin in await response.json():
+                        markets[str(coin.get('id', '')).upper()] = coin
+        return markets
+    
+    async def _load_market_charts(self, assets: List[str]) -> Dict[str, Dict]:
+        """Цены и объемы за неделю (CoinGecko market_chart) - по активу, с ограничением параллелизма"""
+        semaphore = asyncio.Semaphore(self.FLOWS_CONCURRENCY)
+        params = {
+            'vs_currency': 'usd',
+            'days': '7',  # Данные за неделю
+            'interval': 'daily'
+        }
+        
+        async def load(asset):
+            url = f"{EXTERNAL_APIS['coingecko']['base_url']}/coins/{asset.lower()}/market_chart"
+            async with semaphore:
+                try:
+                    async with self._session() as session:
+                        async with session.get(url, params=params, timeout=10) as response:
+                            if response.status == 200:
+                                return asset, await response.json()
+                except Exception as e:
+                    print(f"❌ Exchange flows error for {asset}: {e}")
+            return asset, None
+        
+        return dict(await asyncio.gather(*[load(asset) for asset in assets]))
+    
+    async def _load_news(self, assets: List[str]) -> Dict[str, List[Dict]]:
+        """Новости CryptoPanic пакетами валют, разложенные по активам"""
+        url = f"{EXTERNAL_APIS['crypto_panic']['base_url']}/posts/"
+        news = {asset: [] for asset in assets}
+        async with self._session() as session:
+            for start in range(0, len(assets), self.NEWS_BATCH):
+                batch = assets[start:start + self.NEWS_BATCH]
+                params = {
+                    'auth_token': self.crypto_panic_key,
+                    'currencies': ','.join(batch),
+                    'kind': 'news',
+                    'filter': 'rising'
+                }
+                async with session.get(url, params=params, timeout=10) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"CryptoPanic HTTP {response.status}")
+                    data = await response.json()
+                for post in data.get('results') or []:
+                    tagged = post.get('currencies') or post.get('instruments') or []
+                    for code in {str(item.get('code', '')).upper() for item in tagged}:
+                        if code in news:
+                            news[code].append(post)
+        return news
+    
+    # === Расчет метрик из загруженных данных ===
+    
+    @staticmethod
+    def _whale_from_dune(rows: List[Dict], asset: str) -> Optional[Dict]:
+        """РЕАЛЬНЫЙ анализ активности китов по строкам Dune Analytics"""
+        if not rows:
+            return None
+        
+        # Фильтруем по нашему символу если возможно
+        relevant_rows = [row for row in rows if asset in str(row).upper()]
+        
+        if not relevant_rows:
+            relevant_rows = rows[:10]  # Берем первые 10 записей
+        
+        # Анализируем активность
+        large_transactions = len(relevant_rows)
+        
+        # Считаем общий объем
+        total_volume = 0
+        for row in relevant_rows:
+            # Ищем поля с объемом (могут называться по-разному)
+            for key, value in row.items():
+                if 'amount' in key.lower() or 'volume' in key.lower():
+                    try:
+                        total_volume += float(value)
+                    except:
+                        continue
+        
+        # Определяем уровень активности
+        if large_transactions > 50 or total_volume > 10000000:
+            activity_level = "very_high"
+            description = "Очень высокая активность китов"
+            whale_score = 85
+        elif large_transactions > 20 or total_volume > 5000000:
+            activity_level = "high"
+            description = "Высокая активность китов"
+            whale_score = 70
+        elif large_transactions > 10 or total_volume > 1000000:
+            activity_level = "moderate"
+            description = "Умеренная активность китов"
+            whale_score = 55
+        else:
+            activity_level = "low"
+            description = "Низкая активность китов"
+            whale_score = 35
+        
+        return {
+            'score': whale_score,
+            'level': activity_level,
+            'description': description,
+            'large_transactions': large_transactions,
+            'net_flow': total_volume,
+            'data_source': 'dune_analytics'
+        }
+    
+    @staticmethod
+    def _whale_from_market(market: Optional[Dict]) -> Optional[Dict]:
+        """Fallback анализ активности по объему и волатильности (CoinGecko)"""
+        if not market:
+            return None
+        total_volume = market.get('total_volume') or 0
+        price_change_24h = market.get('price_change_percentage_24h') or 0
+        
+        # Определяем активность на основе объема и волатильности
+        if total_volume > 1000000000 and abs(price_change_24h) > 10:
+            whale_score = 80
+            activity_level = "very_high"
+            description = "Очень высокая активность (высокий объем + волатильность)"
+        elif total_volume > 500000000 and abs(price_change_24h) > 5:
+            whale_score = 65
+            activity_level = "high"
+            description = "Высокая активность"
+        elif total_volume > 100000000:
+            whale_score = 50
+            activity_level = "moderate"
+            description = "Умеренная активность"
+        else:
+            whale_score = 30
+            activity_level = "low"
+            description = "Низкая активность"
+        
+        return {
+            'score': whale_score,
+            'level': activity_level,
+            'description': description,
+            'large_transactions': int(total_volume / 1000000),  # Приблизительно
+            'net_flow': total_volume,
+            'data_source': 'coingecko_fallback'
+        }
+    
+    @staticmethod
+    def _flows_from_chart(data: Optional[Dict]) -> Optional[Dict]:
+        """РЕАЛЬНЫЙ анализ потоков на биржи по динамике цены и объема (CoinGecko)"""
+        if not data:
+            return None
+        prices = data.get('prices', [])
+        volumes = data.get('total_volumes', [])
+        if len(prices) < 2 or len(volumes) < 2:
+            return None
+        
+        # Анализируем тренд цены и объема
+        recent_prices = [p[1] for p in prices[-3:]]  # Последние 3 дня
+        recent_volumes = [v[1] for v in volumes[-3:]]  # Последние 3 дня
+        
+        # Тренд цены
+        price_trend = (recent_prices[-1] - recent_prices[0]) / recent_prices[0] * 100
+        
+        # Тренд объема
+        avg_volume_recent = sum(recent_volumes) / len(recent_volumes)
+        avg_volume_week = sum([v[1] for v in volumes]) / len(volumes)
+        volume_change = (avg_volume_recent - avg_volume_week) / avg_volume_week * 100
+        
+        # Определяем потоки на основе корреляции цены и объема
+        if price_trend < -5 and volume_change > 20:
+            # Цена падает, объем растет = приток на биржи (продажи)
+            flow_sentiment = "bearish"
+            description = "Большой приток на биржи (медвежий сигнал)"
+            net_flow = -avg_volume_recent
+        elif price_trend > 5 and volume_change > 20:
+            # Цена растет, объем растет = активные покупки
+            flow_sentiment = "bullish"
+            description = "Активные покупки (бычий сигнал)"
+            net_flow = avg_volume_recent
+        elif price_trend > 2 and volume_change < -10:
+            # Цена растет, объем падает = отток с бирж (ходл)
+            flow_sentiment = "bullish"
+            description = "Отток с бирж, ходлинг (бычий сигнал)"
+            net_flow = avg_volume_recent * 0.5
+        else:
+            flow_sentiment = "neutral"
+            description = "Нейтральные потоки"
+            net_flow = 0
+        
+        return {
+            'inflow': max(0, -net_flow) if net_flow < 0 else 0,
+            'outflow': max(0, net_flow) if net_flow > 0 else 0,
+            'net_flow': net_flow,
+            'sentiment': flow_sentiment,
+            'description': description,
+            'price_trend': price_trend,
+            'volume_change': volume_change,
+            'data_source': 'coingecko'
+        }
+    
+    @staticmethod
+    def _sentiment_from_posts(posts: Optional[List[Dict]]) -> Optional[Dict]:
+        """Анализ социального настроения по новостям CryptoPanic"""
+        if not posts:
+            return None
+        positive_count = 0
+        negative_count = 0
+        total_count = len(posts)
+        
+        for post in posts[:10]:  # Берем первые 10 новостей
+            votes = post.get('votes', {})
+            if votes.get('positive', 0) > votes.get('negative', 0):
+                positive_count += 1
+            elif votes.get('negative', 0) > votes.get('positive', 0):
+                negative_count += 1
+        
+        sentiment_score = (positive_count - negative_count) / total_count * 100
+        
+        if sentiment_score > 20:
+            sentiment = "bullish"
+            description = "Позитивные новости преобладают"
+        elif sentiment_score < -20:
+            sentiment = "bearish"
+            description = "Негативные новости преобладают"
+        else:
+            sentiment = "neutral"
+            description = "Смешанные новости"
+        
+        return {
+            'score': sentiment_score,
+            'sentiment': sentiment,
+            'description': description,
+            'news_count': total_count,
+            'positive_news': positive_count,
+            'negative_news': negative_count
+        }
 
 class TelegramBot:
     """Telegram бот для отправки сигналов и управления"""
@@ -1216,15 +892,19 @@ class TelegramBot:
         # Троттлинг ошибок
         self._last_err_log_ts = 0.0
         self._err_log_interval_sec = 30.0
+        # Очередь доставки сигналов: скан не ждет Telegram и его 429
+        self.outbox = TelegramOutbox(
+            self.bot_token, self.chat_id, parse_mode='Markdown',
+            path=TELEGRAM_CONFIG.get('outbox_path', 'data/telegram_outbox_unified.json')
+        )
     
     def set_bot_instance(self, bot_instance):
         """Устанавливаем ссылку на основной бот для управления"""
         self.bot_instance = bot_instance
     
-    def _session(self) -> aiohttp.ClientSession:
-        """Создаёт HTTP-сессию для Telegram с отключённой SSL-проверкой (фикс SSL ошибок)."""
-        connector = aiohttp.TCPConnector(ssl=False)
-        return aiohttp.ClientSession(connector=connector)
+    def _session(self):
+        """Общая пулированная HTTP-сессия Telegram с отключённой SSL-проверкой (фикс SSL ошибок)."""
+        return http_client.borrow('telegram', ssl=False)
     
     def _log_error_throttled(self, prefix: str, err: Exception):
         now = time.time()
@@ -1255,6 +935,11 @@ class TelegramBot:
         
         return False
     
+    def queue_message(self, message: str, chat_id: str = None, on_sent=None, coalesce: bool = True) -> int:
+        """Постановка сообщения в очередь доставки (мгновенно, без сетевых запросов)"""
+        self.outbox.start()
+        return self.outbox.enqueue(message, chat_id or self.chat_id, coalesce=coalesce, on_sent=on_sent)
+    
     async def _ensure_polling_mode(self) -> None:
         """Сбрасывает webhook, чтобы работал getUpdates (polling-режим)."""
         try:
@@ -1422,50 +1107,51 @@ class TelegramBot:
             print(f"❌ Error handling command: {e}")
             await self.send_message("❌ Ошибка выполнения команды", chat_id)
 
-async def process_and_collect_signals(pairs, timeframes, data_manager, ai_engine, min_confidence=0.8, top_n=5):
+async def process_and_collect_signals(pairs, timeframes, data_manager, ai_engine, min_confidence=0.8, top_n=5,
+                                      on_signal=None, fetch_concurrency=None, compute_concurrency=None):
     """
     Анализирует N пар и выдает только top-N лучших (самых точных) сигналов по alpha/confidence.
+    Конвейер fetch -> compute -> rank со своим лимитом параллелизма на каждой стадии.
+    on_signal(signal) вызывается для каждого сигнала из top-N, как только он гарантирован,
+    не дожидаясь самой медленной пары.
     """
-    all_signals = []
-    errors = 0
+    max_confidence = 0.95  # Потолок confidence после нормализации
 
-    async def analyze_pair(pair):
+    async def fetch(pair):
+        return await data_manager.get_multi_timeframe_data(pair, timeframes)
+
+    async def compute(pair, ohlcv_data):
         try:
-            ohlcv_data = await data_manager.get_multi_timeframe_data(pair, timeframes)
-            if not ohlcv_data:
-                return None
-            
             signal = await ai_engine.process_symbol(pair, ohlcv_data)
-            if signal and signal.get('action') in ('BUY', 'SELL'):
-                # Патчинг confidence, защита
-                conf = signal.get('confidence', 0)
-                if isinstance(conf, str):
-                    try:
-                        conf = float(conf)
-                    except:
-                        conf = 0
-                while conf > 1.0:
-                    conf /= 100.0
-                conf = max(0.0, min(conf, 0.95))
-                signal['confidence'] = conf
-                return signal
-            return None
         except Exception as e:
             print(f"Signal error for {pair}: {e}")
-            nonlocal errors
-            errors += 1
-            return None
-
-    # Async-parallel анализ всех пар
-    tasks = [analyze_pair(pair) for pair in pairs]
-    results = await asyncio.gather(*tasks)
-    signals_ok = [s for s in results if s is not None]
+            raise
+        if signal and signal.get('action') in ('BUY', 'SELL'):
+            # Патчинг confidence, защита
+            conf = signal.get('confidence', 0)
+            if isinstance(conf, str):
+                try:
+                    conf = float(conf)
+                except:
+                    conf = 0
+            while conf > 1.0:
+                conf /= 100.0
+            conf = max(0.0, min(conf, max_confidence))
+            signal['confidence'] = conf
+            if conf >= min_confidence:
+                return conf, signal
+        return None
 
-    # Отбор только лучших TOP-N значений по alpha/confidence
-    filtered = [s for s in signals_ok if s['confidence'] >= min_confidence]
-    filtered = sorted(filtered, key=lambda x: x['confidence'], reverse=True)[:top_n]
+    scanner = PipelinedScanner(
+        fetch, compute,
+        fetch_concurrency=fetch_concurrency or TRADING_CONFIG.get('fetch_concurrency', 16),
+        compute_concurrency=compute_concurrency or TRADING_CONFIG.get('compute_concurrency', 4)
+    )
+    filtered, stats = await scanner.scan(pairs, top_n, max_score=max_confidence, on_signal=on_signal)
 
-    print(f"Всего пар: {len(pairs)}. Сработало сигналов: {len(signals_ok)}. Среди лучших (conf>={min_confidence}): {len(filtered)}. Ошибок: {errors}")
+    print(f"Всего пар: {len(pairs)}. Обработано: {stats['processed']}. "
+          f"Сигналов (conf>={min_confidence}): {stats['signals']}. Среди лучших: {len(filtered)}. "
+          f"Досрочно отправлено: {stats['published_early']}. Ошибок: {stats['errors']}")
     for sig in filtered:
         print(f"{sig['symbol']} {sig['action']} conf={sig['confidence']:.3f} price={sig['entry_price']}")
 
@@ -1728,7 +1414,7 @@ class UnifiedSignalBot:
     def __init__(self):
         self.data_manager = UniversalDataManager()
         self.ai_engine = RealTimeAIEngine()
-        self.onchain_analyzer = OnChainAnalyzer()
+        self.onchain_analyzer = self.ai_engine.onchain_analyzer  # Один on-chain store на процесс
         self.telegram_bot = TelegramBot()
         self.scalping_engine = ScalpingSignalEngine(min_confidence=0.6, min_filters=3)  # Настройки для скальпинга  # ЗОЛОТАЯ СЕРЕДИНА: Баланс качества и частоты
         self.running = False
@@ -1783,7 +1469,8 @@ class UnifiedSignalBot:
         print("=" * 60)
         
         # Отправляем сообщение о запуске
-        await self.telegram_bot.send_message(
+        self.telegram_bot.outbox.start()
+        self.telegram_bot.queue_message(
             "🚨 **UNIFIED SIGNAL BOT STARTED**\n\n"
             f"📊 Пар для анализа: {len(self.pairs)}\n"
             f"⏱️ Таймфреймы: {', '.join(self.timeframes)}\n"
@@ -1796,7 +1483,8 @@ class UnifiedSignalBot:
             f"⏰ Частота скальпинга: {self.scalping_frequency} сек\n\n"
             "🎯 SignalPro: Обычные сигналы (80%+ уверенность)"
             "ScalpingPro: Быстрые сигналы (60%+ уверенность)\n\n"
-            "💬 Управление: /help для команд"
+            "💬 Управление: /help для команд",
+            coalesce=False
         )
         
         # Запускаем основной цикл и прослушивание команд параллельно
@@ -1817,6 +1505,20 @@ class UnifiedSignalBot:
         
         await asyncio.gather(*tasks)
     
+    def _on_signal_sent(self, symbol: str, stat: str):
+        def on_sent():
+            print(f"📤 Signal for {symbol} sent to Telegram")
+            self.stats[stat] += 1
+        return on_sent
+
+    async def _send_top_signal(self, signal: Dict):
+        """Постановка сигнала из top-N в очередь Telegram (скан не ждет доставки)"""
+        try:
+            message = format_signal_for_telegram(signal, signal['analysis'], signal['mtf_analysis'], signal['onchain_data'])
+            self.telegram_bot.queue_message(message, on_sent=self._on_signal_sent(signal['symbol'], 'sent_signals'))
+        except Exception as e:
+            print(f"❌ Failed to queue signal for {signal.get('symbol')}: {e}")
+
     async def batch_top_signals_loop(self):
         """Основной цикл отбора лучших сигналов"""
         while self.running:
@@ -1824,25 +1526,17 @@ class UnifiedSignalBot:
                 self.stats['cycles'] += 1
                 print(f"\n📊 Cycle #{self.stats['cycles']}: Analyzing {len(self.pairs)} pairs...")
                 
-                # Получаем топ сигналы
+                # Получаем топ сигналы; каждый отправляется в Telegram, как только гарантирован
                 top_signals = await process_and_collect_signals(
                     self.pairs,
                     self.timeframes,
                     self.data_manager,
                     self.ai_engine,
                     min_confidence=self.min_confidence,
-                    top_n=self.top_n
+                    top_n=self.top_n,
+                    on_signal=self._send_top_signal
                 )
                 
-                # Отправляем сигналы в Telegram
-                for signal in top_signals:
-                    message = format_signal_for_telegram(signal, signal['analysis'], signal['mtf_analysis'], signal['onchain_data'])
-                    if await self.telegram_bot.send_message(message):
-                        print(f"📤 Signal for {signal['symbol']} sent to Telegram")
-                        self.stats['sent_signals'] += 1
-                    else:
-                        print(f"❌ Failed to send signal for {signal['symbol']}")
-                
                 self.stats['total_signals'] += len(top_signals)
                 
                 # Отправляем статус каждые 10 циклов
@@ -1859,7 +1553,7 @@ class UnifiedSignalBot:
                         f"🎯 Success rate: {(self.stats['sent_signals']/max(1,self.stats['total_signals'])*100):.1f}%\n"
                         f"🤖 Status: 🟢 ACTIVE"
                     )
-                    await self.telegram_bot.send_message(status_message)
+                    self.telegram_bot.queue_message(status_message, coalesce=False)
                 
                 # Ждем до следующего цикла
                 await asyncio.sleep(self.update_frequency)
@@ -1917,22 +1611,20 @@ class UnifiedSignalBot:
                 
                 print(f"📊 Scalping analysis: {analyzed_count} pairs, {len(scalping_signals)} signals, {error_count} errors")
                 
-                # Отправляем скальпинг сигналы
-                sent_count = 0
+                # Отправляем скальпинг сигналы (через очередь: пачка уйдет дайджестом)
+                queued_count = 0
                 for signal in scalping_signals:
                     try:
                         message = self.format_scalping_signal_for_telegram(signal)
-                        if await self.telegram_bot.send_message(message):
-                            print(f"⚡ Scalping signal for {signal['symbol']} sent to Telegram")
-                            self.stats['scalping_sent'] += 1
-                            sent_count += 1
-                        else:
-                            print(f"❌ Failed to send scalping signal for {signal['symbol']}")
+                        self.telegram_bot.queue_message(
+                            message, on_sent=self._on_signal_sent(signal['symbol'], 'scalping_sent')
+                        )
+                        queued_count += 1
                     except Exception as e:
-                        print(f"❌ Error sending scalping signal: {e}")
+                        print(f"❌ Error queueing scalping signal: {e}")
                 
                 self.stats['scalping_signals'] += len(scalping_signals)
-                print(f"📤 Sent {sent_count}/{len(scalping_signals)} scalping signals to Telegram")
+                print(f"📤 Queued {queued_count}/{len(scalping_signals)} scalping signals for Telegram")
                 
                 # Ждем до следующего скальпинг цикла
                 await asyncio.sleep(self.scalping_frequency)
@@ -2041,6 +1733,10 @@ async def main():
         print("\n🛑 Stopping bot...")
     finally:
         bot.stop()
+        await bot.data_manager.close()
+        await bot.onchain_analyzer.close()
+        await bot.telegram_bot.outbox.stop()
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file